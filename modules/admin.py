@@ -8,6 +8,7 @@ import sys
 import os
 import json
 import numpy as np
+import logging
 
 # Optional Firebase Storage imports
 try:
@@ -22,11 +23,18 @@ except Exception:
 # Add utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
-from utils.firebase_config import get_firestore_client, COLLECTIONS
-from google.cloud.firestore import FieldFilter
+from utils.firebase_config import get_firestore_client
 from utils.auth_utils import get_all_users, is_admin, get_user_by_id
 from utils.ai_config_utils import load_ai_configuration, save_ai_configuration, reset_ai_configuration, validate_prompt_template
 from utils.feedback_system import display_feedback_analytics
+from utils.admin_metrics import AdminMetricsService, empty_system_statistics
+from utils.config_snapshot import get_config_snapshot, invalidate_config_snapshot
+from utils.session_result_store import get_memory_usage as get_session_store_usage
+from utils.ttl_cache import app_cache
+from utils.tracing import tracer
+from utils.usage_accounting import UsageAccountant, load_budgets, usage_ledger
+
+logger = logging.getLogger(__name__)
 
 # Import translations
 try:
@@ -94,6 +102,12 @@ admin_codes = ["YOUR_ADMIN_CODE_HERE"]
             st.session_state.pop('admin_code_used', None)
             st.rerun()
     
+    display_system_overview()
+    display_session_store_usage()
+    display_cache_statistics()
+    display_performance_traces()
+    display_llm_usage()
+    
     st.divider()
     
     # Admin navigation (Dashboard removed)
@@ -124,82 +138,178 @@ def show_admin_dashboard():
     st.info("Dashboard has been removed.")
 
 def get_system_statistics() -> Dict[str, Any]:
-    """Get system statistics for dashboard"""
+    """Get system statistics for dashboard (aggregation queries + daily rollups, cached briefly)"""
     try:
-        db = get_firestore_client()
-        
-        # Get user statistics
-        users_ref = db.collection(COLLECTIONS['users'])
-        total_users = len(list(users_ref.stream()))
-        
-        # Get real user statistics
-        return {
-            'total_users': total_users,
-            'new_users_today': 0,  # Will be calculated from actual user data
-            'active_users_7d': 45,
-            'active_users_change': 12,
-            'total_analyses': 156,
-            'analyses_today': 8,
-            'system_health': 0.95,
-            'queued_tasks': 0,
-            'tasks_today': 0
-        }
+        return AdminMetricsService().get_system_statistics()
     except Exception as e:
         st.error(f"Error getting system statistics: {str(e)}")
-        return {
-            'total_users': 0,
-            'new_users_today': 0,
-            'active_users_7d': 0,
-            'active_users_change': 0,
-            'total_analyses': 0,
-            'analyses_today': 0,
-            'system_health': 0.0
-        }
+        return empty_system_statistics()
+
+def display_system_overview():
+    """Compact row of live system metrics shown above the admin tabs"""
+    stats = get_system_statistics()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Users", stats['total_users'], delta=stats['new_users_today'] or None)
+    with col2:
+        st.metric("Active Users (7d)", stats['active_users_7d'], delta=stats['active_users_change'] or None)
+    with col3:
+        st.metric("Total Analyses", stats['total_analyses'], delta=stats['analyses_today'] or None)
+    with col4:
+        st.metric("Success Rate (7d)", f"{stats['system_health']:.0%}",
+                  delta=-stats['failures_7d'] if stats['failures_7d'] else None)
+
+def display_session_store_usage():
+    """Memory held by session analysis results on this server process (all sessions)"""
+    usage = get_session_store_usage()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Sessions Holding Results", usage['sessions'])
+    with col2:
+        st.metric("Results In Memory", usage['in_memory'],
+                  help=f"{usage['in_memory_bytes'] / (1024 * 1024):.1f} MB (approx.)")
+    with col3:
+        st.metric("Results Spilled to Disk", usage['spilled'],
+                  help=f"{usage['spilled_bytes'] / (1024 * 1024):.1f} MB compressed, {usage['reloads']} reloads")
+
+def display_cache_statistics():
+    """Hit/miss/eviction counters of the per-user result caches on this server process"""
+    stats = app_cache.stats()
+    if not stats:
+        return
+    with st.expander("Cache Statistics", expanded=False):
+        st.dataframe(pd.DataFrame([
+            {'Namespace': namespace, 'Entries': row['entries'], 'Hits': row['hits'],
+             'Misses': row['misses'], 'Evictions': row['evictions'], 'Hit Rate': f"{row['hit_rate']:.0%}"}
+            for namespace, row in sorted(stats.items())
+        ]), use_container_width=True, hide_index=True)
+
+def display_performance_traces():
+    """Per-stage latency percentiles and the slowest recent analyses from this process's trace buffer"""
+    stage_rows = tracer.stage_stats()
+    if not stage_rows:
+        return
+    with st.expander("Performance Traces", expanded=False):
+        st.caption("Recent spans recorded on this server process (ring buffer, cleared on restart)")
+        st.dataframe(pd.DataFrame([
+            {'Stage': row['stage'], 'Span': row['name'], 'Count': row['count'],
+             'p50 (ms)': round(row['p50_s'] * 1000, 1), 'p95 (ms)': round(row['p95_s'] * 1000, 1),
+             'Max (ms)': round(row['max_s'] * 1000, 1), 'Errors': row['errors']}
+            for row in stage_rows
+        ]), use_container_width=True, hide_index=True)
+
+        slowest = tracer.slowest_traces(limit=10)
+        if slowest:
+            st.markdown("**Slowest Recent Analyses**")
+            rows = []
+            for trace in slowest:
+                attributes = trace.get('attributes', {})
+                row = {
+                    'Started': datetime.fromtimestamp(trace['start_time']).strftime('%Y-%m-%d %H:%M:%S'),
+                    'Span': trace['name'],
+                    'Duration (s)': round(trace['duration_s'] or 0.0, 2),
+                    'Status': trace['status'],
+                    'Tokens': attributes.get('prompt_tokens', 0) + attributes.get('output_tokens', 0),
+                }
+                for stage, seconds in sorted(trace.get('stage_totals', {}).items()):
+                    row[f"{stage} (s)"] = round(seconds, 2)
+                rows.append(row)
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def display_llm_usage():
+    """LLM token and cost rollups: this month from Firestore, recent analyses from this process"""
+    with st.expander("LLM Usage & Cost", expanded=False):
+        try:
+            accountant = UsageAccountant()
+            daily = accountant.daily_usage(days=30)
+            top_users = accountant.top_users(limit=20)
+        except Exception as e:
+            logger.error(f"Error loading LLM usage: {str(e)}")
+            daily, top_users = [], []
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Analyses (30d)", sum(day['analyses'] for day in daily))
+        with col2:
+            st.metric("LLM Calls (30d)", sum(day['calls'] for day in daily),
+                      help=f"{sum(day['failed_calls'] for day in daily)} failed")
+        with col3:
+            st.metric("Tokens (30d)", f"{sum(day['total_tokens'] for day in daily):,}")
+        with col4:
+            st.metric("Est. Cost (30d)", f"${sum(day['cost_usd'] for day in daily):,.2f}")
+
+        if any(day['calls'] for day in daily):
+            chart = pd.DataFrame({'Date': pd.to_datetime([day['date'] for day in daily]),
+                                  'Cost (USD)': [day['cost_usd'] for day in daily]})
+            fig = px.bar(chart, x='Date', y='Cost (USD)')
+            fig.update_layout(height=240, margin=dict(l=10, r=10, t=10, b=10))
+            st.plotly_chart(fig, use_container_width=True)
+
+        if top_users:
+            st.markdown("**Top Users This Month**")
+            st.dataframe(pd.DataFrame([
+                {'User': row['user_key'], 'Plan': row.get('plan') or '-', 'Analyses': row.get('analyses', 0),
+                 'Calls': row.get('calls', 0), 'Tokens': row.get('total_tokens', 0),
+                 'Cost (USD)': round(row.get('cost_usd', 0.0), 4)}
+                for row in top_users
+            ]), use_container_width=True, hide_index=True)
+
+        totals = usage_ledger.totals()
+        if totals['by_model']:
+            st.markdown("**By Model (this server process)**")
+            st.dataframe(pd.DataFrame([
+                {'Model': model, 'Calls': row['calls'], 'Failed': row['failed_calls'],
+                 'Prompt Tokens': row['prompt_tokens'], 'Output Tokens': row['output_tokens'],
+                 'Cost (USD)': round(row['cost_usd'], 4)}
+                for model, row in sorted(totals['by_model'].items(), key=lambda item: -item[1]['cost_usd'])
+            ]), use_container_width=True, hide_index=True)
+
+        recent = usage_ledger.recent(limit=20)
+        if recent:
+            st.markdown("**Recent Analyses (this server process)**")
+            rows = []
+            for entry in recent:
+                row = {'Finished': entry['recorded_at'][:19].replace('T', ' '), 'User': entry['user_key'],
+                       'Mode': entry.get('analysis_mode') or '-', 'Tokens': entry['total_tokens'],
+                       'Cost (USD)': round(entry['cost_usd'], 4)}
+                for step, counters in sorted(entry.get('by_step', {}).items()):
+                    row[f"Step {step} tokens"] = counters['total_tokens']
+                rows.append(row)
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+        budgets = load_budgets()
+        if budgets.get('plans') or budgets.get('users'):
+            st.caption("Monthly budgets (advanced settings → llm_budgets): " + ", ".join(
+                f"{plan}: {limits.get('monthly_tokens') or '∞'} tokens / ${limits.get('monthly_cost_usd') or '∞'}"
+                for plan, limits in sorted((budgets.get('plans') or {}).items())
+            ) + (f"; {len(budgets['users'])} per-user overrides" if budgets.get('users') else ''))
+        else:
+            st.caption("No LLM budgets configured (advanced settings → llm_budgets)")
 
 def display_usage_trends():
     """Display usage trends chart"""
-    st.subheader("Feature Adoption")
+    st.subheader("Usage Trends (30 days)")
     
-    # Get real usage data from Firestore
     try:
-        db = get_firestore_client()
-        if db:
-            # Query real analysis data
-            analyses_ref = db.collection('analyses')
-            analyses = list(analyses_ref.stream())
-            
-            # Create usage data from real analyses
-            dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='D')
-            usage_data = pd.DataFrame({
-                'Date': dates,
-                'Daily Active Users': [0] * len(dates),  # Will be populated with real data
-                'Analyses Created': [0] * len(dates)      # Will be populated with real data
-            })
-        else:
-            # Fallback when database is not available
-            dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='D')
-            usage_data = pd.DataFrame({
-                'Date': dates,
-                'Daily Active Users': [0] * len(dates),
-                'Analyses Created': [0] * len(dates)
-            })
+        rollups = AdminMetricsService().get_daily_rollups(days=30)
     except Exception as e:
         logger.error(f"Error fetching usage data: {str(e)}")
-        dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='D')
-        usage_data = pd.DataFrame({
-            'Date': dates,
-            'Daily Active Users': [0] * len(dates),
-            'Analyses Created': [0] * len(dates)
-        })
-    
-    # Replace with a simple adoption summary
-    col_a, col_b = st.columns(2)
-    with col_a:
-        st.metric("New Admin Prompts (30d)", 0)
-        st.metric("Reference Docs Added (30d)", 0)
-    with col_b:
-        st.metric("Users Edited Settings (30d)", 0)
-        st.metric("Feedback Submissions (30d)", 0)
+        rollups = []
+    
+    usage_data = pd.DataFrame({
+        'Date': pd.to_datetime([day['date'] for day in rollups]),
+        'Daily Active Users': [day['active_users'] for day in rollups],
+        'Analyses Created': [day['analyses'] for day in rollups],
+        'Failed Analyses': [day['failures'] for day in rollups]
+    })
+    
+    if usage_data.empty or not usage_data.drop(columns=['Date']).values.any():
+        st.info("No usage recorded in the last 30 days.")
+        return
+    
+    fig = px.line(usage_data, x='Date', y=['Daily Active Users', 'Analyses Created', 'Failed Analyses'])
+    fig.update_layout(height=320, legend_title_text='', margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
 
 def display_feature_adoption():
     """Wrapper to keep call sites working after renaming"""
@@ -335,18 +445,9 @@ def get_analysis_prompts() -> List[Dict[str, Any]]:
         return []
 
 def get_active_prompt() -> Optional[Dict[str, Any]]:
-    """Get the currently active prompt"""
+    """Get the currently active prompt (copy from the cached configuration snapshot)"""
     try:
-        db = get_firestore_client()
-        prompts_ref = db.collection('analysis_prompts')
-        active_query = prompts_ref.where(filter=FieldFilter('is_active', '==', True)).limit(1)
-        active_docs = list(active_query.stream())
-        
-        if active_docs:
-            prompt_data = active_docs[0].to_dict()
-            prompt_data['id'] = active_docs[0].id
-            return prompt_data
-        return None
+        return get_config_snapshot().get_active_prompt()
     
     except Exception as e:
         st.error(f"Error getting active prompt: {str(e)}")
@@ -370,6 +471,7 @@ def save_prompt(prompt_data: Dict[str, Any], prompt_id: str = None) -> bool:
             prompt_data['created_at'] = datetime.now()
             prompts_ref.add(prompt_data)
         
+        invalidate_config_snapshot()
         return True
         
     except Exception as e:
@@ -394,6 +496,7 @@ def set_active_prompt(prompt_id: str) -> bool:
         batch.update(target_doc, {'is_active': True})
         
         batch.commit()
+        invalidate_config_snapshot()
         return True
     
     except Exception as e:
@@ -406,6 +509,7 @@ def delete_prompt(prompt_id: str) -> bool:
         db = get_firestore_client()
         prompts_ref = db.collection('analysis_prompts')
         prompts_ref.document(prompt_id).delete()
+        invalidate_config_snapshot()
         return True
     
     except Exception as e:
@@ -1754,12 +1858,10 @@ def show_reference_materials_config():
 def get_output_formatting_config() -> Dict[str, Any]:
     """Get output formatting configuration from Firestore"""
     try:
-        db = get_firestore_client()
-        config_ref = db.collection('ai_config').document('output_formatting')
-        doc = config_ref.get()
+        stored_config = get_config_snapshot().get_setting('output_formatting')
         
-        if doc.exists:
-            return doc.to_dict()
+        if stored_config is not None:
+            return stored_config
         else:
             # Return default configuration
             return {
@@ -1797,6 +1899,7 @@ def save_output_formatting_config(config_data: Dict[str, Any]) -> bool:
         config_data['updated_by'] = st.session_state.get('user_id', 'system')
         
         config_ref.set(config_data, merge=True)
+        invalidate_config_snapshot()
         return True
     
     except Exception as e:
@@ -2007,12 +2110,10 @@ def show_output_formatting_config():
 def get_tagging_config() -> Dict[str, Any]:
     """Get tagging system configuration from Firestore"""
     try:
-        db = get_firestore_client()
-        config_ref = db.collection('ai_config').document('tagging_system')
-        doc = config_ref.get()
+        stored_config = get_config_snapshot().get_setting('tagging')
         
-        if doc.exists:
-            return doc.to_dict()
+        if stored_config is not None:
+            return stored_config
         else:
             # Return default configuration
             return {
@@ -2064,6 +2165,7 @@ def save_tagging_config(config_data: Dict[str, Any]) -> bool:
         config_data['updated_by'] = st.session_state.get('user_id', 'system')
         
         config_ref.set(config_data, merge=True)
+        invalidate_config_snapshot()
         return True
     
     except Exception as e:
@@ -2328,12 +2430,10 @@ def show_tagging_config():
 def get_advanced_settings_config() -> Dict[str, Any]:
     """Get advanced settings configuration from Firestore"""
     try:
-        db = get_firestore_client()
-        config_ref = db.collection('ai_config').document('advanced_settings')
-        doc = config_ref.get()
+        stored_config = get_config_snapshot().get_setting('advanced_settings')
         
-        if doc.exists:
-            config = doc.to_dict()
+        if stored_config is not None:
+            config = stored_config
             # Fix any out-of-range values
             if config.get('max_tokens', 65536) > 65536:
                 config['max_tokens'] = 65536
@@ -2394,6 +2494,7 @@ def save_advanced_settings_config(config_data: Dict[str, Any]) -> bool:
         config_data['updated_by'] = st.session_state.get('user_id', 'system')
         
         config_ref.set(config_data, merge=True)
+        invalidate_config_snapshot()
         return True
     
     except Exception as e:
@@ -14,6 +14,8 @@ from firebase_config import get_firestore_client, COLLECTIONS
 from google.cloud.firestore import FieldFilter
 from functools import lru_cache
 from translations import translate, t, get_language
+from utils.user_stats import UserStatsAggregator, monthly_trends, summarize_stats
+from utils.ttl_cache import scoped_cache
 
 def show_dashboard():
     """Display simplified user dashboard for non-technical users"""
@@ -53,54 +55,30 @@ def show_dashboard():
         display_help_us_improve_tab()
 
 # ===== SIMPLIFIED DASHBOARD SECTIONS =====
-@st.cache_data(ttl=30)
+def _load_user_stats_document(db, user_id: str) -> Dict[str, Any]:
+    """Read the materialized statistics document for a user (user_id first, then email)"""
+    aggregator = UserStatsAggregator(db)
+    stats = aggregator.get_stats(user_id)
+    if not (stats or {}).get('totals', {}).get('analyses') and 'user_email' in st.session_state:
+        user_email = st.session_state.get('user_email')
+        if user_email and user_email != user_id:
+            stats = aggregator.get_stats(user_email) or stats
+    return stats or {}
+
+@scoped_cache('user_stats', ttl_seconds=30, max_entries=256)
 def _cached_user_stats(user_id: str) -> Dict[str, Any]:
     try:
         db = get_firestore_client()
         if not db:
             return {'total_analyses': 0, 'recent_activity': 0, 'total_recommendations': 0}
         
-        # Try both user_id and user_email approaches
-        # First try with user_id
-        q = db.collection('analysis_results').where(filter=FieldFilter('user_id', '==', user_id)).order_by('created_at', direction='DESCENDING').limit(50)
-        docs = list(q.stream())
-        total = len(docs)
-        
-        # If no results with user_id, try with user_email from session state
-        if total == 0 and 'user_email' in st.session_state:
-            user_email = st.session_state.get('user_email')
-            q = db.collection('analysis_results').where(filter=FieldFilter('user_id', '==', user_email)).order_by('created_at', direction='DESCENDING').limit(50)
-            docs = list(q.stream())
-            total = len(docs)
-        
-        now = datetime.utcnow()
-        week_count = 0
-        recs = 0
-        
-        for d in docs:
-            data = d.to_dict()
-            created = data.get('created_at', now)
-            
-            # Handle different datetime formats
-            if hasattr(created, 'timestamp'):
-                delta_days = (now - created).days
-            elif hasattr(created, 'replace') and hasattr(created, 'tzinfo') and created.tzinfo is not None:
-                created_naive = created.replace(tzinfo=None)
-                delta_days = (now - created_naive).days
-            else:
-                delta_days = 0
-                
-            if delta_days <= 7:
-                week_count += 1
-                
-            # Count recommendations from the analysis data
-            recommendations = data.get('recommendations', [])
-            if isinstance(recommendations, list):
-                recs += len(recommendations)
-            elif isinstance(recommendations, dict):
-                recs += len(recommendations.get('recommendations', []))
-                
-        return {'total_analyses': total, 'recent_activity': week_count, 'total_recommendations': recs}
+        # One small per-user document maintained when analyses are stored
+        stats = summarize_stats(_load_user_stats_document(db, user_id))
+        return {
+            'total_analyses': stats['total_analyses'],
+            'recent_activity': stats['recent_activity'],
+            'total_recommendations': stats['total_recommendations']
+        }
     except Exception as e:
         # Silent error handling - return default values
         return {'total_analyses': 0, 'recent_activity': 0, 'total_recommendations': 0}
@@ -431,7 +409,7 @@ def display_user_overview_section(user_info, user_id):
     </div>
     """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=30)
+@scoped_cache('recent_analyses', ttl_seconds=30, max_entries=256)
 def _cached_recent_analyses(user_id: str) -> List[Dict[str, Any]]:
     try:
         db = get_firestore_client()
@@ -847,107 +825,8 @@ def get_comprehensive_user_statistics(user_id: str) -> Dict[str, Any]:
         if not db:
             return {}
         
-        # Get all user analyses from analysis_results collection
-        # Try both user_id and user_email approaches
-        analyses_ref = db.collection('analysis_results').where(filter=FieldFilter('user_id', '==', user_id))
-        analyses = analyses_ref.get()
-        
-        # If no results with user_id, try with user_email from session state
-        if len(analyses) == 0 and 'user_email' in st.session_state:
-            user_email = st.session_state.get('user_email')
-            analyses_ref = db.collection('analysis_results').where(filter=FieldFilter('user_id', '==', user_email))
-            analyses = analyses_ref.get()
-        
-        total_analyses = len(analyses)
-        
-        # Count by report type
-        soil_analyses = 0
-        leaf_analyses = 0
-        total_issues = 0
-        critical_issues = 0
-        total_recommendations = 0
-        
-        # Time-based calculations
-        now = datetime.now()
-        week_ago = now - timedelta(days=7)
-        month_ago = now - timedelta(days=30)
-        
-        recent_activity = 0
-        soil_this_month = 0
-        leaf_this_month = 0
-        soil_last_month = 0
-        leaf_last_month = 0
-        
-        for analysis in analyses:
-            data = analysis.to_dict()
-            created_at = data.get('created_at', now)
-            
-            # Convert timezone-aware datetime to naive for comparison
-            if hasattr(created_at, 'replace') and hasattr(created_at, 'tzinfo') and created_at.tzinfo is not None:
-                created_at_naive = created_at.replace(tzinfo=None)
-            else:
-                created_at_naive = created_at
-            
-            # Check raw_data for report types (soil/leaf data presence)
-            raw_data = data.get('raw_data', {})
-            has_soil = bool(raw_data.get('soil_data', {}))
-            has_leaf = bool(raw_data.get('leaf_data', {}))
-            
-            if has_soil:
-                soil_analyses += 1
-                if created_at_naive > month_ago:
-                    soil_this_month += 1
-                elif month_ago > created_at_naive > (month_ago - timedelta(days=30)):
-                    soil_last_month += 1
-                    
-            if has_leaf:
-                leaf_analyses += 1
-                if created_at_naive > month_ago:
-                    leaf_this_month += 1
-                elif month_ago > created_at_naive > (month_ago - timedelta(days=30)):
-                    leaf_last_month += 1
-            
-            if created_at_naive > week_ago:
-                recent_activity += 1
-            
-            # Count issues and recommendations from the analysis data structure
-            issues_analysis = data.get('issues_analysis', {})
-            recommendations = data.get('recommendations', {})
-            
-            # Count issues
-            if isinstance(issues_analysis, dict):
-                issues_list = issues_analysis.get('issues', [])
-                if isinstance(issues_list, list):
-                    total_issues += len(issues_list)
-                    # Count critical issues
-                    for issue in issues_list:
-                        if isinstance(issue, dict) and issue.get('priority', '').lower() in ['high', 'critical']:
-                            critical_issues += 1
-            
-            # Count recommendations
-            if isinstance(recommendations, dict):
-                recs_list = recommendations.get('recommendations', [])
-                if isinstance(recs_list, list):
-                    total_recommendations += len(recs_list)
-        
-        # Calculate trends
-        soil_trend = ((soil_this_month - soil_last_month) / max(soil_last_month, 1)) * 100 if soil_last_month > 0 else 0
-        leaf_trend = ((leaf_this_month - leaf_last_month) / max(leaf_last_month, 1)) * 100 if leaf_last_month > 0 else 0
-        
-        return {
-            'total_analyses': total_analyses,
-            'soil_analyses': soil_analyses,
-            'leaf_analyses': leaf_analyses,
-            'total_issues': total_issues,
-            'critical_issues': critical_issues,
-            'total_recommendations': total_recommendations,
-            'recent_activity': recent_activity,
-            'soil_trend': soil_trend,
-            'leaf_trend': leaf_trend,
-            'issues_trend': 0,  # Placeholder
-            'recommendations_trend': 0,  # Placeholder
-            'avg_issues_per_analysis': total_issues / max(total_analyses, 1)
-        }
+        # Read the materialized per-user statistics instead of scanning analyses
+        return summarize_stats(_load_user_stats_document(db, user_id))
         
     except Exception as e:
         # Silent error handling - return empty dict
@@ -1062,43 +941,14 @@ def display_monthly_trends_chart(user_id: str):
             st.info("Unable to load trend data.")
             return
         
-        # Get analyses for the last 12 months
-        from datetime import timezone
-        twelve_months_ago = datetime.now(timezone.utc) - timedelta(days=365)
-        analyses_ref = (db.collection(COLLECTIONS['analyses'])
-                       .where(filter=FieldFilter('user_id', '==', user_id))
-                       .where(filter=FieldFilter('created_at', '>=', twelve_months_ago)))
-        
-        analyses = analyses_ref.get()
+        # Monthly buckets for the last 12 months from the user's statistics document
+        buckets = monthly_trends(_load_user_stats_document(db, user_id), months=12)
         
-        if not analyses:
+        if not buckets:
             st.info("Not enough data to show trends. Upload more reports to see analysis trends.")
             return
         
-        # Process data for trends
-        trend_data = {}
-        for analysis in analyses:
-            data = analysis.to_dict()
-            created_at = data.get('created_at', datetime.now())
-            
-            if hasattr(created_at, 'strftime'):
-                month_key = created_at.strftime('%Y-%m')
-            else:
-                month_key = datetime.now().strftime('%Y-%m')
-            
-            if month_key not in trend_data:
-                trend_data[month_key] = {'soil': 0, 'leaf': 0, 'issues': 0, 'recommendations': 0}
-            
-            report_type = data.get('report_type', '')
-            if report_type in ['soil', 'leaf']:
-                trend_data[month_key][report_type] += 1
-            
-            # Count issues and recommendations
-            analysis_results = data.get('analysis_results', {})
-            issues = analysis_results.get('issues', [])
-            recommendations = analysis_results.get('recommendations', [])
-            trend_data[month_key]['issues'] += len(issues)
-            trend_data[month_key]['recommendations'] += len(recommendations)
+        trend_data = {bucket['month']: bucket for bucket in buckets}
         
         # Create trend chart
         months = sorted(trend_data.keys())
@@ -1325,68 +1175,23 @@ def get_comprehensive_analytics(user_id: str) -> Dict[str, Any]:
         if not db:
             return {}
         
-        analyses_ref = db.collection(COLLECTIONS['analyses']).where(filter=FieldFilter('user_id', '==', user_id))
-        analyses = analyses_ref.get()
-        
-        if not analyses:
+        stats = summarize_stats(_load_user_stats_document(db, user_id))
+        total_analyses = stats['total_analyses']
+        if not total_analyses:
             return {}
         
-        # Calculate comprehensive metrics
-        total_analyses = len(analyses)
-        completed_analyses = 0
-        total_issues = 0
-        total_recommendations = 0
-        avg_processing_time = 0
-        
-        issue_severity = {'Low': 0, 'Medium': 0, 'High': 0, 'Critical': 0}
-        recommendation_effectiveness = {'High': 0, 'Medium': 0, 'Low': 0}
-        
-        processing_times = []
-        
-        for analysis in analyses:
-            data = analysis.to_dict()
-            
-            if data.get('status') == 'completed':
-                completed_analyses += 1
-            
-            analysis_results = data.get('analysis_results', {})
-            issues = analysis_results.get('issues', [])
-            recommendations = analysis_results.get('recommendations', [])
-            
-            total_issues += len(issues)
-            total_recommendations += len(recommendations)
-            
-            # Count issue severities
-            for issue in issues:
-                severity = issue.get('priority', 'Medium')
-                issue_severity[severity] = issue_severity.get(severity, 0) + 1
-            
-            # Count recommendation effectiveness
-            for rec in recommendations:
-                effectiveness = rec.get('effectiveness', 'Medium')
-                recommendation_effectiveness[effectiveness] = recommendation_effectiveness.get(effectiveness, 0) + 1
-            
-            # Calculate processing time
-            created_at = data.get('created_at')
-            completed_at = data.get('completed_at')
-            if created_at and completed_at:
-                if hasattr(created_at, 'timestamp') and hasattr(completed_at, 'timestamp'):
-                    processing_time = completed_at.timestamp() - created_at.timestamp()
-                    processing_times.append(processing_time)
-        
-        avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0
-        
+        completed_analyses = stats['completed_analyses']
         return {
             'total_analyses': total_analyses,
             'completed_analyses': completed_analyses,
             'completion_rate': (completed_analyses / total_analyses * 100) if total_analyses > 0 else 0,
-            'total_issues': total_issues,
-            'total_recommendations': total_recommendations,
-            'avg_processing_time': avg_processing_time,
-            'issue_severity': issue_severity,
-            'recommendation_effectiveness': recommendation_effectiveness,
-            'avg_issues_per_analysis': total_issues / total_analyses if total_analyses > 0 else 0,
-            'avg_recommendations_per_analysis': total_recommendations / total_analyses if total_analyses > 0 else 0
+            'total_issues': stats['total_issues'],
+            'total_recommendations': stats['total_recommendations'],
+            'avg_processing_time': stats['avg_processing_time'],
+            'issue_severity': stats['issue_severity'],
+            'recommendation_effectiveness': stats['recommendation_effectiveness'],
+            'avg_issues_per_analysis': stats['avg_issues_per_analysis'],
+            'avg_recommendations_per_analysis': stats['avg_recommendations_per_analysis']
         }
         
     except Exception as e:
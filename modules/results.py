@@ -1,6 +1,7 @@
 import streamlit as st
 import sys
 import os
+import time
 from datetime import datetime
 import pandas as pd
 import plotly.graph_objects as go
@@ -18,11 +19,26 @@ sys.path.append(os.path.join(
 from utils.firebase_config import get_firestore_client, COLLECTIONS
 from google.cloud.firestore import Query, FieldFilter
 from utils.pdf_utils import PDFReportGenerator
-from utils.analysis_engine import AnalysisEngine
+from utils.analysis_engine import AnalysisEngine, ANALYSIS_MODE_FULL, ANALYSIS_MODE_QUICK
 from utils.ocr_utils import extract_data_from_image
 from modules.admin import get_active_prompt
 from utils.feedback_system import (
     display_feedback_section as display_feedback_section_util)
+from utils.analysis_schema import decode_analysis_document
+from utils.analysis_storage import (
+    AnalysisDocumentStore, is_chunked_document, prepare_for_firestore)
+from utils.user_stats import record_analysis_for_user, replace_analysis_for_user
+from utils.admin_metrics import EVENT_ANALYSIS, EVENT_FAILURE, record_system_event
+from utils.findings_clustering import (
+    FindingsClusterer, deduplicate_by_word_overlap, extract_concepts,
+    KEY_FINDINGS_CACHE_KEY, extract_issue_categories, get_cached_key_findings)
+from utils.figure_cache import cached_figure, fragment
+from utils.session_result_store import get_session_result_store
+from utils.ttl_cache import app_cache, scoped_cache
+from utils.tracing import STAGE_ANALYSIS, traced
+from utils.usage_accounting import check_usage_budget, record_analysis_usage
+from utils.incremental_analysis import restore_flattened, without_bookkeeping
+from utils.cropdrive_integration import get_user_plan
 
 
 def normalize_markdown_block_for_step3(text):
@@ -489,7 +505,10 @@ def show_results_page():
     button_col1, button_col2, button_col3 = st.columns([1, 1, 1])
     with button_col1:
         if st.button("🔄 Refresh", type="secondary", use_container_width=True):
-            st.cache_data.clear()
+            # Only this user's cached result; other sessions keep their caches
+            scope = _current_user_scope()
+            if scope is not None:
+                _load_latest_firestore_results.invalidate(scope)
             st.rerun()
     with button_col2:
         pass  # Empty column for spacing
@@ -711,30 +730,8 @@ def show_results_page():
         display_step_by_step_results(results_data)
         
         
-        # PDF Download section
-        st.markdown("---")
-        st.markdown("## 📄 Download Report")
-        
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button("📥 Download PDF Report", type="primary", use_container_width=True):
-                try:
-                    # Generate PDF
-                    with st.spinner("🔄 Generating PDF report..."):
-                        pdf_bytes = generate_results_pdf(results_data)
-                        
-                    # Download the PDF
-                    st.download_button(
-                        label="💾 Download PDF",
-                        data=pdf_bytes,
-                        file_name=f"agricultural_analysis_report.pdf",
-                        mime="application/pdf",
-                        type="primary"
-                    )
-                    
-                except Exception as e:
-                    st.error(f"❌ Failed to generate PDF: {str(e)}")
-                    st.info("Please try again or contact support if the issue persists.")
+        # PDF Download section (reruns on its own when clicked)
+        display_pdf_download_section(results_data)
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -747,7 +744,63 @@ def show_results_page():
         st.error(f"❌ Error processing analysis: {str(e)}")
         st.info("Please try refreshing the page or contact support if the issue persists.")
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+@fragment
+def display_pdf_download_section(results_data):
+    """PDF download controls; a fragment so clicking them does not re-render the whole report"""
+    st.markdown("---")
+    st.markdown("## 📄 Download Report")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if st.button("📥 Download PDF Report", type="primary", use_container_width=True):
+            try:
+                # Generate PDF
+                with st.spinner("🔄 Generating PDF report..."):
+                    pdf_bytes = generate_results_pdf(results_data)
+                    
+                # Download the PDF
+                st.download_button(
+                    label="💾 Download PDF",
+                    data=pdf_bytes,
+                    file_name=f"agricultural_analysis_report.pdf",
+                    mime="application/pdf",
+                    type="primary"
+                )
+                
+            except Exception as e:
+                st.error(f"❌ Failed to generate PDF: {str(e)}")
+                st.info("Please try again or contact support if the issue persists.")
+
+
+def _current_user_scope():
+    """Cache scope for the signed-in user (user_id, falling back to email)"""
+    return st.session_state.get('user_id') or st.session_state.get('user_email')
+
+@scoped_cache('latest_results', ttl_seconds=300, max_entries=256)  # Cache for 5 minutes, per user
+def _load_latest_firestore_results(user_key, field):
+    """Latest analysis document for a user from Firestore (field is 'user_id' or 'user_email')"""
+    db = get_firestore_client()
+    analyses_ref = db.collection(COLLECTIONS['analysis_results'])
+    query = analyses_ref.where(filter=FieldFilter(field, '==', user_key)).order_by('created_at', direction=Query.DESCENDING).limit(1)
+    
+    docs = query.stream()
+    for doc in docs:
+        data = doc.to_dict() or {}
+        if is_chunked_document(data):
+            # Reassemble steps and heavy sections stored outside the summary document;
+            # load_full decodes analysis_results, so only the top-level fields are decoded here
+            store = AnalysisDocumentStore(db, COLLECTIONS['analysis_results'])
+            analysis_results = store.load_full(dict(data, id=doc.id))
+            data = reconstruct_firestore_data({k: v for k, v in data.items() if k != 'analysis_results'})
+            data['analysis_results'] = analysis_results
+        else:
+            data = reconstruct_firestore_data(data)
+        data['id'] = doc.id
+        data['success'] = True  # Ensure success flag is set
+        return data
+    
+    return None
+
 def load_latest_results():
     """Load the latest analysis results from Firestore or current analysis from session state"""
     try:
@@ -771,8 +824,9 @@ def load_latest_results():
             # Get analysis_results from session state if available (to avoid Firebase validation issues)
             if 'stored_analysis_results' in st.session_state:
                 result_id = current_analysis.get('id')
-                if result_id and result_id in st.session_state.stored_analysis_results:
-                    results_data['analysis_results'] = st.session_state.stored_analysis_results[result_id]
+                stored_results = get_session_result_store(st.session_state)
+                if result_id and result_id in stored_results:
+                    results_data['analysis_results'] = stored_results[result_id]
                 else:
                     # Fallback to the original method if not found in session state
                     results_data['analysis_results'] = current_analysis.get('analysis_results', {})
@@ -784,9 +838,10 @@ def load_latest_results():
         
         # Check if there are any stored analysis results in session state (newly completed)
         if 'stored_analysis_results' in st.session_state and st.session_state.stored_analysis_results:
-            # Get the most recent analysis result from session state
-            latest_id = max(st.session_state.stored_analysis_results.keys())
-            latest_analysis = st.session_state.stored_analysis_results[latest_id]
+            # Get the most recently stored analysis result (spilled results reload lazily)
+            stored_results = get_session_result_store(st.session_state)
+            latest_id = stored_results.latest_id()
+            latest_analysis = stored_results[latest_id]
             
             # Create results data structure
             results_data = {
@@ -801,30 +856,16 @@ def load_latest_results():
             return results_data
         
         # If no stored results, try to load from Firestore (optional - only if user is logged in)
-        db = get_firestore_client()
         user_email = st.session_state.get('user_email')
         user_id = st.session_state.get('user_id')
         
         if not user_email and not user_id:
             return None
         
-        # Query for the latest analysis results from Firestore
-        analyses_ref = db.collection(COLLECTIONS['analysis_results'])
-        
         # Try with user_id first (preferred), then fallback to user_email
         if user_id:
-            query = analyses_ref.where(filter=FieldFilter('user_id', '==', user_id)).order_by('created_at', direction=Query.DESCENDING).limit(1)
-        else:
-            query = analyses_ref.where(filter=FieldFilter('user_email', '==', user_email)).order_by('created_at', direction=Query.DESCENDING).limit(1)
-        
-        docs = query.stream()
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            data['success'] = True  # Ensure success flag is set
-            return data
-        
-        return None
+            return _load_latest_firestore_results(user_id, 'user_id')
+        return _load_latest_firestore_results(user_email, 'user_email')
         
     except Exception as e:
         st.error(f"Error loading results from database: {str(e)}")
@@ -861,8 +902,14 @@ def validate_firestore_data(data):
         logger.warning(f"Data validation warning: {e}")
         return False
 
-def store_analysis_to_firestore(analysis_results, result_id):
-    """Store analysis results to Firestore with proper data flattening"""
+def store_analysis_to_firestore(analysis_results, result_id, count_as_new=True, previous_results=None):
+    """Store analysis results to Firestore with proper data flattening
+
+    count_as_new=False overwrites an existing result (e.g. a re-analysis after
+    sample corrections) without counting it again in user and system statistics;
+    given the overwritten previous_results, the user's issue and recommendation
+    counts are adjusted to the new version.
+    """
     try:
         db = get_firestore_client()
         if not db:
@@ -885,23 +932,25 @@ def store_analysis_to_firestore(analysis_results, result_id):
             'timestamp': current_time.isoformat(),  # Convert to ISO string
             'status': 'completed',
             'report_types': ['soil', 'leaf'],
-            'created_at': current_time.isoformat(),  # Convert to ISO string
-            'analysis_results': analysis_results
+            'created_at': current_time.isoformat()  # Convert to ISO string
         }
         
-        # Pre-process analysis_results to handle datetime objects and complex structures
-        analysis_results = preprocess_analysis_results_for_firestore(analysis_results)
-
-        # Ensure the data is properly flattened for Firestore (preserves step_by_step_analysis structure)
-        firestore_data = flatten_nested_arrays_for_firestore(firestore_data, preserve_keys=['step_by_step_analysis'])
-        
-        # Validate the data before storing
-        if not validate_firestore_data(firestore_data):
-            logger.warning("Data validation failed, but proceeding with storage")
-        
-        # Store in the analysis_results collection
-        doc_ref = db.collection('analysis_results').document(result_id)
-        doc_ref.set(firestore_data)
+        # Store as a small summary document plus per-step/per-section parts
+        # (large parts are offloaded to Cloud Storage as compressed JSON)
+        store = AnalysisDocumentStore(db, COLLECTIONS['analysis_results'])
+        # Render payloads and consolidated findings are derived data for this session only
+        persisted = {k: v for k, v in analysis_results.items()
+                     if k not in (RENDER_PAYLOADS_KEY, KEY_FINDINGS_CACHE_KEY)}
+        store.save(result_id, firestore_data, persisted)
+        
+        # Keep the owner's dashboard statistics document up to date
+        if count_as_new:
+            record_analysis_for_user(user_id or user_email, analysis_results, current_time, result_id, db=db)
+            record_system_event(EVENT_ANALYSIS, user_id or user_email, current_time, db=db)
+        elif previous_results is not None:
+            previous_metadata = previous_results.get('analysis_metadata', {}) or {}
+            replace_analysis_for_user(user_id or user_email, previous_results, analysis_results,
+                                      previous_metadata.get('timestamp') or current_time, result_id, db=db)
         
         logger.info(f"✅ Analysis {result_id} stored to Firestore successfully")
         return True
@@ -925,55 +974,7 @@ def flatten_nested_arrays_for_firestore(data, preserve_keys=None):
     try:
         logger.info("🔄 Preparing data for Firestore storage")
 
-        def _prepare_for_firestore(obj, visited=None):
-            """Recursively prepare data for Firestore storage"""
-            if visited is None:
-                visited = set()
-
-            # Prevent infinite recursion with circular references
-            obj_id = id(obj)
-            if obj_id in visited:
-                return "<circular_reference>"
-            visited.add(obj_id)
-
-            try:
-                if isinstance(obj, datetime):
-                    # Convert datetime to ISO string
-                    return obj.isoformat()
-                elif isinstance(obj, (int, float, str, bool)):
-                    # Primitive types are fine
-                    return obj
-                elif isinstance(obj, dict):
-                    # Process dictionaries
-                    prepared_dict = {}
-                    for key, value in obj.items():
-                        prepared_dict[key] = _prepare_for_firestore(value, visited.copy())
-                    return prepared_dict
-                elif isinstance(obj, list):
-                    # Process lists - Firestore supports nested arrays
-                    prepared_list = []
-                    for item in obj:
-                        prepared_list.append(_prepare_for_firestore(item, visited.copy()))
-                    return prepared_list
-                elif obj is None:
-                    # None is acceptable
-                    return None
-                else:
-                    # For any other object type, convert to string representation
-                    # This handles custom objects, sets, etc.
-                    try:
-                        # Try to get a meaningful string representation
-                        if hasattr(obj, '__dict__'):
-                            # For custom objects, try to serialize their __dict__
-                            return _prepare_for_firestore(obj.__dict__, visited.copy())
-                        else:
-                            return str(obj)
-                    except:
-                        return str(obj)
-            finally:
-                visited.discard(obj_id)
-
-        result = _prepare_for_firestore(data)
+        result = prepare_for_firestore(data)
         logger.info("✅ Data preparation for Firestore completed successfully")
         return result
 
@@ -991,70 +992,17 @@ def flatten_nested_arrays_for_firestore(data, preserve_keys=None):
 def reconstruct_firestore_data(data):
     """
     Reconstruct data retrieved from Firestore back to its original form.
-    This handles converting ISO datetime strings back to datetime objects.
+    Only fields declared as timestamps, numbers or table rows in the analysis
+    schema are converted; all other strings are returned untouched.
     """
     try:
-        def _reconstruct(obj, key_path=""):
-            if isinstance(obj, str):
-                # Try to convert various datetime string formats back to datetime objects
-                try:
-                    # Check if it's an ISO datetime string (with T and timezone indicators)
-                    if 'T' in obj and ('Z' in obj or '+' in obj or '-' in obj[-6:]):
-                        return datetime.fromisoformat(obj.replace('Z', '+00:00'))
-                    # Check if it's an ISO datetime string without timezone (like from isoformat())
-                    elif 'T' in obj and len(obj) >= 19:
-                        # Try to parse ISO format without timezone
-                        try:
-                            return datetime.fromisoformat(obj)
-                        except ValueError:
-                            # Try with timezone if parsing fails
-                            return datetime.fromisoformat(obj + '+00:00')
-                    # Check if it's a simple date-time string like "2024-01-01 12:00:00"
-                    elif len(obj) >= 19 and obj[4] == '-' and obj[7] == '-' and obj[10] == ' ' and obj[13] == ':' and obj[16] == ':':
-                        return datetime.strptime(obj, '%Y-%m-%d %H:%M:%S')
-                    # Check if it's just a date string
-                    elif len(obj) == 10 and obj[4] == '-' and obj[7] == '-':
-                        return datetime.strptime(obj, '%Y-%m-%d')
-                    # Check if it's a timestamp-like string (Unix timestamp)
-                    elif obj.isdigit() and len(obj) >= 10:
-                        try:
-                            return datetime.fromtimestamp(float(obj))
-                        except (ValueError, OSError):
-                            pass
-                    # Check if it's a float-like timestamp string
-                    elif '.' in obj and obj.replace('.', '').isdigit():
-                        try:
-                            return datetime.fromtimestamp(float(obj))
-                        except (ValueError, OSError):
-                            pass
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Failed to parse datetime string '{obj}': {e}")
-                    pass
-                
-                # Special handling for known datetime fields - if we can't parse it, return current time
-                if key_path.endswith('created_at') or key_path.endswith('timestamp') or key_path.endswith('date'):
-                    logger.warning(f"Could not parse datetime field '{key_path}' with value '{obj}' (type: {type(obj)}), using current time")
-                    return datetime.now()
-                
-                return obj
-            elif isinstance(obj, dict):
-                reconstructed_dict = {}
-                for key, value in obj.items():
-                    new_key_path = f"{key_path}.{key}" if key_path else key
-                    reconstructed_dict[key] = _reconstruct(value, new_key_path)
-                return reconstructed_dict
-            elif isinstance(obj, list):
-                return [_reconstruct(item, f"{key_path}[{i}]") for i, item in enumerate(obj)]
-            else:
-                return obj
-
-        result = _reconstruct(data)
-        return result
+        return decode_analysis_document(data)
 
     except Exception as e:
         logger.error(f"❌ Error reconstructing Firestore data: {e}")
         return data
 
+@traced(STAGE_ANALYSIS, 'analysis.request')
 def process_new_analysis(analysis_data, progress_bar, status_text, time_estimate=None, step_indicator=None, working_indicator=None):
     """Process new analysis data from uploaded files"""
     try:
@@ -1321,6 +1269,17 @@ def process_new_analysis(analysis_data, progress_bar, status_text, time_estimate
         if not active_prompt:
             return {'success': False, 'message': 'No active analysis prompt found'}
         
+        # Monthly LLM budgets only gate modes that call the model; quick mode stays available
+        analysis_mode = analysis_data.get('analysis_mode', ANALYSIS_MODE_FULL)
+        user_key = st.session_state.get('user_id') or st.session_state.get('user_email')
+        user_plan = get_user_plan()
+        if analysis_mode != ANALYSIS_MODE_QUICK:
+            budget = check_usage_budget(user_key, user_plan)
+            if not budget.allowed:
+                logger.info(f"LLM budget exhausted for {user_key}: {budget.message}")
+                return {'success': False,
+                        'message': f"{budget.message}. Quick analysis (no AI narrative) is still available."}
+        
         # Step 4: AI Analysis (optimized)
         current_step = 4
         progress_bar.progress(70)
@@ -1468,9 +1427,15 @@ def process_new_analysis(analysis_data, progress_bar, status_text, time_estimate
                 soil_data=transformed_soil_data,
                 leaf_data=transformed_leaf_data,
                 land_yield_data=land_yield_data,
-                prompt_text=active_prompt.get('prompt_text', '')
+                prompt_text=active_prompt.get('prompt_text', ''),
+                analysis_mode=analysis_mode
             )
             logger.info(f"✅ Analysis completed successfully")
+            try:
+                usage = record_analysis_usage(user_key, analysis_results, user_plan)
+                logger.info(f"LLM usage: {usage['calls']} calls, {usage['total_tokens']} tokens, ${usage['cost_usd']:.4f}")
+            except Exception as e:
+                logger.warning(f"Could not record LLM usage: {str(e)}")
             logger.info(f"🔍 Analysis results keys: {list(analysis_results.keys()) if isinstance(analysis_results, dict) else 'None'}")
         except Exception as e:
             logger.error(f"❌ Analysis failed: {str(e)}")
@@ -1588,16 +1553,15 @@ def process_new_analysis(analysis_data, progress_bar, status_text, time_estimate
                 else:
                     logger.warning(f"🔍 DEBUG - Step {i+1} is not a dict, type: {type(step)}, value: {step}")
         
-        # Store analysis results in both session state and Firestore
-        if 'stored_analysis_results' not in st.session_state:
-            st.session_state.stored_analysis_results = {}
+        # Store analysis results in both session state (bounded, spills to disk) and Firestore
+        stored_results = get_session_result_store(st.session_state)
         
         result_id = f"analysis_{int(time.time())}"
         logger.info(f"🔍 DEBUG - Storing analysis {result_id} to session state")
         logger.info(f"🔍 DEBUG - Analysis keys before storage: {list(analysis_results.keys())}")
         logger.info(f"🔍 DEBUG - Step-by-step analysis length before storage: {len(analysis_results.get('step_by_step_analysis', []))}")
 
-        st.session_state.stored_analysis_results[result_id] = analysis_results
+        stored_results[result_id] = analysis_results
 
         logger.info(f"🔍 DEBUG - Analysis stored successfully in session state")
         
@@ -1605,9 +1569,17 @@ def process_new_analysis(analysis_data, progress_bar, status_text, time_estimate
         try:
             store_analysis_to_firestore(analysis_results, result_id)
             logger.info(f"✅ Successfully stored analysis {result_id} to Firestore")
+            # This user's cached latest result, stats and recent reports are now stale
+            app_cache.invalidate_scope(_current_user_scope())
         except Exception as e:
             logger.error(f"❌ Failed to store analysis to Firestore: {e}")
             # Continue with session state storage as fallback
+
+        # Finalize: clean text and parse tables once so the results page only renders
+        try:
+            prepare_render_payloads(analysis_results)
+        except Exception as e:
+            logger.error(f"Could not prepare step render payloads: {e}")
         
         # Return data structure with analysis results included
         display_data = {
@@ -1629,6 +1601,93 @@ def process_new_analysis(analysis_data, progress_bar, status_text, time_estimate
         
     except Exception as e:
         st.error(f"Error processing analysis: {str(e)}")
+        record_system_event(EVENT_FAILURE, st.session_state.get('user_id') or st.session_state.get('user_email'))
+        return {'success': False, 'message': f'Processing error: {str(e)}'}
+
+@traced(STAGE_ANALYSIS, 'analysis.reanalysis')
+def reanalyze_with_corrections(results_data, corrected_soil_data, corrected_leaf_data):
+    """Re-run an analysis after the user corrected sample values.
+
+    Only parameters whose values changed are recomputed and compared against the
+    standards again; LLM steps whose inputs are unchanged are reused from the
+    previous result. The corrected result replaces the previous one under the
+    same result id. Pass None for a report type that was not corrected.
+    """
+    try:
+        previous_results = get_analysis_results_from_data(results_data)
+        if not previous_results:
+            return {'success': False, 'message': 'No analysis to update'}
+
+        active_prompt = get_active_prompt()
+        if not active_prompt:
+            return {'success': False, 'message': 'No active analysis prompt found'}
+
+        analysis_mode = (previous_results.get('analysis_metadata', {}) or {}).get('analysis_mode', ANALYSIS_MODE_FULL)
+        user_key = st.session_state.get('user_id') or st.session_state.get('user_email')
+        user_plan = get_user_plan()
+        if analysis_mode != ANALYSIS_MODE_QUICK:
+            budget = check_usage_budget(user_key, user_plan)
+            if not budget.allowed:
+                return {'success': False, 'message': budget.message}
+
+        # The engine reads the structured data from session state, so later runs see the corrections too
+        if corrected_soil_data is not None:
+            st.session_state.structured_soil_data = corrected_soil_data
+        if corrected_leaf_data is not None:
+            st.session_state.structured_leaf_data = corrected_leaf_data
+        land_yield_data = results_data.get('land_yield_data') or without_bookkeeping(
+            restore_flattened((previous_results.get('raw_data', {}) or {}).get('land_yield_data', {})))
+
+        analysis_results = AnalysisEngine().generate_comprehensive_analysis(
+            soil_data=corrected_soil_data or {},
+            leaf_data=corrected_leaf_data or {},
+            land_yield_data=land_yield_data,
+            prompt_text=active_prompt.get('prompt_text', ''),
+            analysis_mode=analysis_mode,
+            previous_analysis=previous_results
+        )
+        if analysis_results.get('error'):
+            return {'success': False, 'message': analysis_results['error']}
+        try:
+            record_analysis_usage(user_key, analysis_results, user_plan)
+        except Exception as e:
+            logger.warning(f"Could not record LLM usage: {str(e)}")
+
+        raw_ocr_data = dict(previous_results.get('raw_ocr_data', {}) or {})
+        for data_type, corrected in (('soil', corrected_soil_data), ('leaf', corrected_leaf_data)):
+            if corrected is not None:
+                raw_ocr_data[f'{data_type}_data'] = dict(raw_ocr_data.get(f'{data_type}_data', {}) or {},
+                                                         structured_ocr_data=corrected)
+            parameters = restore_flattened((analysis_results.get('raw_data', {}) or {}).get(f'{data_type}_parameters', {}))
+            analysis_results[f'{data_type}_samples'] = previous_results.get(f'{data_type}_samples', [])
+            analysis_results[f'{data_type}_tables'] = [{
+                'samples': (parameters or {}).get('parameter_statistics', {}),
+                'data_type': 'structured_ocr'
+            }]
+        analysis_results['raw_ocr_data'] = raw_ocr_data
+        analysis_results = flatten_nested_arrays_for_firestore(analysis_results, preserve_keys=['step_by_step_analysis'])
+
+        result_id = results_data.get('id') or get_session_result_store(st.session_state).latest_id() \
+            or f"analysis_{int(time.time())}"
+        get_session_result_store(st.session_state)[result_id] = analysis_results
+        try:
+            store_analysis_to_firestore(analysis_results, result_id, count_as_new=False,
+                                        previous_results=previous_results)
+            app_cache.invalidate_scope(_current_user_scope())
+        except Exception as e:
+            logger.error(f"❌ Failed to store corrected analysis to Firestore: {e}")
+
+        try:
+            prepare_render_payloads(analysis_results)
+        except Exception as e:
+            logger.error(f"Could not prepare step render payloads: {e}")
+
+        incremental = restore_flattened(analysis_results.get('analysis_metadata', {}).get('incremental', {}))
+        logger.info(f"Re-analysis {result_id}: {incremental}")
+        return {'success': True, 'id': result_id, 'incremental': incremental, 'analysis_results': analysis_results}
+
+    except Exception as e:
+        logger.error(f"Error re-analysing corrected data: {str(e)}")
         return {'success': False, 'message': f'Processing error: {str(e)}'}
 
 def get_analysis_results_from_data(results_data):
@@ -1646,13 +1705,14 @@ def get_analysis_results_from_data(results_data):
         result_id = results_data.get('id')
         logger.info(f"🔍 DEBUG - Looking for result_id: {result_id} in stored_analysis_results")
         
-        if result_id and result_id in st.session_state.stored_analysis_results:
-            analysis_results = st.session_state.stored_analysis_results[result_id]
+        stored_results = get_session_result_store(st.session_state)
+        if result_id and result_id in stored_results:
+            analysis_results = stored_results[result_id]
             logger.info(f"🔍 DEBUG - Found stored analysis_results for {result_id}: {type(analysis_results)} - keys: {list(analysis_results.keys()) if isinstance(analysis_results, dict) else 'Not a dict'}")
         else:
             # If no specific result_id, get the latest one
-            latest_id = max(st.session_state.stored_analysis_results.keys())
-            analysis_results = st.session_state.stored_analysis_results[latest_id]
+            latest_id = stored_results.latest_id()
+            analysis_results = stored_results[latest_id]
             logger.info(f"🔍 DEBUG - Using latest stored analysis_results {latest_id}: {type(analysis_results)} - keys: {list(analysis_results.keys()) if isinstance(analysis_results, dict) else 'Not a dict'}")
     
     # If still empty, check if the entire results_data is actually the analysis results
@@ -1899,6 +1959,8 @@ def display_raw_data_section(results_data):
                 display_raw_leaf_data(leaf_data)
             else:
                 display_leaf_data_table(leaf_data)
+
+        display_sample_corrections(results_data, soil_data, leaf_data)
     else:
         st.info("📋 No raw data available for this analysis.")
         st.write(f"Results data keys: {list(results_data.keys())}")
@@ -2126,6 +2188,88 @@ def display_structured_leaf_data(leaf_data):
     except Exception as e:
         st.error(f"Error displaying structured leaf data: {str(e)}")
 
+def _structured_container(data, container_keys):
+    """(container name, {sample_id: {parameter: value}}) of structured OCR data, or (None, None)"""
+    if not isinstance(data, dict):
+        return None, None
+    for key in container_keys:
+        if isinstance(data.get(key), dict) and data[key]:
+            return key, data[key]
+    return None, None
+
+def _apply_sample_edits(container, edited_rows):
+    """Corrected copy of a sample container from data editor rows; cleared or unchanged cells keep their value"""
+    rows = {str(row.get('Sample ID')): row for row in edited_rows}
+    corrected = {}
+    for sample_id, values in container.items():
+        row = rows.get(str(sample_id))
+        if not isinstance(values, dict) or row is None:
+            corrected[sample_id] = values
+            continue
+        sample = dict(values)
+        for param, value in values.items():
+            new_value = row.get(param, value)
+            if hasattr(new_value, 'item'):
+                new_value = new_value.item()  # numpy scalar -> Python value
+            if new_value is None or pd.isna(new_value):
+                continue
+            if isinstance(new_value, str):
+                try:
+                    new_value = float(new_value.strip())
+                except ValueError:
+                    pass
+            if new_value != value:
+                sample[param] = new_value
+        corrected[sample_id] = sample
+    return corrected
+
+def display_sample_corrections(results_data, soil_data, leaf_data):
+    """Editable sample tables; re-analysing recomputes only what the corrected values affect"""
+    soil_name, soil_container = _structured_container(
+        soil_data, ['Farm_3_Soil_Test_Data', 'SP_Lab_Test_Report', 'Farm_Soil_Test_Data'])
+    leaf_name, leaf_container = _structured_container(
+        leaf_data, ['Farm_3_Leaf_Test_Data', 'Farm_Leaf_Test_Data', 'SP_Lab_Test_Report'])
+    if not soil_container and not leaf_container:
+        return
+
+    summary = st.session_state.pop('reanalysis_summary', None)
+    if summary:
+        changed = [param for params in (summary.get('changed_parameters', {}) or {}).values() for param in params or []]
+        st.success(f"✅ Analysis updated for {len(changed)} changed parameter(s)"
+                   f"{': ' + ', '.join(changed) if changed else ''}. "
+                   f"{len(summary.get('reused_steps') or [])} AI step(s) reused, "
+                   f"{len(summary.get('recomputed_steps') or [])} re-run.")
+
+    with st.expander("✏️ Correct sample values", expanded=False):
+        st.caption("Fix values that were misread from your report and re-run the analysis. "
+                   "Only parameters with changed values are recalculated; AI steps whose inputs did not change are reused.")
+        result_id = results_data.get('id', 'latest')
+        corrected = {}
+        for data_type, label, container in (('soil', '🌱 Soil samples', soil_container),
+                                            ('leaf', '🍃 Leaf samples', leaf_container)):
+            if not container:
+                continue
+            st.markdown(f"**{label}**")
+            rows = [dict({'Sample ID': sample_id}, **values) for sample_id, values in container.items()
+                    if isinstance(values, dict)]
+            edited_df = st.data_editor(pd.DataFrame(rows), key=f"sample_corrections_{data_type}_{result_id}",
+                                       disabled=['Sample ID'], hide_index=True, use_container_width=True)
+            corrected[data_type] = _apply_sample_edits(container, edited_df.to_dict('records'))
+
+        has_changes = corrected.get('soil', soil_container) != soil_container or \
+            corrected.get('leaf', leaf_container) != leaf_container
+        if st.button("🔄 Re-analyse with corrections", type="primary", disabled=not has_changes,
+                     key=f"reanalyse_{result_id}"):
+            corrected_soil = dict(soil_data, **{soil_name: corrected['soil']}) if soil_container else None
+            corrected_leaf = dict(leaf_data, **{leaf_name: corrected['leaf']}) if leaf_container else None
+            with st.spinner("Re-analysing corrected values..."):
+                outcome = reanalyze_with_corrections(results_data, corrected_soil, corrected_leaf)
+            if outcome.get('success'):
+                st.session_state.reanalysis_summary = outcome.get('incremental', {})
+                st.rerun()
+            else:
+                st.error(f"❌ Re-analysis failed: {outcome.get('message', 'Unknown error')}")
+
 def process_html_tables(text):
     """Process HTML tables in text and convert them to proper Streamlit tables"""
     import re
@@ -3089,9 +3233,10 @@ def display_summary_section(results_data):
 
                 # Also update the stored analysis results in session state
                 if hasattr(st, 'session_state') and 'stored_analysis_results' in st.session_state:
-                    latest_id = max(st.session_state.stored_analysis_results.keys(), key=lambda x: st.session_state.stored_analysis_results[x].get('timestamp', 0) if isinstance(st.session_state.stored_analysis_results[x], dict) else 0)
-                    if latest_id and latest_id in st.session_state.stored_analysis_results:
-                        st.session_state.stored_analysis_results[latest_id]['executive_summary'] = sanitized_summary
+                    stored_results = get_session_result_store(st.session_state)
+                    latest_id = stored_results.latest_id()
+                    if latest_id and latest_id in stored_results:
+                        stored_results[latest_id]['executive_summary'] = sanitized_summary
                         logger.info(f"✅ Executive summary stored to session state for PDF reuse")
 
         except Exception as e:
@@ -3255,9 +3400,10 @@ def display_summary_section(results_data):
 
             # Also update the stored analysis results in session state
             if hasattr(st, 'session_state') and 'stored_analysis_results' in st.session_state:
-                latest_id = max(st.session_state.stored_analysis_results.keys(), key=lambda x: st.session_state.stored_analysis_results[x].get('timestamp', 0) if isinstance(st.session_state.stored_analysis_results[x], dict) else 0)
-                if latest_id and latest_id in st.session_state.stored_analysis_results:
-                    st.session_state.stored_analysis_results[latest_id]['executive_summary'] = comprehensive_summary
+                stored_results = get_session_result_store(st.session_state)
+                latest_id = stored_results.latest_id()
+                if latest_id and latest_id in stored_results:
+                    stored_results[latest_id]['executive_summary'] = comprehensive_summary
                     logger.info(f"✅ Fallback executive summary stored to session state for PDF reuse")
 
     except Exception as e:
@@ -3328,82 +3474,11 @@ def clean_finding_text(text):
 
 def is_same_issue(finding1, finding2):
     """Check if two findings are about the same agricultural issue"""
-    # Define issue patterns
-    issue_patterns = {
-        'potassium_deficiency': ['potassium', 'k deficiency', 'k level', 'k average', 'k critical'],
-        'soil_acidity': ['ph', 'acidic', 'acidity', 'soil ph', 'ph level'],
-        'phosphorus_deficiency': ['phosphorus', 'p deficiency', 'available p', 'p level'],
-        'nutrient_deficiency': ['deficiency', 'deficient', 'nutrient', 'nutrients'],
-        'cec_issue': ['cec', 'cation exchange', 'nutrient retention', 'nutrient holding'],
-        'organic_matter': ['organic matter', 'organic carbon', 'carbon'],
-        'micronutrient': ['copper', 'zinc', 'manganese', 'iron', 'boron', 'micronutrient'],
-        'yield_impact': ['yield', 'productivity', 'tonnes', 'production'],
-        'economic_impact': ['roi', 'investment', 'cost', 'profit', 'revenue', 'economic']
-    }
-    
-    finding1_lower = finding1.lower()
-    finding2_lower = finding2.lower()
-    
-    # Check if both findings mention the same issue category
-    for issue, keywords in issue_patterns.items():
-        finding1_has_issue = any(keyword in finding1_lower for keyword in keywords)
-        finding2_has_issue = any(keyword in finding2_lower for keyword in keywords)
-        
-        if finding1_has_issue and finding2_has_issue:
-            # Additional check for specific values or percentages
-            if issue in ['potassium_deficiency', 'soil_acidity', 'phosphorus_deficiency']:
-                # Extract numbers from both findings
-                import re
-                nums1 = re.findall(r'\d+\.?\d*', finding1)
-                nums2 = re.findall(r'\d+\.?\d*', finding2)
-                
-                # If they have similar numbers, they're likely the same issue
-                if nums1 and nums2:
-                    for num1 in nums1:
-                        for num2 in nums2:
-                            if abs(float(num1) - float(num2)) < 0.1:  # Very close values
-                                return True
-            
-            return True
-    
-    return False
+    return bool(extract_issue_categories(finding1) & extract_issue_categories(finding2))
 
 def _extract_key_concepts(text):
     """Extract key concepts from text for better deduplication"""
-    import re
-    
-    # Define key agricultural concepts and nutrients
-    nutrients = ['nitrogen', 'phosphorus', 'potassium', 'calcium', 'magnesium', 'sulfur', 'copper', 'zinc', 'manganese', 'iron', 'boron', 'molybdenum']
-    parameters = ['ph', 'cec', 'organic matter', 'base saturation', 'yield', 'deficiency', 'excess', 'optimum', 'critical', 'mg/kg', '%', 'meq']
-    conditions = ['acidic', 'alkaline', 'deficient', 'sufficient', 'excessive', 'low', 'high', 'moderate', 'severe', 'mild']
-    
-    # Extract numbers and percentages
-    numbers = re.findall(r'\d+\.?\d*', text)
-    
-    # Extract nutrient names and parameters
-    found_concepts = set()
-    
-    # Check for nutrients
-    for nutrient in nutrients:
-        if nutrient in text:
-            found_concepts.add(nutrient)
-    
-    # Check for parameters
-    for param in parameters:
-        if param in text:
-            found_concepts.add(param)
-    
-    # Check for conditions
-    for condition in conditions:
-        if condition in text:
-            found_concepts.add(condition)
-    
-    # Add significant numbers (values that matter for agricultural analysis)
-    for num in numbers:
-        if float(num) > 0:  # Only add positive numbers
-            found_concepts.add(num)
-    
-    return found_concepts
+    return set(extract_concepts(text))
 
 def merge_similar_findings(finding1: str, finding2: str) -> str:
     """Merge two similar findings into one comprehensive finding"""
@@ -3690,7 +3765,16 @@ def merge_parameter_group_findings(param, group_findings):
     }
 
 def generate_intelligent_key_findings(analysis_results, step_results):
-    """Generate comprehensive intelligent key findings grouped by parameter with proper deduplication"""
+    """Generate comprehensive intelligent key findings grouped by parameter with proper deduplication.
+
+    The result is cached on ``analysis_results`` for the analysis run and render payload version.
+    """
+    return get_cached_key_findings(
+        analysis_results, 'results',
+        lambda: _build_intelligent_key_findings(analysis_results, step_results), version=RENDER_PAYLOAD_VERSION)
+
+def _build_intelligent_key_findings(analysis_results, step_results):
+    """Build key findings from the analysis and its step results"""
     all_key_findings = []
     
     # 1. Check for key findings at the top level of analysis_results
@@ -3791,46 +3875,8 @@ def generate_intelligent_key_findings(analysis_results, step_results):
             # First group findings by parameter and merge within each group
             parameter_merged_findings = group_and_merge_findings_by_parameter(step_findings)
             
-            # Then apply additional deduplication for any remaining similar findings
-            unique_findings = []
-            seen_concepts = []
-            
-            for finding_data in parameter_merged_findings:
-                finding = finding_data['finding']
-                normalized = ' '.join(finding.lower().split())
-                key_concepts = _extract_key_concepts(normalized)
-                
-                is_duplicate = False
-                for i, seen_concept_set in enumerate(seen_concepts):
-                    concept_overlap = len(key_concepts.intersection(seen_concept_set))
-                    total_concepts = len(key_concepts.union(seen_concept_set))
-                    
-                    if total_concepts > 0:
-                        similarity = concept_overlap / total_concepts
-                        word_similarity = len(key_concepts.intersection(seen_concept_set)) / max(len(key_concepts), len(seen_concept_set)) if len(key_concepts) > 0 and len(seen_concept_set) > 0 else 0
-                        
-                        # More aggressive deduplication - consolidate similar issues
-                        if similarity > 0.5 or word_similarity > 0.6:
-                            # Merge findings for the same issue
-                            existing_finding = unique_findings[i]['finding']
-                            merged_finding = merge_similar_findings(existing_finding, finding)
-                            unique_findings[i]['finding'] = merged_finding
-                            is_duplicate = True
-                            break
-                        
-                        # Check for same issue with stricter criteria
-                        if similarity > 0.3 and word_similarity > 0.4:
-                            if is_same_issue(finding, unique_findings[i]['finding']):
-                                # Merge findings for the same issue
-                                existing_finding = unique_findings[i]['finding']
-                                merged_finding = merge_similar_findings(existing_finding, finding)
-                                unique_findings[i]['finding'] = merged_finding
-                                is_duplicate = True
-                                break
-                
-                if not is_duplicate:
-                    unique_findings.append(finding_data)
-                    seen_concepts.append(key_concepts)
+            # Then merge remaining similar findings through the concept index
+            unique_findings = FindingsClusterer(merge_similar_findings).cluster(parameter_merged_findings)
             
             # Combine step findings with existing findings
             all_key_findings.extend(unique_findings)
@@ -5169,44 +5215,23 @@ def _deduplicate_findings(findings_list):
             if not findings_list:
                 return []
 
-            # Convert to lowercase for comparison but keep original case for display
-            seen_findings = set()
-            unique_findings = []
+            # Remove common prefixes that might make findings appear different
+            prefixes_to_remove = [
+                'key finding 1:', 'key finding 2:', 'key finding 3:', 'key finding 4:', 'key finding 5:',
+                'finding 1:', 'finding 2:', 'finding 3:', 'finding 4:', 'finding 5:',
+                '• ', '- ', '* '
+            ]
 
-            for finding in findings_list:
-                # Create a normalized version for comparison
+            def normalize(finding):
+                # Normalized version for comparison; original case is kept for display
                 normalized = finding.lower().strip()
-
-                # Remove common prefixes that might make findings appear different
-                prefixes_to_remove = [
-                    'key finding 1:', 'key finding 2:', 'key finding 3:', 'key finding 4:', 'key finding 5:',
-                    'finding 1:', 'finding 2:', 'finding 3:', 'finding 4:', 'finding 5:',
-                    '• ', '- ', '* '
-                ]
-
                 for prefix in prefixes_to_remove:
                     if normalized.startswith(prefix):
                         normalized = normalized[len(prefix):].strip()
+                return normalized
 
-                # Check for similarity with existing findings (80% similarity threshold)
-                is_duplicate = False
-                for existing in seen_findings:
-                    # Simple similarity check - if 80% of words match
-                    existing_words = set(existing.split())
-                    current_words = set(normalized.split())
-
-                    if existing_words and current_words:
-                        intersection = existing_words.intersection(current_words)
-                        union = existing_words.union(current_words)
-                        similarity = len(intersection) / len(union) if union else 0
-
-                        if similarity > 0.8:  # 80% similarity threshold
-                            is_duplicate = True
-                            break
-
-                if not is_duplicate and len(normalized) > 10:  # Avoid very short findings
-                    seen_findings.add(normalized)
-                    unique_findings.append(finding)
+            # 80% word-overlap threshold, avoiding very short findings
+            unique_findings = deduplicate_by_word_overlap(findings_list, normalize, threshold=0.8, min_length=10)
 
             # Limit to maximum 3 findings per category to avoid overwhelming the user
             return unique_findings[:3]
@@ -5253,6 +5278,377 @@ def display_references_section(results_data):
     else:
         st.info("📚 No research references found in this analysis.")
 
+# ---------------------------------------------------------------------------
+# Render-ready step payloads
+# ---------------------------------------------------------------------------
+# Text cleanup, table parsing and section normalization are done once when an
+# analysis is finalized (or first shown) and kept next to the results, so the
+# display functions only render on each Streamlit rerun.
+RENDER_PAYLOADS_KEY = '_render_payloads'
+RENDER_PAYLOAD_VERSION = 1
+FILTERED_CONTENT_MARKER = "Content filtered to prevent raw LLM output display."
+
+STEP_ALIAS_MAP = {
+    'Key Findings': 'key_findings',
+    'Specific Recommendations': 'specific_recommendations',
+    'Tables': 'tables',
+    'Interpretations': 'interpretations',
+    'Visualizations': 'visualizations',
+    'Yield Forecast': 'yield_forecast',
+    'Format Analysis': 'format_analysis',
+    'Data Format Recommendations': 'data_format_recommendations',
+    'Plantation Values vs. Malaysian Reference Ranges': 'plantation_values_vs_reference',
+    'Soil Issues': 'soil_issues',
+    'Issues Source': 'issues_source',
+    'Scenarios': 'scenarios',
+    'Assumptions': 'assumptions',
+}
+
+
+# Step keys rendered by dedicated sections (or never shown); the rest are
+# listed under "Additional Analysis Results"
+STEP_RENDER_EXCLUDED_KEYS = frozenset([
+    'summary', 'key_findings', 'detailed_analysis', 'formatted_analysis',
+    'step_number', 'step_title', 'step_description',
+    'visualizations', 'yield_forecast', 'references', 'search_timestamp', 'prompt_instructions',
+    'tables', 'interpretations', 'data_quality',
+    'specific_recommendations', 'format_analysis', 'data_format_recommendations',
+    'raw_llm_output', 'raw_output', 'raw_llm', 'deterministic', 'llm_output',
+    'scenarios', 'assumptions',
+    'Key Findings', 'Specific Recommendations', 'Tables', 'Interpretations', 'Visualizations',
+    'Yield Forecast', 'Format Analysis', 'Data Format Recommendations',
+    'Plantation Values vs. Malaysian Reference Ranges', 'Soil Issues', 'Issues Source',
+    'Item 0', 'Item 1', 'Item 2', 'Item 3', 'Item 4', 'Item 5', 'Item 6', 'Item 7', 'Item 8', 'Item 9',
+])
+
+
+def _normalize_step_aliases(analysis_data):
+    """Move capitalized LLM keys to their snake_case names (in place)"""
+    try:
+        for k, v in list(analysis_data.items()):
+            if k in STEP_ALIAS_MAP and STEP_ALIAS_MAP[k] not in analysis_data:
+                analysis_data[STEP_ALIAS_MAP[k]] = v
+        # Remove original capitalized keys to prevent raw dict leakage in other_fields
+        for original_key in list(analysis_data.keys()):
+            if original_key in STEP_ALIAS_MAP:
+                analysis_data.pop(original_key, None)
+    except Exception:
+        pass
+
+
+def _as_text(value, default=""):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return str(value)
+    return str(value) if value is not None else default
+
+
+def _build_detailed_blocks(detailed_text):
+    """Detailed analysis split into paragraphs; HTML tables are kept as-is"""
+    import re
+    detailed_text = sanitize_persona_and_enforce_article(_as_text(detailed_text, "No detailed analysis available"))
+    # Remove QuickChart URLs but keep the visual comparison text
+    detailed_text = re.sub(r'!\[.*?\]\(https://quickchart\.io.*?\)', '', detailed_text, flags=re.DOTALL)
+    filtered = filter_known_sections_from_text(detailed_text)
+    if not filtered.strip() or filtered == FILTERED_CONTENT_MARKER:
+        return []
+
+    processed_text = process_html_tables(filtered)
+    paragraphs = processed_text.split('\n\n') if '\n\n' in processed_text else [processed_text]
+    blocks = []
+    for paragraph in paragraphs:
+        if not isinstance(paragraph, str) or not paragraph.strip():
+            continue
+        if '<table' in paragraph and '</table>' in paragraph:
+            blocks.append({'table': True, 'text': paragraph})
+        else:
+            blocks.append({'table': False, 'text': sanitize_persona_and_enforce_article(paragraph.strip())})
+    return blocks
+
+
+def _build_step1_detailed(detailed_text):
+    """Step 1 detailed analysis: cleaned text (for placeholder tables) and paragraphs"""
+    import re
+    detailed_text = _as_text(detailed_text, "No detailed analysis available")
+    # If the LLM included a prefixed "Formatted Analysis:" section, prefer its content
+    formatted_block = re.search(r"Formatted Analysis:\s*(.*)$", detailed_text, re.DOTALL | re.IGNORECASE)
+    if formatted_block and formatted_block.group(1).strip():
+        detailed_text = formatted_block.group(1).strip()
+    # <br> to line breaks, drop other HTML tags that leak through
+    detailed_text = re.sub(r'<br\s*/?>', '\n', detailed_text, flags=re.IGNORECASE)
+    detailed_text = re.sub(r'</?[a-z]+[^>]*>', '', detailed_text, flags=re.IGNORECASE)
+    detailed_text = detailed_text.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"')
+    detailed_text = sanitize_persona_and_enforce_article(detailed_text)
+    # Remove large noisy blocks (e.g., Detected Formats dumps) before parsing tables
+    detailed_text = re.sub(r"Detected Formats:[\s\S]*$", "", detailed_text, flags=re.IGNORECASE)
+    detailed_text = re.sub(r"Format Comparison:[\s\S]*?Quality Assessment:[\s\S]*?Integration Quality:[\s\S]*?Format Specific Insights:[\s\S]*?Cross Format Benefits:[\s\S]*?$", "", detailed_text, flags=re.IGNORECASE)
+    detailed_text = _clean_step1_llm_noise(detailed_text)
+    detailed_text = _extract_and_render_markdown_tables(detailed_text)
+
+    paragraphs = detailed_text.split('\n\n') if '\n\n' in detailed_text else [detailed_text]
+    return {
+        'text': detailed_text,
+        'paragraphs': [sanitize_persona_and_enforce_article(p.strip())
+                       for p in paragraphs if isinstance(p, str) and p.strip()],
+    }
+
+
+def _parse_table_rows(rows):
+    """Table rows as lists (string-encoded lists from the LLM are parsed)"""
+    import ast
+    parsed_rows = []
+    for row in rows:
+        if isinstance(row, str) and row.startswith('[') and row.endswith(']'):
+            try:
+                parsed_row = ast.literal_eval(row)
+                parsed_rows.append(parsed_row if isinstance(parsed_row, list) else [str(row)])
+            except (ValueError, SyntaxError) as e:
+                logger.warning(f"❌ AST parsing failed for: {row[:50]}... Error: {e}")
+                parsed_rows.append([str(row)])
+        elif isinstance(row, list):
+            parsed_rows.append(row)
+        elif isinstance(row, str):
+            parsed_rows.append([row])
+        else:
+            parsed_rows.append([str(row)])
+    return parsed_rows
+
+
+def _build_scenarios_section(scenarios):
+    """Scenario cards (key, data) or fallback text"""
+    import json
+    import re
+    section = {'cards': [], 'text': None}
+    if isinstance(scenarios, dict):
+        section['cards'] = [(k, v) for k, v in scenarios.items() if isinstance(v, dict)]
+    elif isinstance(scenarios, str):
+        match = re.search(r'\{[^}]*"high"[^}]*\}', scenarios, re.DOTALL)
+        if match:
+            try:
+                section['cards'] = [(k, v) for k, v in json.loads(match.group(0)).items() if isinstance(v, dict)]
+            except json.JSONDecodeError:
+                filtered_text = filter_known_sections_from_text(scenarios)
+                if filtered_text.strip() and filtered_text != FILTERED_CONTENT_MARKER:
+                    section['text'] = filtered_text
+    return section
+
+
+def _build_assumptions_section(assumptions):
+    """Assumption bullets as (label or None, text), or fallback text"""
+    import json
+    import re
+    section = {'items': [], 'text': None}
+
+    def _label(key):
+        return key.replace('item_', '').replace('_', ' ').title()
+
+    if isinstance(assumptions, dict):
+        section['items'] = [(_label(k), v) for k, v in assumptions.items()]
+    elif isinstance(assumptions, list):
+        section['items'] = [(None, a) for a in assumptions]
+    elif isinstance(assumptions, str):
+        match = re.search(r'\{[^}]*"item_0"[^}]*\}', assumptions, re.DOTALL)
+        if match:
+            try:
+                section['items'] = [(_label(k), v) for k, v in json.loads(match.group(0)).items()]
+            except json.JSONDecodeError:
+                filtered_text = filter_known_sections_from_text(assumptions)
+                if filtered_text.strip() and filtered_text != FILTERED_CONTENT_MARKER:
+                    section['text'] = filtered_text
+    return section
+
+
+def _build_interpretations(interpretations):
+    """(label, text) pairs with duplicated 'Interpretation N:' prefixes removed"""
+    if isinstance(interpretations, str):
+        return [('Interpretation', interpretations.strip())] if interpretations.strip() else []
+    items = []
+    for idx, interpretation in enumerate(interpretations or [], 1):
+        if isinstance(interpretation, dict):
+            text = interpretation.get('text', str(interpretation))
+        else:
+            text = interpretation if isinstance(interpretation, str) else str(interpretation)
+        if not isinstance(text, str) or not text.strip():
+            continue
+        clean = text.strip()
+        for prefix in (f"Interpretation {idx}:", f"Detailed interpretation {idx}"):
+            if clean.startswith(prefix):
+                clean = clean.replace(prefix, "", 1).strip()
+                break
+        items.append((f"Interpretation {idx}", clean))
+    return items
+
+
+def _build_key_findings(key_findings):
+    normalized = []
+    if isinstance(key_findings, dict):
+        ordered_keys = sorted(key_findings.keys(), key=lambda x: (not x.startswith('item_'), int(x.split('_')[1]) if x.startswith('item_') and x.split('_')[1].isdigit() else 1000000000))
+        values = [key_findings.get(k) for k in ordered_keys]
+    elif isinstance(key_findings, list):
+        values = key_findings
+    elif isinstance(key_findings, str) and key_findings.strip():
+        parts = [p.strip('-• ').strip() for p in key_findings.strip().split('\n') if p.strip()]
+        values = parts if parts else [key_findings.strip()]
+    else:
+        values = []
+    for v in values:
+        if isinstance(v, str) and v.strip():
+            # JSON objects like {"finding": "...", "implication": "..."}
+            normalized.append(_parse_json_finding(v.strip()))
+    return normalized
+
+
+def _filter_other_text(value):
+    """Filtered text for a free-form string field, or None when it must not be shown"""
+    filtered_value = filter_known_sections_from_text(value)
+    if not filtered_value.strip() or filtered_value == FILTERED_CONTENT_MARKER:
+        return None
+    return filtered_value
+
+
+def build_step_render_payload(step_result, step_number, analysis_results=None):
+    """
+    Precompute everything display_enhanced_step_result needs for one step
+
+    Args:
+        step_result: Step dict (capitalized keys are normalized in place)
+        step_number: Step number
+        analysis_results: Full results, used to attach the economic forecast to Step 6
+
+    Returns:
+        Dict of render-ready sections (plain data, safe to keep in session state)
+    """
+    _normalize_step_aliases(step_result)
+    data = step_result
+    payload = {'version': RENDER_PAYLOAD_VERSION, 'step_number': step_number}
+
+    if step_number == 1:
+        if data.get('detailed_analysis'):
+            payload['step1_detailed'] = _build_step1_detailed(data['detailed_analysis'])
+        return payload
+    if step_number == 3:
+        return payload
+
+    summary = data.get('summary')
+    payload['summary'] = summary.strip() if isinstance(summary, str) and summary.strip() else None
+    payload['detailed_blocks'] = _build_detailed_blocks(data['detailed_analysis']) if data.get('detailed_analysis') else None
+    payload['scenarios'] = _build_scenarios_section(data['scenarios']) if data.get('scenarios') else None
+    payload['assumptions'] = _build_assumptions_section(data['assumptions']) if data.get('assumptions') else None
+
+    tables = []
+    try:
+        for table in _normalize_tables_section(data.get('tables')) if data.get('tables') else []:
+            if isinstance(table, dict) and table.get('title') and table.get('headers') and table.get('rows'):
+                tables.append({'title': table['title'], 'headers': table['headers'], 'rows': _parse_table_rows(table['rows'])})
+    except Exception as e:
+        logger.warning(f"Could not prepare tables for Step {step_number}: {e}")
+    payload['tables'] = tables
+
+    recommendations = []
+    if step_number != 3 and data.get('specific_recommendations'):
+        try:
+            recommendations = _normalize_recommendations_section(data['specific_recommendations'])
+        except Exception:
+            recommendations = data['specific_recommendations'] if isinstance(data['specific_recommendations'], list) else []
+    payload['recommendations'] = recommendations
+
+    interpretations = data.get('interpretations')
+    try:
+        if interpretations:
+            interpretations = _normalize_interpretations_section(interpretations)
+    except Exception:
+        pass
+    payload['interpretations'] = _build_interpretations(interpretations) if interpretations else []
+    payload['key_findings'] = _build_key_findings(data.get('key_findings')) if step_number != 3 else []
+
+    payload['other_text'] = {
+        key: _filter_other_text(value)
+        for key, value in data.items()
+        if isinstance(value, str) and value.strip() and key not in STEP_RENDER_EXCLUDED_KEYS
+    }
+
+    if step_number == 6:
+        payload['forecast_data'] = _build_step6_forecast_data(data, analysis_results)
+    return payload
+
+
+def _build_step6_forecast_data(analysis_data, analysis_results):
+    """Step 6 data with the (cleaned) economic forecast from Step 5 attached"""
+    analysis_results = analysis_results if isinstance(analysis_results, dict) else {}
+    economic_forecast = analysis_results.get('economic_forecast') or analysis_data.get('economic_forecast')
+    if not economic_forecast:
+        for step in analysis_results.get('step_by_step_analysis', []) or []:
+            if isinstance(step, dict) and step.get('step_number') == 5 and step.get('economic_forecast'):
+                economic_forecast = step['economic_forecast']
+                break
+    if not economic_forecast:
+        economic_forecast = {'scenarios': {'high': {'yearly_data': []}, 'medium': {'yearly_data': []}, 'low': {'yearly_data': []}}}
+
+    forecast_data = dict(analysis_data)
+    if 'economic_forecast' not in forecast_data:
+        cleaned = remove_economic_scenarios_from_analysis({'economic_forecast': economic_forecast})
+        forecast_data['economic_forecast'] = cleaned.get('economic_forecast', {})
+    forecast_data = remove_economic_scenarios_from_analysis(forecast_data)
+
+    forecast = forecast_data.get('yield_forecast')
+    if isinstance(forecast, dict):
+        forecast_data['yield_forecast'] = {
+            key: filter_step6_net_profit_placeholders(value) if isinstance(value, str) else value
+            for key, value in forecast.items()
+        }
+    return forecast_data
+
+
+def prepare_render_payloads(analysis_results, force=False):
+    """
+    Build render payloads for every step of an analysis (once)
+
+    Step 5 economic scenario dumps are removed here as well, so the results
+    page does not repeat it on each rerun.
+
+    Returns:
+        List of payloads aligned with analysis_results['step_by_step_analysis']
+    """
+    if not isinstance(analysis_results, dict):
+        return []
+    step_results = analysis_results.get('step_by_step_analysis')
+    if not isinstance(step_results, list):
+        return []
+
+    cached = analysis_results.get(RENDER_PAYLOADS_KEY)
+    if (not force and isinstance(cached, dict) and cached.get('version') == RENDER_PAYLOAD_VERSION
+            and len(cached.get('steps', [])) == len(step_results)):
+        return cached['steps']
+
+    started = time.perf_counter()
+    for i, sr in enumerate(step_results):
+        if isinstance(sr, dict) and (sr.get('step_number') == 5 or sr.get('number') == 5):
+            step_results[i] = remove_economic_scenarios_from_analysis(sr)
+
+    payloads = []
+    for i, step_result in enumerate(step_results):
+        if not isinstance(step_result, dict):
+            payloads.append(None)
+            continue
+        try:
+            payloads.append(build_step_render_payload(step_result, step_result.get('step_number', i + 1), analysis_results))
+        except Exception as e:
+            logger.error(f"Could not prepare render payload for step {i + 1}: {e}")
+            payloads.append(None)
+
+    analysis_results[RENDER_PAYLOADS_KEY] = {'version': RENDER_PAYLOAD_VERSION, 'steps': payloads}
+    logger.info(f"Prepared render payloads for {len(payloads)} steps in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return payloads
+
+
+def invalidate_render_payloads(analysis_results):
+    """Drop cached payloads and key findings after step content changes"""
+    if isinstance(analysis_results, dict):
+        analysis_results.pop(RENDER_PAYLOADS_KEY, None)
+        analysis_results.pop(KEY_FINDINGS_CACHE_KEY, None)
+
+
 def display_step_by_step_results(results_data):
     """Display step-by-step analysis results with enhanced LLM response clarity"""
     st.markdown("---")
@@ -5265,15 +5661,13 @@ def display_step_by_step_results(results_data):
         st.error("❌ Analysis results data format error")
         return
     
-    step_results = analysis_results.get('step_by_step_analysis', []) if isinstance(analysis_results, dict) else []
-    # Sanitize Step 5 content globally to remove economic scenarios/assumptions raw outputs
+    # Render payloads are normally built at finalization; older results get them on first view
     try:
-        if isinstance(step_results, list):
-            for i, sr in enumerate(step_results):
-                if isinstance(sr, dict) and (sr.get('step_number') == 5 or sr.get('number') == 5):
-                    step_results[i] = remove_economic_scenarios_from_analysis(sr)
-    except Exception:
-        pass
+        render_payloads = prepare_render_payloads(analysis_results)
+    except Exception as e:
+        logger.error(f"Could not prepare step render payloads: {e}")
+        render_payloads = []
+    step_results = analysis_results.get('step_by_step_analysis', []) if isinstance(analysis_results, dict) else []
     total_steps = len(step_results)
     
     # Enhanced debugging for step-by-step analysis
@@ -5284,9 +5678,9 @@ def display_step_by_step_results(results_data):
     
     # Also check if there are step results in session state that aren't being captured
     if hasattr(st.session_state, 'stored_analysis_results') and st.session_state.stored_analysis_results:
-        logger.info(f"🔍 DEBUG - stored_analysis_results keys: {list(st.session_state.stored_analysis_results.keys())}")
-        latest_id = max(st.session_state.stored_analysis_results.keys())
-        latest_analysis = st.session_state.stored_analysis_results[latest_id]
+        stored_results = get_session_result_store(st.session_state)
+        logger.info(f"🔍 DEBUG - stored_analysis_results keys: {stored_results.keys()}")
+        latest_analysis = stored_results.latest({})
         if 'step_by_step_analysis' in latest_analysis:
             stored_steps = latest_analysis['step_by_step_analysis']
             logger.info(f"🔍 DEBUG - stored step_by_step_analysis length: {len(stored_steps) if isinstance(stored_steps, list) else 'Not a list'}")
@@ -5316,8 +5710,7 @@ def display_step_by_step_results(results_data):
             # Check session state for analysis data
             if hasattr(st.session_state, 'stored_analysis_results') and st.session_state.stored_analysis_results:
                 st.markdown(f"- Stored analysis results found: {len(st.session_state.stored_analysis_results)} items")
-                latest_id = max(st.session_state.stored_analysis_results.keys())
-                latest_analysis = st.session_state.stored_analysis_results[latest_id]
+                latest_analysis = get_session_result_store(st.session_state).latest({})
                 st.markdown(f"- Latest analysis keys: {list(latest_analysis.keys()) if isinstance(latest_analysis, dict) else 'Not a dict'}")
                 if 'step_by_step_analysis' in latest_analysis:
                     stored_steps = latest_analysis['step_by_step_analysis']
@@ -5348,7 +5741,8 @@ def display_step_by_step_results(results_data):
                 st.markdown("---")
             
             # Display the step result in a block format
-            display_step_block(step_result, step_number, step_title)
+            payload = render_payloads[i] if i < len(render_payloads) else None
+            display_step_block(step_result, step_number, step_title, payload)
     
     # Display additional analysis components (Economic Forecast removed as requested)
     # display_analysis_components(analysis_results)
@@ -8030,7 +8424,7 @@ def display_analysis_components(analysis_results):
         st.markdown("## 📈 Economic Forecast")
         display_economic_forecast(economic_forecast)
 
-def display_step_block(step_result, step_number, step_title):
+def display_step_block(step_result, step_number, step_title, payload=None):
     """Display step results in a professional block format with clear visual hierarchy"""
     
     # Define step-specific colors and icons
@@ -8079,28 +8473,25 @@ def display_step_block(step_result, step_number, step_title):
     """, unsafe_allow_html=True)
     
     # Display the enhanced step result content
-    display_enhanced_step_result(step_result, step_number)
+    display_enhanced_step_result(step_result, step_number, payload)
 
-def display_enhanced_step_result(step_result, step_number):
+def display_enhanced_step_result(step_result, step_number, payload=None):
     """Display enhanced step results with proper structure and formatting for non-technical users"""
     # Ensure step_result is a dictionary
     if not isinstance(step_result, dict):
         logger.error(f"Step {step_number} step_result is not a dictionary: {type(step_result)}")
         st.error(f"❌ Error: Step {step_number} data is not in the expected format")
         return
-    
+
+    # Cleaned text, parsed tables and normalized sections (see prepare_render_payloads)
+    if not isinstance(payload, dict) or payload.get('version') != RENDER_PAYLOAD_VERSION:
+        payload = build_step_render_payload(step_result, step_number)
+
     analysis_data = step_result
 
-    # Debug: Log the structure of analysis_data
-    logger.info(f"Step {step_number} analysis_data keys: {list(analysis_data.keys()) if analysis_data else 'None'}")
-    if 'key_findings' in analysis_data:
-        logger.info(f"Step {step_number} key_findings type: {type(analysis_data['key_findings'])}, value: {analysis_data['key_findings']}")
-    if 'detailed_analysis' in analysis_data:
-        logger.info(f"Step {step_number} detailed_analysis type: {type(analysis_data['detailed_analysis'])}, length: {len(str(analysis_data['detailed_analysis'])) if analysis_data['detailed_analysis'] else 0}")
-    
     # Special handling for STEP 1 - Data Analysis
     if step_number == 1:
-        display_step1_data_analysis(analysis_data)
+        display_step1_data_analysis(analysis_data, payload)
         return
     
     
@@ -8109,106 +8500,35 @@ def display_enhanced_step_result(step_result, step_number):
     if step_number == 3:
         display_step3_solution_recommendations(analysis_data)
         return
-    
-    # Alias-mapping: normalize common capitalized keys from LLM output
-    try:
-        alias_map = {
-            'Key Findings': 'key_findings',
-            'Specific Recommendations': 'specific_recommendations',
-            'Tables': 'tables',
-            'Interpretations': 'interpretations',
-            'Visualizations': 'visualizations',
-            'Yield Forecast': 'yield_forecast',
-            'Format Analysis': 'format_analysis',
-            'Data Format Recommendations': 'data_format_recommendations',
-            'Plantation Values vs. Malaysian Reference Ranges': 'plantation_values_vs_reference',
-            'Soil Issues': 'soil_issues',
-            'Issues Source': 'issues_source',
-            'Scenarios': 'scenarios',
-            'Assumptions': 'assumptions',
-        }
-        for k, v in list(analysis_data.items()):
-            if k in alias_map and alias_map[k] not in analysis_data:
-                analysis_data[alias_map[k]] = v
-        # Remove original capitalized keys to prevent raw dict leakage in other_fields
-        for original_key in list(analysis_data.keys()):
-            if original_key in alias_map:
-                try:
-                    del analysis_data[original_key]
-                except Exception:
-                    pass
-    except Exception:
-        pass
 
     # 1. SUMMARY SECTION - Always show if available
-    if 'summary' in analysis_data and analysis_data['summary']:
+    if payload.get('summary'):
         st.markdown("### 📋 Summary")
-        summary_text = analysis_data['summary']
-        if isinstance(summary_text, str) and summary_text.strip():
-            st.markdown(
-                f'<div style="margin-bottom: 20px; padding: 15px; background: linear-gradient(135deg, #e8f5e8, #ffffff); border-left: 4px solid #28a745; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">'
-                f'<p style="margin: 0; font-size: 16px; line-height: 1.6; color: #2c3e50;">{summary_text.strip()}</p>'
-                f'</div>',
-                unsafe_allow_html=True
-            )
-            st.markdown("")
+        st.markdown(
+            f'<div style="margin-bottom: 20px; padding: 15px; background: linear-gradient(135deg, #e8f5e8, #ffffff); border-left: 4px solid #28a745; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">'
+            f'<p style="margin: 0; font-size: 16px; line-height: 1.6; color: #2c3e50;">{payload["summary"]}</p>'
+            f'</div>',
+            unsafe_allow_html=True
+        )
+        st.markdown("")
         
     # 2. KEY FINDINGS SECTION - Removed from individual steps
     # Key findings are now consolidated and displayed only after Executive Summary
         
     # 3. DETAILED ANALYSIS SECTION - Show if available (with filtering for all steps)
-    if 'detailed_analysis' in analysis_data and analysis_data['detailed_analysis']:
+    if payload.get('detailed_blocks') is not None:
         st.markdown("### 📋 Detailed Analysis")
-        detailed_text = analysis_data['detailed_analysis']
-        
-        # Ensure detailed_text is a string
-        if isinstance(detailed_text, dict):
-            detailed_text = str(detailed_text)
-        elif not isinstance(detailed_text, str):
-            detailed_text = str(detailed_text) if detailed_text is not None else "No detailed analysis available"
-        
-        # Sanitize persona and enforce neutral tone before other filtering
-        detailed_text = sanitize_persona_and_enforce_article(detailed_text)
-        
-        # Filter out QuickChart URLs but preserve visual comparison text for proper chart generation
-        import re
-        # Remove QuickChart URLs but keep the visual comparison text
-        detailed_text = re.sub(r'!\[.*?\]\(https://quickchart\.io.*?\)', '', detailed_text, flags=re.DOTALL)
-        
-        # For Step 2, we want to keep the visual comparison text but remove the actual QuickChart URLs
-        # This allows the visualization generation to work properly
-        
-        # Filter out raw LLM output patterns before processing
-        filtered_detailed_text = filter_known_sections_from_text(detailed_text)
-
-        if filtered_detailed_text.strip() and filtered_detailed_text != "Content filtered to prevent raw LLM output display.":
-            # Process HTML tables and other content
-            processed_text = process_html_tables(filtered_detailed_text)
-
-            # Split into paragraphs for better formatting
-            paragraphs = processed_text.split('\n\n') if '\n\n' in processed_text else [processed_text]
-
-            for paragraph in paragraphs:
-                if isinstance(paragraph, str) and paragraph.strip():
-                    # Skip empty paragraphs
-                    if paragraph.strip() == '':
-                        continue
-
-                    # Check if this paragraph contains a table (already processed)
-                    if '<table' in paragraph and '</table>' in paragraph:
-                        # This is an HTML table, render it directly
-                        st.markdown(paragraph, unsafe_allow_html=True)
-                    else:
-                        # Regular text paragraph
-                        st.markdown(
-                            f'<div style="margin-bottom: 18px; padding: 15px; background: linear-gradient(135deg, #ffffff, #f8f9fa); border: 1px solid #e9ecef; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">'
-                            f'<p style="margin: 0; line-height: 1.8; font-size: 16px; color: #2c3e50;">{sanitize_persona_and_enforce_article(paragraph.strip())}</p>'
-                            f'</div>',
-                            unsafe_allow_html=True
-                        )
-        else:
-            # If all content was filtered out, don't display anything
-            pass
+        for block in payload['detailed_blocks']:
+            if block['table']:
+                # This is an HTML table, render it directly
+                st.markdown(block['text'], unsafe_allow_html=True)
+            else:
+                st.markdown(
+                    f'<div style="margin-bottom: 18px; padding: 15px; background: linear-gradient(135deg, #ffffff, #f8f9fa); border: 1px solid #e9ecef; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">'
+                    f'<p style="margin: 0; line-height: 1.8; font-size: 16px; color: #2c3e50;">{block["text"]}</p>'
+                    f'</div>',
+                    unsafe_allow_html=True
+                )
         st.markdown("")
     
     # 3.5. PLANTATION VALUES VS REFERENCE RANGES SECTION - REMOVED as requested
@@ -8217,151 +8537,46 @@ def display_enhanced_step_result(step_result, step_number):
     # 3.6. SOIL ISSUES SECTION - Disabled to prevent raw or malformed 'Soil Issues' output
     # Intentionally no-op: we do not render analysis_data['soil_issues'] at all
 
-        st.markdown("")
-
     # 3.7. ECONOMIC SCENARIOS SECTION - Special handling for Step 5
-    if 'scenarios' in analysis_data and analysis_data['scenarios']:
-        scenarios = analysis_data['scenarios']
-
+    if payload.get('scenarios'):
         st.markdown("### 📈 Investment Scenarios")
-
-        # Handle different formats of scenarios data
-        if isinstance(scenarios, dict):
-            # Display each scenario in a formatted card
-            for scenario_key, scenario_data in scenarios.items():
-                if isinstance(scenario_data, dict):
-                    display_formatted_scenario(scenario_key, scenario_data)
-        elif isinstance(scenarios, str):
-            # Try to parse JSON from string
-            import json
-            import re
-
-            # Look for JSON pattern
-            json_pattern = r'\{[^}]*"high"[^}]*\}'
-            match = re.search(json_pattern, scenarios, re.DOTALL)
-
-            if match:
-                json_str = match.group(0)
-                try:
-                    scenarios_data = json.loads(json_str)
-                    for scenario_key, scenario_data in scenarios_data.items():
-                        if isinstance(scenario_data, dict):
-                            display_formatted_scenario(scenario_key, scenario_data)
-                except json.JSONDecodeError:
-                    # Fallback to filtering
-                    filtered_text = filter_known_sections_from_text(scenarios)
-                    if filtered_text.strip() and filtered_text != "Content filtered to prevent raw LLM output display.":
-                        st.markdown(filtered_text)
-
+        for scenario_key, scenario_data in payload['scenarios']['cards']:
+            display_formatted_scenario(scenario_key, scenario_data)
+        if payload['scenarios']['text']:
+            st.markdown(payload['scenarios']['text'])
         st.markdown("")
 
     # 3.8. ASSUMPTIONS SECTION - Special handling for Step 5
-    if 'assumptions' in analysis_data and analysis_data['assumptions']:
-        assumptions = analysis_data['assumptions']
-
+    if payload.get('assumptions'):
         st.markdown("### 📋 Key Assumptions")
-
-        # Handle different formats of assumptions data
-        if isinstance(assumptions, dict):
-            # Display assumptions as a list
-            for key, assumption in assumptions.items():
-                st.markdown(f"• **{key.replace('item_', '').replace('_', ' ').title()}:** {assumption}")
-        elif isinstance(assumptions, list):
-            for assumption in assumptions:
-                st.markdown(f"• {assumption}")
-        elif isinstance(assumptions, str):
-            # Try to parse JSON from string
-            import json
-            import re
-
-            # Look for JSON pattern
-            json_pattern = r'\{[^}]*"item_0"[^}]*\}'
-            match = re.search(json_pattern, assumptions, re.DOTALL)
-
-            if match:
-                json_str = match.group(0)
-                try:
-                    assumptions_data = json.loads(json_str)
-                    for key, assumption in assumptions_data.items():
-                        st.markdown(f"• **{key.replace('item_', '').replace('_', ' ').title()}:** {assumption}")
-                except json.JSONDecodeError:
-                    # Fallback to filtering
-                    filtered_text = filter_known_sections_from_text(assumptions)
-                    if filtered_text.strip() and filtered_text != "Content filtered to prevent raw LLM output display.":
-                        st.markdown(filtered_text)
-
+        for label, assumption in payload['assumptions']['items']:
+            st.markdown(f"• **{label}:** {assumption}" if label else f"• {assumption}")
+        if payload['assumptions']['text']:
+            st.markdown(payload['assumptions']['text'])
         st.markdown("")
 
     # 4. TABLES SECTION - Display detailed tables if available
-    try:
-        if 'tables' in analysis_data and analysis_data['tables']:
-            analysis_data['tables'] = _normalize_tables_section(analysis_data['tables'])
-    except Exception:
-        pass
-    if 'tables' in analysis_data and analysis_data['tables']:
-        # st.markdown("### 📊 Detailed Data Tables")  # REMOVED
-        for table in analysis_data['tables']:
-            if isinstance(table, dict) and table.get('title') and table.get('headers') and table.get('rows'):
-                st.markdown(f"**{table['title']}**")
-                # Create a DataFrame for better display
-                import pandas as pd
-
-                # BULLETPROOF DataFrame creation with STRING-TO-LIST PARSING
-                try:
-                    # Parse string representations of lists in table rows
-                    parsed_rows = []
-                    for row in table['rows']:
-                        if isinstance(row, str) and row.startswith('[') and row.endswith(']'):
-                            # This is a string representation of a list - parse it
-                            try:
-                                import ast
-                                parsed_row = ast.literal_eval(row)
-                                if isinstance(parsed_row, list):
-                                    parsed_rows.append(parsed_row)
-                                    logger.info(f"✅ Parsed string list: {row[:50]}...")
-                                else:
-                                    logger.warning(f"❌ Failed to parse as list: {row}")
-                                    parsed_rows.append([str(row)])
-                            except (ValueError, SyntaxError) as e:
-                                logger.warning(f"❌ AST parsing failed for: {row[:50]}... Error: {e}")
-                                parsed_rows.append([str(row)])
-                        elif isinstance(row, list):
-                            # Already a proper list
-                            parsed_rows.append(row)
-                        elif isinstance(row, str):
-                            # Single string value - treat as single column
-                            logger.warning(f"⚠️ Single string row detected: {row}")
-                            parsed_rows.append([row])
-                        else:
-                            # Other data type - convert to string list
-                            parsed_rows.append([str(row)])
-                    
-                    # Create DataFrame with parsed data
-                    if parsed_rows:
-                        df = pd.DataFrame(parsed_rows, columns=table['headers'])
-                        logger.info(f"✅ Created table DataFrame for '{table['title']}' with shape: {df.shape}")
-                        apply_table_styling()
-                        st.dataframe(df, use_container_width=True)
-                    else:
-                        st.warning(f"No valid data found for table '{table['title']}'")
-                        
-                except Exception as df_error:
-                    logger.error(f"❌ Table DataFrame creation failed for '{table['title']}': {str(df_error)}")
-                    logger.error(f"🔍 Raw table data: {table['rows'][:2] if table['rows'] else 'Empty'}")
-                    st.error(f"Unable to display table '{table['title']}'")
-                    continue
-                st.markdown("")
+    for table in payload.get('tables', []):
+        st.markdown(f"**{table['title']}**")
+        try:
+            if table['rows']:
+                df = pd.DataFrame(table['rows'], columns=table['headers'])
+                apply_table_styling()
+                st.dataframe(df, use_container_width=True)
+            else:
+                st.warning(f"No valid data found for table '{table['title']}'")
+        except Exception as df_error:
+            logger.error(f"❌ Table DataFrame creation failed for '{table['title']}': {str(df_error)}")
+            st.error(f"Unable to display table '{table['title']}'")
+            continue
+        st.markdown("")
 
     # 5b. SPECIFIC RECOMMENDATIONS (for steps other than 3)
-    if step_number != 3 and analysis_data.get('specific_recommendations'):
-        try:
-            analysis_data['specific_recommendations'] = _normalize_recommendations_section(analysis_data['specific_recommendations'])
-        except Exception:
-            pass
+    if payload.get('recommendations'):
         st.markdown("### ✅ Specific Recommendations")
         ctx = st.session_state.get("runtime_context", {})
         mon = ctx.get('month')
-        for idx, rec in enumerate(analysis_data['specific_recommendations'], 1):
+        for idx, rec in enumerate(payload['recommendations'], 1):
             if isinstance(rec, str):
                 st.markdown(f"- {rec}")
                 continue
@@ -8395,80 +8610,21 @@ def display_enhanced_step_result(step_result, step_number):
 </div>
 """, unsafe_allow_html=True)
     
-    # 5. INTERPRETATIONS SECTION - Normalize and display detailed interpretations if available
-    try:
-        if 'interpretations' in analysis_data and analysis_data['interpretations']:
-            analysis_data['interpretations'] = _normalize_interpretations_section(analysis_data['interpretations'])
-    except Exception:
-        pass
-    if 'interpretations' in analysis_data and analysis_data['interpretations']:
+    # 5. INTERPRETATIONS SECTION - Display detailed interpretations if available
+    if payload.get('interpretations'):
         st.markdown("### 🔍 Detailed Interpretations")
-        interpretations = analysis_data['interpretations']
-        
-        # Handle different interpretation formats
-        if isinstance(interpretations, list):
-            for idx, interpretation in enumerate(interpretations, 1):
-                # Handle both string and dict formats
-                if isinstance(interpretation, dict):
-                    # Extract text from dictionary format
-                    interpretation_text = interpretation.get('text', str(interpretation))
-                elif isinstance(interpretation, str):
-                    interpretation_text = interpretation
-                else:
-                    interpretation_text = str(interpretation)
-                
-                if interpretation_text and isinstance(interpretation_text, str) and interpretation_text.strip():
-                # Remove any existing "Interpretation X:" prefix to avoid duplication
-                    clean_interpretation = interpretation_text.strip()
-                if clean_interpretation.startswith(f"Interpretation {idx}:"):
-                    clean_interpretation = clean_interpretation.replace(f"Interpretation {idx}:", "").strip()
-                elif clean_interpretation.startswith(f"Detailed interpretation {idx}"):
-                    clean_interpretation = clean_interpretation.replace(f"Detailed interpretation {idx}", "").strip()
-                
-                st.markdown(
-                    f'<div style="margin-bottom: 15px; padding: 12px; background: linear-gradient(135deg, #f8f9fa, #ffffff); border-left: 4px solid #007bff; border-radius: 6px; box-shadow: 0 1px 4px rgba(0,0,0,0.1);">'
-                    f'<p style="margin: 0; font-size: 15px; line-height: 1.5; color: #2c3e50;"><strong>Interpretation {idx}:</strong> {clean_interpretation}</p>'
-                        f'</div>',
-                        unsafe_allow_html=True
-                    )
-        elif isinstance(interpretations, str):
-            # Single interpretation as string
-            if interpretations.strip():
-                st.markdown(
-                    f'<div style="margin-bottom: 15px; padding: 12px; background: linear-gradient(135deg, #f8f9fa, #ffffff); border-left: 4px solid #007bff; border-radius: 6px; box-shadow: 0 1px 4px rgba(0,0,0,0.1);">'
-                    f'<p style="margin: 0; font-size: 15px; line-height: 1.5; color: #2c3e50;"><strong>Interpretation:</strong> {interpretations.strip()}</p>'
-                    f'</div>',
-                    unsafe_allow_html=True
-                )
+        for label, text in payload['interpretations']:
+            st.markdown(
+                f'<div style="margin-bottom: 15px; padding: 12px; background: linear-gradient(135deg, #f8f9fa, #ffffff); border-left: 4px solid #007bff; border-radius: 6px; box-shadow: 0 1px 4px rgba(0,0,0,0.1);">'
+                f'<p style="margin: 0; font-size: 15px; line-height: 1.5; color: #2c3e50;"><strong>{label}:</strong> {text}</p>'
+                f'</div>',
+                unsafe_allow_html=True
+            )
         st.markdown("")
     
     # 6. ANALYSIS RESULTS SECTION - Show actual LLM results (renamed from Additional Information)
     # This section shows the main analysis results from the LLM
-    excluded_keys = set([
-        'summary', 'key_findings', 'detailed_analysis', 'formatted_analysis',
-        'step_number', 'step_title', 'step_description',
-        'visualizations', 'yield_forecast', 'references', 'search_timestamp', 'prompt_instructions',
-        'tables', 'interpretations', 'data_quality',
-        'specific_recommendations', 'format_analysis', 'data_format_recommendations',
-        'raw_llm_output', 'raw_output', 'raw_llm',
-        'scenarios', 'assumptions'
-    ])
-    excluded_keys.update([
-        'Key Findings', 'Specific Recommendations', 'Tables', 'Interpretations', 'Visualizations',
-        'Yield Forecast', 'Format Analysis', 'Data Format Recommendations', 'Plantation Values vs. Malaysian Reference Ranges',
-        'Soil Issues', 'Issues Source'
-    ])
-    # Also exclude capitalized variants that may appear from LLM outputs
-    excluded_keys.update([
-        'Specific Recommendations', 'Tables', 'Interpretations', 'Visualizations',
-        'Yield Forecast', 'Format Analysis', 'Data Format Recommendations'
-    ])
-    # Exclude raw LLM output patterns and deterministic data
-    excluded_keys.update([
-        'raw_llm_output', 'raw_output', 'raw_llm', 'deterministic', 'llm_output',
-        'Item 0', 'Item 1', 'Item 2', 'Item 3', 'Item 4', 'Item 5', 'Item 6', 'Item 7', 'Item 8', 'Item 9'
-    ])
-    other_fields = [k for k in analysis_data.keys() if k not in excluded_keys and analysis_data.get(k) is not None and analysis_data.get(k) != ""]
+    other_fields = [k for k in analysis_data.keys() if k not in STEP_RENDER_EXCLUDED_KEYS and analysis_data.get(k) is not None and analysis_data.get(k) != ""]
     
     has_key_findings = bool(analysis_data.get('key_findings'))
     if has_key_findings or other_fields:
@@ -8476,29 +8632,7 @@ def display_enhanced_step_result(step_result, step_number):
 
     # KEY FINDINGS - render nicely under Analysis Results (for all steps except 3)
     if has_key_findings and step_number != 3:
-        key_findings = analysis_data.get('key_findings')
-        normalized_kf = []
-        if isinstance(key_findings, dict):
-            ordered_keys = sorted(key_findings.keys(), key=lambda x: (not x.startswith('item_'), int(x.split('_')[1]) if x.startswith('item_') and x.split('_')[1].isdigit() else 1000000000))
-            for k in ordered_keys:
-                v = key_findings.get(k)
-                if isinstance(v, str) and v.strip():
-                    # Try to parse JSON objects like {"finding": "...", "implication": "..."}
-                    parsed_finding = _parse_json_finding(v.strip())
-                    normalized_kf.append(parsed_finding)
-        elif isinstance(key_findings, list):
-            for v in key_findings:
-                if isinstance(v, str) and v.strip():
-                    # Try to parse JSON objects like {"finding": "...", "implication": "..."}
-                    parsed_finding = _parse_json_finding(v.strip())
-                    normalized_kf.append(parsed_finding)
-        elif isinstance(key_findings, str) and key_findings.strip():
-            parts = [p.strip('-• ').strip() for p in key_findings.strip().split('\n') if p.strip()]
-            for part in (parts if parts else [key_findings.strip()]):
-                # Try to parse JSON objects like {"finding": "...", "implication": "..."}
-                parsed_finding = _parse_json_finding(part)
-                normalized_kf.append(parsed_finding)
-
+        normalized_kf = payload.get('key_findings', [])
         if normalized_kf:
             st.markdown(
                 """
@@ -8552,15 +8686,12 @@ def display_enhanced_step_result(step_result, step_number):
                     else:
                         st.markdown(f"- {item}")
             elif isinstance(value, str) and value.strip():
-                # Filter out raw dictionary patterns from string values
-                filtered_value = filter_known_sections_from_text(value)
-                if filtered_value.strip() and filtered_value != "Content filtered to prevent raw LLM output display.":
-                    # Additional check: if the original value contained raw LLM patterns, don't display
-                    original_filtered = filter_known_sections_from_text(str(value))
-                    if original_filtered == "Content filtered to prevent raw LLM output display.":
-                        pass  # Don't display anything
-                    else:
-                        st.markdown(f"**{title}:** {filtered_value}")
+                # Filtered once when the payload was built (None = raw LLM output, not shown)
+                filtered_value = payload.get('other_text', {}).get(key)
+                if filtered_value is None and key not in payload.get('other_text', {}):
+                    filtered_value = _filter_other_text(value)
+                if filtered_value:
+                    st.markdown(f"**{title}:** {filtered_value}")
             st.markdown("")
 
     # Display visualizations for all steps except Step 2 (which shows no visualizations or tables)
@@ -8609,65 +8740,11 @@ def display_enhanced_step_result(step_result, step_number):
     
     # Display forecast graph only for Step 6
     if step_number == 6 and should_show_forecast_graph(step_result) and has_yield_forecast_data(analysis_data):
-        # Ensure Step 6 has access to economic forecast data from Step 5
-        economic_forecast = None
-
-        # First try to get economic forecast from session state (preferred method)
-        if hasattr(st, 'session_state') and 'stored_analysis_results' in st.session_state and st.session_state.stored_analysis_results:
-            latest_id = max(st.session_state.stored_analysis_results.keys())
-            latest_analysis = st.session_state.stored_analysis_results[latest_id]
-            if 'economic_forecast' in latest_analysis:
-                economic_forecast = latest_analysis['economic_forecast']
-                logger.info(f"Retrieved economic forecast from session state for Step 6")
-
-        # Fallback: try to get economic forecast from current analysis_data if available
-        if not economic_forecast and 'economic_forecast' in analysis_data:
-            economic_forecast = analysis_data['economic_forecast']
-            logger.info(f"Using economic forecast from current analysis_data for Step 6")
-
-        # Fallback: try to reconstruct economic forecast from Step 5 data in session state
-        if not economic_forecast:
-            try:
-                # Look for Step 5 data in stored results
-                if hasattr(st, 'session_state') and 'stored_analysis_results' in st.session_state and st.session_state.stored_analysis_results:
-                    latest_id = max(st.session_state.stored_analysis_results.keys())
-                    latest_analysis = st.session_state.stored_analysis_results[latest_id]
-
-                    # Look for step 5 data
-                    step_by_step = latest_analysis.get('step_by_step_analysis', [])
-                    for step in step_by_step:
-                        if isinstance(step, dict) and step.get('step_number') == 5:
-                            if 'economic_forecast' in step:
-                                economic_forecast = step['economic_forecast']
-                                logger.info(f"Reconstructed economic forecast from Step 5 data for Step 6")
-                                break
-            except Exception as e:
-                logger.warning(f"Could not reconstruct economic forecast from Step 5: {e}")
-
-        # If we still don't have economic forecast, try to generate a basic one from available data
-        if not economic_forecast:
-            try:
-                logger.warning("No economic forecast found, attempting to generate basic forecast for Step 6")
-                # This is a fallback - in a real scenario, this should not happen
-                economic_forecast = {
-                    'scenarios': {
-                        'high': {'yearly_data': []},
-                        'medium': {'yearly_data': []},
-                        'low': {'yearly_data': []}
-                    }
-                }
-            except Exception as e:
-                logger.error(f"Could not generate fallback economic forecast: {e}")
-
-        # Add cleaned economic forecast to analysis_data so Step 6 can access it
-        if economic_forecast and 'economic_forecast' not in analysis_data:
-            # Clean the economic forecast to prevent raw data leakage
-            cleaned_economic_forecast = remove_economic_scenarios_from_analysis({'economic_forecast': economic_forecast})
-            analysis_data['economic_forecast'] = cleaned_economic_forecast.get('economic_forecast', {})
-
-        # FINAL SAFEGUARD: Clean any remaining raw economic data in analysis_data
-        # This catches any raw data that might have leaked through from LLM responses
-        analysis_data = remove_economic_scenarios_from_analysis(analysis_data)
+        # Step 6 data with the cleaned Step 5 economic forecast, prepared with the payload
+        forecast_data = payload.get('forecast_data')
+        if forecast_data is None:
+            forecast_data = _build_step6_forecast_data(analysis_data, None)
+        analysis_data = forecast_data
 
         display_forecast_graph_content(analysis_data, step_number, step_result.get('step_title', f'Step {step_number}'))
 
@@ -10245,132 +10322,136 @@ def display_actual_vs_optimal_bar(data, title, options):
             st.warning("Insufficient data for bar chart")
             return
         
-        # Create subplots - one for each parameter
-        num_params = len(categories)
+        def _build():
+            # Create subplots - one for each parameter
+            num_params = len(categories)
         
-        # Calculate optimal layout - if more than 4 parameters, use 2 rows
-        if num_params > 4:
-            rows = 2
-            cols = (num_params + 1) // 2
-        else:
-            rows = 1
-            cols = num_params
+            # Calculate optimal layout - if more than 4 parameters, use 2 rows
+            if num_params > 4:
+                rows = 2
+                cols = (num_params + 1) // 2
+            else:
+                rows = 1
+                cols = num_params
         
-        fig = make_subplots(
-            rows=rows, 
-            cols=cols,
-            subplot_titles=categories,
-            horizontal_spacing=0.05,
-            vertical_spacing=0.2
-        )
+            fig = make_subplots(
+                rows=rows, 
+                cols=cols,
+                subplot_titles=categories,
+                horizontal_spacing=0.05,
+                vertical_spacing=0.2
+            )
         
-        # Define colors
-        actual_color = series[0].get('color', '#3498db')
-        optimal_color = series[1].get('color', '#e74c3c')
+            # Define colors
+            actual_color = series[0].get('color', '#3498db')
+            optimal_color = series[1].get('color', '#e74c3c')
         
-        # Add bars for each parameter
-        for i, param in enumerate(categories):
-            actual_val = actual_values[i]
-            optimal_val = optimal_values[i]
+            # Add bars for each parameter
+            for i, param in enumerate(categories):
+                actual_val = actual_values[i]
+                optimal_val = optimal_values[i]
             
-            # Calculate appropriate scale for this parameter
-            max_val = max(actual_val, optimal_val)
-            min_val = min(actual_val, optimal_val)
+                # Calculate appropriate scale for this parameter
+                max_val = max(actual_val, optimal_val)
+                min_val = min(actual_val, optimal_val)
             
-            # Add more padding to the scale to accommodate outside text
-            range_val = max_val - min_val
-            if range_val == 0:
-                range_val = max_val * 0.1 if max_val > 0 else 1
+                # Add more padding to the scale to accommodate outside text
+                range_val = max_val - min_val
+                if range_val == 0:
+                    range_val = max_val * 0.1 if max_val > 0 else 1
             
-            y_max = max_val + (range_val * 0.4)  # Increased padding for outside text
-            y_min = max(0, min_val - (range_val * 0.2))  # Increased padding for outside text
+                y_max = max_val + (range_val * 0.4)  # Increased padding for outside text
+                y_min = max(0, min_val - (range_val * 0.2))  # Increased padding for outside text
             
-            # Calculate row and column position
-            if rows == 1:
-                row_pos = 1
-                col_pos = i + 1
-            else:
-                row_pos = (i // cols) + 1
-                col_pos = (i % cols) + 1
+                # Calculate row and column position
+                if rows == 1:
+                    row_pos = 1
+                    col_pos = i + 1
+                else:
+                    row_pos = (i // cols) + 1
+                    col_pos = (i % cols) + 1
             
-            # Add actual value bar
-            fig.add_trace(
-                go.Bar(
-                    x=['Observed'],
-                    y=[actual_val],
-                    name='Observed' if i == 0 else None,  # Only show legend for first chart
-                    marker_color=actual_color,
-                    text=[f"{actual_val:.1f}"],
-                    textposition='outside',
-                    textfont=dict(size=10, color='black', family='Arial Black'),
-                    showlegend=(i == 0)
-                ),
-                row=row_pos, col=col_pos
-            )
+                # Add actual value bar
+                fig.add_trace(
+                    go.Bar(
+                        x=['Observed'],
+                        y=[actual_val],
+                        name='Observed' if i == 0 else None,  # Only show legend for first chart
+                        marker_color=actual_color,
+                        text=[f"{actual_val:.1f}"],
+                        textposition='outside',
+                        textfont=dict(size=10, color='black', family='Arial Black'),
+                        showlegend=(i == 0)
+                    ),
+                    row=row_pos, col=col_pos
+                )
             
-            # Add optimal value bar
-            fig.add_trace(
-                go.Bar(
-                    x=['Recommended'],
-                    y=[optimal_val],
-                    name='Recommended' if i == 0 else None,  # Only show legend for first chart
-                    marker_color=optimal_color,
-                    text=[f"{optimal_val:.1f}"],
-                    textposition='outside',
-                    textfont=dict(size=10, color='black', family='Arial Black'),
-                    showlegend=(i == 0)
-                ),
-                row=row_pos, col=col_pos
-            )
+                # Add optimal value bar
+                fig.add_trace(
+                    go.Bar(
+                        x=['Recommended'],
+                        y=[optimal_val],
+                        name='Recommended' if i == 0 else None,  # Only show legend for first chart
+                        marker_color=optimal_color,
+                        text=[f"{optimal_val:.1f}"],
+                        textposition='outside',
+                        textfont=dict(size=10, color='black', family='Arial Black'),
+                        showlegend=(i == 0)
+                    ),
+                    row=row_pos, col=col_pos
+                )
             
-            # Update y-axis for this subplot
-            fig.update_yaxes(
-                range=[y_min, y_max],
-                row=row_pos, col=col_pos,
-                showgrid=True,
-                gridwidth=1,
-                gridcolor='lightgray',
-                zeroline=True,
-                zerolinewidth=1,
-                zerolinecolor='lightgray',
-                tickfont=dict(size=10)
-            )
+                # Update y-axis for this subplot
+                fig.update_yaxes(
+                    range=[y_min, y_max],
+                    row=row_pos, col=col_pos,
+                    showgrid=True,
+                    gridwidth=1,
+                    gridcolor='lightgray',
+                    zeroline=True,
+                    zerolinewidth=1,
+                    zerolinecolor='lightgray',
+                    tickfont=dict(size=10)
+                )
             
-            # Update x-axis for this subplot
-            fig.update_xaxes(
-                row=row_pos, col=col_pos,
-                showgrid=False,
-                tickangle=0,
-                tickfont=dict(size=10)
+                # Update x-axis for this subplot
+                fig.update_xaxes(
+                    row=row_pos, col=col_pos,
+                    showgrid=False,
+                    tickangle=0,
+                    tickfont=dict(size=10)
+                )
+        
+            # Enhanced professional layout
+            fig.update_layout(
+                title={
+                    'text': title,
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'size': 18, 'color': '#1B5E20', 'family': 'Arial Black'},
+                    'pad': {'t': 20, 'b': 20}
+                },
+                height=650 if rows > 1 else 450,
+                showlegend=True,
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="center",
+                    x=0.5,
+                    bgcolor="rgba(255,255,255,0.9)",
+                    bordercolor="rgba(0,0,0,0.2)",
+                    borderwidth=1,
+                    font=dict(size=12)
+                ),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(size=12, family='Arial'),
+                margin=dict(l=60, r=60, t=100, b=60)
             )
+            return fig
         
-        # Enhanced professional layout
-        fig.update_layout(
-            title={
-                'text': title,
-                'x': 0.5,
-                'xanchor': 'center',
-                'font': {'size': 18, 'color': '#1B5E20', 'family': 'Arial Black'},
-                'pad': {'t': 20, 'b': 20}
-            },
-            height=650 if rows > 1 else 450,
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5,
-                bgcolor="rgba(255,255,255,0.9)",
-                bordercolor="rgba(0,0,0,0.2)",
-                borderwidth=1,
-                font=dict(size=12)
-            ),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12, family='Arial'),
-            margin=dict(l=60, r=60, t=100, b=60)
-        )
+        fig = cached_figure('actual_vs_optimal_bar', (categories, series, title), _build)
         
         st.plotly_chart(fig, use_container_width=True)
         
@@ -10764,38 +10845,12 @@ def display_gauge_chart(data, title, options=None):
     except ImportError:
         st.info("Plotly not available for chart display")
 
-def display_step1_data_analysis(analysis_data):
+def display_step1_data_analysis(analysis_data, payload=None):
     """Display Step 1: Data Analysis with nutrient status tables"""
     
-    # Normalize aliases and common mis-cased keys for all steps
-    try:
-        alias_map = {
-            'Key Findings': 'key_findings',
-            'Specific Recommendations': 'specific_recommendations',
-            'Tables': 'tables',
-            'Interpretations': 'interpretations',
-            'Visualizations': 'visualizations',
-            'Yield Forecast': 'yield_forecast',
-            'Format Analysis': 'format_analysis',
-            'Data Format Recommendations': 'data_format_recommendations',
-            'Plantation Values vs. Malaysian Reference Ranges': 'plantation_values_vs_reference',
-            'Soil Issues': 'soil_issues',
-            'Issues Source': 'issues_source',
-            'Scenarios': 'scenarios',
-            'Assumptions': 'assumptions',
-        }
-        for k, v in list(analysis_data.items()):
-            if k in alias_map and alias_map[k] not in analysis_data:
-                analysis_data[alias_map[k]] = v
-        # Remove original capitalized keys to prevent raw dict leakage in other_fields
-        for original_key in list(analysis_data.keys()):
-            if original_key in alias_map:
-                try:
-                    del analysis_data[original_key]
-                except Exception:
-                    pass
-    except Exception:
-        pass
+    # Aliases are normalized and the detailed text cleaned when the payload is built
+    if not isinstance(payload, dict) or payload.get('version') != RENDER_PAYLOAD_VERSION:
+        payload = build_step_render_payload(analysis_data, 1)
     
     # 1. SUMMARY SECTION
     if 'summary' in analysis_data and analysis_data['summary']:
@@ -10813,70 +10868,20 @@ def display_step1_data_analysis(analysis_data):
     # Key findings are now consolidated and displayed only after Executive Summary
     
     # 3. DETAILED ANALYSIS SECTION
-    if 'detailed_analysis' in analysis_data and analysis_data['detailed_analysis']:
+    step1_detailed = payload.get('step1_detailed')
+    if step1_detailed:
         st.markdown("#### 📋 Detailed Analysis")
-        detailed_text = analysis_data['detailed_analysis']
-        
-        if isinstance(detailed_text, dict):
-            detailed_text = str(detailed_text)
-        elif not isinstance(detailed_text, str):
-            detailed_text = str(detailed_text) if detailed_text is not None else "No detailed analysis available"
-
-        # If the LLM included a prefixed "Formatted Analysis:" section, prefer its content
-        try:
-            import re
-            formatted_block = re.search(r"Formatted Analysis:\s*(.*)$", detailed_text, re.DOTALL | re.IGNORECASE)
-            if formatted_block and formatted_block.group(1).strip():
-                detailed_text = formatted_block.group(1).strip()
-        except Exception:
-            pass
-
-        # Clean HTML-like tags (e.g., <br>, <br/>, <br />) and convert to line breaks
-        try:
-            import re as _re_html
-            # Replace <br>, <br/>, <br /> with actual line breaks
-            detailed_text = _re_html.sub(r'<br\s*/?>', '\n', detailed_text, flags=_re_html.IGNORECASE)
-            # Remove other common HTML tags that might leak through
-            detailed_text = _re_html.sub(r'</?[a-z]+[^>]*>', '', detailed_text, flags=_re_html.IGNORECASE)
-        except Exception:
-            pass
-
-        # Unescape common escape sequences that sometimes leak from LLM
-        try:
-            detailed_text = detailed_text.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"')
-        except Exception:
-            pass
-
-        # Sanitize persona and enforce neutral tone before rendering
-        detailed_text = sanitize_persona_and_enforce_article(detailed_text)
-        
-        # Remove large noisy blocks (e.g., Detected Formats dumps) before parsing tables
-        try:
-            import re as _re
-            detailed_text = _re.sub(r"Detected Formats:[\s\S]*$", "", detailed_text, flags=_re.IGNORECASE)
-            # Remove other noisy blocks
-            detailed_text = _re.sub(r"Format Comparison:[\s\S]*?Quality Assessment:[\s\S]*?Integration Quality:[\s\S]*?Format Specific Insights:[\s\S]*?Cross Format Benefits:[\s\S]*?$", "", detailed_text, flags=_re.IGNORECASE)
-        except Exception:
-            pass
-
-        # Remove noisy scaffolding blocks leaked by LLM and render markdown tables
-        detailed_text = _clean_step1_llm_noise(detailed_text)
-        detailed_text = _extract_and_render_markdown_tables(detailed_text)
-        
-        paragraphs = detailed_text.split('\n\n') if '\n\n' in detailed_text else [detailed_text]
-        
-        for paragraph in paragraphs:
-            if isinstance(paragraph, str) and paragraph.strip():
-                st.markdown(
-                    f'<div style="margin-bottom: 18px; padding: 15px; background: linear-gradient(135deg, #ffffff, #f8f9fa); border: 1px solid #e9ecef; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">'
-                    f'<p style="margin: 0; line-height: 1.8; font-size: 16px; color: #2c3e50;">{sanitize_persona_and_enforce_article(paragraph.strip())}</p>'
-                    f'</div>',
-                    unsafe_allow_html=True
-                )
+        for paragraph in step1_detailed['paragraphs']:
+            st.markdown(
+                f'<div style="margin-bottom: 18px; padding: 15px; background: linear-gradient(135deg, #ffffff, #f8f9fa); border: 1px solid #e9ecef; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05);">'
+                f'<p style="margin: 0; line-height: 1.8; font-size: 16px; color: #2c3e50;">{paragraph}</p>'
+                f'</div>',
+                unsafe_allow_html=True
+            )
 
         # If LLM left placeholders like "<insert table: ...>", auto-generate the corresponding tables
         try:
-            display_step1_placeholder_tables(analysis_data, detailed_text)
+            display_step1_placeholder_tables(analysis_data, step1_detailed['text'])
         except Exception as e:
             logger.error(f"Error generating placeholder tables for Step 1: {e}")
     
@@ -15170,112 +15175,116 @@ def display_forecast_graph_content(analysis_data, step_number=None, step_title=N
             years = list(range(0, 6))
             year_labels = ['Current', 'Year 1', 'Year 2', 'Year 3', 'Year 4', 'Year 5']
             
-            fig = go.Figure()
+            def _build():
+                fig = go.Figure()
             
-            # Add baseline reference line
-            if baseline_yield > 0:
-                fig.add_hline(
-                    y=baseline_yield, 
-                    line_dash="dash", 
-                    line_color="gray",
-                    annotation_text=f"Current Baseline: {baseline_yield:.1f} t/ha",
-                    annotation_position="top right"
-                )
+                # Add baseline reference line
+                if baseline_yield > 0:
+                    fig.add_hline(
+                        y=baseline_yield, 
+                        line_dash="dash", 
+                        line_color="gray",
+                        annotation_text=f"Current Baseline: {baseline_yield:.1f} t/ha",
+                        annotation_position="top right"
+                    )
             
-            # Add lines for different investment approaches. Ensure Year 0 matches baseline.
-            # Always add all three investment lines, even if data is missing
-            investment_scenarios = [
-                ('high_investment', 'High Investment', '#e74c3c'),
-                ('medium_investment', 'Medium Investment', '#f39c12'),
-                ('low_investment', 'Low Investment', '#27ae60')
-            ]
+                # Add lines for different investment approaches. Ensure Year 0 matches baseline.
+                # Always add all three investment lines, even if data is missing
+                investment_scenarios = [
+                    ('high_investment', 'High Investment', '#e74c3c'),
+                    ('medium_investment', 'Medium Investment', '#f39c12'),
+                    ('low_investment', 'Low Investment', '#27ae60')
+                ]
             
-            for scenario_key, scenario_name, color in investment_scenarios:
-                scenario_values = [baseline_yield]  # Start with baseline
+                for scenario_key, scenario_name, color in investment_scenarios:
+                    scenario_values = [baseline_yield]  # Start with baseline
                 
-                if scenario_key in forecast:
-                    scenario_data = forecast[scenario_key]
+                    if scenario_key in forecast:
+                        scenario_data = forecast[scenario_key]
                     
-                    if isinstance(scenario_data, list) and len(scenario_data) >= 6:
-                        # Old array format
-                        if len(scenario_data) >= 1 and isinstance(scenario_data[0], (int, float)) and baseline_yield and scenario_data[0] != baseline_yield:
-                            scenario_data = [baseline_yield] + scenario_data[1:]
-                        scenario_values = scenario_data[:6]  # Ensure we have exactly 6 values
-                    elif isinstance(scenario_data, dict):
-                        # New range or string-with-units format → parse robustly
-                        for year in ['year_1', 'year_2', 'year_3', 'year_4', 'year_5']:
-                            if year in scenario_data:
-                                parsed = _extract_first_float(scenario_data[year], baseline_yield)
-                                scenario_values.append(parsed if parsed else baseline_yield)
-                            else:
-                                scenario_values.append(baseline_yield)
+                        if isinstance(scenario_data, list) and len(scenario_data) >= 6:
+                            # Old array format
+                            if len(scenario_data) >= 1 and isinstance(scenario_data[0], (int, float)) and baseline_yield and scenario_data[0] != baseline_yield:
+                                scenario_data = [baseline_yield] + scenario_data[1:]
+                            scenario_values = scenario_data[:6]  # Ensure we have exactly 6 values
+                        elif isinstance(scenario_data, dict):
+                            # New range or string-with-units format → parse robustly
+                            for year in ['year_1', 'year_2', 'year_3', 'year_4', 'year_5']:
+                                if year in scenario_data:
+                                    parsed = _extract_first_float(scenario_data[year], baseline_yield)
+                                    scenario_values.append(parsed if parsed else baseline_yield)
+                                else:
+                                    scenario_values.append(baseline_yield)
+                        else:
+                            # Invalid data format, generate fallback
+                            scenario_values = _generate_fallback_values(baseline_yield, scenario_key)
                     else:
-                        # Invalid data format, generate fallback
+                        # Generate fallback data if scenario is missing
                         scenario_values = _generate_fallback_values(baseline_yield, scenario_key)
-                else:
-                    # Generate fallback data if scenario is missing
-                    scenario_values = _generate_fallback_values(baseline_yield, scenario_key)
                 
-                # Ensure we have exactly 6 values
-                while len(scenario_values) < 6:
-                    scenario_values.append(scenario_values[-1] if scenario_values else baseline_yield)
-                scenario_values = scenario_values[:6]
-
-                # If a series is still flat (all equal), apply minimal offsets to ensure visibility
-                if all(abs(v - scenario_values[0]) < 1e-6 for v in scenario_values):
-                    fallback = _generate_fallback_values(baseline_yield, scenario_key)
-                    scenario_values = fallback[:6]
+                    # Ensure we have exactly 6 values
+                    while len(scenario_values) < 6:
+                        scenario_values.append(scenario_values[-1] if scenario_values else baseline_yield)
+                    scenario_values = scenario_values[:6]
+
+                    # If a series is still flat (all equal), apply minimal offsets to ensure visibility
+                    if all(abs(v - scenario_values[0]) < 1e-6 for v in scenario_values):
+                        fallback = _generate_fallback_values(baseline_yield, scenario_key)
+                        scenario_values = fallback[:6]
                 
-                # Create hover text showing ranges where available
-                hover_texts = []
-                for i, year in enumerate(years):
-                    if i == 0:  # Current year
-                        hover_texts.append(f"Year: Current<br>Yield: {scenario_values[i]:.1f} t/ha<br>Scenario: {scenario_name}")
-                    else:
-                        # Try to get the original range data for hover
-                        year_key = f'year_{i}'
-                        if isinstance(scenario_data, dict) and year_key in scenario_data:
-                            original_value = scenario_data[year_key]
-                            if isinstance(original_value, str) and '-' in original_value:
-                                # This is a range, show it in hover
-                                hover_texts.append(f"Year: {year_labels[i]}<br>Yield Range: {original_value}<br>Scenario: {scenario_name}")
+                    # Create hover text showing ranges where available
+                    hover_texts = []
+                    for i, year in enumerate(years):
+                        if i == 0:  # Current year
+                            hover_texts.append(f"Year: Current<br>Yield: {scenario_values[i]:.1f} t/ha<br>Scenario: {scenario_name}")
+                        else:
+                            # Try to get the original range data for hover
+                            year_key = f'year_{i}'
+                            if isinstance(scenario_data, dict) and year_key in scenario_data:
+                                original_value = scenario_data[year_key]
+                                if isinstance(original_value, str) and '-' in original_value:
+                                    # This is a range, show it in hover
+                                    hover_texts.append(f"Year: {year_labels[i]}<br>Yield Range: {original_value}<br>Scenario: {scenario_name}")
+                                else:
+                                    # Single value
+                                    hover_texts.append(f"Year: {year_labels[i]}<br>Yield: {scenario_values[i]:.1f} t/ha<br>Scenario: {scenario_name}")
                             else:
-                                # Single value
+                                # Fallback
                                 hover_texts.append(f"Year: {year_labels[i]}<br>Yield: {scenario_values[i]:.1f} t/ha<br>Scenario: {scenario_name}")
-                        else:
-                            # Fallback
-                            hover_texts.append(f"Year: {year_labels[i]}<br>Yield: {scenario_values[i]:.1f} t/ha<br>Scenario: {scenario_name}")
 
-                fig.add_trace(go.Scatter(
-                    x=years,
-                    y=scenario_values,
-                    mode='lines+markers',
-                    name=scenario_name,
-                    line=dict(color=color, width=3),
-                    marker=dict(size=8),
-                    text=hover_texts,
-                    hovertemplate='%{text}<extra></extra>'
-                ))
+                    fig.add_trace(go.Scatter(
+                        x=years,
+                        y=scenario_values,
+                        mode='lines+markers',
+                        name=scenario_name,
+                        line=dict(color=color, width=3),
+                        marker=dict(size=8),
+                        text=hover_texts,
+                        hovertemplate='%{text}<extra></extra>'
+                    ))
             
-            fig.update_layout(
-                title='5-Year Yield Projection from Current Baseline',
-                xaxis_title='Years',
-                yaxis_title='Yield (tons/ha)',
-                xaxis=dict(
-                    tickmode='array',
-                    tickvals=years,
-                    ticktext=year_labels
-                ),
-                hovermode='x unified',
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1
+                fig.update_layout(
+                    title='5-Year Yield Projection from Current Baseline',
+                    xaxis_title='Years',
+                    yaxis_title='Yield (tons/ha)',
+                    xaxis=dict(
+                        tickmode='array',
+                        tickvals=years,
+                        ticktext=year_labels
+                    ),
+                    hovermode='x unified',
+                    showlegend=True,
+                    legend=dict(
+                        orientation="h",
+                        yanchor="bottom",
+                        y=1.02,
+                        xanchor="right",
+                        x=1
+                    )
                 )
-            )
+                return fig
+            
+            fig = cached_figure('yield_forecast', (forecast, baseline_yield), _build)
             
             st.plotly_chart(fig, use_container_width=True)
 
@@ -15707,45 +15716,49 @@ def display_heatmap(data, title, options):
             st.info("Heatmap data format not recognized")
             return
         
-        # Create heatmap data
-        heatmap_data = []
-        for i, param in enumerate(parameters):
-            heatmap_data.append([levels[i]])
+        def _build():
+            # Create heatmap data
+            heatmap_data = []
+            for i, param in enumerate(parameters):
+                heatmap_data.append([levels[i]])
         
-        # Create color scale
-        colors = []
-        for level in levels:
-            if level in color_scale:
-                colors.append(color_scale[level])
-            else:
-                colors.append('#f0f0f0')  # Default color
-        
-        fig = go.Figure(data=go.Heatmap(
-            z=heatmap_data,
-            x=['Deficiency Level'],
-            y=parameters,
-            colorscale=[[0, '#e74c3c'], [0.33, '#f39c12'], [0.66, '#f1c40f'], [1, '#2ecc71']],
-            showscale=True,
-            colorbar=dict(
-                title="Deficiency Level",
-                tickvals=[0, 1, 2, 3],
-                ticktext=['Critical', 'High', 'Medium', 'Low']
+            # Create color scale
+            colors = []
+            for level in levels:
+                if level in color_scale:
+                    colors.append(color_scale[level])
+                else:
+                    colors.append('#f0f0f0')  # Default color
+        
+            fig = go.Figure(data=go.Heatmap(
+                z=heatmap_data,
+                x=['Deficiency Level'],
+                y=parameters,
+                colorscale=[[0, '#e74c3c'], [0.33, '#f39c12'], [0.66, '#f1c40f'], [1, '#2ecc71']],
+                showscale=True,
+                colorbar=dict(
+                    title="Deficiency Level",
+                    tickvals=[0, 1, 2, 3],
+                    ticktext=['Critical', 'High', 'Medium', 'Low']
+                )
+            ))
+        
+            fig.update_layout(
+                title=dict(
+                    text=title,
+                    x=0.5,
+                    font=dict(size=16, color='#2E7D32')
+                ),
+                xaxis_title="Deficiency Level",
+                yaxis_title="Parameters",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(size=12),
+                height=400
             )
-        ))
+            return fig
         
-        fig.update_layout(
-            title=dict(
-                text=title,
-                x=0.5,
-                font=dict(size=16, color='#2E7D32')
-            ),
-            xaxis_title="Deficiency Level",
-            yaxis_title="Parameters",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            height=400
-        )
+        fig = cached_figure('heatmap', (parameters, levels, color_scale, title), _build)
         
         st.plotly_chart(fig, use_container_width=True)
         
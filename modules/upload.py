@@ -30,6 +30,11 @@ except Exception:
         st.error(f"Import error (utils): {e}")
         st.stop()
 
+try:
+    from utils.analysis_engine import ANALYSIS_MODE_FULL, ANALYSIS_MODE_FAST, ANALYSIS_MODE_QUICK
+except Exception:
+    ANALYSIS_MODE_FULL, ANALYSIS_MODE_FAST, ANALYSIS_MODE_QUICK = 'full', 'fast', 'quick'
+
 try:
     from utils.config_manager import get_ui_config
 except Exception:
@@ -1061,6 +1066,19 @@ def upload_section():
     land_yield_provided = land_size > 0 and current_yield > 0
     
     if soil_uploaded and leaf_uploaded and land_yield_provided:
+        mode_labels = {
+            ANALYSIS_MODE_FULL: t('upload_mode_full'),
+            ANALYSIS_MODE_FAST: t('upload_mode_fast'),
+            ANALYSIS_MODE_QUICK: t('upload_mode_quick')
+        }
+        analysis_mode = st.radio(
+            t('upload_analysis_mode'),
+            options=list(mode_labels.keys()),
+            format_func=lambda mode: mode_labels[mode],
+            horizontal=True,
+            key="analysis_mode",
+            help=t('upload_analysis_mode_help')
+        )
         if st.button(f"🚀 {t('upload_start_analysis')}", type="primary", use_container_width=True, key="start_analysis"):
             # Ensure files are valid before passing to analysis
             try:
@@ -1083,7 +1101,8 @@ def upload_section():
                 st.session_state.analysis_data = {
                     'soil_file': soil_file,
                     'leaf_file': leaf_file,
-                    'land_yield_data': st.session_state.land_yield_data
+                    'land_yield_data': st.session_state.land_yield_data,
+                    'analysis_mode': analysis_mode
                 }
                 st.session_state.current_page = 'results'
                 st.rerun()
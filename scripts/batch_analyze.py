@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Headless batch runner: extract -> analyse -> PDF for many estates.
+
+Pairs soil and leaf reports found under a directory (or listed in a
+manifest), runs them across a process pool and writes, per job,
+<output>/<job_id>/analysis.json and report.pdf, plus <output>/timings.csv
+with per-stage timings. Completed jobs are recorded in
+<output>/checkpoint.jsonl; rerunning the same command skips them.
+
+Usage:
+    python scripts/batch_analyze.py soil_leaf_dir/ --output output/batch --workers 4
+    python scripts/batch_analyze.py --manifest estates.csv --output output/batch --no-llm
+    python scripts/batch_analyze.py . --output output/batch --fake-llm --no-pdf
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.batch_pipeline import (
+    DEFAULT_PROMPT, LLM_MODE_FAKE, LLM_MODE_FULL, LLM_MODE_NONE, BatchOptions,
+    discover_jobs, load_manifest, run_batch)
+
+
+def _load_prompt(prompt_file, llm_mode):
+    """Prompt file, else the active prompt from configuration, else the built-in outline"""
+    if prompt_file:
+        with open(prompt_file, 'r', encoding='utf-8') as handle:
+            return handle.read()
+    if llm_mode == LLM_MODE_FULL:
+        try:
+            from utils.config_snapshot import get_config_snapshot
+            active = get_config_snapshot().get_active_prompt()
+            if active and active.get('prompt_text'):
+                return active['prompt_text']
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Active prompt unavailable, using built-in steps: {str(e)}")
+    return DEFAULT_PROMPT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input_dir', nargs='?', help='Directory of soil/leaf reports')
+    parser.add_argument('--manifest', help='CSV or JSON manifest (job_id, soil, leaf, land_size, current_yield)')
+    parser.add_argument('--output', default=os.path.join('output', 'batch'), help='Output directory')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--prompt-file', help='Analysis prompt with "Step N:" sections')
+    llm = parser.add_mutually_exclusive_group()
+    llm.add_argument('--no-llm', action='store_true', help='Quick mode: no LLM calls')
+    llm.add_argument('--fake-llm', action='store_true', help='Use the offline fake Gemini backend')
+    parser.add_argument('--fake-latency', type=float, default=0.0, help='Seconds per fake LLM call')
+    parser.add_argument('--no-pdf', action='store_true', help='Skip PDF rendering')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and rerun every job')
+    parser.add_argument('--land-size', type=float, help='Hectares, applied to jobs without their own value')
+    parser.add_argument('--current-yield', type=float, help='t/ha, applied to jobs without their own value')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if not args.input_dir and not args.manifest:
+        parser.error('an input directory or --manifest is required')
+
+    jobs = load_manifest(args.manifest) if args.manifest else discover_jobs(args.input_dir)
+    if not jobs:
+        print('No soil/leaf report pairs found.', file=sys.stderr)
+        return 1
+    for job in jobs:
+        if args.land_size is not None:
+            job.land_yield_data.setdefault('land_size', args.land_size)
+        if args.current_yield is not None:
+            job.land_yield_data.setdefault('current_yield', args.current_yield)
+
+    llm_mode = LLM_MODE_NONE if args.no_llm else LLM_MODE_FAKE if args.fake_llm else LLM_MODE_FULL
+    options = BatchOptions(
+        output_dir=args.output,
+        llm_mode=llm_mode,
+        prompt_text=_load_prompt(args.prompt_file, llm_mode),
+        workers=max(1, min(args.workers, len(jobs))),
+        write_pdf=not args.no_pdf,
+        resume=not args.restart,
+        fake_latency=args.fake_latency,
+    )
+
+    def _progress(row):
+        print(f"[{row.get('status')}] {row.get('job_id')} {row.get('total_s', '')}s {row.get('error', '')}".rstrip(),
+              flush=True)
+
+    summary = run_batch(jobs, options, on_result=_progress)
+    print(json.dumps({key: summary[key] for key in ('jobs', 'counts', 'wall_s')}, indent=2))
+    return 0 if not (summary['counts'].get('failed') or summary['counts'].get('degraded')) else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
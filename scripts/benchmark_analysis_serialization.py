@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Round-trip benchmark for the analysis storage schema.
+
+Builds a realistic saved analysis from the bundled Farm 3 soil/leaf test
+files (parameter statistics, six steps with long narratives and tables,
+timestamps), then measures encode -> JSON transport -> decode and checks
+that the decoded analysis equals the original.
+
+Usage:
+    python scripts/benchmark_analysis_serialization.py [--iterations 50] [--scale 1]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis_schema import decode_analysis_document, encode_analysis_document
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_samples(filename):
+    with open(os.path.join(ROOT, 'json', filename), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return next(iter(data.values()))
+
+
+def _parameter_statistics(samples):
+    stats = {}
+    for sample_id, values in samples.items():
+        for param, value in values.items():
+            entry = stats.setdefault(param, {'values': [], 'samples': []})
+            entry['values'].append(value)
+            entry['samples'].append({'sample_no': sample_id, 'lab_no': sample_id, 'value': value})
+    for entry in stats.values():
+        values = entry['values']
+        avg = sum(values) / len(values)
+        entry.update({
+            'average': avg,
+            'min': min(values),
+            'max': max(values),
+            'std_dev': (sum((v - avg) ** 2 for v in values) / len(values)) ** 0.5,
+            'count': len(values),
+            'missing_count': 0,
+        })
+    return stats
+
+
+def build_realistic_analysis(scale=1):
+    """Create an analysis document shaped like the ones the app stores"""
+    soil = _load_samples('farm_3_soil_test.json')
+    leaf = _load_samples('farm_3_leaf_test.json')
+    if scale > 1:
+        soil = {f"{k}-{i}": v for i in range(scale) for k, v in soil.items()}
+        leaf = {f"{k}-{i}": v for i in range(scale) for k, v in leaf.items()}
+
+    soil_stats = _parameter_statistics(soil)
+    leaf_stats = _parameter_statistics(leaf)
+    narrative = ("Soil pH averages 4.8 across the estate, below the MPOB optimum of 5.25. "
+                 "Exchangeable K at 0.06 meq% indicates severe deficiency limiting bunch weight. "
+                 "Reference 20240101 and lab batch 1700000000 are recorded for traceability. ") * 40
+
+    steps = []
+    for number in range(1, 7):
+        steps.append({
+            'step_number': number,
+            'step_title': f"Step {number}",
+            'summary': narrative[:400],
+            'detailed_analysis': narrative,
+            'key_findings': [narrative[:200]] * 5,
+            'tables': [{
+                'title': 'Soil Parameters Summary',
+                'headers': ['Parameter', 'Average', 'Min', 'Max', 'Samples', 'Status'],
+                'rows': [[p, f"{s['average']:.3f}", f"{s['min']:.3f}", f"{s['max']:.3f}", s['count'], 'Low']
+                         for p, s in soil_stats.items()],
+            }],
+        })
+
+    now = datetime.now()
+    return {
+        'id': 'analysis_benchmark',
+        'user_id': 'benchmark-user',
+        'timestamp': now,
+        'created_at': now,
+        'status': 'completed',
+        'analysis_results': {
+            'analysis_metadata': {
+                'timestamp': now,
+                'processing_time_seconds': 42.5,
+                'data_quality_score': 0.92,
+            },
+            'raw_data': {
+                'soil_parameters': {'parameter_statistics': soil_stats, 'total_samples': len(soil)},
+                'leaf_parameters': {'parameter_statistics': leaf_stats, 'total_samples': len(leaf)},
+            },
+            'step_by_step_analysis': steps,
+        },
+    }
+
+
+def run(iterations, scale):
+    document = build_realistic_analysis(scale)
+
+    encode_time = decode_time = 0.0
+    payload_bytes = 0
+    decoded = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        stored = encode_analysis_document(document)
+        encode_time += time.perf_counter() - start
+
+        # Simulate the Firestore round trip
+        transported = json.loads(json.dumps(stored))
+        payload_bytes = len(json.dumps(stored))
+
+        start = time.perf_counter()
+        decoded = decode_analysis_document(transported)
+        decode_time += time.perf_counter() - start
+
+    return {
+        'iterations': iterations,
+        'scale': scale,
+        'payload_bytes': payload_bytes,
+        'encode_ms': round(encode_time / iterations * 1000, 3),
+        'decode_ms': round(decode_time / iterations * 1000, 3),
+        'round_trip_equal': decoded == document,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--scale', type=int, default=1, help='Multiply the sample count')
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations, args.scale), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark with the offline fake Gemini backend.
+
+Drives the real pipeline on the bundled sample data and on synthetically
+scaled datasets:
+
+    csv_tables      soil/soil_table_1.csv + leaf/leaf_table_1.csv
+    farm_3          json/farm_3_soil_test.json + json/farm_3_leaf_test.json
+    sp_lab          json/sp_lab_test_report.json + json/farm_3_leaf_test.json
+    synthetic_<N>   N soil and N leaf samples derived from Farm 3, written as
+                    CSV and extracted like an upload
+
+and reports wall time, CPU time and peak traced memory per stage:
+extraction, preprocessing, standards comparison, LLM orchestration, results
+post-processing (engine assembly + render payloads), PDF build and Firestore
+serialization (AnalysisDocumentStore against utils.fake_firestore). LLM calls
+go to utils.fake_llm.FakeModelFactory, so runs are deterministic and need no
+API key. Stage times are exclusive: time spent in a nested stage is not
+counted again in the stage that called it.
+
+Output is JSON (see --output); --compare reports per-stage wall time changes
+against an earlier run and exits with status 1 when any stage regressed by
+more than --threshold.
+
+Usage:
+    python scripts/benchmark_pipeline.py
+    python scripts/benchmark_pipeline.py --sizes 10 100 1000 10000 --llm-latency 0.2 --output bench.json
+    python scripts/benchmark_pipeline.py --cases farm_3 synthetic --sizes 1000 --repeat 3 --compare bench.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.batch_pipeline import DEFAULT_PROMPT, BatchJob, analysis_input_from_extraction, extract_report, render_pdf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ('extraction', 'preprocessing', 'standards', 'llm', 'postprocess', 'pdf', 'firestore')
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+BUNDLED_CASES = ('csv_tables', 'farm_3', 'sp_lab')
+SYNTHETIC_SEED = 20240101
+LAND_YIELD = {'land_size': 100.0, 'land_unit': 'hectares', 'current_yield': 20.0, 'yield_unit': 'tonnes/hectare'}
+
+
+class StageProfiler:
+    """Exclusive wall/CPU time and peak traced memory per named stage (nestable)"""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._stack = []
+
+    def _peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+
+    def _pause(self, frame):
+        """Close the running segment of a stage (before a child starts or at its own end)"""
+        now, cpu = time.perf_counter(), time.process_time()
+        frame['wall'] += now - frame['mark']
+        frame['cpu'] += cpu - frame['cpu_mark']
+        frame['peak'] = max(frame['peak'], self._peak() - frame['base'])
+
+    def _resume(self, frame):
+        frame['mark'], frame['cpu_mark'] = time.perf_counter(), time.process_time()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            frame['base'] = tracemalloc.get_traced_memory()[0]
+
+    @contextmanager
+    def stage(self, name):
+        if self._stack:
+            self._pause(self._stack[-1])
+        frame = {'name': name, 'wall': 0.0, 'cpu': 0.0, 'peak': 0, 'base': 0, 'mark': 0.0, 'cpu_mark': 0.0}
+        self._stack.append(frame)
+        self._resume(frame)
+        try:
+            yield
+        finally:
+            self._pause(frame)
+            self._stack.pop()
+            totals = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': 0})
+            totals['calls'] += 1
+            totals['wall_s'] += frame['wall']
+            totals['cpu_s'] += frame['cpu']
+            totals['peak_bytes'] = max(totals['peak_bytes'], frame['peak'])
+            if self._stack:
+                self._resume(self._stack[-1])
+
+    def instrument(self, owner, method_name, stage_name):
+        """Time every call of owner.method_name as stage_name (instance attribute, not the class)"""
+        method = getattr(owner, method_name)
+
+        def _timed(*args, **kwargs):
+            with self.stage(stage_name):
+                return method(*args, **kwargs)
+
+        setattr(owner, method_name, _timed)
+
+    def report(self):
+        return {name: {'calls': values['calls'],
+                       'wall_s': round(values['wall_s'], 4),
+                       'cpu_s': round(values['cpu_s'], 4),
+                       'peak_mib': round(values['peak_bytes'] / (1024 * 1024), 3)}
+                for name, values in self.stages.items()}
+
+
+# ----------------------------------------------------------------------
+# Datasets
+# ----------------------------------------------------------------------
+def _load_json_samples(filename):
+    with open(os.path.join(ROOT, 'json', filename), 'r', encoding='utf-8') as handle:
+        data = json.load(handle)
+    return next(iter(data.values()))
+
+
+def _json_report(filename, report_type):
+    """Extraction for the JSON lab reports: parse and shape like an OCR result"""
+    samples = _load_json_samples(filename)
+    extraction = {'success': True, 'tables': [{
+        'type': report_type,
+        'samples': [{'sample_id': sample_id, 'data': values} for sample_id, values in samples.items()],
+    }]}
+    return analysis_input_from_extraction(extraction, report_type)
+
+
+def _scaled_samples(template, count, seed):
+    """count samples cycling through the template with +/-15% deterministic jitter"""
+    rng = random.Random(seed)
+    base = list(template.values())
+    scaled = {}
+    for index in range(count):
+        values = base[index % len(base)]
+        scaled[f"{index + 1:05d}"] = {param: round(value * rng.uniform(0.85, 1.15), 3)
+                                      for param, value in values.items()}
+    return scaled
+
+
+def _write_csv(samples, path, prefix):
+    params = list(next(iter(samples.values())).keys())
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['Lab No.', 'Sample No.'] + params)
+        for number, (sample_id, values) in enumerate(samples.items(), 1):
+            writer.writerow([f"{prefix}{sample_id}/25", number] + [values[param] for param in params])
+
+
+def build_cases(selected, sizes, work_dir):
+    """(name, sample count, soil loader, leaf loader) for each selected case"""
+    cases = []
+    if 'csv_tables' in selected:
+        soil_path = os.path.join(ROOT, 'soil', 'soil_table_1.csv')
+        leaf_path = os.path.join(ROOT, 'leaf', 'leaf_table_1.csv')
+        cases.append(('csv_tables', None, lambda: extract_report(soil_path, 'soil'),
+                      lambda: extract_report(leaf_path, 'leaf')))
+    if 'farm_3' in selected:
+        cases.append(('farm_3', None, lambda: _json_report('farm_3_soil_test.json', 'soil'),
+                      lambda: _json_report('farm_3_leaf_test.json', 'leaf')))
+    if 'sp_lab' in selected:
+        cases.append(('sp_lab', None, lambda: _json_report('sp_lab_test_report.json', 'soil'),
+                      lambda: _json_report('farm_3_leaf_test.json', 'leaf')))
+    if 'synthetic' in selected:
+        soil_template = _load_json_samples('farm_3_soil_test.json')
+        leaf_template = _load_json_samples('farm_3_leaf_test.json')
+        for size in sizes:
+            soil_path = os.path.join(work_dir, f"soil_{size}.csv")
+            leaf_path = os.path.join(work_dir, f"leaf_{size}.csv")
+            _write_csv(_scaled_samples(soil_template, size, SYNTHETIC_SEED), soil_path, 'S')
+            _write_csv(_scaled_samples(leaf_template, size, SYNTHETIC_SEED + 1), leaf_path, 'P')
+            cases.append((f"synthetic_{size}", size,
+                          lambda path=soil_path: extract_report(path, 'soil'),
+                          lambda path=leaf_path: extract_report(path, 'leaf')))
+    return cases
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+def build_engine(llm_latency, profiler):
+    from utils.analysis_engine import AnalysisEngine
+    from utils.fake_llm import FakeModelFactory
+
+    engine = AnalysisEngine()
+    engine.prompt_analyzer.use_model_factory(FakeModelFactory(default_latency=llm_latency, seed=0))
+    for owner, method_name in ((engine.preprocessor, 'preprocess_raw_data'),
+                               (engine.data_processor, 'extract_soil_parameters'),
+                               (engine.data_processor, 'extract_leaf_parameters'),
+                               (engine.data_processor, 'validate_data_quality')):
+        profiler.instrument(owner, method_name, 'preprocessing')
+    for method_name in ('perform_cross_validation', 'compare_soil_parameters', 'compare_leaf_parameters'):
+        profiler.instrument(engine.standards_comparator, method_name, 'standards')
+    profiler.instrument(engine.prompt_analyzer, 'generate_step_analysis', 'llm')
+    profiler.instrument(engine.prompt_analyzer, '_build_deterministic_step_result', 'llm')
+    # Whatever the engine does outside the stages above is result assembly
+    profiler.instrument(engine, 'generate_comprehensive_analysis', 'postprocess')
+    return engine
+
+
+def _prepare_render_payloads(analysis):
+    try:
+        from modules.results import prepare_render_payloads
+    except Exception as e:
+        return f"render payloads skipped: {str(e)}"
+    prepare_render_payloads(analysis)
+    return None
+
+
+def _persisted(analysis):
+    """The analysis as store_analysis_to_firestore saves it: render payloads are session-only"""
+    try:
+        from modules.results import RENDER_PAYLOADS_KEY
+    except Exception:
+        RENDER_PAYLOADS_KEY = '_render_payloads'
+    return {key: value for key, value in analysis.items() if key != RENDER_PAYLOADS_KEY}
+
+
+def run_case(engine, profiler, case, prompt_text, analysis_mode):
+    from utils.analysis_storage import AnalysisDocumentStore
+    from utils.fake_firestore import FakeFirestore
+
+    name, size, load_soil, load_leaf = case
+    profiler.stages.clear()
+    notes = []
+    started, cpu_started = time.perf_counter(), time.process_time()
+
+    with profiler.stage('extraction'):
+        soil, leaf = load_soil(), load_leaf()
+    analysis = engine.generate_comprehensive_analysis(
+        soil_data=soil, leaf_data=leaf, land_yield_data=dict(LAND_YIELD),
+        prompt_text=prompt_text, analysis_mode=analysis_mode)
+    if not isinstance(analysis, dict) or analysis.get('success') is False:
+        raise RuntimeError(f"{name}: analysis failed: {(analysis or {}).get('error') if isinstance(analysis, dict) else analysis}")
+    with profiler.stage('postprocess'):
+        note = _prepare_render_payloads(analysis)
+    if note:
+        notes.append(note)
+
+    with profiler.stage('pdf'):
+        pdf_bytes = render_pdf(analysis, BatchJob(job_id=name, soil_path='', leaf_path=''))
+    db = FakeFirestore()
+    with profiler.stage('firestore'):
+        AnalysisDocumentStore(db, bucket=None).save(
+            f"benchmark_{name}", {'user_id': 'benchmark', 'timestamp': datetime.now(), 'status': 'completed'},
+            _persisted(analysis))
+
+    model_usage = (analysis.get('analysis_metadata') or {}).get('model_usage') or {}
+    return {
+        'case': name,
+        'samples': {'soil': soil['data']['total_samples'], 'leaf': leaf['data']['total_samples'], 'scaled_to': size},
+        'stages': profiler.report(),
+        'total_wall_s': round(time.perf_counter() - started, 4),
+        'total_cpu_s': round(time.process_time() - cpu_started, 4),
+        'pdf_bytes': len(pdf_bytes or b''),
+        'firestore': dict(db.stats),
+        'llm_calls': len(model_usage.get('calls') or []),
+        'notes': notes,
+    }
+
+
+def summarize(runs):
+    """Median per case and stage across repeats"""
+    by_case = {}
+    for run in runs:
+        by_case.setdefault(run['case'], []).append(run)
+    summary = {}
+    for case, case_runs in by_case.items():
+        stages = {}
+        for stage in STAGES:
+            values = [run['stages'][stage] for run in case_runs if stage in run['stages']]
+            if values:
+                stages[stage] = {metric: round(statistics.median(v[metric] for v in values), 4)
+                                 for metric in ('wall_s', 'cpu_s', 'peak_mib')}
+        summary[case] = {'repeats': len(case_runs), 'stages': stages,
+                         'total_wall_s': round(statistics.median(r['total_wall_s'] for r in case_runs), 4)}
+    return summary
+
+
+def compare(current, baseline, threshold, min_seconds=0.005):
+    """Per-stage wall time ratio against a baseline summary; returns (lines, regressed)"""
+    lines, regressed = [], False
+    for case, entry in current.items():
+        base_case = baseline.get(case)
+        if not base_case:
+            lines.append(f"{case}: not in baseline")
+            continue
+        for stage, values in entry['stages'].items():
+            before = (base_case['stages'].get(stage) or {}).get('wall_s')
+            if before is None:
+                continue
+            after = values['wall_s']
+            change = (after - before) / before if before > 0 else 0.0
+            flag = ''
+            if change > threshold and after - before > min_seconds:
+                flag, regressed = '  REGRESSION', True
+            lines.append(f"{case:<18} {stage:<14} {before:>9.4f}s -> {after:>9.4f}s  {change:+7.1%}{flag}")
+    return lines, regressed
+
+
+def _environment(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'analysis_mode': args.analysis_mode,
+        'llm_latency_s': args.llm_latency,
+        'memory_traced': not args.no_memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', default=list(BUNDLED_CASES) + ['synthetic'],
+                        choices=list(BUNDLED_CASES) + ['synthetic'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='Sample counts for the synthetic datasets')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case (medians are reported)')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Seconds per fake LLM call')
+    parser.add_argument('--analysis-mode', default='full', choices=('full', 'fast', 'quick'))
+    parser.add_argument('--prompt-file', help='Analysis prompt with "Step N:" sections (default: built-in steps)')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc (lower overhead, no peak memory)')
+    parser.add_argument('--output', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Regression threshold for --compare (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    prompt_text = DEFAULT_PROMPT
+    if args.prompt_file:
+        with open(args.prompt_file, 'r', encoding='utf-8') as handle:
+            prompt_text = handle.read()
+
+    profiler = StageProfiler(trace_memory=not args.no_memory)
+    if profiler.trace_memory:
+        tracemalloc.start()
+    engine = build_engine(args.llm_latency, profiler)
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix='ags_ai_bench_') as work_dir:
+        for case in build_cases(set(args.cases), args.sizes, work_dir):
+            for repeat in range(max(1, args.repeat)):
+                run = run_case(engine, profiler, case, prompt_text, args.analysis_mode)
+                run['repeat'] = repeat
+                runs.append(run)
+                print(f"{run['case']:<18} run {repeat + 1}: {run['total_wall_s']:.3f}s wall, "
+                      f"{run['total_cpu_s']:.3f}s cpu", file=sys.stderr, flush=True)
+
+    results = {
+        'environment': _environment(args),
+        'max_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'summary': summarize(runs),
+        'runs': runs,
+    }
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as handle:
+            baseline = json.load(handle).get('summary', {})
+        lines, regressed = compare(results['summary'], baseline, args.threshold)
+        print('\n'.join(lines), file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
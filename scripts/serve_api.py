@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Run the Ags-AI HTTP API (see utils/api_server.py for the endpoints).
+
+Needs the optional API dependencies: pip install fastapi uvicorn python-multipart
+
+Usage:
+    AGS_AI_API_KEYS=secret python scripts/serve_api.py --port 8080 --workers 4
+    python scripts/serve_api.py --fake-llm --host 127.0.0.1
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis_service import ServiceSettings
+from utils.batch_pipeline import LLM_MODE_FAKE, LLM_MODE_FULL, LLM_MODE_NONE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, help='Analysis worker processes (default: AGS_AI_API_WORKERS)')
+    parser.add_argument('--work-dir', help='Upload and job output directory (default: AGS_AI_API_WORK_DIR)')
+    parser.add_argument('--prompt-file', help='Analysis prompt with "Step N:" sections')
+    llm = parser.add_mutually_exclusive_group()
+    llm.add_argument('--no-llm', action='store_true', help='Quick mode only: no LLM calls')
+    llm.add_argument('--fake-llm', action='store_true', help='Use the offline fake Gemini backend (load tests)')
+    parser.add_argument('--fake-latency', type=float, default=0.0, help='Seconds per fake LLM call')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        import uvicorn
+        from utils.api_server import create_app
+    except ImportError as e:
+        print(f"HTTP API dependencies missing ({str(e)}). Install: pip install fastapi uvicorn python-multipart",
+              file=sys.stderr)
+        return 1
+
+    settings = ServiceSettings.from_env()
+    if args.workers:
+        settings.workers = max(1, args.workers)
+    if args.work_dir:
+        settings.work_dir = args.work_dir
+    if args.no_llm:
+        settings.llm_mode = LLM_MODE_NONE
+    elif args.fake_llm:
+        settings.llm_mode = LLM_MODE_FAKE
+    settings.fake_latency = args.fake_latency
+    if args.prompt_file:
+        with open(args.prompt_file, 'r', encoding='utf-8') as handle:
+            settings.prompt_text = handle.read()
+    elif settings.llm_mode == LLM_MODE_FULL:
+        try:
+            from utils.config_snapshot import get_config_snapshot
+            active = get_config_snapshot().get_active_prompt()
+            if active and active.get('prompt_text'):
+                settings.prompt_text = active['prompt_text']
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Active prompt unavailable, using built-in steps: {str(e)}")
+
+    # A single server process: concurrency comes from the analysis worker pool
+    uvicorn.run(create_app(settings), host=args.host, port=args.port,
+                log_level='info' if args.verbose else 'warning')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
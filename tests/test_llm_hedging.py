@@ -0,0 +1,144 @@
+"""
+Hedged LLM requests against the offline fake Gemini backend.
+
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.fake_llm import FINISH_STOP, FakeModelFactory
+from utils.llm_hedging import (
+    DEFAULT_MAX_IN_FLIGHT, HedgedCaller, HedgedCallError, LatencyTracker, create_hedged_caller)
+
+SETTINGS = {'enabled': True, 'percentile': 0.95, 'min_delay_seconds': 0.0}
+PROMPT = 'Step 1 - Analyze the Uploaded Data: interpret every parameter'
+
+
+def _caller(delay=0.05, tracker=None):
+    return HedgedCaller(tracker=tracker or LatencyTracker(), min_delay=0.0, default_delay=delay)
+
+
+def _attempt(model):
+    return lambda cancel: model.generate_content(PROMPT, cancel_event=cancel)
+
+
+def _valid(response):
+    return response.candidates[0].finish_reason == FINISH_STOP
+
+
+def test_hedge_wins_when_primary_stalls_and_primary_is_cancelled():
+    factory = FakeModelFactory(latency={'slow': 5.0, 'fast': 0.0})
+    caller = _caller()
+
+    started = time.perf_counter()
+    response = caller.call('balanced', _attempt(factory('slow')), _attempt(factory('fast')), validate=_valid)
+    elapsed = time.perf_counter() - started
+
+    assert '"summary"' in response.text
+    assert elapsed < 1.0
+    metrics = caller.metrics.snapshot()
+    assert metrics['hedges_issued'] == 1
+    assert metrics['hedge_wins'] == 1
+    assert metrics['cancelled'] == 1
+    assert caller.tracker.count('balanced') == 1
+
+
+def test_failed_primary_issues_hedge_immediately():
+    factory = FakeModelFactory(latency={'fast': 0.0})
+    failing = FakeModelFactory(error_rate=1.0)('primary')
+    caller = _caller(delay=30.0)
+
+    started = time.perf_counter()
+    response = caller.call('fast', _attempt(failing), _attempt(factory('fast')), validate=_valid)
+
+    assert _valid(response)
+    assert time.perf_counter() - started < 1.0
+    assert caller.metrics.snapshot()['hedge_wins'] == 1
+
+
+def test_all_attempts_failing_raises():
+    factory = FakeModelFactory(error_rate=1.0)
+    caller = _caller()
+
+    try:
+        caller.call('fast', _attempt(factory('a')), _attempt(factory('b')), validate=_valid)
+    except HedgedCallError as e:
+        assert len(e.errors) == 2
+    else:
+        raise AssertionError('expected HedgedCallError')
+    assert caller.metrics.snapshot()['failures'] == 1
+
+
+def test_callers_do_not_share_worker_threads():
+    tracker = LatencyTracker()
+    busy, idle = _caller(delay=60.0, tracker=tracker), _caller(delay=60.0, tracker=tracker)
+    release = threading.Event()
+
+    def _blocked(cancel):
+        release.wait(5.0)
+        return 'late'
+
+    # Fill every worker of the busy caller with attempts that cannot be interrupted
+    blockers = [threading.Thread(target=busy.call, args=('quality', _blocked)) for _ in range(DEFAULT_MAX_IN_FLIGHT)]
+    for thread in blockers:
+        thread.start()
+    try:
+        fast = FakeModelFactory()('fast')
+        started = time.perf_counter()
+        response = idle.call('quality', _attempt(fast), validate=_valid)
+        assert _valid(response)
+        assert time.perf_counter() - started < 1.0
+    finally:
+        release.set()
+        for thread in blockers:
+            thread.join()
+        busy.close()
+        idle.close()
+    # Latencies are still pooled across callers
+    assert tracker.count('quality') == DEFAULT_MAX_IN_FLIGHT + 1
+
+
+def _hedge_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('llm-hedge')]
+
+
+def test_closed_callers_do_not_accumulate_threads():
+    factory = FakeModelFactory(latency={'slow': 5.0, 'fast': 0.0})
+    before = len(_hedge_threads())
+
+    # One caller per analysis, as each AnalysisEngine builds its own PromptAnalyzer
+    for _ in range(20):
+        caller = create_hedged_caller(SETTINGS)
+        caller.default_delay = 0.01
+        caller.call('balanced', _attempt(factory('slow')), _attempt(factory('fast')), validate=_valid)
+        caller.close()
+
+    deadline = time.perf_counter() + 2.0
+    while len(_hedge_threads()) > before and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert len(_hedge_threads()) <= before
+
+
+def test_closed_caller_can_be_reused():
+    caller = _caller()
+    fast = FakeModelFactory()('fast')
+    caller.close()
+    assert _valid(caller.call('fast', _attempt(fast), validate=_valid))
+    caller.close()
+    assert _valid(caller.call('fast', _attempt(fast), validate=_valid))
+    caller.close()
+
+
+def test_create_hedged_caller_uses_settings_and_shared_tracker():
+    first = create_hedged_caller(dict(SETTINGS, percentile=0.9, min_delay_seconds=2.0))
+    second = create_hedged_caller(SETTINGS)
+
+    assert first.percentile == 0.9
+    assert first.min_delay == 2.0
+    assert first.tracker is second.tracker
+    assert first.metrics is not second.metrics
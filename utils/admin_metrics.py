@@ -0,0 +1,220 @@
+"""
+Admin System Metrics
+Computes the admin dashboard numbers with Firestore count/sum aggregation
+queries and small per-day rollup documents instead of streaming whole
+collections. Results are cached in-process for a short TTL so repeated
+dashboard renders cost nothing.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    from google.cloud.firestore import FieldFilter, Increment
+except ImportError:
+    FieldFilter = None
+    Increment = None
+
+from utils.firebase_config import COLLECTIONS, get_firestore_client
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Admin numbers are allowed to be this stale
+METRICS_TTL_SECONDS = 60
+
+# Rollup event types recorded per day
+EVENT_ANALYSIS = 'analyses'
+EVENT_FAILURE = 'failures'
+
+
+def _day_key(when: datetime) -> str:
+    return when.strftime('%Y-%m-%d')
+
+
+def _user_token(user_key: str) -> str:
+    """Stable short token so daily rollups don't store raw emails as map keys"""
+    return hashlib.sha1(str(user_key).encode('utf-8')).hexdigest()[:16]
+
+
+_metrics_cache = TTLCache(METRICS_TTL_SECONDS)
+
+
+class AdminMetricsService:
+    """Reads system-wide counts for the admin dashboard and maintains daily rollups"""
+
+    def __init__(self, db=None, cache: Optional[TTLCache] = None):
+        self.db = db or get_firestore_client()
+        self.cache = cache or _metrics_cache
+        self.logger = logging.getLogger(f"{__name__}.AdminMetricsService")
+
+    # ------------------------------------------------------------------
+    # Aggregation queries
+    # ------------------------------------------------------------------
+    def _where(self, query, field: str, op: str, value: Any):
+        if FieldFilter is not None:
+            return query.where(filter=FieldFilter(field, op, value))
+        return query.where(field, op, value)
+
+    def _count(self, query) -> int:
+        """Server-side count; falls back to streaming only if aggregations are unavailable"""
+        if hasattr(query, 'count'):
+            results = query.count(alias='total').get()
+            for result in results:
+                for aggregate in (result if isinstance(result, list) else [result]):
+                    return int(aggregate.value)
+            return 0
+        return sum(1 for _ in query.stream())
+
+    # ------------------------------------------------------------------
+    # Daily rollups
+    # ------------------------------------------------------------------
+    def _rollup_ref(self, day_key: str):
+        return self.db.collection(COLLECTIONS['system_stats']).document(day_key)
+
+    def record_event(self, event: str, user_key: Optional[str] = None,
+                     when: Optional[datetime] = None) -> bool:
+        """
+        Increment today's rollup for an analysis or failure event
+
+        Args:
+            event: EVENT_ANALYSIS or EVENT_FAILURE
+            user_key: user_id/email that triggered the event (counts as active)
+            when: Event time, defaults to now
+
+        Returns:
+            bool: True if the rollup document was updated
+        """
+        if not self.db:
+            return False
+        try:
+            when = when or datetime.now()
+            day_key = _day_key(when)
+            update: Dict[str, Any] = {'date': day_key, 'updated_at': datetime.now().isoformat()}
+            if Increment is not None:
+                update[event] = Increment(1)
+                if user_key:
+                    update['users'] = {_user_token(user_key): Increment(1)}
+                self._rollup_ref(day_key).set(update, merge=True)
+            else:
+                snapshot = self._rollup_ref(day_key).get()
+                current = snapshot.to_dict() if snapshot.exists else {}
+                update[event] = current.get(event, 0) + 1
+                users = dict(current.get('users', {}))
+                if user_key:
+                    token = _user_token(user_key)
+                    users[token] = users.get(token, 0) + 1
+                update['users'] = users
+                self._rollup_ref(day_key).set(update, merge=True)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error recording {event} rollup: {str(e)}")
+            return False
+
+    def get_daily_rollups(self, days: int = 30, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Daily analyses/failures/active-user counts, oldest first (one read per day)"""
+        now = now or datetime.now()
+        keys = [_day_key(now - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+
+        def _load():
+            snapshots = {}
+            refs = [self._rollup_ref(key) for key in keys]
+            if hasattr(self.db, 'get_all'):
+                for snapshot in self.db.get_all(refs):
+                    if snapshot.exists:
+                        snapshots[snapshot.id] = snapshot.to_dict() or {}
+            else:
+                for key, ref in zip(keys, refs):
+                    snapshot = ref.get()
+                    if snapshot.exists:
+                        snapshots[key] = snapshot.to_dict() or {}
+            return [
+                {
+                    'date': key,
+                    'analyses': int(snapshots.get(key, {}).get(EVENT_ANALYSIS, 0) or 0),
+                    'failures': int(snapshots.get(key, {}).get(EVENT_FAILURE, 0) or 0),
+                    'active_users': len(snapshots.get(key, {}).get('users', {}) or {}),
+                    'users': set((snapshots.get(key, {}).get('users', {}) or {}).keys()),
+                }
+                for key in keys
+            ]
+
+        if not self.db:
+            return [{'date': key, 'analyses': 0, 'failures': 0, 'active_users': 0, 'users': set()}
+                    for key in keys]
+        try:
+            return self.cache.get_or_compute(f"rollups:{keys[0]}:{keys[-1]}", _load)
+        except Exception as e:
+            self.logger.error(f"Error loading daily rollups: {str(e)}")
+            return [{'date': key, 'analyses': 0, 'failures': 0, 'active_users': 0, 'users': set()}
+                    for key in keys]
+
+    # ------------------------------------------------------------------
+    # Dashboard statistics
+    # ------------------------------------------------------------------
+    def _compute_system_statistics(self, now: datetime) -> Dict[str, Any]:
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        users_ref = self.db.collection(COLLECTIONS['users'])
+        analyses_ref = self.db.collection(COLLECTIONS['analysis_results'])
+
+        total_users = self._count(users_ref)
+        new_users_today = self._count(self._where(users_ref, 'created_at', '>=', today_start))
+        total_analyses = self._count(analyses_ref)
+        # Analysis timestamps are stored as ISO strings, which sort chronologically
+        analyses_today = self._count(self._where(analyses_ref, 'created_at', '>=', today_start.isoformat()))
+
+        rollups = self.get_daily_rollups(days=14, now=now)
+        this_week, last_week = rollups[7:], rollups[:7]
+        active_7d = len(set().union(*(day['users'] for day in this_week)))
+        active_prev_7d = len(set().union(*(day['users'] for day in last_week)))
+        if not active_7d:
+            # Rollups start empty on existing deployments; use login times instead
+            active_7d = self._count(self._where(users_ref, 'last_login', '>=', now - timedelta(days=7)))
+
+        analyses_7d = sum(day['analyses'] for day in this_week)
+        failures_7d = sum(day['failures'] for day in this_week)
+        attempts_7d = analyses_7d + failures_7d
+
+        return {
+            'total_users': total_users,
+            'new_users_today': new_users_today,
+            'active_users_7d': active_7d,
+            'active_users_change': active_7d - active_prev_7d,
+            'total_analyses': total_analyses,
+            'analyses_today': analyses_today,
+            'analyses_7d': analyses_7d,
+            'failures_today': rollups[-1]['failures'],
+            'failures_7d': failures_7d,
+            'system_health': (analyses_7d / attempts_7d) if attempts_7d else 1.0,
+            # There is no background task queue; analyses run inline
+            'queued_tasks': 0,
+            'tasks_today': analyses_today,
+            'generated_at': now.isoformat(),
+        }
+
+    def get_system_statistics(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """System-wide admin statistics, cached for METRICS_TTL_SECONDS"""
+        if not self.db:
+            return empty_system_statistics()
+        now = now or datetime.now()
+        return self.cache.get_or_compute('system_statistics', lambda: self._compute_system_statistics(now))
+
+
+def empty_system_statistics() -> Dict[str, Any]:
+    return {
+        'total_users': 0, 'new_users_today': 0, 'active_users_7d': 0, 'active_users_change': 0,
+        'total_analyses': 0, 'analyses_today': 0, 'analyses_7d': 0, 'failures_today': 0,
+        'failures_7d': 0, 'system_health': 0, 'queued_tasks': 0, 'tasks_today': 0,
+    }
+
+
+def record_system_event(event: str, user_key: Optional[str] = None,
+                        when: Optional[datetime] = None, db=None) -> bool:
+    """Convenience wrapper used when an analysis is stored or fails"""
+    return AdminMetricsService(db).record_event(event, user_key, when)
+
+
+def clear_metrics_cache():
+    _metrics_cache.clear()
@@ -5,6 +5,11 @@ from datetime import datetime
 from firebase_config import get_firestore_client, COLLECTIONS
 import streamlit as st
 
+try:
+    from utils.config_snapshot import get_config_snapshot, invalidate_config_snapshot
+except ImportError:
+    from config_snapshot import get_config_snapshot, invalidate_config_snapshot
+
 # Default AI Configuration Schema
 DEFAULT_AI_CONFIG = {
     'prompt_templates': {
@@ -228,21 +233,12 @@ Apply tags: {tags}
 }
 
 def load_ai_configuration() -> Dict[str, Any]:
-    """Load AI configuration from Firestore"""
+    """Load AI configuration (copy from the cached configuration snapshot)"""
     try:
-        db = get_firestore_client()
-        if not db:
-            return DEFAULT_AI_CONFIG
-        
-        config_ref = db.collection(COLLECTIONS['ai_configuration']).document('default')
-        config_doc = config_ref.get()
+        config = get_config_snapshot().get_ai_configuration()
         
-        if config_doc.exists:
-            return config_doc.to_dict()
-        else:
-            # Initialize with default configuration
-            save_ai_configuration(DEFAULT_AI_CONFIG)
-            return DEFAULT_AI_CONFIG
+        # Defaults are served until an admin saves a configuration
+        return config if config is not None else DEFAULT_AI_CONFIG
             
     except Exception as e:
         st.error(f"Error loading AI configuration: {str(e)}")
@@ -258,6 +254,7 @@ def save_ai_configuration(config_data: Dict[str, Any]) -> bool:
         config_data['updated_at'] = datetime.now()
         config_ref = db.collection(COLLECTIONS['ai_configuration']).document('default')
         config_ref.set(config_data)
+        invalidate_config_snapshot()
         
         return True
         
@@ -5,6 +5,7 @@ import re
 import math
 from typing import Dict, List, Any, Optional, Tuple
 import time
+import threading
 from dataclasses import dataclass
 from datetime import datetime
 from utils.reference_search import reference_search_engine
@@ -31,11 +32,92 @@ from .firebase_config import get_firestore_client
 from google.cloud.firestore import FieldFilter
 from .config_manager import get_ai_config, get_mpob_standards, get_economic_config
 from .feedback_system import FeedbackLearningSystem
+from .model_router import MAX_OUTPUT_TOKENS, ModelRoute, ModelRouter, UsageRecorder, is_model_unavailable_error
+from .usage_accounting import UsagePricing, summarize_calls
+from .economic_simulation import (
+    BASE_MAINTENANCE_COST_PER_HA, YEARS, ScenarioInputs, SimulationSettings, project_ranges, simulate_scenarios
+)
+from .llm_context import LLMContextBuilder, estimate_tokens
+from .run_context import (
+    ARTIFACT_CROSS_VALIDATION, ARTIFACT_ECONOMIC_FORECAST, ARTIFACT_LEAF_ISSUES, ARTIFACT_RECOMMENDATIONS,
+    ARTIFACT_SOIL_ISSUES, RunContext, fingerprint
+)
+from .llm_hedging import create_hedged_caller, load_hedging_settings
+from .llm_json import (
+    JSON_MIME_TYPE, PARSE_FAILED, PARSE_STRICT, IncrementalJSONParser, JSONParseMetrics, JSONStreamError,
+    ParsedResponse, is_schema_unsupported_error, parse_json_text, step_response_schema
+)
+from .incremental_analysis import (
+    STEP_INPUT_HASHES_KEY, ReanalysisContext, merge_parameter_issues, reusable_parameter_statistics, without_bookkeeping
+)
+from .parameter_standardizer import resolve_parameter_name
+from .tracing import (
+    STAGE_ANALYSIS, STAGE_LLM, STAGE_PREPROCESSING, STAGE_STANDARDS, current_span, traced
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _finish_reason(response: Any) -> Optional[int]:
+    """finish_reason of the first candidate (1 = STOP, 2 = MAX_TOKENS), or None"""
+    candidates = getattr(response, 'candidates', None)
+    if not candidates:
+        return None
+    reason = getattr(candidates[0], 'finish_reason', None)
+    try:
+        return int(reason) if reason is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# Analysis modes (selectable per run)
+ANALYSIS_MODE_FULL = 'full'    # LLM for every step; computable parts overwritten deterministically
+ANALYSIS_MODE_FAST = 'fast'    # Computable steps built deterministically; LLM only for narrative steps
+ANALYSIS_MODE_QUICK = 'quick'  # No LLM calls at all
+ANALYSIS_MODES = (ANALYSIS_MODE_FULL, ANALYSIS_MODE_FAST, ANALYSIS_MODE_QUICK)
+
+# Steps whose content is fully computed from the data (tables, charts, issues, economics)
+DETERMINISTIC_STEPS = (1, 2, 5)
+
+# What each LLM step is built from: 'samples' is the full soil/leaf context,
+# 'statistics' only the per-parameter statistics; previous_steps are the earlier
+# steps whose summaries it sees and recommendations the computed fertilizer
+# recommendations (Step 5's economic forecast). Unlisted steps read everything.
+STEP_INPUTS = {
+    1: {'soil_leaf': 'samples', 'land_yield': True, 'previous_steps': (), 'recommendations': False},
+    2: {'soil_leaf': 'statistics', 'land_yield': False, 'previous_steps': (), 'recommendations': False},
+    3: {'soil_leaf': 'statistics', 'land_yield': False, 'previous_steps': (2,), 'recommendations': False},
+    4: {'soil_leaf': 'statistics', 'land_yield': False, 'previous_steps': (2,), 'recommendations': False},
+    5: {'soil_leaf': None, 'land_yield': True, 'previous_steps': (3,), 'recommendations': True},
+    6: {'soil_leaf': None, 'land_yield': True, 'previous_steps': (3,), 'recommendations': False},
+}
+
+# DataProcessor sample keys for each canonical parameter name
+LEGACY_PARAMETER_KEYS = {
+    'soil': {
+        'pH': 'pH',
+        'N (%)': 'Nitrogen_%',
+        'Org. C (%)': 'Organic_Carbon_%',
+        'Total P (mg/kg)': 'Total_P_mg_kg',
+        'Avail P (mg/kg)': 'Available_P_mg_kg',
+        'Exch. K (meq/100 g)': 'Exchangeable_K_meq%',
+        'Exch. Ca (meq/100 g)': 'Exchangeable_Ca_meq%',
+        'Exch. Mg (meq/100 g)': 'Exchangeable_Mg_meq%',
+        'CEC (meq/100 g)': 'CEC_meq%',
+    },
+    'leaf': {
+        'N (%)': 'N_%',
+        'P (%)': 'P_%',
+        'K (%)': 'K_%',
+        'Mg (%)': 'Mg_%',
+        'Ca (%)': 'Ca_%',
+        'B (mg/kg)': 'B_mg_kg',
+        'Cu (mg/kg)': 'Cu_mg_kg',
+        'Zn (mg/kg)': 'Zn_mg_kg',
+    },
+}
+
 
 @dataclass
 class AnalysisResult:
@@ -56,29 +138,6 @@ class DataProcessor:
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.DataProcessor")
         self.supported_formats = ['json', 'csv', 'xlsx', 'xls', 'txt']
-        self.parameter_mappings = {
-            'soil': {
-                'pH': ['ph', 'p_h', 'soil_ph', 'acidity'],
-                'Nitrogen_%': ['nitrogen', 'n', 'n_%', 'total_n', 'nitrogen_%'],
-                'Organic_Carbon_%': ['organic_carbon', 'oc', 'oc_%', 'organic_matter', 'om'],
-                'Total_P_mg_kg': ['total_p', 'p_total', 'phosphorus_total'],
-                'Available_P_mg_kg': ['available_p', 'p_available', 'extractable_p'],
-                'Exchangeable_K_meq%': ['k', 'potassium', 'exch_k', 'exchangeable_k'],
-                'Exchangeable_Ca_meq%': ['ca', 'calcium', 'exch_ca', 'exchangeable_ca'],
-                'Exchangeable_Mg_meq%': ['mg', 'magnesium', 'exch_mg', 'exchangeable_mg'],
-                'CEC_meq%': ['cec', 'cation_exchange_capacity']
-            },
-            'leaf': {
-                'N_%': ['n', 'nitrogen', 'n_%', 'leaf_n'],
-                'P_%': ['p', 'phosphorus', 'p_%', 'leaf_p'],
-                'K_%': ['k', 'potassium', 'k_%', 'leaf_k'],
-                'Mg_%': ['mg', 'magnesium', 'mg_%', 'leaf_mg'],
-                'Ca_%': ['ca', 'calcium', 'ca_%', 'leaf_ca'],
-                'B_mg_kg': ['b', 'boron', 'b_mg_kg', 'leaf_b'],
-                'Cu_mg_kg': ['cu', 'copper', 'cu_mg_kg', 'leaf_cu'],
-                'Zn_mg_kg': ['zn', 'zinc', 'zn_mg_kg', 'leaf_zn']
-            }
-        }
 
     def process_uploaded_files(self, uploaded_files: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Process multiple uploaded files and extract soil/leaf data with enhanced error handling"""
@@ -570,48 +629,18 @@ class DataProcessor:
     def _standardize_parameter_name(self, key: str, data_type: str) -> str:
         """Standardize parameter names based on data type"""
         try:
-            key_lower = key.lower().strip()
-            
-            if data_type == 'soil':
-                soil_mappings = {
-                    'ph': 'pH',
-                    'nitrogen': 'Nitrogen_%',
-                    'organic_carbon': 'Organic_Carbon_%',
-                    'org_c': 'Organic_Carbon_%',
-                    'total_p': 'Total_P_mg_kg',
-                    'available_p': 'Available_P_mg_kg',
-                    'avail_p': 'Available_P_mg_kg',
-                    'exchangeable_k': 'Exchangeable_K_meq%',
-                    'exch_k': 'Exchangeable_K_meq%',
-                    'exchangeable_ca': 'Exchangeable_Ca_meq%',
-                    'exch_ca': 'Exchangeable_Ca_meq%',
-                    'exchangeable_mg': 'Exchangeable_Mg_meq%',
-                    'exch_mg': 'Exchangeable_Mg_meq%',
-                    'cec': 'CEC_meq%'
-                }
-                return soil_mappings.get(key_lower, key)
-                
-            elif data_type == 'leaf':
-                leaf_mappings = {
-                    'n_%': 'N_%',
-                    'p_%': 'P_%',
-                    'k_%': 'K_%',
-                    'mg_%': 'Mg_%',
-                    'ca_%': 'Ca_%',
-                    'b_mg_kg': 'B_mg_kg',
-                    'cu_mg_kg': 'Cu_mg_kg',
-                    'zn_mg_kg': 'Zn_mg_kg',
-                    'leaf_n': 'N_%',
-                    'leaf_p': 'P_%',
-                    'leaf_k': 'K_%'
-                }
-                return leaf_mappings.get(key_lower, key)
-                
-            return key
-            
+            return self._legacy_parameter_key(resolve_parameter_name(key, data_type), data_type) or key
         except Exception:
             return key
 
+    def _legacy_parameter_key(self, canonical: Optional[str], data_type: Optional[str]) -> Optional[str]:
+        """DataProcessor key (e.g. 'Nitrogen_%') for a canonical parameter name"""
+        if not canonical:
+            return None
+        other = 'leaf' if data_type == 'soil' else 'soil'
+        preferred = data_type if data_type in LEGACY_PARAMETER_KEYS else 'soil'
+        return LEGACY_PARAMETER_KEYS[preferred].get(canonical) or LEGACY_PARAMETER_KEYS[other].get(canonical)
+
     def _validate_sample(self, sample: Dict[str, Any], data_type: str) -> bool:
         """Validate individual sample"""
         try:
@@ -729,8 +758,8 @@ class DataProcessor:
             if samples and isinstance(samples, list):
                 # Check parameter names in first sample
                 first_sample = samples[0]
-                soil_params = set(self.parameter_mappings['soil'].keys())
-                leaf_params = set(self.parameter_mappings['leaf'].keys())
+                soil_params = set(LEGACY_PARAMETER_KEYS['soil'].values())
+                leaf_params = set(LEGACY_PARAMETER_KEYS['leaf'].values())
 
                 sample_keys = set(first_sample.keys())
                 soil_matches = len(soil_params.intersection(sample_keys))
@@ -793,35 +822,9 @@ class DataProcessor:
 
     def _map_column_to_parameter(self, column_name: str, df: pd.DataFrame) -> Optional[str]:
         """Map DataFrame column to standard parameter name"""
-        col_lower = column_name.lower().strip()
-
-        # Check both soil and leaf mappings
-        for data_type, mappings in self.parameter_mappings.items():
-            for std_param, variants in mappings.items():
-                if col_lower in variants or any(variant in col_lower for variant in variants):
-                    return std_param
-
-        # Try fuzzy matching for common variations
-        return self._fuzzy_parameter_match(col_lower)
-
-    def _fuzzy_parameter_match(self, column_name: str) -> Optional[str]:
-        """Fuzzy match column names to parameters"""
-        # Common abbreviations and variations
-        fuzzy_mappings = {
-            'ph': 'pH',
-            'n': 'N_%' if 'leaf' in column_name.lower() else 'Nitrogen_%',
-            'p': 'P_%' if 'leaf' in column_name.lower() else 'Available_P_mg_kg',
-            'k': 'K_%' if 'leaf' in column_name.lower() else 'Exchangeable_K_meq%',
-            'ca': 'Ca_%' if 'leaf' in column_name.lower() else 'Exchangeable_Ca_meq%',
-            'mg': 'Mg_%' if 'leaf' in column_name.lower() else 'Exchangeable_Mg_meq%',
-            'cec': 'CEC_meq%'
-        }
-
-        for key, value in fuzzy_mappings.items():
-            if key in column_name.lower():
-                return value
-
-        return None
+        col_lower = str(column_name).lower().strip()
+        data_type = 'leaf' if 'leaf' in col_lower else 'soil'
+        return self._legacy_parameter_key(resolve_parameter_name(col_lower, data_type), data_type)
 
     def _parse_text_content(self, content: str) -> Dict[str, Any]:
         """Parse text content to extract parameters (for OCR text files)"""
@@ -991,7 +994,7 @@ class DataProcessor:
             
             for sample in samples_data:
                 # Standardize parameter names
-                standardized_sample = parameter_standardizer.standardize_data_dict(sample)
+                standardized_sample = parameter_standardizer.standardize_data_dict(sample, param_type)
                 
                 # Fill missing parameters with default values
                 complete_sample = parameter_standardizer.validate_parameter_completeness(standardized_sample, param_type)
@@ -1013,8 +1016,45 @@ class DataProcessor:
             self.logger.error(f"Error standardizing and filling missing values: {str(e)}")
             return samples_data
 
-    def extract_soil_parameters(self, soil_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract and validate soil parameters from OCR data - ALL SAMPLES"""
+    def _parameter_statistics(self, param: str, all_samples_data: List[Dict[str, Any]],
+                              total_samples: int) -> Optional[Dict[str, Any]]:
+        """Statistics of one parameter across all standardized samples, or None without values"""
+        values = [sample[param] for sample in all_samples_data if sample[param] is not None]
+        if not values:
+            return None
+
+        # Calculate comprehensive statistics
+        avg_val = sum(values) / len(values)
+        min_val = min(values)
+        max_val = max(values)
+
+        # Calculate enhanced standard deviation using sample standard deviation (n-1)
+        if len(values) > 1:
+            variance = sum((x - avg_val) ** 2 for x in values) / (len(values) - 1)
+            std_dev = math.sqrt(variance)
+        else:
+            std_dev = 0
+
+        return {
+            'values': values,
+            'average': avg_val,
+            'min': min_val,
+            'max': max_val,
+            'std_dev': std_dev,
+            'count': len(values),
+            'missing_count': int(total_samples - len(values)),
+            'samples': [{'sample_no': sample.get('sample_no', 'N/A'), 'lab_no': sample.get('lab_no', 'N/A'), 'value': sample[param]}
+                      for sample in all_samples_data if sample[param] is not None]
+        }
+
+    @traced(STAGE_PREPROCESSING, 'preprocessing.soil_parameters')
+    def extract_soil_parameters(self, soil_data: Dict[str, Any],
+                                 previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Extract and validate soil parameters from OCR data - ALL SAMPLES
+
+        previous: parameters from an earlier extraction of the same report; statistics of
+        unchanged parameters are taken from it instead of being recomputed
+        """
         try:
             if not soil_data:
                 return {}
@@ -1069,36 +1109,16 @@ class DataProcessor:
             # Standardize and fill missing values using parameter standardizer
             all_samples_data = self._standardize_and_fill_missing_values(samples, 'soil')
 
+            # Statistics of parameters whose column is unchanged since the previous extraction are reused
+            reusable = reusable_parameter_statistics(previous, all_samples_data, parameter_names, len(samples))
+
             # Calculate statistics for each parameter across all samples with enhanced statistics
             parameter_stats = {}
 
             for param in parameter_names:
-                values = [sample[param] for sample in all_samples_data if sample[param] is not None]
-                if values:
-                    # Calculate comprehensive statistics
-                    avg_val = sum(values) / len(values)
-                    min_val = min(values)
-                    max_val = max(values)
-
-                    # Calculate enhanced standard deviation using sample standard deviation (n-1)
-                    if len(values) > 1:
-                        variance = sum((x - avg_val) ** 2 for x in values) / (len(values) - 1)
-                        std_dev = math.sqrt(variance)
-                    else:
-                        variance = 0
-                        std_dev = 0
-
-                    parameter_stats[param] = {
-                        'values': values,
-                        'average': avg_val,
-                        'min': min_val,
-                        'max': max_val,
-                        'std_dev': std_dev,
-                        'count': len(values),
-                        'missing_count': int(len(samples) - len(values)),
-                        'samples': [{'sample_no': sample.get('sample_no', 'N/A'), 'lab_no': sample.get('lab_no', 'N/A'), 'value': sample[param]}
-                                  for sample in all_samples_data if sample[param] is not None]
-                    }
+                stats = reusable.get(param) or self._parameter_statistics(param, all_samples_data, len(samples))
+                if stats:
+                    parameter_stats[param] = stats
 
             # Also include the raw samples data for LLM analysis with comprehensive summary
             extracted_params = {
@@ -1122,8 +1142,14 @@ class DataProcessor:
             self.logger.error(f"Error extracting soil parameters: {str(e)}")
             return {}
     
-    def extract_leaf_parameters(self, leaf_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract and validate leaf parameters from OCR data - ALL SAMPLES"""
+    @traced(STAGE_PREPROCESSING, 'preprocessing.leaf_parameters')
+    def extract_leaf_parameters(self, leaf_data: Dict[str, Any],
+                                 previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Extract and validate leaf parameters from OCR data - ALL SAMPLES
+
+        previous: parameters from an earlier extraction of the same report; statistics of
+        unchanged parameters are taken from it instead of being recomputed
+        """
         try:
             if not leaf_data:
                 return {}
@@ -1167,36 +1193,16 @@ class DataProcessor:
             # Standardize and fill missing values using parameter standardizer
             all_samples_data = self._standardize_and_fill_missing_values(samples, 'leaf')
 
+            # Statistics of parameters whose column is unchanged since the previous extraction are reused
+            reusable = reusable_parameter_statistics(previous, all_samples_data, parameter_names, len(samples))
+
             # Calculate statistics for each parameter across all samples with enhanced statistics
             parameter_stats = {}
 
             for param in parameter_names:
-                values = [sample[param] for sample in all_samples_data if sample[param] is not None]
-                if values:
-                    # Calculate comprehensive statistics
-                    avg_val = sum(values) / len(values)
-                    min_val = min(values)
-                    max_val = max(values)
-
-                    # Calculate enhanced standard deviation using sample standard deviation (n-1)
-                    if len(values) > 1:
-                        variance = sum((x - avg_val) ** 2 for x in values) / (len(values) - 1)
-                        std_dev = math.sqrt(variance)
-                    else:
-                        variance = 0
-                        std_dev = 0
-
-                    parameter_stats[param] = {
-                        'values': values,
-                        'average': avg_val,
-                        'min': min_val,
-                        'max': max_val,
-                        'std_dev': std_dev,
-                        'count': len(values),
-                        'missing_count': int(len(samples) - len(values)),
-                        'samples': [{'sample_no': sample.get('sample_no', 'N/A'), 'lab_no': sample.get('lab_no', 'N/A'), 'value': sample[param]}
-                                  for sample in all_samples_data if sample[param] is not None]
-                    }
+                stats = reusable.get(param) or self._parameter_statistics(param, all_samples_data, len(samples))
+                if stats:
+                    parameter_stats[param] = stats
 
             # Also include the raw samples data for LLM analysis with comprehensive summary
             extracted_params = {
@@ -1266,6 +1272,7 @@ class DataProcessor:
         except (ValueError, TypeError):
             return None
     
+    @traced(STAGE_PREPROCESSING, 'preprocessing.data_quality')
     def validate_data_quality(self, soil_params: Dict[str, Any], leaf_params: Dict[str, Any]) -> Tuple[float, str]:
         """Enhanced data validation with comprehensive quality checks"""
         try:
@@ -1697,6 +1704,7 @@ class StandardsComparator:
             self.enhanced_soil_standards = {}
             self.enhanced_leaf_standards = {}
 
+    @traced(STAGE_STANDARDS, 'standards.cross_validation')
     def perform_cross_validation(self, soil_params: Dict[str, Any], leaf_params: Dict[str, Any]) -> Dict[str, Any]:
         """Perform cross-validation between soil and leaf data"""
         try:
@@ -1877,6 +1885,7 @@ class StandardsComparator:
         except Exception:
             return "Unable to analyze ratio"
     
+    @traced(STAGE_STANDARDS, 'standards.soil')
     def compare_soil_parameters(self, soil_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Enhanced comparison of soil parameters against MPOB standards with comprehensive issue detection"""
         issues = []
@@ -2219,6 +2228,7 @@ class StandardsComparator:
         except Exception:
             return 50  # Default medium priority
     
+    @traced(STAGE_STANDARDS, 'standards.leaf')
     def compare_leaf_parameters(self, leaf_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Enhanced comparison of leaf parameters against MPOB standards with comprehensive issue detection"""
         issues = []
@@ -2477,6 +2487,19 @@ class PromptAnalyzer:
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.PromptAnalyzer")
         self.ai_config = get_ai_config()
+        self.model_router = ModelRouter.from_configuration()
+        self.usage_recorder = UsageRecorder()
+        self.usage_pricing = UsagePricing.from_configuration()
+        self.json_metrics = JSONParseMetrics()
+        self._schema_unsupported = set()
+        self.context_builder = LLMContextBuilder.from_configuration()
+        self._context_cache = {}
+        self.context_stats = {}
+        self.run_context = None
+        self.hedging = load_hedging_settings()
+        self.hedged_caller = create_hedged_caller(self.hedging)
+        self.model_factory = None
+        self._models = {}
         self._initialize_llm()
     
     def _initialize_llm(self):
@@ -2500,23 +2523,14 @@ class PromptAnalyzer:
                 self.llm = None
                 return
             
-            # Use optimal Gemini 2.5 Pro configuration for maximum performance
-            configured_model = 'gemini-2.5-pro'  # Force use of best available model
-            
-            # Final model fallback list to avoid NotFound errors on older SDKs
-            preferred_models = [
-                'gemini-2.5-pro',
-                'gemini-1.5-pro-002',
-                'gemini-1.5-pro-latest',
-                'gemini-1.5-pro',
-                'gemini-1.0-pro'
-            ]
+            # Default (quality tier) model; individual steps are routed by self.model_router
+            preferred_models = self.model_router.route_task('default').models + ('gemini-1.0-pro',)
             
             # Use optimal settings from memory: temperature=0.0 for maximum accuracy [[memory:7795938]]
             temperature = 0.0  
             
-            # Use maximum available tokens for Gemini 2.5 Pro [[memory:7795941]]
-            max_tokens = 65536  # Gemini 2.5 Pro maximum output tokens
+            # Ceiling for unrouted calls; routed steps use their own output budget
+            max_tokens = MAX_OUTPUT_TOKENS
             
             # Ensure the API key is available to all client layers
             try:
@@ -2556,6 +2570,7 @@ class PromptAnalyzer:
                         mdl,
                         safety_settings=safety_settings
                     )
+                    self._models = {mdl: self.llm}
                     self._use_direct_gemini = True
                     self._temperature = temperature
                     self._max_tokens = max_tokens
@@ -2578,6 +2593,155 @@ class PromptAnalyzer:
             self.logger.error(f"Error initializing LLM: {str(e)}")
             self.llm = None
     
+    def _get_model(self, model_name: str):
+        """GenerativeModel for a routed model name (created once per analyzer)"""
+        if model_name not in self._models:
+            if self.model_factory is not None:
+                self._models[model_name] = self.model_factory(
+                    model_name, safety_settings=getattr(self, '_safety_settings', None))
+            else:
+                import google.generativeai as genai
+                self._models[model_name] = genai.GenerativeModel(
+                    model_name,
+                    safety_settings=getattr(self, '_safety_settings', None)
+                )
+        return self._models[model_name]
+    
+    def use_model_factory(self, model_factory):
+        """Serve all model calls from model_factory(name) (e.g. utils.fake_llm.FakeModelFactory)"""
+        self.model_factory = model_factory
+        self._models = {}
+        self._use_direct_gemini = True
+        self._temperature = 0.0
+        self._max_tokens = MAX_OUTPUT_TOKENS
+        self._safety_settings = None
+        self.llm = self._get_model(self.model_router.route_task('default').model)
+    
+    @traced(STAGE_LLM, 'llm.call', attributes=lambda self, model_name, route, prompt, step_number, *args, **kwargs: {
+        'model': model_name, 'step_number': step_number, 'tier': route.tier})
+    def _call_model_once(self, model_name: str, route: ModelRoute, prompt: str, step_number: Any,
+                         cancel_event: Optional[threading.Event] = None,
+                         response_schema: Optional[Dict[str, Any]] = None):
+        """Single generate_content call with usage/latency recorded.
+
+        With a response_schema the model is asked for schema-constrained JSON
+        and the output is streamed through an IncrementalJSONParser, so a
+        structurally broken response fails as soon as it goes wrong.
+        """
+        use_schema = response_schema is not None and model_name not in self._schema_unsupported
+        usage = self.usage_recorder.start(step_number, route)
+        usage.model = model_name
+        usage.attempts = 1
+        started = time.perf_counter()
+        extra = {'cancel_event': cancel_event} if self.model_factory is not None else {}
+        generation_config = {
+            'temperature': route.temperature,
+            'max_output_tokens': route.max_output_tokens,
+        }
+        if use_schema:
+            generation_config['response_mime_type'] = JSON_MIME_TYPE
+            generation_config['response_schema'] = response_schema
+            self.json_metrics.incr('schema_requests')
+        try:
+            resp_obj = self._get_model(model_name).generate_content(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=getattr(self, '_safety_settings', None),
+                stream=use_schema,
+                **extra
+            )
+            if use_schema:
+                resp_obj = self._consume_json_stream(resp_obj, cancel_event)
+        except Exception as e:
+            self.usage_recorder.finish(usage, started, error=e)
+            if use_schema and is_schema_unsupported_error(e):
+                self.logger.warning(f"{model_name} does not support structured output; using plain JSON prompting")
+                self._schema_unsupported.add(model_name)
+                self.json_metrics.incr('schema_unsupported')
+                return self._call_model_once(model_name, route, prompt, step_number, cancel_event)
+            raise
+        finish_reason = _finish_reason(resp_obj)
+        usage.finish_reason = str(finish_reason) if finish_reason is not None else None
+        self.usage_recorder.finish(usage, started, response=resp_obj)
+        current_span().set_attributes(prompt_tokens=usage.prompt_tokens, output_tokens=usage.output_tokens,
+                                      finish_reason=usage.finish_reason)
+        return resp_obj
+    
+    def _consume_json_stream(self, stream, cancel_event: Optional[threading.Event] = None):
+        """Feed streamed chunks to an IncrementalJSONParser; returns the resolved
+        response wrapped with its parsed value (None if the stream was truncated)"""
+        parser = IncrementalJSONParser()
+        self.json_metrics.incr('streamed')
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RuntimeError("Streamed generation cancelled")
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunk without text parts (e.g. the final chunk carrying finish_reason)
+                    continue
+                parser.feed(text)
+        except JSONStreamError:
+            self.json_metrics.incr('stream_aborts')
+            raise
+        if not parser.complete:
+            return ParsedResponse(stream, None)
+        started = time.perf_counter()
+        try:
+            parsed = parser.result()
+        except ValueError:
+            self.json_metrics.record_parse(PARSE_FAILED, started)
+            return ParsedResponse(stream, None)
+        self.json_metrics.record_parse(PARSE_STRICT, started)
+        return ParsedResponse(stream, parsed)
+    
+    def _generate_once(self, prompt: str, route: ModelRoute, step_number: Any, index: int,
+                       response_schema: Optional[Dict[str, Any]] = None):
+        """Call route.models[index]; when hedging is enabled, race a hedged request
+        to the next model in the pool (or the same model) after the tier's
+        latency percentile and keep the first usable response."""
+        model_name = route.models[index]
+        if not self.hedging.get('enabled', True):
+            return self._call_model_once(model_name, route, prompt, step_number,
+                                         response_schema=response_schema)
+        hedge_model = route.models[index + 1] if index + 1 < len(route.models) else model_name
+        return self.hedged_caller.call(
+            route.tier,
+            primary=lambda cancel: self._call_model_once(model_name, route, prompt, step_number, cancel,
+                                                         response_schema),
+            hedge=lambda cancel: self._call_model_once(hedge_model, route, prompt, step_number, cancel,
+                                                       response_schema),
+            validate=lambda resp: _finish_reason(resp) in (1, 2)
+        )
+    
+    def _generate_with_route(self, prompt: str, route: ModelRoute, step_number: Any,
+                             response_schema: Optional[Dict[str, Any]] = None):
+        """Call the routed model, falling back through the tier's pool and
+        escalating the output budget once if the response hits MAX_TOKENS.
+        Every call's latency and token usage is recorded in self.usage_recorder."""
+        last_error = None
+        for index in range(len(route.models)):
+            current = route
+            while True:
+                try:
+                    resp_obj = self._generate_once(prompt, current, step_number, index, response_schema)
+                except Exception as e:
+                    errors = getattr(e, 'errors', None) or [e]
+                    if all(is_model_unavailable_error(err) for err in errors):
+                        self.logger.warning(f"Model {route.models[index]} unavailable for Step {step_number}, "
+                                            f"trying next in pool")
+                        last_error = e
+                        break
+                    raise
+                if _finish_reason(resp_obj) == 2 and current.max_output_tokens < MAX_OUTPUT_TOKENS:
+                    self.logger.warning(f"Step {step_number} hit its {current.max_output_tokens} token budget on "
+                                        f"{route.models[index]}; retrying with {MAX_OUTPUT_TOKENS}")
+                    current = current.escalated()
+                    continue
+                return resp_obj
+        raise last_error or Exception(f"No model available for Step {step_number}")
+    
     def ensure_llm_available(self):
         """Ensure LLM is available, reinitialize if necessary"""
         if not self.llm:
@@ -2630,6 +2794,8 @@ class PromptAnalyzer:
             self.logger.error(f"Error extracting steps from prompt: {str(e)}")
             return []
     
+    @traced(STAGE_LLM, 'llm.step', attributes=lambda self, step, *args, **kwargs: {
+        'step_number': step.get('number'), 'step_title': step.get('title')})
     def generate_step_analysis(self, step: Dict[str, str], soil_params: Dict[str, Any], 
                              leaf_params: Dict[str, Any], land_yield_data: Dict[str, Any],
                              previous_results: List[Dict[str, Any]] = None, total_steps: int = None, 
@@ -2646,16 +2812,7 @@ class PromptAnalyzer:
             # For Step 5 (Economic Impact Forecast), generate economic forecast using user data
             economic_forecast = None
             if step['number'] == 5 and land_yield_data:
-                results_generator = ResultsGenerator()
-                # Generate recommendations from previous steps if available
-                recommendations = []
-                for prev_result in (previous_results or []):
-                    if 'specific_recommendations' in prev_result:
-                        recommendations.extend(prev_result['specific_recommendations'])
-                economic_forecast = results_generator.generate_economic_forecast(land_yield_data, recommendations, previous_results)
-            
-            # Prepare context for the LLM
-            _ = self._prepare_step_context(step, soil_params, leaf_params, land_yield_data, previous_results)
+                economic_forecast = self._get_economic_forecast(land_yield_data, previous_results)
             
             # Search for relevant references from database only
             search_query = f"{step.get('title', '')} {step.get('description', '')} oil palm cultivation Malaysia"
@@ -3017,46 +3174,44 @@ class PromptAnalyzer:
 
             IMPORTANT: Use only neutral, third-person language. Avoid all first-person pronouns (I, me, my, we, our) and second-person pronouns (you, your)."""
 
+            step_inputs = self._step_prompt_inputs(step, soil_params, leaf_params, land_yield_data, previous_results)
             human_prompt = f"""Analyze the following data according to Step {step['number']} - {step['title']}:{table_instruction}
             
             SOIL DATA:
-            {self._format_soil_data_for_llm(soil_params)}
+            {step_inputs['soil']}
             
             LEAF DATA:
-            {self._format_leaf_data_for_llm(leaf_params)}
+            {step_inputs['leaf']}
             
             LAND & YIELD DATA:
-            {self._format_land_yield_data_for_llm(land_yield_data)}
+            {step_inputs['land_yield']}
             
             PREVIOUS STEP RESULTS:
-            {self._format_previous_results_for_llm(previous_results)}
+            {step_inputs['previous']}
             
             RESEARCH REFERENCES:
             {reference_summary}
             
             Please provide your analysis in the requested JSON format. Be specific and detailed in your findings and recommendations. Use the research references to support your analysis where relevant."""
             
+            self._record_prompt_context(step['number'], soil_params, leaf_params, system_prompt, human_prompt)
+            
             # Generate response using Google Gemini with retries
-            self.logger.info(f"Generating LLM response for Step {step['number']}")
+            route = self.model_router.route_step(step)
+            self.logger.info(f"Generating LLM response for Step {step['number']} with {route.model} "
+                             f"({route.tier} tier, max_output_tokens={route.max_output_tokens})")
             last_err = None
             for attempt in range(1, (getattr(self.ai_config, 'retry_attempts', 3) or 3) + 1):
                 try:
                     if hasattr(self, '_use_direct_gemini') and self._use_direct_gemini:
                         # Use direct Gemini API
-                        import google.generativeai as genai
                         combined_prompt = f"{system_prompt}\n\n{human_prompt}"
-                        generation_config = genai.types.GenerationConfig(
-                            temperature=self._temperature,
-                            max_output_tokens=self._max_tokens,
-                        )
-                        resp_obj = self.llm.generate_content(
-                            combined_prompt,
-                            generation_config=generation_config,
-                            safety_settings=getattr(self, '_safety_settings', None)
-                        )
+                        resp_obj = self._generate_with_route(combined_prompt, route, step['number'],
+                                                             response_schema=step_response_schema(step['number']))
                         class GeminiResponse:
-                            def __init__(self, content):
+                            def __init__(self, content, parsed=None):
                                 self.content = content
+                                self.parsed = parsed
                         
                         # Check if response is valid
                         if not resp_obj.candidates or len(resp_obj.candidates) == 0:
@@ -3071,7 +3226,7 @@ class PromptAnalyzer:
                         if not hasattr(resp_obj, 'text') or not resp_obj.text:
                             raise Exception("Empty response from Gemini API. This may be due to safety filters.")
                         
-                        response = GeminiResponse(resp_obj.text)
+                        response = GeminiResponse(resp_obj.text, getattr(resp_obj, 'parsed', None))
                     else:
                         # Use LangChain client
                         response = self.llm.invoke(system_prompt + "\n\n" + human_prompt)
@@ -3096,7 +3251,7 @@ class PromptAnalyzer:
             self.logger.info(f"Raw LLM Response: {response.content}")
             self.logger.info(f"=== END STEP {step['number']} RAW JSON RESPONSE ===")
             
-            result = self._parse_llm_response(response.content, step)
+            result = self._parse_llm_response(response.content, step, getattr(response, 'parsed', None))
             
             # Validate table generation if step description mentions "table" OR if step is hardcoded to require tables (steps 2-4, 6)
             # Note: Step 5 tables are generated from economic_forecast data in _format_step5_text, not from LLM tables array
@@ -3152,41 +3307,13 @@ class PromptAnalyzer:
             if step['number'] == 5 and economic_forecast:
                 result['economic_forecast'] = economic_forecast
                 # Ensure the economic forecast includes yearly_data for Years 2-5
-                if 'scenarios' in economic_forecast:
-                    for scenario_name, scenario_data in economic_forecast['scenarios'].items():
-                        if isinstance(scenario_data, dict) and 'yearly_data' not in scenario_data:
-                            # Generate yearly data if missing
-                            results_generator = ResultsGenerator()
-                            # Parse new_yield_range (format: "15.0-20.0 t/ha")
-                            yield_range_str = scenario_data.get('new_yield_range', '15.0-20.0 t/ha')
-                            yield_low = float(yield_range_str.split('-')[0].strip())
-                            yield_high = float(yield_range_str.split('-')[1].split()[0].strip())
-                            
-                            # Parse total_cost_range (format: "RM 1,000-2,000")
-                            cost_range_str = scenario_data.get('total_cost_range', 'RM 1,000-2,000')
-                            cost_low = float(cost_range_str.replace('RM ', '').replace(',', '').split('-')[0].strip())
-                            cost_high = float(cost_range_str.replace('RM ', '').replace(',', '').split('-')[1].strip())
-                            
-                            yearly_data = results_generator._generate_5_year_economic_data(
-                                economic_forecast.get('land_size_hectares', 1),
-                                economic_forecast.get('current_yield_tonnes_per_ha', 10),
-                                yield_low, yield_high,
-                                cost_low, cost_high,
-                                650, 750, scenario_name
-                            )
-                            scenario_data['yearly_data'] = yearly_data
+                ResultsGenerator().ensure_scenario_yearly_data(economic_forecast)
                 self.logger.info(f"Added complete economic forecast to Step 5 result with yearly_data")
             elif step['number'] == 5 and not economic_forecast:
                 # Generate fallback economic forecast if none was generated
                 results_generator = ResultsGenerator()
                 if land_yield_data:
-                    # Collect recommendations from previous steps for fallback
-                    fallback_recommendations = []
-                    for prev_result in (previous_results or []):
-                        if 'specific_recommendations' in prev_result:
-                            fallback_recommendations.extend(prev_result['specific_recommendations'])
-
-                    fallback_forecast = results_generator.generate_economic_forecast(land_yield_data, fallback_recommendations, previous_results)
+                    fallback_forecast = self._get_economic_forecast(land_yield_data, previous_results)
                     result['economic_forecast'] = fallback_forecast
                     self.logger.info(f"Generated fallback economic forecast for Step 5")
                 else:
@@ -3226,72 +3353,17 @@ class PromptAnalyzer:
     def _prepare_step_context(self, step: Dict[str, str], soil_params: Dict[str, Any],
                             leaf_params: Dict[str, Any], land_yield_data: Dict[str, Any],
                             previous_results: List[Dict[str, Any]] = None) -> str:
-        """Prepare context for LLM analysis with enhanced all-samples data and averages"""
+        """Prepare a bounded context for LLM analysis: per-parameter statistics over
+        all samples plus a token-budgeted set of representative sample rows"""
         context_parts = []
         
-        # Add soil data with comprehensive statistics and averages
-        if soil_params and ('averages' in soil_params or 'parameter_statistics' in soil_params):
+        if soil_params and ('all_samples' in soil_params or 'parameter_statistics' in soil_params):
             context_parts.append("SOIL DATA ANALYSIS:")
-            soil_entries = []
-
-            # Extract and include SOIL PARAMETER AVERAGES prominently for LLM issue detection
-            # Use the 'averages' field which now contains raw averages calculated from original samples
-            context_parts.append("SOIL PARAMETER AVERAGES (from raw sample data for accurate issue detection):")
-            soil_avg_entries = []
-            soil_param_count = 0
-
-            # Use the 'averages' field which contains raw averages calculated from original samples
-            if 'averages' in soil_params and soil_params['averages']:
-                for param, avg_val in soil_params['averages'].items():
-                    if avg_val and avg_val > 0:  # Only include valid averages
-                        soil_avg_entries.append(f"{param}: {avg_val:.3f}")
-                        soil_param_count += 1
-
-            if soil_avg_entries:
-                context_parts.append(" | ".join(soil_avg_entries))
-                context_parts.append(f"Total soil parameters analyzed: {soil_param_count}")
-            context_parts.append("")
-
-            # Add detailed statistics from parameter_statistics for additional context
-            if 'parameter_statistics' in soil_params:
-                context_parts.append("DETAILED SOIL STATISTICS:")
-                for param, stats in soil_params['parameter_statistics'].items():
-                    if isinstance(stats, dict) and 'average' in stats:
-                        soil_entries.append(f"{param}: avg={stats['average']:.3f} (range {stats.get('min', 0):.2f}-{stats.get('max', 0):.2f}, n={stats.get('count', 0)})")
-                context_parts.append("; ".join(soil_entries))
-                context_parts.append("")
-
-        # Add leaf data with comprehensive statistics and averages
-        if leaf_params and ('averages' in leaf_params or 'parameter_statistics' in leaf_params):
+            context_parts.append(self._get_dataset_context(soil_params, 'SOIL')['text'])
+        
+        if leaf_params and ('all_samples' in leaf_params or 'parameter_statistics' in leaf_params):
             context_parts.append("LEAF DATA ANALYSIS:")
-            leaf_entries = []
-
-            # Extract and include LEAF PARAMETER AVERAGES prominently for LLM issue detection
-            # Use the 'averages' field which now contains raw averages calculated from original samples
-            context_parts.append("LEAF PARAMETER AVERAGES (from raw sample data for accurate issue detection):")
-            leaf_avg_entries = []
-            leaf_param_count = 0
-
-            # Use the 'averages' field which contains raw averages calculated from original samples
-            if 'averages' in leaf_params and leaf_params['averages']:
-                for param, avg_val in leaf_params['averages'].items():
-                    if avg_val and avg_val > 0:  # Only include valid averages
-                        leaf_avg_entries.append(f"{param}: {avg_val:.3f}")
-                        leaf_param_count += 1
-
-            if leaf_avg_entries:
-                context_parts.append(" | ".join(leaf_avg_entries))
-                context_parts.append(f"Total leaf parameters analyzed: {leaf_param_count}")
-            context_parts.append("")
-
-            # Add detailed statistics from parameter_statistics for additional context
-            if 'parameter_statistics' in leaf_params:
-                context_parts.append("DETAILED LEAF STATISTICS:")
-                for param, stats in leaf_params['parameter_statistics'].items():
-                    if isinstance(stats, dict) and 'average' in stats:
-                        leaf_entries.append(f"{param}: avg={stats['average']:.3f} (range {stats.get('min', 0):.2f}-{stats.get('max', 0):.2f}, n={stats.get('count', 0)})")
-                context_parts.append("; ".join(leaf_entries))
-                context_parts.append("")
+            context_parts.append(self._get_dataset_context(leaf_params, 'LEAF')['text'])
         
         # Add land and yield data
         if land_yield_data:
@@ -3309,6 +3381,137 @@ class PromptAnalyzer:
         
         return "\n".join(context_parts)
     
+    def _get_dataset_context(self, params: Dict[str, Any], label: str,
+                             preamble: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Bounded soil/leaf context, built once per dataset per analysis run"""
+        key = (label, id(params), len(params.get('all_samples') or []), tuple(preamble or ()))
+        if key not in self._context_cache:
+            self._context_cache[key] = self.context_builder.build(params, label, preamble)
+        return self._context_cache[key]
+    
+    def _record_prompt_context(self, step_number: Any, soil_params: Dict[str, Any], leaf_params: Dict[str, Any],
+                               system_prompt: str, human_prompt: str):
+        """Keep the estimated prompt size and sample coverage of a step for analysis_metadata"""
+        stats = {'prompt_tokens_estimate': estimate_tokens(system_prompt) + estimate_tokens(human_prompt)}
+        for label, params in (('soil', soil_params), ('leaf', leaf_params)):
+            contexts = [c for (kind, ident, _, _), c in self._context_cache.items()
+                        if kind == label.upper() and ident == id(params)]
+            if contexts:
+                stats[f'{label}_samples_total'] = contexts[-1]['samples_total']
+                stats[f'{label}_samples_included'] = contexts[-1]['samples_included']
+                stats[f'{label}_context_tokens'] = contexts[-1]['estimated_tokens']
+        self.context_stats[str(step_number)] = stats
+        self.logger.info(f"Step {step_number} prompt ~{stats['prompt_tokens_estimate']} tokens")
+    
+    def reset_run_state(self, run_context: Optional[RunContext] = None):
+        """Clear per-run usage, parse metrics and cached prompt context"""
+        self.usage_recorder.reset()
+        self.json_metrics.reset()
+        self._context_cache = {}
+        self.context_stats = {}
+        self.run_context = run_context
+    
+    def _get_economic_forecast(self, land_yield_data: Dict[str, Any],
+                               previous_results: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Economic forecast for this run; reuses the one the engine already computed"""
+        def _compute():
+            # Generate recommendations from previous steps if available
+            recommendations = []
+            for prev_result in (previous_results or []):
+                if 'specific_recommendations' in prev_result:
+                    recommendations.extend(prev_result['specific_recommendations'])
+            return ResultsGenerator().generate_economic_forecast(land_yield_data, recommendations, previous_results)
+        
+        if self.run_context is None:
+            return _compute()
+        return self.run_context.get_or_compute(ARTIFACT_ECONOMIC_FORECAST, fingerprint(land_yield_data), _compute)
+    
+    def _build_deterministic_step_result(self, step: Dict[str, str], soil_params: Dict[str, Any],
+                                         leaf_params: Dict[str, Any], all_issues: List[Dict[str, Any]],
+                                         recommendations: List[Dict[str, Any]],
+                                         economic_forecast: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a step's narrative from computed results without calling the LLM.
+
+        Tables, visualizations, issues and the economic forecast for Steps 1, 2
+        and 5 are attached afterwards by the same deterministic builders used in
+        full mode; this only supplies summary, detailed_analysis and key_findings.
+        """
+        step_number = step.get('number', 0)
+        soil_stats = (soil_params or {}).get('parameter_statistics', {})
+        leaf_stats = (leaf_params or {}).get('parameter_statistics', {})
+        critical_issues = [i for i in all_issues if i.get('critical', False)]
+
+        def _issue_line(issue: Dict[str, Any]) -> str:
+            value = issue.get('current_value', 0)
+            value_text = f"{value:.2f}" if isinstance(value, (int, float)) else str(value)
+            return (f"{issue.get('parameter', 'Unknown')} ({issue.get('source', 'Analysis')}) is "
+                    f"{str(issue.get('status', 'out of range')).lower()} at {value_text} "
+                    f"{issue.get('unit', '')} (optimal: {issue.get('optimal_range', 'N/A')})").replace('  ', ' ')
+
+        ranked_issues = sorted(all_issues, key=lambda i: i.get('priority_score', 50), reverse=True)
+
+        if step_number == 1:
+            summary = (f"{len(soil_stats)} soil and {len(leaf_stats)} leaf parameters were compared against "
+                       f"MPOB standards; {len(all_issues)} fall outside the optimal range.")
+            key_findings = [_issue_line(issue) for issue in ranked_issues[:8]] or [
+                'All analysed parameters are within MPOB optimal ranges']
+            detailed_analysis = (
+                f"Soil samples analysed: {soil_params.get('total_samples', 0)}. "
+                f"Leaf samples analysed: {leaf_params.get('total_samples', 0)}. "
+                f"Parameters outside the optimal range: {len(all_issues)} "
+                f"({len(critical_issues)} critical). The tables and charts below show each parameter's "
+                f"average against its MPOB standard.")
+        elif step_number == 2:
+            by_severity: Dict[str, int] = {}
+            for issue in all_issues:
+                severity = str(issue.get('severity', 'Medium')).title()
+                by_severity[severity] = by_severity.get(severity, 0) + 1
+            severity_text = ', '.join(f"{count} {level.lower()}" for level, count in sorted(by_severity.items()))
+            summary = (f"{len(all_issues)} agronomic issues identified"
+                       f"{f' ({severity_text})' if severity_text else ''}.")
+            key_findings = [
+                f"{_issue_line(issue)} - {issue.get('impact', 'affects palm nutrition and yield')}"
+                for issue in ranked_issues[:8]
+            ] or ['No nutrient issues detected against MPOB standards']
+            detailed_analysis = ' '.join(
+                f"{issue.get('parameter')}: {issue.get('causes', 'Multiple contributing factors')}."
+                for issue in ranked_issues[:8]
+            ) or 'No nutrient deficiencies or excesses were detected.'
+        elif step_number == 3:
+            summary = f"{len(recommendations)} corrective recommendations prepared from the identified issues."
+            key_findings = [rec.get('issue_description', rec.get('parameter', 'Recommendation'))
+                            for rec in recommendations[:8]] or ['Maintain current nutrient programme']
+            detailed_analysis = ('Each recommendation offers high, medium and low investment options. '
+                                 'Critical issues should be addressed first.')
+        elif step_number == 5:
+            scenarios = (economic_forecast or {}).get('scenarios', {}) or {}
+            summary = (f"Five-year economic forecast for {economic_forecast.get('land_size_hectares', 0)} ha "
+                       f"at a current yield of {economic_forecast.get('current_yield_tonnes_per_ha', 0)} t/ha."
+                       if economic_forecast else 'Economic forecast requires land size and yield data.')
+            key_findings = [
+                f"{name.title()} investment: cost {data.get('total_cost_range', 'N/A')}, "
+                f"5-year ROI {data.get('roi_5year_range', 'N/A')}, payback {data.get('payback_period_range', 'N/A')}"
+                for name, data in scenarios.items() if isinstance(data, dict)
+            ] or ['Economic scenarios unavailable for the provided data']
+            detailed_analysis = ' '.join((economic_forecast or {}).get('assumptions', [])[:3])
+        else:
+            summary = f"{step.get('title', 'Step')} prepared from the computed analysis."
+            key_findings = [_issue_line(issue) for issue in critical_issues[:5]] or [
+                'No critical issues require step-specific action']
+            detailed_analysis = ('This quick report contains only computed results. '
+                                 'Run a full analysis for detailed narrative guidance on this step.')
+
+        return {
+            'step_number': step_number,
+            'step_title': step.get('title', f'Step {step_number}'),
+            'summary': summary,
+            'detailed_analysis': detailed_analysis,
+            'key_findings': key_findings,
+            'data_quality': 'Computed',
+            'confidence_level': 'High' if step_number in DETERMINISTIC_STEPS else 'Medium',
+            'processing_method': 'deterministic'
+        }
+
     def _create_fallback_step_result(self, step: Dict[str, str], error: Exception) -> Dict[str, Any]:
         """Create a fallback step result when LLM processing fails"""
         try:
@@ -3349,56 +3552,6 @@ class PromptAnalyzer:
                 'error_details': f"Multiple errors: LLM={str(error)}, Fallback={str(fallback_error)}"
             }
     
-    def _sanitize_json_string(self, json_str: str) -> str:
-        """Sanitize JSON string by removing invalid control characters"""
-        import unicodedata
-        # Remove or replace control characters that cause JSON parsing errors
-        sanitized = ""
-        for char in json_str:
-            # Keep printable characters and common whitespace
-            if char.isprintable() or char in ['\n', '\r', '\t']:
-                sanitized += char
-            else:
-                # Replace control characters with space
-                sanitized += ' '
-        
-        # Clean up multiple spaces
-        sanitized = re.sub(r'\s+', ' ', sanitized)
-        return sanitized.strip()
-    
-    def _extract_key_value_pairs(self, response: str) -> Dict[str, Any]:
-        """Extract key-value pairs from text response as fallback"""
-        try:
-            result = {}
-            lines = response.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if ':' in line and not line.startswith('#'):
-                    # Try to extract key-value pairs
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        key = parts[0].strip().strip('"\'')
-                        value = parts[1].strip().strip('"\'')
-                        
-                        # Try to parse value as JSON if it looks like it
-                        if value.startswith('[') or value.startswith('{'):
-                            try:
-                                value = json.loads(value)
-                            except:
-                                pass
-                        
-                        result[key] = value
-            
-            # If we found some data, return it
-            if result:
-                return result
-                
-        except Exception as e:
-            self.logger.warning(f"Key-value extraction failed: {e}")
-        
-        return None
-    
     def _migrate_ai_config_to_gemini(self):
         """Auto-migrate AI configuration from OpenAI models to Gemini"""
         try:
@@ -3438,42 +3591,26 @@ class PromptAnalyzer:
             self.logger.error(f"Error migrating AI configuration: {e}")
             return False
     
-    def _parse_llm_response(self, response: str, step: Dict[str, str]) -> Dict[str, Any]:
-        """Parse LLM response and extract structured data"""
+    def _parse_llm_response(self, response: str, step: Dict[str, str], parsed: Any = None) -> Dict[str, Any]:
+        """Parse LLM response and extract structured data
+
+        Args:
+            response: Raw response text
+            step: Step definition
+            parsed: Value already parsed while the response streamed (schema-constrained output)
+        """
         try:
-            # Try to extract JSON from response with multiple strategies
-            json_str = None
-            parsed_data = None
-            
-            # Strategy 1: Look for complete JSON object
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                json_str = self._sanitize_json_string(json_str)
-                try:
-                    parsed_data = json.loads(json_str)
-                except json.JSONDecodeError as e:
-                    self.logger.warning(f"JSON parsing failed with strategy 1: {e}")
-                    json_str = None
-            
-            # Strategy 2: Try to find JSON array if object failed
-            if not parsed_data:
-                array_match = re.search(r'\[.*\]', response, re.DOTALL)
-                if array_match:
-                    json_str = array_match.group()
-                    json_str = self._sanitize_json_string(json_str)
-                    try:
-                        parsed_data = json.loads(json_str)
-                        # Convert array to object if needed
-                        if isinstance(parsed_data, list):
-                            parsed_data = {'data': parsed_data}
-                    except json.JSONDecodeError as e:
-                        self.logger.warning(f"JSON parsing failed with strategy 2: {e}")
-                        json_str = None
-            
-            # Strategy 3: Try to extract key-value pairs manually
-            if not parsed_data:
-                parsed_data = self._extract_key_value_pairs(response)
+            parsed_data = parsed
+            if parsed_data is None:
+                started = time.perf_counter()
+                parsed_data, outcome = parse_json_text(response)
+                self.json_metrics.record_parse(outcome, started)
+                if outcome == PARSE_FAILED:
+                    self.logger.warning(f"Step {step.get('number')} response is not valid JSON")
+                elif outcome != PARSE_STRICT:
+                    self.logger.info(f"Step {step.get('number')} JSON parsed ({outcome})")
+            if isinstance(parsed_data, list):
+                parsed_data = {'data': parsed_data}
             
             if parsed_data:
 
@@ -3643,8 +3780,8 @@ class PromptAnalyzer:
             )
 
             try:
-                import google.generativeai as genai  # noqa: F401  (ensures client is available)
-                response = self.llm.generate_content(prompt)  # type: ignore[attr-defined]
+                response = self._generate_with_route(prompt, self.model_router.route_task('executive_summary'),
+                                                     'executive_summary')
                 text = getattr(response, 'text', None)
             except Exception as gen_err:
                 self.logger.error(f"Gemini generate_content failed: {gen_err}")
@@ -3658,94 +3795,53 @@ class PromptAnalyzer:
             return None
     
     def _format_soil_data_for_llm(self, soil_params: Dict[str, Any]) -> str:
-        """Format soil data for LLM consumption - ALL SAMPLES including missing standard parameters"""
+        """Format soil data for LLM consumption - statistics over ALL samples including
+        missing standard parameters, and sample rows within the context token budget"""
         if not soil_params:
             return "No soil data available"
 
         formatted = []
 
         # Standard oil palm soil parameters that should be included in analysis
+        # (display name -> keys used by the structured and legacy extractors)
         standard_soil_params = {
-            'pH': 'pH',
-            'Nitrogen (%)': 'Nitrogen_%',
-            'Organic Carbon (%)': 'Organic_Carbon_%',
-            'Total P (mg/kg)': 'Total_P_mg_kg',
-            'Available P (mg/kg)': 'Available_P_mg_kg',
-            'Exchangeable K (meq/100 g)': 'Exchangeable_K_meq/100 g',
-            'Exchangeable Ca (meq/100 g)': 'Exchangeable_Ca_meq/100 g',
-            'Exchangeable Mg (meq/100 g)': 'Exchangeable_Mg_meq/100 g',
-            'CEC (meq/100 g)': 'CEC_meq/100 g'
+            'pH': ('pH',),
+            'Nitrogen (%)': ('N (%)', 'Nitrogen_%'),
+            'Organic Carbon (%)': ('Org. C (%)', 'Organic_Carbon_%'),
+            'Total P (mg/kg)': ('Total P (mg/kg)', 'Total_P_mg_kg'),
+            'Available P (mg/kg)': ('Avail P (mg/kg)', 'Available_P_mg_kg'),
+            'Exchangeable K (meq/100 g)': ('Exch. K (meq/100 g)', 'Exchangeable_K_meq/100 g'),
+            'Exchangeable Ca (meq/100 g)': ('Exch. Ca (meq/100 g)', 'Exchangeable_Ca_meq/100 g'),
+            'Exchangeable Mg (meq/100 g)': ('Exch. Mg (meq/100 g)', 'Exchangeable_Mg_meq/100 g'),
+            'CEC (meq/100 g)': ('CEC (meq/100 g)', 'CEC_meq/100 g')
         }
 
         # Add summary statistics - include ALL standard parameters
-        formatted.append("SOIL PARAMETER STATISTICS (All Samples):")
         formatted.append("Note: ALL standard oil palm soil parameters are listed below. Parameters marked as 'Not Detected' were not found in the uploaded data but MUST be included in analysis tables.")
 
         # Always list ALL standard parameters for the LLM to use in table generation
         formatted.append("COMPLETE LIST OF STANDARD PARAMETERS FOR ANALYSIS:")
-        for display_name, param_key in standard_soil_params.items():
-            if param_key in soil_params.get('parameter_statistics', {}):
-                stats = soil_params['parameter_statistics'][param_key]
+        parameter_statistics = soil_params.get('parameter_statistics', {})
+        for display_name, param_keys in standard_soil_params.items():
+            param_key = next((key for key in param_keys if key in parameter_statistics), None)
+            if param_key:
+                stats = parameter_statistics[param_key]
                 formatted.append(f"- {display_name}: Average = {stats['average']:.3f}, Status = Detected")
             else:
                 formatted.append(f"- {display_name}: Status = Not Detected (include in tables with N/A)")
         formatted.append("")
 
-        # Detailed statistics for detected parameters
-        formatted.append("DETAILED STATISTICS FOR DETECTED PARAMETERS:")
-        for display_name, param_key in standard_soil_params.items():
-            if param_key in soil_params.get('parameter_statistics', {}):
-                stats = soil_params['parameter_statistics'][param_key]
-                formatted.append(f"- {display_name}:")
-                formatted.append(f"  Average: {stats['average']:.3f}")
-                formatted.append(f"  Range: {stats['min']:.3f} - {stats['max']:.3f}")
-                formatted.append(f"  Samples: {stats['count']}")
-                formatted.append("")
-
-        # Add individual sample data
-        if 'all_samples' in soil_params:
-            formatted.append("INDIVIDUAL SOIL SAMPLE DATA:")
-            for sample in soil_params['all_samples']:
-                sample_no = sample.get('sample_no', 'N/A')
-                lab_no = sample.get('lab_no', 'N/A')
-                formatted.append(f"Sample {sample_no} (Lab: {lab_no}):")
-                for param, value in sample.items():
-                    if param not in ['sample_no', 'lab_no'] and value is not None:
-                        formatted.append(f"  {param}: {value}")
-                formatted.append("")
-
-        return "\n".join(formatted) if formatted else "No soil parameters available"
+        context = self._get_dataset_context(soil_params, 'SOIL', formatted)
+        return context['text'] or "No soil parameters available"
     
     def _format_leaf_data_for_llm(self, leaf_params: Dict[str, Any]) -> str:
-        """Format leaf data for LLM consumption - ALL SAMPLES"""
+        """Format leaf data for LLM consumption - statistics over ALL samples and
+        sample rows within the context token budget"""
         if not leaf_params:
             return "No leaf data available"
         
-        formatted = []
-        
-        # Add summary statistics
-        if 'parameter_statistics' in leaf_params:
-            formatted.append("LEAF PARAMETER STATISTICS (All Samples):")
-            for param, stats in leaf_params['parameter_statistics'].items():
-                formatted.append(f"- {param}:")
-                formatted.append(f"  Average: {stats['average']:.3f}")
-                formatted.append(f"  Range: {stats['min']:.3f} - {stats['max']:.3f}")
-                formatted.append(f"  Samples: {stats['count']}")
-                formatted.append("")
-        
-        # Add individual sample data
-        if 'all_samples' in leaf_params:
-            formatted.append("INDIVIDUAL LEAF SAMPLE DATA:")
-            for sample in leaf_params['all_samples']:
-                sample_no = sample.get('sample_no', 'N/A')
-                lab_no = sample.get('lab_no', 'N/A')
-                formatted.append(f"Sample {sample_no} (Lab: {lab_no}):")
-                for param, value in sample.items():
-                    if param not in ['sample_no', 'lab_no'] and value is not None:
-                        formatted.append(f"  {param}: {value}")
-                formatted.append("")
-        
-        return "\n".join(formatted) if formatted else "No leaf parameters available"
+        context = self._get_dataset_context(leaf_params, 'LEAF')
+        return context['text'] or "No leaf parameters available"
     
     def _format_land_yield_data_for_llm(self, land_yield_data: Dict[str, Any]) -> str:
         """Format land and yield data for LLM consumption"""
@@ -3770,9 +3866,73 @@ class PromptAnalyzer:
             step_title = result.get('step_title', f'Step {step_num}')
             summary = result.get('summary', 'No summary available')
             formatted.append(f"Step {step_num} ({step_title}): {summary}")
-        
+
+        return "\n".join(formatted)
+
+    def _format_parameter_statistics_for_llm(self, params: Dict[str, Any], label: str) -> str:
+        """Per-parameter statistics over all samples, without the individual sample rows"""
+        parameter_statistics = (params or {}).get('parameter_statistics') or {}
+        if not parameter_statistics:
+            return f"No {label.lower()} data available"
+
+        formatted = [f"{label} PARAMETER STATISTICS (all samples):"]
+        for param, stats in parameter_statistics.items():
+            if not isinstance(stats, dict) or not isinstance(stats.get('average'), (int, float)):
+                continue
+            formatted.append(
+                f"- {param}: Average = {stats['average']:.3f}, Min = {stats.get('min') or 0:.3f}, "
+                f"Max = {stats.get('max') or 0:.3f}, Samples = {stats.get('count') or 0}")
         return "\n".join(formatted)
 
+    def _step_prompt_inputs(self, step: Dict[str, Any], soil_params: Dict[str, Any], leaf_params: Dict[str, Any],
+                            land_yield_data: Dict[str, Any],
+                            previous_results: Optional[List[Dict[str, Any]]]) -> Dict[str, str]:
+        """Prompt sections for a step, limited to what STEP_INPUTS says the step reads"""
+        inputs = STEP_INPUTS.get(step.get('number'))
+        previous_results = previous_results or []
+        if inputs is None:
+            return {
+                'soil': self._format_soil_data_for_llm(soil_params),
+                'leaf': self._format_leaf_data_for_llm(leaf_params),
+                'land_yield': self._format_land_yield_data_for_llm(land_yield_data),
+                'previous': self._format_previous_results_for_llm(previous_results),
+            }
+
+        not_used = "Not used in this step"
+        if inputs['soil_leaf'] == 'samples':
+            soil_text = self._format_soil_data_for_llm(soil_params)
+            leaf_text = self._format_leaf_data_for_llm(leaf_params)
+        elif inputs['soil_leaf'] == 'statistics':
+            soil_text = self._format_parameter_statistics_for_llm(soil_params, 'SOIL')
+            leaf_text = self._format_parameter_statistics_for_llm(leaf_params, 'LEAF')
+        else:
+            soil_text = leaf_text = not_used
+        upstream = [result for result in previous_results
+                    if result.get('step_number') in inputs['previous_steps']]
+        return {
+            'soil': soil_text,
+            'leaf': leaf_text,
+            'land_yield': self._format_land_yield_data_for_llm(land_yield_data) if inputs['land_yield'] else not_used,
+            'previous': self._format_previous_results_for_llm(upstream),
+        }
+
+    def step_input_fingerprint(self, step: Dict[str, Any], soil_params: Dict[str, Any], leaf_params: Dict[str, Any],
+                               land_yield_data: Dict[str, Any], previous_results: List[Dict[str, Any]],
+                               recommendations: List[Dict[str, Any]], total_steps: int, analysis_mode: str) -> str:
+        """
+        Hash of exactly what a step reads (see STEP_INPUTS), so a correction
+        only invalidates the steps whose inputs it actually changes
+        """
+        route = self.model_router.route_step(step)
+        inputs = STEP_INPUTS.get(step.get('number'))
+        return fingerprint(
+            step, total_steps, analysis_mode,
+            [route.tier, list(route.models), route.max_output_tokens, route.temperature],
+            self._step_prompt_inputs(step, soil_params, leaf_params, without_bookkeeping(land_yield_data),
+                                     previous_results),
+            recommendations if inputs is None or inputs['recommendations'] else None
+        )
+
     def _get_default_step_result(self, step: Dict[str, str]) -> Dict[str, Any]:
         """Get default result when LLM is not available"""
         # Provide meaningful fallback content based on step type
@@ -6198,6 +6358,7 @@ class ResultsGenerator:
                             break
 
             scenarios = {}
+            simulation_inputs = []
 
             # Calculate dynamic costs based on actual recommendations
             fertilizer_costs = self._calculate_fertilizer_costs(recommendations, land_size_ha)
@@ -6301,8 +6462,34 @@ class ResultsGenerator:
                     'yearly_data': yearly_data,
                     'cumulative_net_profit_range': f"RM {cumulative_net_profit_low:,.0f}-{cumulative_net_profit_high:,.0f}",
                     'roi_5year_range': f"{roi_5year_low:.0f}-{roi_5year_high:.0f}%{roi_capped_note}",
-                    'payback_period_range': f"{payback_year_low:.1f}-{payback_year_high:.1f} years"
+                    'payback_period_range': f"{payback_year_low:.1f}-{payback_year_high:.1f} years",
+                    # Numeric equivalents of the display ranges above
+                    'cost_per_hectare_low': cost_per_ha_low,
+                    'cost_per_hectare_high': cost_per_ha_high,
+                    'total_cost_low': total_cost_low,
+                    'total_cost_high': total_cost_high,
+                    'new_yield_low': new_yield_low,
+                    'new_yield_high': new_yield_high,
+                    'additional_yield_low': additional_yield_low,
+                    'additional_yield_high': additional_yield_high,
+                    'cumulative_net_profit_low': cumulative_net_profit_low,
+                    'cumulative_net_profit_high': cumulative_net_profit_high,
+                    'roi_5year_low': roi_5year_low,
+                    'roi_5year_high': roi_5year_high,
+                    'payback_years_low': payback_year_low,
+                    'payback_years_high': payback_year_high
                 }
+                simulation_inputs.append(ScenarioInputs(
+                    level=investment_level,
+                    yield_increase=(yield_increase_low, yield_increase_high),
+                    cost_per_ha=(cost_per_ha_low, cost_per_ha_high)
+                ))
+            
+            # Monte Carlo sensitivity bands for all scenarios in one vectorized pass
+            simulation_settings = SimulationSettings(ffb_price_range=(ffb_price_low, ffb_price_high))
+            sensitivity = simulate_scenarios(current_yield_tonnes, simulation_inputs, simulation_settings)
+            for investment_level, bands in sensitivity.items():
+                scenarios[investment_level]['sensitivity'] = bands
             
             return {
                 'land_size_hectares': land_size_ha,
@@ -6310,7 +6497,15 @@ class ResultsGenerator:
                 'palm_density_per_hectare': palm_density,
                 'total_palms': int(land_size_ha * palm_density),
                 'oil_palm_price_range_rm_per_tonne': f"RM {ffb_price_low}-{ffb_price_high}",
+                'ffb_price_low': ffb_price_low,
+                'ffb_price_high': ffb_price_high,
                 'scenarios': scenarios,
+                'sensitivity_analysis': {
+                    'draws': simulation_settings.draws,
+                    'percentiles': list(simulation_settings.percentiles),
+                    'variables': ['FFB price (triangular)', 'yield response', 'yearly yield progression',
+                                  'initial cost', 'maintenance cost'],
+                } if sensitivity else {},
                 'assumptions': [
                     'Yield improvements based on addressing identified nutrient issues from soil/leaf analysis',
                     f'FFB price range: RM {ffb_price_low}-{ffb_price_high}/tonne (Malaysian market range)',
@@ -6332,116 +6527,72 @@ class ResultsGenerator:
                                      total_cost_low: float, total_cost_high: float,
                                      ffb_price_low: float, ffb_price_high: float,
                                      investment_level: str) -> List[Dict[str, Any]]:
-        """Generate 5-year economic projections with realistic yield progression"""
-        yearly_data = []
-        cumulative_profit_low = 0
-        cumulative_profit_high = 0
-        
-        # Define yield progression factors for each year (realistic for oil palm nutrient correction)
-        # Year 1: Initial response to fertilization, Year 2-3: Peak nutrient uptake, Year 4-5: Sustained productivity
-        # More aggressive Year 1 progression to avoid negative profits
-        yield_progression = {
-            'year_1': {'low': 0.85, 'high': 0.95},  # 85-95% of full potential - stronger initial response
-            'year_2': {'low': 0.95, 'high': 1.0},   # 95-100% of full potential - peak performance
-            'year_3': {'low': 0.98, 'high': 1.0},   # 98-100% of full potential - sustained peak
-            'year_4': {'low': 0.95, 'high': 0.98},  # 95-98% sustained productivity
-            'year_5': {'low': 0.92, 'high': 0.95}   # 92-95% long-term sustained benefits
-        }
+        """Generate 5-year economic projections with realistic yield progression
+
+        Per-hectare low/high values for all five years are computed in one
+        vectorized pass (see utils.economic_simulation.project_ranges).
+        """
+        cost_per_ha_low = total_cost_low / land_size_ha if land_size_ha > 0 else 0
+        cost_per_ha_high = total_cost_high / land_size_ha if land_size_ha > 0 else 0
+        projection = project_ranges(
+            current_yield, new_yield_low, new_yield_high, cost_per_ha_low, cost_per_ha_high,
+            ffb_price_low, ffb_price_high, BASE_MAINTENANCE_COST_PER_HA.get(investment_level, 400.0),
+            roi_investment=(total_cost_low + total_cost_high) / 2
+        )
         
-        # Define maintenance costs per year (excluding initial investment)
-        # Maintenance costs are proportional to initial investment level
-        # High investment requires more ongoing maintenance, low investment requires less
-        # Costs increase slightly over time as palms mature and require more nutrients
-        base_maintenance_cost_per_ha = {
-            'high': 600,    # RM 600/ha/year for high investment maintenance
-            'medium': 400,  # RM 400/ha/year for medium investment maintenance
-            'low': 250      # RM 250/ha/year for low investment maintenance
-        }
+        if (projection['additional_revenue'] < 0).any():
+            self.logger.warning(f"Negative revenue calculated for {investment_level}: "
+                                f"{projection['additional_revenue'].round(0).tolist()}")
         
-        # Calculate additional yield for each year
-        additional_yield_base_low = new_yield_low - current_yield
-        additional_yield_base_high = new_yield_high - current_yield
+        yearly_data = []
+        for index in range(YEARS):
+            row = {'year': index + 1}
+            for key, prefix in (('yield', 'yield'), ('additional_yield', 'additional_yield'),
+                                ('additional_revenue', 'additional_revenue'), ('cost', 'cost'),
+                                ('net_profit', 'net_profit'), ('cumulative_profit', 'cumulative_profit'),
+                                ('roi', 'roi')):
+                row[f'{prefix}_low'] = float(projection[key][0, index])
+                row[f'{prefix}_high'] = float(projection[key][1, index])
+            yearly_data.append(row)
         
-        for year_num in range(1, 6):
-            year_key = f'year_{year_num}'
-            progression_low = yield_progression[year_key]['low']
-            progression_high = yield_progression[year_key]['high']
-            
-            # Calculate yield for this year
-            year_yield_low = current_yield + (additional_yield_base_low * progression_low)
-            year_yield_high = current_yield + (additional_yield_base_high * progression_high)
-            
-            # Calculate additional yield (above baseline)
-            additional_yield_low = year_yield_low - current_yield
-            additional_yield_high = year_yield_high - current_yield
-            
-            # Calculate revenue from additional yield per hectare - ensure accurate multiplication
-            additional_revenue_low = additional_yield_low * ffb_price_low  # RM/ha
-            additional_revenue_high = additional_yield_high * ffb_price_high  # RM/ha
-
-            # Validate revenue calculations
-            if additional_revenue_low < 0 or additional_revenue_high < 0:
-                self.logger.warning(f"Negative revenue calculated for year {year_num}, {investment_level}: low={additional_revenue_low}, high={additional_revenue_high}")
-
-            # Calculate costs for this year per hectare
-            if year_num == 1:
-                # Year 1 includes initial investment per hectare
-                year_cost_low = total_cost_low / land_size_ha if land_size_ha > 0 else 0
-                year_cost_high = total_cost_high / land_size_ha if land_size_ha > 0 else 0
-            else:
-                # Years 2-5 include maintenance costs that increase slightly as palms mature
-                # Year 2: base maintenance, Year 3-4: 110% of base, Year 5: 105% of base
-                maintenance_multiplier = {2: 1.0, 3: 1.1, 4: 1.1, 5: 1.05}
-                base_maintenance = base_maintenance_cost_per_ha[investment_level]
-                year_cost_low = base_maintenance * maintenance_multiplier.get(year_num, 1.0)
-                year_cost_high = base_maintenance * maintenance_multiplier.get(year_num, 1.0)
-
-            # Ensure costs are positive and reasonable
-            year_cost_low = max(year_cost_low, 0)
-            year_cost_high = max(year_cost_high, 0)
-
-            # Calculate net profit for this year - ensure accurate calculation
-            net_profit_low = additional_revenue_low - year_cost_low
-            net_profit_high = additional_revenue_high - year_cost_high
-
-            # Log yearly calculation for verification
-            if year_num <= 2:  # Log first 2 years for verification
-                self.logger.info(f"Year {year_num} {investment_level}: Yield {additional_yield_low:.2f}-{additional_yield_high:.2f}t/ha, Revenue RM {additional_revenue_low:,.0f}-{additional_revenue_high:,.0f}/ha, Cost RM {year_cost_low:,.0f}-{year_cost_high:,.0f}/ha, Profit RM {net_profit_low:,.0f}-{net_profit_high:,.0f}/ha")
-
-            # Update cumulative profit per hectare
-            cumulative_profit_low += net_profit_low
-            cumulative_profit_high += net_profit_high
-
-            # Calculate ROI for this year (based on initial investment)
-            # Use average of low and high initial costs for ROI calculation
-            initial_investment_avg = (total_cost_low + total_cost_high) / 2
-            roi_low = (net_profit_low / initial_investment_avg * 100) if initial_investment_avg > 0 else 0
-            roi_high = (net_profit_high / initial_investment_avg * 100) if initial_investment_avg > 0 else 0
-
-            # Cap ROI at 300% for conservatism
-            roi_low = min(roi_low, 300.0)
-            roi_high = min(roi_high, 300.0)
-
-            yearly_data.append({
-                'year': year_num,
-                'yield_low': year_yield_low,
-                'yield_high': year_yield_high,
-                'additional_yield_low': additional_yield_low,
-                'additional_yield_high': additional_yield_high,
-                'additional_revenue_low': additional_revenue_low,
-                'additional_revenue_high': additional_revenue_high,
-                'cost_low': year_cost_low,
-                'cost_high': year_cost_high,
-                'net_profit_low': net_profit_low,
-                'net_profit_high': net_profit_high,
-                'cumulative_profit_low': cumulative_profit_low,
-                'cumulative_profit_high': cumulative_profit_high,
-                'roi_low': roi_low,
-                'roi_high': roi_high
-            })
+        for row in yearly_data[:2]:  # Log first 2 years for verification
+            self.logger.info(f"Year {row['year']} {investment_level}: Yield {row['additional_yield_low']:.2f}-{row['additional_yield_high']:.2f}t/ha, "
+                             f"Revenue RM {row['additional_revenue_low']:,.0f}-{row['additional_revenue_high']:,.0f}/ha, "
+                             f"Cost RM {row['cost_low']:,.0f}-{row['cost_high']:,.0f}/ha, "
+                             f"Profit RM {row['net_profit_low']:,.0f}-{row['net_profit_high']:,.0f}/ha")
         
         return yearly_data
 
+    @staticmethod
+    def _scenario_ranges(scenario_data: Dict[str, Any]) -> Tuple[float, float, float, float]:
+        """(new yield low/high t/ha, total cost low/high RM) from the numeric scenario
+        fields, parsing the display strings only for forecasts stored before they existed"""
+        if 'new_yield_low' in scenario_data and 'total_cost_low' in scenario_data:
+            return (float(scenario_data['new_yield_low']), float(scenario_data['new_yield_high']),
+                    float(scenario_data['total_cost_low']), float(scenario_data['total_cost_high']))
+        # Legacy format: "15.0-20.0 t/ha" and "RM 1,000-2,000"
+        yield_range_str = scenario_data.get('new_yield_range', '15.0-20.0 t/ha')
+        cost_range_str = scenario_data.get('total_cost_range', 'RM 1,000-2,000').replace('RM ', '').replace(',', '')
+        return (float(yield_range_str.split('-')[0].strip()), float(yield_range_str.split('-')[1].split()[0].strip()),
+                float(cost_range_str.split('-')[0].strip()), float(cost_range_str.split('-')[1].strip()))
+    
+    def ensure_scenario_yearly_data(self, economic_forecast: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in yearly_data for any scenario that lacks it (in place)"""
+        if not isinstance(economic_forecast, dict):
+            return economic_forecast
+        for scenario_name, scenario_data in (economic_forecast.get('scenarios') or {}).items():
+            if isinstance(scenario_data, dict) and 'yearly_data' not in scenario_data:
+                yield_low, yield_high, cost_low, cost_high = self._scenario_ranges(scenario_data)
+                scenario_data['yearly_data'] = self._generate_5_year_economic_data(
+                    economic_forecast.get('land_size_hectares', 1),
+                    economic_forecast.get('current_yield_tonnes_per_ha', 10),
+                    yield_low, yield_high,
+                    cost_low, cost_high,
+                    economic_forecast.get('ffb_price_low', 650), economic_forecast.get('ffb_price_high', 750),
+                    scenario_name
+                )
+        return economic_forecast
+    
     def _clean_economic_forecast(self, economic_forecast: Dict[str, Any]) -> Dict[str, Any]:
         """Clean economic forecast by removing raw scenarios and assumptions data for display, but preserve for table generation"""
         if not economic_forecast or not isinstance(economic_forecast, dict):
@@ -6915,6 +7066,7 @@ class DataPreprocessor:
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.DataPreprocessor")
 
+    @traced(STAGE_PREPROCESSING, 'preprocessing.raw_data')
     def preprocess_raw_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Main preprocessing pipeline"""
         try:
@@ -7805,8 +7957,12 @@ class AnalysisEngine:
             self.logger.error(f"Error creating sample leaf data: {str(e)}")
             return {}
 
-    def _convert_structured_to_analysis_format(self, structured_data: Dict[str, Any], data_type: str) -> Dict[str, Any]:
-        """Convert structured OCR data to analysis format with missing value handling"""
+    def _convert_structured_to_analysis_format(self, structured_data: Dict[str, Any], data_type: str,
+                                               previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Convert structured OCR data to analysis format with missing value handling
+
+        previous: parameters of an earlier analysis of the same report, passed on to the extractor
+        """
         try:
             if not structured_data:
                 return {}
@@ -7858,20 +8014,59 @@ class AnalysisEngine:
             
             # Use the standardized extraction method
             if data_type.lower() == 'soil':
-                return self.data_processor.extract_soil_parameters({'samples': samples})
+                return self.data_processor.extract_soil_parameters({'samples': samples}, previous)
             else:
-                return self.data_processor.extract_leaf_parameters({'samples': samples})
+                return self.data_processor.extract_leaf_parameters({'samples': samples}, previous)
 
         except Exception as e:
             self.logger.error(f"Error converting structured data to analysis format: {str(e)}")
             return {}
 
+    def _compare_changed_parameters(self, reanalysis: Optional[ReanalysisContext], data_type: str,
+                                    params: Dict[str, Any], changed: Optional[List[str]],
+                                    compare) -> Optional[List[Dict[str, Any]]]:
+        """Standards issues for a re-analysis: previous issues of unchanged parameters plus a
+        comparison of the changed ones only. None when there is no previous analysis to build on."""
+        if reanalysis is None or reanalysis.previous_parameters(data_type) is None:
+            return None
+        previous_issues = reanalysis.previous_section('issues_analysis', f'{data_type}_issues')
+        if previous_issues is None:
+            return None
+        stats = params.get('parameter_statistics', {})
+        subset = {param: stats[param] for param in changed or [] if param in stats}
+        new_issues = compare({**params, 'parameter_statistics': subset}) if subset else []
+        # An empty issue list is stored as an empty map
+        previous_issues = previous_issues if isinstance(previous_issues, list) else []
+        return merge_parameter_issues(previous_issues, new_issues or [], changed or [], list(stats))
+
+    @traced(STAGE_ANALYSIS, 'analysis.engine', attributes=lambda self, *args, **kwargs: {
+        'analysis_mode': kwargs.get('analysis_mode', args[4] if len(args) > 4 else ANALYSIS_MODE_FULL)})
     def generate_comprehensive_analysis(self, soil_data: Dict[str, Any], leaf_data: Dict[str, Any],
-                                      land_yield_data: Dict[str, Any], prompt_text: str) -> Dict[str, Any]:
-        """Generate comprehensive analysis with all components (enhanced)"""
+                                      land_yield_data: Dict[str, Any], prompt_text: str,
+                                      analysis_mode: str = ANALYSIS_MODE_FULL,
+                                      previous_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate comprehensive analysis with all components (enhanced)
+
+        analysis_mode selects how much of the analysis uses the LLM:
+        ANALYSIS_MODE_FULL asks the LLM for every step, ANALYSIS_MODE_FAST builds
+        Steps 1, 2 and 5 deterministically and uses the LLM only for the narrative
+        steps, and ANALYSIS_MODE_QUICK makes no LLM calls at all.
+
+        previous_analysis is an earlier result for the same report (e.g. before the
+        user corrected some sample values). Parameter statistics, standards
+        comparisons and LLM steps whose inputs are unchanged are reused from it.
+        """
         try:
-            self.logger.info("Starting enhanced comprehensive analysis")
+            if analysis_mode not in ANALYSIS_MODES:
+                self.logger.warning(f"Unknown analysis mode '{analysis_mode}', using '{ANALYSIS_MODE_FULL}'")
+                analysis_mode = ANALYSIS_MODE_FULL
+            self.logger.info(f"Starting enhanced comprehensive analysis (mode: {analysis_mode})")
             start_time = datetime.now()
+            run_context = RunContext()
+            self.prompt_analyzer.reset_run_state(run_context)
+            reanalysis = ReanalysisContext(previous_analysis) if previous_analysis else None
+            previous_soil = reanalysis.previous_parameters('soil') if reanalysis else None
+            previous_leaf = reanalysis.previous_parameters('leaf') if reanalysis else None
 
             # Initialize previous_results for comprehensive analysis (no prior steps)
             previous_results = []
@@ -7883,7 +8078,7 @@ class AnalysisEngine:
             # Handle structured data conversion with better error handling
             if structured_soil_data:
                 self.logger.info("Using pre-processed structured soil data")
-                soil_data = self._convert_structured_to_analysis_format(structured_soil_data, 'soil')
+                soil_data = self._convert_structured_to_analysis_format(structured_soil_data, 'soil', previous_soil)
                 if not soil_data:
                     self.logger.warning("Structured soil data conversion failed, falling back to file processing")
                     structured_soil_data = None  # Force fallback
@@ -7892,7 +8087,7 @@ class AnalysisEngine:
 
             if structured_leaf_data:
                 self.logger.info("Using pre-processed structured leaf data")
-                leaf_data = self._convert_structured_to_analysis_format(structured_leaf_data, 'leaf')
+                leaf_data = self._convert_structured_to_analysis_format(structured_leaf_data, 'leaf', previous_leaf)
                 if not leaf_data:
                     self.logger.warning("Structured leaf data conversion failed, falling back to file processing")
                     structured_leaf_data = None  # Force fallback
@@ -7925,17 +8120,23 @@ class AnalysisEngine:
             self.logger.info(f"Leaf data keys: {list(leaf_data.keys()) if leaf_data else 'None'}")
             
             # Try to extract parameters from the provided data
-            soil_params = self.data_processor.extract_soil_parameters(soil_data)
-            leaf_params = self.data_processor.extract_leaf_parameters(leaf_data)
+            soil_params = self.data_processor.extract_soil_parameters(soil_data, previous_soil)
+            leaf_params = self.data_processor.extract_leaf_parameters(leaf_data, previous_leaf)
             
-            # If extraction failed, try to convert from structured format if available
+            # If extraction failed, use already converted parameters or convert from structured format
             if not soil_params and soil_data:
-                self.logger.info("Attempting to convert soil data from structured format...")
-                soil_params = self._convert_structured_to_analysis_format(soil_data, 'soil')
+                if 'parameter_statistics' in soil_data:
+                    soil_params = soil_data
+                else:
+                    self.logger.info("Attempting to convert soil data from structured format...")
+                    soil_params = self._convert_structured_to_analysis_format(soil_data, 'soil', previous_soil)
             
             if not leaf_params and leaf_data:
-                self.logger.info("Attempting to convert leaf data from structured format...")
-                leaf_params = self._convert_structured_to_analysis_format(leaf_data, 'leaf')
+                if 'parameter_statistics' in leaf_data:
+                    leaf_params = leaf_data
+                else:
+                    self.logger.info("Attempting to convert leaf data from structured format...")
+                    leaf_params = self._convert_structured_to_analysis_format(leaf_data, 'leaf', previous_leaf)
             
             # Log final parameter counts
             soil_param_count = len(soil_params.get('parameter_statistics', {})) if soil_params else 0
@@ -7950,10 +8151,25 @@ class AnalysisEngine:
 
             data_quality_score, confidence_level = self.data_processor.validate_data_quality(soil_params, leaf_params)
 
+            # Parameters whose statistics differ from the previous analysis drive what is recomputed
+            soil_changed = leaf_changed = None
+            if reanalysis:
+                soil_changed = reanalysis.record_changes('soil', soil_params)
+                leaf_changed = reanalysis.record_changes('leaf', leaf_params)
+                self.logger.info(f"Re-analysis: changed soil parameters {soil_changed}, leaf parameters {leaf_changed}")
+            data_unchanged = reanalysis is not None and not soil_changed and not leaf_changed
+
             # Step 2: Perform cross-validation between soil and leaf data
             self.logger.info("Performing cross-validation...")
+            soil_key, leaf_key = fingerprint(soil_params), fingerprint(leaf_params)
             try:
-                cross_validation_results = self.standards_comparator.perform_cross_validation(soil_params, leaf_params)
+                cross_validation_results = reanalysis.reuse_artifact(
+                    'cross_validation', data_unchanged, 'preprocessing_results', 'cross_validation_results'
+                ) if reanalysis else None
+                if cross_validation_results is None:
+                    cross_validation_results = run_context.get_or_compute(
+                        ARTIFACT_CROSS_VALIDATION, fingerprint(soil_key, leaf_key),
+                        lambda: self.standards_comparator.perform_cross_validation(soil_params, leaf_params))
                 if cross_validation_results is None:
                     cross_validation_results = {}
             except Exception as e:
@@ -7963,7 +8179,11 @@ class AnalysisEngine:
             # Step 3: Compare against standards (all samples)
             self.logger.info("Comparing against MPOB standards...")
             try:
-                soil_issues = self.standards_comparator.compare_soil_parameters(soil_params)
+                soil_issues = self._compare_changed_parameters(
+                    reanalysis, 'soil', soil_params, soil_changed, self.standards_comparator.compare_soil_parameters)
+                if soil_issues is None:
+                    soil_issues = run_context.get_or_compute(
+                        ARTIFACT_SOIL_ISSUES, soil_key, lambda: self.standards_comparator.compare_soil_parameters(soil_params))
                 if soil_issues is None:
                     soil_issues = []
             except Exception as e:
@@ -7971,7 +8191,11 @@ class AnalysisEngine:
                 soil_issues = []
 
             try:
-                leaf_issues = self.standards_comparator.compare_leaf_parameters(leaf_params)
+                leaf_issues = self._compare_changed_parameters(
+                    reanalysis, 'leaf', leaf_params, leaf_changed, self.standards_comparator.compare_leaf_parameters)
+                if leaf_issues is None:
+                    leaf_issues = run_context.get_or_compute(
+                        ARTIFACT_LEAF_ISSUES, leaf_key, lambda: self.standards_comparator.compare_leaf_parameters(leaf_params))
                 if leaf_issues is None:
                     leaf_issues = []
             except Exception as e:
@@ -7979,13 +8203,29 @@ class AnalysisEngine:
                 leaf_issues = []
             all_issues = soil_issues + leaf_issues
 
-            # Step 4: Generate recommendations
+            # Step 4: Generate recommendations (derived from the issues alone)
             self.logger.info("Generating recommendations...")
-            recommendations = self.results_generator.generate_recommendations(all_issues)
-
-            # Step 5: Generate economic forecast
+            issues_unchanged = reanalysis is not None and \
+                all_issues == (reanalysis.previous_section('issues_analysis', 'all_issues') or [])
+            recommendations = reanalysis.reuse_artifact(
+                'recommendations', issues_unchanged, 'recommendations') if reanalysis else None
+            if recommendations is None:
+                recommendations = run_context.get_or_compute(
+                    ARTIFACT_RECOMMENDATIONS, fingerprint(soil_key, leaf_key),
+                    lambda: self.results_generator.generate_recommendations(all_issues))
+
+            # Step 5: Generate economic forecast (shared with Step 5's own generation;
+            # recommendations are fixed for the run, so land/yield data is the key)
             self.logger.info("Generating economic forecast...")
-            economic_forecast = self.results_generator.generate_economic_forecast(land_yield_data, recommendations, previous_results)
+            forecast_unchanged = issues_unchanged and \
+                without_bookkeeping(land_yield_data) == \
+                without_bookkeeping(reanalysis.previous_section('raw_data', 'land_yield_data'))
+            previous_forecast = reanalysis.reuse_artifact(
+                'economic_forecast', forecast_unchanged, 'economic_forecast') if reanalysis else None
+            economic_forecast = run_context.get_or_compute(
+                ARTIFACT_ECONOMIC_FORECAST, fingerprint(land_yield_data),
+                lambda: previous_forecast if previous_forecast is not None else
+                self.results_generator.generate_economic_forecast(land_yield_data, recommendations, previous_results))
 
             # Step 6: Process prompt steps with LLM (enhanced)
             self.logger.info("Processing analysis steps...")
@@ -7993,13 +8233,31 @@ class AnalysisEngine:
             step_results = []
 
             # Ensure LLM is available for step analysis
-            if not self.prompt_analyzer.ensure_llm_available():
+            if analysis_mode != ANALYSIS_MODE_QUICK and not self.prompt_analyzer.ensure_llm_available():
                 self.logger.warning("LLM is not available for step analysis - using enhanced fallback")
                 # Continue with enhanced default results instead of failing completely
 
             # Process steps with enhanced error handling
+            step_input_hashes = {}
             for step in steps:
                 try:
+                    if analysis_mode == ANALYSIS_MODE_QUICK or (
+                            analysis_mode == ANALYSIS_MODE_FAST and step.get('number') in DETERMINISTIC_STEPS):
+                        # Computed locally; tables/issues/forecast are injected below as in full mode
+                        step_result = self.prompt_analyzer._build_deterministic_step_result(
+                            step, soil_params, leaf_params, all_issues, recommendations, economic_forecast
+                        )
+                        step_results.append(self._normalize_step_result(step_result))
+                        continue
+                    input_hash = self.prompt_analyzer.step_input_fingerprint(
+                        step, soil_params, leaf_params, land_yield_data, step_results, recommendations,
+                        len(steps), analysis_mode)
+                    step_input_hashes[str(step.get('number'))] = input_hash
+                    reused = reanalysis.reuse_step(step.get('number'), input_hash) if reanalysis else None
+                    if reused is not None:
+                        self.logger.info(f"Step {step.get('number')} inputs unchanged, reusing previous result")
+                        step_results.append(reused)
+                        continue
                     # Inject runtime context for real-time, seasonal adjustments
                     runtime_ctx = self._get_runtime_context()
                     step_result = self.prompt_analyzer.generate_step_analysis(
@@ -8055,28 +8313,7 @@ class AnalysisEngine:
                         # Always inject the complete economic forecast with yearly_data
                         sr['economic_forecast'] = economic_forecast
                         # Ensure scenarios have yearly_data for Years 2-5
-                        if economic_forecast and 'scenarios' in economic_forecast:
-                            for scenario_name, scenario_data in economic_forecast['scenarios'].items():
-                                if isinstance(scenario_data, dict) and 'yearly_data' not in scenario_data:
-                                    # Generate yearly data if missing
-                                    # Parse new_yield_range (format: "15.0-20.0 t/ha")
-                                    yield_range_str = scenario_data.get('new_yield_range', '15.0-20.0 t/ha')
-                                    yield_low = float(yield_range_str.split('-')[0].strip())
-                                    yield_high = float(yield_range_str.split('-')[1].split()[0].strip())
-                                    
-                                    # Parse total_cost_range (format: "RM 1,000-2,000")
-                                    cost_range_str = scenario_data.get('total_cost_range', 'RM 1,000-2,000')
-                                    cost_low = float(cost_range_str.replace('RM ', '').replace(',', '').split('-')[0].strip())
-                                    cost_high = float(cost_range_str.replace('RM ', '').replace(',', '').split('-')[1].strip())
-                                    
-                                    yearly_data = self.results_generator._generate_5_year_economic_data(
-                                        economic_forecast.get('land_size_hectares', 1),
-                                        economic_forecast.get('current_yield_tonnes_per_ha', 10),
-                                        yield_low, yield_high,
-                                        cost_low, cost_high,    
-                                        650, 750, scenario_name
-                                    )
-                                    scenario_data['yearly_data'] = yearly_data
+                        self.results_generator.ensure_scenario_yearly_data(economic_forecast)
                         sr['economic_forecast_source'] = 'deterministic'
                         step_results[i] = sr
                         self.logger.info(f"Injected complete economic forecast with yearly_data into Step 5")
@@ -8100,6 +8337,20 @@ class AnalysisEngine:
                     'critical_issues': len([i for i in all_issues if i.get('critical', False)]),
                     'cross_validation_performed': True,
                     'preprocessing_applied': True,
+                    'analysis_mode': analysis_mode,
+                    'model_usage': {
+                        'calls': self.prompt_analyzer.usage_recorder.records(),
+                        'summary': self.prompt_analyzer.usage_recorder.summary(),
+                        'cost': summarize_calls(self.prompt_analyzer.usage_recorder.records(),
+                                                self.prompt_analyzer.usage_pricing),
+                        'hedging': self.prompt_analyzer.hedged_caller.metrics.snapshot(),
+                        'json_parsing': self.prompt_analyzer.json_metrics.snapshot(),
+                        'prompt_context': self.prompt_analyzer.context_stats
+                    },
+                    'computation_cache': run_context.stats(),
+                    STEP_INPUT_HASHES_KEY: step_input_hashes,
+                    'deterministic_steps': [sr.get('step_number') for sr in step_results
+                                            if sr.get('processing_method') == 'deterministic'],
                     'enhanced_features': [
                         'data_preprocessing',
                         'cross_validation',
@@ -8132,14 +8383,23 @@ class AnalysisEngine:
                     'steps': steps
                 },
                 'system_health': {
-                    'llm_available': self.prompt_analyzer.ensure_llm_available(),
+                    'llm_available': (self.prompt_analyzer.llm is not None if analysis_mode == ANALYSIS_MODE_QUICK
+                                      else self.prompt_analyzer.ensure_llm_available()),
                     'all_steps_processed': len(step_results) == len(steps),
                     'fallback_steps_used': len([s for s in step_results if s.get('fallback_mode')])
                 }
             }
             
+            if reanalysis:
+                comprehensive_results['analysis_metadata']['incremental'] = reanalysis.stats()
+                current_span().set_attributes(reused_steps=len(reanalysis.reused_steps),
+                                              recomputed_steps=len(reanalysis.recomputed_steps))
+
             self.logger.info(f"Enhanced comprehensive analysis completed successfully in {processing_time:.2f} seconds")
             self.logger.info(f"Processed {len(step_results)} analysis steps with {len(all_issues)} issues identified")
+            current_span().set_attributes(
+                steps=len(step_results), issues=len(all_issues),
+                soil_samples=soil_params.get('total_samples', 0), leaf_samples=leaf_params.get('total_samples', 0))
 
             # Incorporate feedback learning insights
             try:
@@ -8160,7 +8420,11 @@ class AnalysisEngine:
 
         except Exception as e:
             self.logger.error(f"Error in enhanced comprehensive analysis: {str(e)}")
+            current_span().set_attributes(failed=True, error=str(e)[:200])
             return self._create_error_response(str(e))
+        finally:
+            # Engines are built per analysis; don't leave idle hedging threads behind
+            self.prompt_analyzer.hedged_caller.close()
 
     def _create_fallback_step_result(self, step: Dict[str, str], error: Exception) -> Dict[str, Any]:
         """Create a fallback step result when LLM processing fails"""
@@ -9683,7 +9947,8 @@ class AnalysisEngine:
 
 # Legacy function for backward compatibility
 def analyze_lab_data(soil_data: Dict[str, Any], leaf_data: Dict[str, Any],
-                    land_yield_data: Dict[str, Any], prompt_text: str) -> Dict[str, Any]:
+                    land_yield_data: Dict[str, Any], prompt_text: str,
+                    analysis_mode: str = ANALYSIS_MODE_FULL) -> Dict[str, Any]:
     """Legacy function for backward compatibility"""
     engine = AnalysisEngine()
-    return engine.generate_comprehensive_analysis(soil_data, leaf_data, land_yield_data, prompt_text)
\ No newline at end of file
+    return engine.generate_comprehensive_analysis(soil_data, leaf_data, land_yield_data, prompt_text, analysis_mode)
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Typed Serialization for Stored Analyses
+Declares which fields of an analysis document are timestamps, numbers and
+table rows, and converts between in-memory analyses and Firestore-compatible
+documents using that schema. Decoding only visits declared paths, so long
+narrative text is never inspected or guessed at.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Field types
+TIMESTAMP = 'timestamp'      # datetime in memory, ISO-8601 string when stored
+NUMBER = 'number'            # int/float; numeric strings are restored as floats
+TABLE_ROWS = 'table_rows'    # list of row lists in memory, list of {'cells': [...]} when stored
+
+# Matches any key of a mapping (e.g. parameter names in parameter_statistics)
+ANY_KEY = '*'
+
+PARAMETER_STATISTICS_SCHEMA = {
+    ANY_KEY: {
+        'average': NUMBER,
+        'min': NUMBER,
+        'max': NUMBER,
+        'std_dev': NUMBER,
+        'count': NUMBER,
+        'missing_count': NUMBER,
+        'values': [NUMBER],
+    }
+}
+
+PARAMETER_SET_SCHEMA = {
+    'parameter_statistics': PARAMETER_STATISTICS_SCHEMA,
+}
+
+TABLE_SCHEMA = {
+    'rows': TABLE_ROWS,
+}
+
+STEP_SCHEMA = {
+    'tables': [TABLE_SCHEMA],
+}
+
+ANALYSIS_RESULTS_SCHEMA = {
+    'raw_data': {
+        'soil_parameters': PARAMETER_SET_SCHEMA,
+        'leaf_parameters': PARAMETER_SET_SCHEMA,
+    },
+    'analysis_metadata': {
+        'timestamp': TIMESTAMP,
+        'processing_time_seconds': NUMBER,
+        'data_quality_score': NUMBER,
+    },
+    'final_validation': {
+        'timestamp': TIMESTAMP,
+    },
+    'step_by_step_analysis': [STEP_SCHEMA],
+    'soil_tables': [TABLE_SCHEMA],
+    'leaf_tables': [TABLE_SCHEMA],
+}
+
+ANALYSIS_DOCUMENT_SCHEMA = {
+    'timestamp': TIMESTAMP,
+    'created_at': TIMESTAMP,
+    'updated_at': TIMESTAMP,
+    'analysis_results': ANALYSIS_RESULTS_SCHEMA,
+}
+
+
+def _child_schema(schema: Any, key: Any) -> Any:
+    if isinstance(schema, dict):
+        if key in schema:
+            return schema[key]
+        return schema.get(ANY_KEY)
+    return None
+
+
+def encode(data: Any, schema: Any = None) -> Any:
+    """Convert in-memory data to Firestore-compatible values in one pass.
+
+    Every node is visited once: datetimes become ISO strings, tuples become
+    lists, objects are serialized through ``__dict__`` or ``str``, circular
+    references are replaced by a marker, and declared table rows are wrapped
+    so no array directly contains another array.
+    """
+    ancestors = set()
+
+    def _encode(obj, node):
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+
+        obj_id = id(obj)
+        if obj_id in ancestors:
+            return "<circular_reference>"
+        ancestors.add(obj_id)
+        try:
+            if node == TABLE_ROWS and isinstance(obj, (list, tuple)):
+                return [
+                    {'cells': _encode(row, None)} if isinstance(row, (list, tuple)) else _encode(row, None)
+                    for row in obj
+                ]
+            if isinstance(obj, dict):
+                return {key: _encode(value, _child_schema(node, key)) for key, value in obj.items()}
+            if isinstance(obj, (list, tuple)):
+                item_node = node[0] if isinstance(node, list) and node else None
+                return [_encode(item, item_node) for item in obj]
+            if hasattr(obj, '__dict__'):
+                return _encode(obj.__dict__, node)
+            return str(obj)
+        finally:
+            ancestors.discard(obj_id)
+
+    return _encode(data, schema)
+
+
+def _decode_timestamp(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            logger.warning(f"Stored timestamp is not ISO-8601: {value!r}")
+            return value
+    # Firestore Timestamp values already arrive as datetime subclasses
+    return value
+
+
+def _decode_number(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def decode(data: Any, schema: Any = None) -> Any:
+    """Restore in-memory types from a stored document.
+
+    Only paths declared in ``schema`` are visited; undeclared subtrees are
+    returned as-is, so strings are never parsed speculatively.
+    """
+    if schema is None:
+        return data
+    if schema == TIMESTAMP:
+        return _decode_timestamp(data)
+    if schema == NUMBER:
+        return _decode_number(data)
+    if schema == TABLE_ROWS:
+        if not isinstance(data, list):
+            return data
+        return [row['cells'] if isinstance(row, dict) and set(row) == {'cells'} else row
+                for row in data]
+    if isinstance(schema, list):
+        if not isinstance(data, list) or not schema:
+            return data
+        return [decode(item, schema[0]) for item in data]
+    if isinstance(schema, dict) and isinstance(data, dict):
+        wildcard = schema.get(ANY_KEY)
+        if wildcard is None:
+            decoded = dict(data)
+            for key, child in schema.items():
+                if key in decoded:
+                    decoded[key] = decode(decoded[key], child)
+            return decoded
+        return {key: decode(value, _child_schema(schema, key)) for key, value in data.items()}
+    return data
+
+
+def encode_analysis_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode a full analysis document (metadata plus analysis_results)"""
+    return encode(document, ANALYSIS_DOCUMENT_SCHEMA)
+
+
+def decode_analysis_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode a full analysis document retrieved from Firestore"""
+    return decode(document, ANALYSIS_DOCUMENT_SCHEMA)
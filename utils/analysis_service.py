@@ -0,0 +1,332 @@
+"""
+Analysis Job Service
+Framework-independent core of the HTTP API (``utils/api_server.py``).
+Uploaded reports are spooled to a work directory; extraction and analysis
+jobs are submitted to a process pool that reuses the batch pipeline worker
+(one ``AnalysisEngine`` per process), so requests never block the event
+loop and no Streamlit session is involved. Job state is kept in memory and
+finished jobs are pruned after a retention period together with their
+files.
+
+Settings come from the environment:
+    AGS_AI_API_WORK_DIR        spool directory (default <tmp>/ags_ai_api)
+    AGS_AI_API_WORKERS         worker processes (default half the CPUs)
+    AGS_AI_API_LLM_MODE        full | none | fake (see utils.batch_pipeline)
+    AGS_AI_API_MAX_PENDING     queued + running jobs before submissions are refused
+    AGS_AI_API_MAX_UPLOAD_MB   per-file upload limit
+    AGS_AI_API_RETENTION_H     hours finished jobs and uploads are kept
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils.batch_pipeline import (
+    DEFAULT_PROMPT, LLM_MODE_FULL, LLM_MODE_NONE, LLM_MODES, STATUS_DEGRADED, STATUS_FAILED, STATUS_OK,
+    SUPPORTED_EXTENSIONS, BatchJob, BatchOptions, _init_pool_worker, extract_report, process_job)
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = ('soil', 'leaf')
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_DEGRADED = 'degraded'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_DEGRADED, JOB_FAILED)
+
+
+class ServiceError(Exception):
+    """Request the service cannot accept; ``status`` is the HTTP status to report"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ServiceSettings:
+    work_dir: str = os.path.join(tempfile.gettempdir(), 'ags_ai_api')
+    workers: int = max(1, (os.cpu_count() or 2) // 2)
+    llm_mode: str = LLM_MODE_FULL
+    prompt_text: Optional[str] = None
+    max_pending: int = 64
+    max_upload_bytes: int = 20 * 1024 * 1024
+    retention_s: float = 24 * 3600
+    fake_latency: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'ServiceSettings':
+        settings = cls()
+        env = os.environ
+        settings.work_dir = env.get('AGS_AI_API_WORK_DIR') or settings.work_dir
+        settings.llm_mode = env.get('AGS_AI_API_LLM_MODE') or settings.llm_mode
+        try:
+            settings.workers = max(1, int(env.get('AGS_AI_API_WORKERS') or settings.workers))
+            settings.max_pending = max(1, int(env.get('AGS_AI_API_MAX_PENDING') or settings.max_pending))
+            if env.get('AGS_AI_API_MAX_UPLOAD_MB'):
+                settings.max_upload_bytes = int(float(env['AGS_AI_API_MAX_UPLOAD_MB']) * 1024 * 1024)
+            if env.get('AGS_AI_API_RETENTION_H'):
+                settings.retention_s = float(env['AGS_AI_API_RETENTION_H']) * 3600
+        except ValueError as e:
+            logger.warning(f"Invalid API service setting, using defaults: {str(e)}")
+        if settings.llm_mode not in LLM_MODES:
+            logger.warning(f"Unknown LLM mode '{settings.llm_mode}', using '{LLM_MODE_FULL}'")
+            settings.llm_mode = LLM_MODE_FULL
+        return settings
+
+
+@dataclass
+class UploadRecord:
+    upload_id: str
+    report_type: str
+    filename: str
+    path: str
+    size: int
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'upload_id': self.upload_id, 'report_type': self.report_type, 'filename': self.filename,
+                'size': self.size, 'created_at': self.created_at}
+
+
+@dataclass
+class JobRecord:
+    job_id: str
+    soil_upload_id: str
+    leaf_upload_id: str
+    llm_mode: str
+    land_yield_data: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    row: Dict[str, Any] = field(default_factory=dict)
+    future: Optional[Future] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is not None:
+            return {STATUS_OK: JOB_SUCCEEDED, STATUS_DEGRADED: JOB_DEGRADED}.get(self.row.get('status'), JOB_FAILED)
+        if self.future is not None and self.future.running():
+            return JOB_RUNNING
+        return JOB_QUEUED
+
+    def output(self, name: str) -> Optional[str]:
+        path = (self.row.get('outputs') or {}).get(name)
+        return path if path and os.path.exists(path) else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        timings = {key: value for key, value in self.row.items() if key.endswith('_s')}
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'llm_mode': self.llm_mode,
+            'soil_upload_id': self.soil_upload_id,
+            'leaf_upload_id': self.leaf_upload_id,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'soil_samples': self.row.get('soil_samples'),
+            'leaf_samples': self.row.get('leaf_samples'),
+            'timings': timings,
+            'error': self.row.get('error'),
+            'has_result': self.output('analysis') is not None,
+            'has_report': self.output('pdf') is not None,
+        }
+
+
+class AnalysisJobService:
+    """Upload spool, extraction and analysis jobs on a shared process pool (thread-safe)"""
+
+    def __init__(self, settings: Optional[ServiceSettings] = None):
+        self.settings = settings or ServiceSettings()
+        self.uploads_dir = os.path.join(self.settings.work_dir, 'uploads')
+        self.jobs_dir = os.path.join(self.settings.work_dir, 'jobs')
+        self._uploads: Dict[str, UploadRecord] = {}
+        self._jobs: Dict[str, JobRecord] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(f"{__name__}.AnalysisJobService")
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._pool is not None:
+                return
+            os.makedirs(self.uploads_dir, exist_ok=True)
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.settings.workers, initializer=_init_pool_worker,
+                                             initargs=(self.settings.llm_mode, self.settings.fake_latency))
+        self.logger.info(f"Analysis service started: {self.settings.workers} worker(s), "
+                         f"LLM mode '{self.settings.llm_mode}', work dir {self.settings.work_dir}")
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self.start()
+        return self._pool
+
+    # ------------------------------------------------------------------
+    # Uploads
+    # ------------------------------------------------------------------
+    def save_upload(self, report_type: str, filename: str, content: bytes) -> UploadRecord:
+        """Spool an uploaded report; validates type, extension and size"""
+        if report_type not in REPORT_TYPES:
+            raise ServiceError(f"report_type must be one of {REPORT_TYPES}")
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            raise ServiceError(f"Unsupported file type '{extension}' (expected one of {SUPPORTED_EXTENSIONS})")
+        if not content:
+            raise ServiceError("Uploaded file is empty")
+        if len(content) > self.settings.max_upload_bytes:
+            raise ServiceError(f"File exceeds {self.settings.max_upload_bytes // (1024 * 1024)} MB", status=413)
+
+        self.prune()
+        upload_id = uuid.uuid4().hex
+        directory = os.path.join(self.uploads_dir, upload_id)
+        os.makedirs(directory, exist_ok=True)
+        # The original name is kept for display only; the stored name is fixed
+        path = os.path.join(directory, f"{report_type}{extension}")
+        with open(path, 'wb') as handle:
+            handle.write(content)
+        record = UploadRecord(upload_id=upload_id, report_type=report_type,
+                              filename=os.path.basename(filename), path=path, size=len(content))
+        with self._lock:
+            self._uploads[upload_id] = record
+        return record
+
+    def get_upload(self, upload_id: str) -> UploadRecord:
+        with self._lock:
+            record = self._uploads.get(upload_id)
+        if record is None or not os.path.exists(record.path):
+            raise ServiceError(f"Upload '{upload_id}' not found", status=404)
+        return record
+
+    async def extract(self, upload_id: str) -> Dict[str, Any]:
+        """Extracted samples for an upload, shaped as analysis input"""
+        record = self.get_upload(upload_id)
+        future = self._executor().submit(extract_report, record.path, record.report_type)
+        try:
+            extracted = await asyncio.wrap_future(future)
+        except Exception as e:
+            self.logger.error(f"Extraction of upload {upload_id} failed: {str(e)}")
+            raise ServiceError(f"Extraction failed: {str(e)[:300]}", status=500)
+        return {'upload_id': upload_id, 'report_type': record.report_type, **extracted}
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.finished_at is None)
+
+    def submit_job(self, soil_upload_id: str, leaf_upload_id: str,
+                   land_yield_data: Optional[Dict[str, Any]] = None, quick: bool = False,
+                   include_pdf: bool = True, prompt_text: Optional[str] = None) -> JobRecord:
+        """Queue an extract -> analyse -> PDF job for a soil/leaf upload pair"""
+        soil = self.get_upload(soil_upload_id)
+        leaf = self.get_upload(leaf_upload_id)
+        if soil.report_type != 'soil' or leaf.report_type != 'leaf':
+            raise ServiceError("soil_upload_id must be a soil report and leaf_upload_id a leaf report")
+        if self.pending_count() >= self.settings.max_pending:
+            raise ServiceError("Too many jobs in progress, retry later", status=429)
+
+        llm_mode = LLM_MODE_NONE if quick else self.settings.llm_mode
+        job = JobRecord(job_id=uuid.uuid4().hex, soil_upload_id=soil_upload_id, leaf_upload_id=leaf_upload_id,
+                        llm_mode=llm_mode, land_yield_data=dict(land_yield_data or {}))
+        batch_job = BatchJob(job_id=job.job_id, soil_path=soil.path, leaf_path=leaf.path,
+                             land_yield_data=job.land_yield_data)
+        options = BatchOptions(output_dir=self.jobs_dir, llm_mode=llm_mode,
+                               prompt_text=prompt_text or self.settings.prompt_text or DEFAULT_PROMPT,
+                               workers=self.settings.workers, write_pdf=include_pdf,
+                               fake_latency=self.settings.fake_latency)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            job.future = self._executor().submit(process_job, batch_job, options)
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job: JobRecord, future: Future):
+        try:
+            row = future.result()
+        except Exception as e:
+            # Worker process died or the pool was shut down
+            row = {'job_id': job.job_id, 'status': STATUS_FAILED, 'error': f"Worker failed: {str(e)[:300]}"}
+        with self._lock:
+            job.row = row
+            job.finished_at = time.time()
+            job.future = None
+        self.logger.info(f"Job {job.job_id} {job.status} in {row.get('total_s', '?')}s")
+
+    def get_job(self, job_id: str) -> JobRecord:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ServiceError(f"Job '{job_id}' not found", status=404)
+        return job
+
+    def job_output(self, job_id: str, name: str) -> str:
+        """Path of a finished job's 'analysis' JSON or 'pdf' report"""
+        job = self.get_job(job_id)
+        if job.status not in FINISHED_STATES:
+            raise ServiceError(f"Job '{job_id}' is {job.status}", status=409)
+        path = job.output(name)
+        if path is None:
+            raise ServiceError(f"Job '{job_id}' has no {name} output", status=404)
+        return path
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)[:limit]
+        return [job.to_dict() for job in jobs]
+
+    # ------------------------------------------------------------------
+    # Housekeeping
+    # ------------------------------------------------------------------
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop finished jobs and uploads older than the retention period (and their files)"""
+        cutoff = (now or time.time()) - self.settings.retention_s
+        with self._lock:
+            in_use = {upload_id for job in self._jobs.values() if job.finished_at is None
+                      for upload_id in (job.soil_upload_id, job.leaf_upload_id)}
+            old_jobs = [job_id for job_id, job in self._jobs.items()
+                        if job.finished_at is not None and job.finished_at < cutoff]
+            old_uploads = [upload_id for upload_id, upload in self._uploads.items()
+                           if upload.created_at < cutoff and upload_id not in in_use]
+            for job_id in old_jobs:
+                del self._jobs[job_id]
+            for upload_id in old_uploads:
+                del self._uploads[upload_id]
+        for directory in [os.path.join(self.jobs_dir, job_id) for job_id in old_jobs] + \
+                [os.path.join(self.uploads_dir, upload_id) for upload_id in old_uploads]:
+            shutil.rmtree(directory, ignore_errors=True)
+        return len(old_jobs) + len(old_uploads)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.status] = states.get(job.status, 0) + 1
+            uploads = len(self._uploads)
+        return {
+            'status': 'ok' if self._pool is not None else 'stopped',
+            'workers': self.settings.workers,
+            'llm_mode': self.settings.llm_mode,
+            'max_pending': self.settings.max_pending,
+            'jobs': states,
+            'uploads': uploads,
+        }
@@ -0,0 +1,307 @@
+"""
+Analysis Storage Layout for Firestore
+Stores large analysis results as a small summary document plus per-step and
+per-section parts, with a manifest describing where every part lives. Parts
+that are too large for a Firestore document are written as gzip-compressed
+JSON blobs to Cloud Storage. Readers load the summary and fetch the parts it lists.
+"""
+
+import gzip
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from utils.analysis_schema import (
+    ANALYSIS_DOCUMENT_SCHEMA, ANALYSIS_RESULTS_SCHEMA, STEP_SCHEMA, decode, encode)
+from utils.tracing import STAGE_FIRESTORE, traced
+
+logger = logging.getLogger(__name__)
+
+STORAGE_FORMAT_VERSION = 2
+
+# Subcollections under analysis_results/{result_id}
+STEPS_SUBCOLLECTION = 'steps'
+SECTIONS_SUBCOLLECTION = 'sections'
+
+# Top-level analysis_results keys that are always stored outside the summary document
+HEAVY_SECTIONS = [
+    'raw_data', 'raw_ocr_data', 'soil_samples', 'leaf_samples', 'soil_tables', 'leaf_tables',
+    'economic_forecast', 'issues_analysis', 'preprocessing_results', 'prompt_used',
+    'learning_insights'
+]
+
+# Any other section whose encoded size exceeds this is moved out of the summary
+INLINE_SECTION_LIMIT_BYTES = 16 * 1024
+
+# Parts larger than this are offloaded to Cloud Storage instead of a subdocument
+# (Firestore documents are limited to 1 MiB including field names)
+BLOB_THRESHOLD_BYTES = 900 * 1024
+
+# Firestore allows at most 500 operations in a single batch
+MAX_BATCH_OPERATIONS = 450
+
+
+def prepare_for_firestore(data: Any) -> Any:
+    """Convert data into Firestore-compatible types in a single pass (no schema)"""
+    return encode(data)
+
+
+def _encode_json(data: Any) -> bytes:
+    return json.dumps(data, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def analysis_report_types(analysis_results: Dict[str, Any]) -> List[str]:
+    """Report types that actually have extracted parameters in an analysis"""
+    raw_data = (analysis_results or {}).get('raw_data', {}) or {}
+    return [report_type for report_type in ('soil', 'leaf')
+            if (raw_data.get(f'{report_type}_parameters') or {}).get('parameter_statistics')]
+
+
+def _summarize_analysis(analysis_results: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact counts used by listings and dashboards"""
+    metadata = analysis_results.get('analysis_metadata', {}) or {}
+    issues = (analysis_results.get('issues_analysis', {}) or {}).get('all_issues', []) or []
+    recommendations = analysis_results.get('recommendations', []) or []
+    steps = analysis_results.get('step_by_step_analysis', []) or []
+    return {
+        'total_issues': len(issues) if isinstance(issues, list) else 0,
+        'critical_issues': metadata.get('critical_issues', 0),
+        'total_recommendations': len(recommendations) if isinstance(recommendations, list) else 0,
+        'step_count': len(steps) if isinstance(steps, list) else 0,
+        'processing_time_seconds': metadata.get('processing_time_seconds', 0),
+        'data_quality_score': metadata.get('data_quality_score', 0),
+        'report_types': analysis_report_types(analysis_results),
+    }
+
+
+class AnalysisDocumentStore:
+    """Reads and writes analysis results using the chunked storage layout.
+
+    Layout for ``analysis_results/{result_id}``:
+        - summary document: request metadata, light analysis sections, counts
+          and a ``storage_manifest`` listing every part
+        - ``steps/step_{n}``: one subdocument per step of step_by_step_analysis
+        - ``sections/{name}``: heavy top-level sections
+        - Cloud Storage ``analysis_results/{result_id}/{part}.json.gz`` for parts
+          too large for a document
+    """
+
+    def __init__(self, db, collection: str = 'analysis_results', bucket=None):
+        self.db = db
+        self.collection = collection
+        self._bucket = bucket
+        self.logger = logging.getLogger(f"{__name__}.AnalysisDocumentStore")
+
+    # ----- writing -----
+
+    @traced(STAGE_FIRESTORE, 'firestore.save_analysis')
+    def save(self, result_id: str, document_fields: Dict[str, Any],
+             analysis_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Store an analysis and return its manifest.
+
+        Args:
+            result_id: Document ID of the analysis
+            document_fields: Top-level fields (user, timestamps, status, ...)
+            analysis_results: Full analysis results tree
+
+        Returns:
+            Dict: The manifest written to the summary document
+        """
+        analysis_results = encode(analysis_results or {}, ANALYSIS_RESULTS_SCHEMA)
+        doc_ref = self.db.collection(self.collection).document(result_id)
+
+        light_results = {}
+        parts = []
+        manifest = {'version': STORAGE_FORMAT_VERSION, 'steps': [], 'sections': []}
+
+        for key, value in analysis_results.items():
+            if key == 'step_by_step_analysis':
+                continue
+            encoded = _encode_json(value)
+            if key in HEAVY_SECTIONS or len(encoded) > INLINE_SECTION_LIMIT_BYTES:
+                entry = self._plan_part(doc_ref, result_id, SECTIONS_SUBCOLLECTION, key,
+                                        {'name': key, 'data': value}, encoded)
+                manifest['sections'].append(entry)
+                parts.append(entry)
+            else:
+                light_results[key] = value
+
+        steps = analysis_results.get('step_by_step_analysis', []) or []
+        for index, step in enumerate(steps):
+            part_id = f"step_{index + 1}"
+            payload = {'index': index, 'data': step}
+            entry = self._plan_part(doc_ref, result_id, STEPS_SUBCOLLECTION, part_id,
+                                    payload, _encode_json(step))
+            if isinstance(step, dict):
+                entry['step_number'] = step.get('step_number', index + 1)
+                entry['step_title'] = step.get('step_title', '')
+            manifest['steps'].append(entry)
+            parts.append(entry)
+
+        summary_doc = dict(encode(document_fields, ANALYSIS_DOCUMENT_SCHEMA))
+        summary_doc['analysis_results'] = light_results
+        summary_doc['summary'] = _summarize_analysis(analysis_results)
+        summary_doc['storage_manifest'] = {
+            'version': manifest['version'],
+            'steps': [self._manifest_entry(e) for e in manifest['steps']],
+            'sections': [self._manifest_entry(e) for e in manifest['sections']],
+        }
+
+        self._write_parts(doc_ref, parts, summary_doc)
+        self.logger.info(f"Stored analysis {result_id} as {len(parts)} parts "
+                         f"({sum(1 for p in parts if p['kind'] == 'blob')} offloaded to storage)")
+        return summary_doc['storage_manifest']
+
+    def _plan_part(self, doc_ref, result_id: str, subcollection: str, part_id: str,
+                   payload: Dict[str, Any], encoded: bytes) -> Dict[str, Any]:
+        entry = {
+            'id': part_id,
+            'subcollection': subcollection,
+            'size_bytes': len(encoded),
+            'kind': 'subdoc',
+            'payload': payload,
+        }
+        if len(encoded) > BLOB_THRESHOLD_BYTES and self.bucket is not None:
+            entry['kind'] = 'blob'
+            entry['path'] = f"{self.collection}/{result_id}/{subcollection}/{part_id}.json.gz"
+            entry['encoding'] = 'gzip+json'
+            entry['compressed'] = gzip.compress(encoded)
+        elif len(encoded) > BLOB_THRESHOLD_BYTES:
+            self.logger.warning(f"Part {subcollection}/{part_id} is {len(encoded)} bytes and no storage "
+                                f"bucket is available; writing it as a subdocument")
+        return entry
+
+    @staticmethod
+    def _manifest_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in entry.items() if k not in ('payload', 'compressed')}
+
+    def _write_parts(self, doc_ref, parts: List[Dict[str, Any]], summary_doc: Dict[str, Any]):
+        """Upload blobs, then write subdocuments and the summary in batches.
+
+        The summary (which carries the manifest) is written in the last batch so
+        readers never see a manifest pointing at parts that do not exist yet.
+        """
+        for part in parts:
+            if part['kind'] == 'blob':
+                blob = self.bucket.blob(part['path'])
+                blob.content_encoding = 'gzip'
+                blob.upload_from_string(part['compressed'], content_type='application/json')
+
+        batch = self.db.batch()
+        pending = 0
+        for part in parts:
+            part_ref = doc_ref.collection(part['subcollection']).document(part['id'])
+            if part['kind'] == 'blob':
+                part_doc = {'storage_path': part['path'], 'encoding': part['encoding'],
+                            'size_bytes': part['size_bytes']}
+            else:
+                part_doc = part['payload']
+            batch.set(part_ref, part_doc)
+            pending += 1
+            if pending >= MAX_BATCH_OPERATIONS:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+
+        batch.set(doc_ref, summary_doc)
+        batch.commit()
+
+    # ----- reading -----
+
+    @traced(STAGE_FIRESTORE, 'firestore.load_summary')
+    def load_summary(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Load only the summary document"""
+        doc = self.db.collection(self.collection).document(result_id).get()
+        if not doc.exists:
+            return None
+        data = decode(doc.to_dict(), ANALYSIS_DOCUMENT_SCHEMA)
+        data['id'] = doc.id
+        return data
+
+    def load_step(self, result_id: str, step_index: int) -> Optional[Dict[str, Any]]:
+        """Load a single step (0-based index into step_by_step_analysis)"""
+        doc_ref = self.db.collection(self.collection).document(result_id)
+        return decode(self._load_part(doc_ref, STEPS_SUBCOLLECTION, f"step_{step_index + 1}"), STEP_SCHEMA)
+
+    def load_section(self, result_id: str, name: str) -> Any:
+        """Load a single heavy section (e.g. ``raw_data`` or ``economic_forecast``)"""
+        doc_ref = self.db.collection(self.collection).document(result_id)
+        return decode(self._load_part(doc_ref, SECTIONS_SUBCOLLECTION, name), ANALYSIS_RESULTS_SCHEMA.get(name))
+
+    @traced(STAGE_FIRESTORE, 'firestore.load_part',
+            attributes=lambda self, doc_ref, subcollection, part_id: {'part': f"{subcollection}/{part_id}"})
+    def _load_part(self, doc_ref, subcollection: str, part_id: str) -> Any:
+        return self._part_data(doc_ref.collection(subcollection).document(part_id).get())
+
+    def _part_data(self, doc) -> Any:
+        """Payload of a part snapshot, downloading it from Cloud Storage when offloaded"""
+        if doc is None or not doc.exists:
+            return None
+        part = doc.to_dict() or {}
+        if 'storage_path' in part:
+            if self.bucket is None:
+                self.logger.warning(f"Storage bucket unavailable, cannot load {part['storage_path']}")
+                return None
+            raw = self.bucket.blob(part['storage_path']).download_as_bytes()
+            try:
+                raw = gzip.decompress(raw)
+            except OSError:
+                # Some clients transparently decompress gzip-encoded blobs
+                pass
+            return json.loads(raw.decode('utf-8'))
+        return part.get('data')
+
+    @traced(STAGE_FIRESTORE, 'firestore.load_parts', attributes=lambda self, refs: {'parts': len(refs)})
+    def _get_all(self, refs: List[Any]) -> Dict[str, Any]:
+        """Fetch many part documents in one round trip, keyed by document path"""
+        if hasattr(self.db, 'get_all'):
+            snapshots = self.db.get_all(refs)
+        else:
+            snapshots = [ref.get() for ref in refs]
+        return {snapshot.reference.path: snapshot for snapshot in snapshots}
+
+    @traced(STAGE_FIRESTORE, 'firestore.load_analysis',
+            attributes=lambda self, summary_doc: {'result_id': summary_doc.get('id')})
+    def load_full(self, summary_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Reassemble the complete analysis_results tree from a summary document"""
+        manifest = summary_doc.get('storage_manifest', {}) or {}
+        results = decode(summary_doc.get('analysis_results', {}) or {}, ANALYSIS_RESULTS_SCHEMA)
+        doc_ref = self.db.collection(self.collection).document(summary_doc.get('id'))
+        section_refs = [doc_ref.collection(SECTIONS_SUBCOLLECTION).document(entry['id'])
+                        for entry in manifest.get('sections', [])]
+        step_refs = [doc_ref.collection(STEPS_SUBCOLLECTION).document(f"step_{index + 1}")
+                     for index in range(len(manifest.get('steps', [])))]
+        snapshots = self._get_all(section_refs + step_refs) if section_refs or step_refs else {}
+
+        for entry, ref in zip(manifest.get('sections', []), section_refs):
+            results[entry['id']] = decode(self._part_data(snapshots.get(ref.path)),
+                                          ANALYSIS_RESULTS_SCHEMA.get(entry['id']))
+        if step_refs:
+            results['step_by_step_analysis'] = [decode(self._part_data(snapshots.get(ref.path)), STEP_SCHEMA)
+                                                for ref in step_refs]
+        return results
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            try:
+                from utils.firebase_config import get_storage_bucket
+                self._bucket = get_storage_bucket()
+            except Exception as e:
+                self.logger.warning(f"Cloud Storage not available for analysis blobs: {e}")
+        return self._bucket
+
+
+def is_chunked_document(doc_data: Dict[str, Any]) -> bool:
+    """True when a stored analysis uses the summary + manifest layout"""
+    return isinstance(doc_data, dict) and isinstance(doc_data.get('storage_manifest'), dict)
+
+
+def load_step(analysis_id: str, n: int, db=None) -> Optional[Dict[str, Any]]:
+    """Load step n (1-based) of a stored analysis without fetching the other parts"""
+    if db is None:
+        from utils.firebase_config import get_firestore_client
+        db = get_firestore_client()
+    if not db:
+        return None
+    return AnalysisDocumentStore(db).load_step(analysis_id, n - 1)
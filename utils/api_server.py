@@ -0,0 +1,126 @@
+"""
+HTTP API
+Async FastAPI application over ``AnalysisJobService`` for machine-to-machine
+integrations that should not go through a Streamlit session. Analysis runs
+as background jobs: upload the soil and leaf reports, submit a job, poll
+its status, then fetch the analysis JSON and the PDF report.
+
+    GET  /v1/health                    worker pool and job counts
+    POST /v1/uploads                   multipart: file, report_type=soil|leaf
+    POST /v1/uploads/{id}/extract      extracted samples (analysis input shape)
+    POST /v1/jobs                      {soil_upload_id, leaf_upload_id, land_yield_data, quick, include_pdf}
+    GET  /v1/jobs                      recent jobs
+    GET  /v1/jobs/{id}                 status, sample counts, per-stage timings
+    GET  /v1/jobs/{id}/result          analysis JSON
+    GET  /v1/jobs/{id}/report.pdf      PDF report
+
+Requests must carry an ``X-API-Key`` header matching one of the
+comma-separated keys in AGS_AI_API_KEYS; when that variable is unset the API
+is open, which is only meant for local use. Run with
+``python scripts/serve_api.py`` (FastAPI, uvicorn and python-multipart are
+optional dependencies).
+"""
+
+import hmac
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+try:
+    from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, UploadFile
+    from fastapi.responses import FileResponse, JSONResponse
+    from pydantic import BaseModel, Field
+    from starlette.concurrency import run_in_threadpool
+    FASTAPI_AVAILABLE = True
+except ImportError:
+    FASTAPI_AVAILABLE = False
+
+from utils.analysis_service import AnalysisJobService, ServiceError, ServiceSettings
+
+logger = logging.getLogger(__name__)
+
+API_KEYS_ENV = 'AGS_AI_API_KEYS'
+
+
+def _configured_keys() -> list:
+    return [key.strip() for key in os.environ.get(API_KEYS_ENV, '').split(',') if key.strip()]
+
+
+def create_app(settings: Optional[ServiceSettings] = None) -> 'FastAPI':
+    """Build the API application (one job service and worker pool per app)"""
+    if not FASTAPI_AVAILABLE:
+        raise ImportError("The HTTP API needs fastapi, uvicorn and python-multipart installed")
+
+    service = AnalysisJobService(settings or ServiceSettings.from_env())
+    api_keys = _configured_keys()
+    if not api_keys:
+        logger.warning(f"{API_KEYS_ENV} is not set; the HTTP API accepts unauthenticated requests")
+
+    @asynccontextmanager
+    async def lifespan(app):
+        service.start()
+        try:
+            yield
+        finally:
+            service.shutdown(wait=False)
+
+    app = FastAPI(title="Ags-AI Analysis API", version="1.0", lifespan=lifespan)
+    app.state.service = service
+
+    @app.exception_handler(ServiceError)
+    async def _service_error(request, exc: ServiceError):
+        return JSONResponse(status_code=exc.status, content={'detail': str(exc)})
+
+    async def require_api_key(x_api_key: Optional[str] = Header(None)):
+        if api_keys and not any(hmac.compare_digest(x_api_key or '', key) for key in api_keys):
+            raise HTTPException(status_code=401, detail="Invalid or missing API key")
+
+    class JobRequest(BaseModel):
+        soil_upload_id: str
+        leaf_upload_id: str
+        land_yield_data: Dict[str, Any] = Field(default_factory=dict)
+        quick: bool = False
+        include_pdf: bool = True
+        prompt_text: Optional[str] = None
+
+    @app.get('/v1/health')
+    async def health():
+        return service.health()
+
+    @app.post('/v1/uploads', status_code=201, dependencies=[Depends(require_api_key)])
+    async def upload_report(file: UploadFile = File(...), report_type: str = Form(...)):
+        # Read one byte past the limit so oversized files are rejected without buffering them whole
+        content = await file.read(service.settings.max_upload_bytes + 1)
+        record = await run_in_threadpool(service.save_upload, report_type, file.filename or '', content)
+        return record.to_dict()
+
+    @app.post('/v1/uploads/{upload_id}/extract', dependencies=[Depends(require_api_key)])
+    async def extract_upload(upload_id: str):
+        return await service.extract(upload_id)
+
+    @app.post('/v1/jobs', status_code=202, dependencies=[Depends(require_api_key)])
+    async def submit_job(request: JobRequest):
+        job = await run_in_threadpool(
+            service.submit_job, request.soil_upload_id, request.leaf_upload_id,
+            request.land_yield_data, request.quick, request.include_pdf, request.prompt_text)
+        return job.to_dict()
+
+    @app.get('/v1/jobs', dependencies=[Depends(require_api_key)])
+    async def list_jobs(limit: int = 50):
+        return {'jobs': service.list_jobs(limit=max(1, min(limit, 500)))}
+
+    @app.get('/v1/jobs/{job_id}', dependencies=[Depends(require_api_key)])
+    async def job_status(job_id: str):
+        return service.get_job(job_id).to_dict()
+
+    @app.get('/v1/jobs/{job_id}/result', dependencies=[Depends(require_api_key)])
+    async def job_result(job_id: str):
+        return FileResponse(service.job_output(job_id, 'analysis'), media_type='application/json')
+
+    @app.get('/v1/jobs/{job_id}/report.pdf', dependencies=[Depends(require_api_key)])
+    async def job_report(job_id: str):
+        return FileResponse(service.job_output(job_id, 'pdf'), media_type='application/pdf',
+                            filename=f"ags_ai_report_{job_id}.pdf")
+
+    return app
@@ -0,0 +1,490 @@
+"""
+Batch Analysis Pipeline
+Headless version of the upload -> analysis -> PDF flow for running many
+estates at once without the Streamlit UI. A job pairs one soil report and
+one leaf report; each job is extracted with ``extract_data_from_image``,
+analysed with ``AnalysisEngine.generate_comprehensive_analysis`` and
+rendered with ``PDFReportGenerator.generate_report``. Jobs run across a
+process pool (one engine per worker), outputs are written per job, and a
+checkpoint file lets an interrupted batch resume where it stopped.
+
+LLM modes:
+    full  - real Gemini calls (needs API credentials)
+    none  - ANALYSIS_MODE_QUICK, no LLM calls
+    fake  - full pipeline against utils.fake_llm.FakeModelFactory (offline)
+"""
+
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.run_context import fingerprint
+
+logger = logging.getLogger(__name__)
+
+LLM_MODE_FULL = 'full'
+LLM_MODE_NONE = 'none'
+LLM_MODE_FAKE = 'fake'
+LLM_MODES = (LLM_MODE_FULL, LLM_MODE_NONE, LLM_MODE_FAKE)
+
+SUPPORTED_EXTENSIONS = ('.csv', '.txt', '.tsv', '.xlsx', '.xls', '.pdf', '.png', '.jpg', '.jpeg')
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+TIMINGS_FILE = 'timings.csv'
+ANALYSIS_FILE = 'analysis.json'
+REPORT_FILE = 'report.pdf'
+
+STATUS_OK = 'ok'
+# Outputs were written but every analysis step used fallback output (LLM unavailable)
+STATUS_DEGRADED = 'degraded'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+TIMING_FIELDS = ('job_id', 'status', 'llm_mode', 'soil_samples', 'leaf_samples', 'extract_soil_s',
+                 'extract_leaf_s', 'analyze_s', 'pdf_s', 'total_s', 'cpu_s', 'error')
+
+# Step outline used when no prompt file or active prompt is available
+DEFAULT_PROMPT = """Step 1: Analyze the Uploaded Data
+Interpret every soil and leaf parameter against MPOB standards.
+
+Step 2: Diagnose Agronomic Issues
+Identify nutrient deficiencies, imbalances and their likely causes.
+
+Step 3: Recommend Solutions
+Give high, medium and low investment options for each issue.
+
+Step 4: Regenerative Agriculture Strategies
+Recommend regenerative practices that address the identified issues.
+
+Step 5: Economic Impact Forecast
+Estimate costs, yield response and return on investment.
+
+Step 6: Forecast Graph
+Project yield over five years for each investment level.
+"""
+
+
+@dataclass
+class BatchJob:
+    """One estate: a soil report and a leaf report"""
+    job_id: str
+    soil_path: str
+    leaf_path: str
+    land_yield_data: Dict[str, Any] = field(default_factory=dict)
+
+    def input_fingerprint(self, llm_mode: str, prompt_text: str = '') -> str:
+        """Changes when either input file, the LLM mode or the analysis prompt changes"""
+        stamps = []
+        for path in (self.soil_path, self.leaf_path):
+            try:
+                stat = os.stat(path)
+                stamps.append((os.path.abspath(path), stat.st_size, int(stat.st_mtime)))
+            except OSError:
+                stamps.append((os.path.abspath(path), None, None))
+        return fingerprint(stamps, self.land_yield_data, llm_mode, prompt_text)
+
+
+@dataclass
+class BatchOptions:
+    output_dir: str
+    llm_mode: str = LLM_MODE_FULL
+    prompt_text: str = DEFAULT_PROMPT
+    workers: int = 1
+    write_pdf: bool = True
+    resume: bool = True
+    fake_latency: float = 0.0
+
+
+# ----------------------------------------------------------------------
+# Job discovery
+# ----------------------------------------------------------------------
+def _report_kind(path: str) -> Optional[str]:
+    """'soil' or 'leaf' from the file name, else from its directory names"""
+    name = os.path.basename(path).lower()
+    for kind in ('soil', 'leaf'):
+        if kind in name:
+            return kind
+    parts = [part.lower() for part in os.path.normpath(os.path.dirname(path)).split(os.sep)]
+    for kind in ('soil', 'leaf'):
+        if kind in parts:
+            return kind
+    return None
+
+
+def _pair_key(path: str, root: str) -> Tuple[str, str]:
+    """Key shared by a soil file and its leaf file (kind words removed from dir and name)"""
+    relative_dir = os.path.relpath(os.path.dirname(path), root)
+    parts = [part for part in relative_dir.split(os.sep) if part.lower() not in ('soil', 'leaf', '.')]
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    for word in ('soil', 'leaf'):
+        stem = stem.replace(word, '')
+    return '/'.join(parts), stem.strip('_- ')
+
+
+def discover_jobs(root: str) -> List[BatchJob]:
+    """
+    Pair soil and leaf reports under a directory
+
+    A soil and a leaf file are paired when they share a directory (ignoring
+    'soil'/'leaf' folders) and their names match once 'soil'/'leaf' is
+    removed, e.g. soil/soil_table_1.csv + leaf/leaf_table_1.csv, or
+    estate_a/soil.pdf + estate_a/leaf.pdf.
+    """
+    found: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for directory, _, files in os.walk(root):
+        for filename in sorted(files):
+            path = os.path.join(directory, filename)
+            if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            kind = _report_kind(os.path.relpath(path, root))
+            if kind:
+                found.setdefault(_pair_key(path, root), {}).setdefault(kind, path)
+
+    jobs = []
+    for (directory, stem), paths in sorted(found.items()):
+        if 'soil' in paths and 'leaf' in paths:
+            job_id = '_'.join(part for part in (directory.replace('/', '_'), stem) if part) or 'job'
+            jobs.append(BatchJob(job_id=job_id, soil_path=paths['soil'], leaf_path=paths['leaf']))
+        else:
+            logger.warning(f"Unpaired report(s) skipped: {sorted(paths.values())}")
+    return _unique_ids(jobs)
+
+
+def load_manifest(path: str) -> List[BatchJob]:
+    """
+    Jobs from a manifest file
+
+    CSV columns: job_id, soil, leaf and optionally land_size, land_unit,
+    current_yield, yield_unit. JSON: a list of objects with the same keys.
+    Relative paths are resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as handle:
+            rows = json.load(handle)
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as handle:
+            rows = list(csv.DictReader(handle))
+
+    jobs = []
+    for index, row in enumerate(rows, 1):
+        land_yield = {}
+        for key in ('land_size', 'current_yield'):
+            if row.get(key) not in (None, ''):
+                land_yield[key] = float(row[key])
+        for key in ('land_unit', 'yield_unit'):
+            if row.get(key):
+                land_yield[key] = row[key]
+        jobs.append(BatchJob(
+            job_id=str(row.get('job_id') or f"job_{index}"),
+            soil_path=os.path.join(base, row['soil']),
+            leaf_path=os.path.join(base, row['leaf']),
+            land_yield_data=land_yield,
+        ))
+    return _unique_ids(jobs)
+
+
+def _unique_ids(jobs: List[BatchJob]) -> List[BatchJob]:
+    seen: Dict[str, int] = {}
+    for job in jobs:
+        count = seen.get(job.job_id, 0)
+        seen[job.job_id] = count + 1
+        if count:
+            job.job_id = f"{job.job_id}_{count + 1}"
+    return jobs
+
+
+# ----------------------------------------------------------------------
+# Extraction -> analysis input
+# ----------------------------------------------------------------------
+def _flatten_sample(sample: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """One extracted sample as a flat {parameter: value} row"""
+    if 'data' in sample and isinstance(sample['data'], dict):
+        sample_id = sample.get('sample_id', index)
+        return {'sample_no': sample_id, 'lab_no': sample_id, **sample['data']}
+
+    row = {'sample_no': index, 'lab_no': str(index)}
+    for key, value in sample.items():
+        if key == '% Dry Matter' and isinstance(value, dict):
+            row.update({f"{nutrient} (%)": v for nutrient, v in value.items()})
+        elif key == 'mg/kg Dry Matter' and isinstance(value, dict):
+            row.update({f"{nutrient} (mg/kg)": v for nutrient, v in value.items()})
+        elif key in ('Sample No.', 'sample_no'):
+            row['sample_no'] = value
+        elif key in ('Lab No.', 'lab_no'):
+            row['lab_no'] = value
+        elif not isinstance(value, dict):
+            row[key] = value
+    return row
+
+
+def analysis_input_from_extraction(extraction: Dict[str, Any], report_type: str) -> Dict[str, Any]:
+    """Shape an extract_data_from_image result like the upload page does for the engine"""
+    samples = []
+    if isinstance(extraction, dict) and extraction.get('success'):
+        tables = [t for t in extraction.get('tables', []) if isinstance(t, dict)]
+        matching = [t for t in tables if t.get('type') == report_type] or tables
+        for table in matching:
+            for sample in table.get('samples', []):
+                if isinstance(sample, dict):
+                    samples.append(_flatten_sample(sample, len(samples) + 1))
+    return {
+        'success': bool(samples),
+        'data': {'samples': samples, 'total_samples': len(samples)},
+    }
+
+
+# ----------------------------------------------------------------------
+# Worker
+# ----------------------------------------------------------------------
+_worker_engine = None
+
+
+def _init_worker(llm_mode: str, fake_latency: float = 0.0):
+    """Build one AnalysisEngine per worker process"""
+    global _worker_engine
+    from utils.analysis_engine import AnalysisEngine
+    _worker_engine = AnalysisEngine()
+    if llm_mode == LLM_MODE_FAKE:
+        from utils.fake_llm import FakeModelFactory
+        _worker_engine.prompt_analyzer.use_model_factory(FakeModelFactory(default_latency=fake_latency, seed=0))
+
+
+def _init_pool_worker(llm_mode: str, fake_latency: float = 0.0):
+    """Pool initializer: a failure here would break the whole pool, so defer it to the job"""
+    try:
+        _init_worker(llm_mode, fake_latency)
+    except Exception as e:
+        logger.error(f"Worker engine initialisation failed: {str(e)}")
+
+
+def extract_report(path: str, report_type: str) -> Dict[str, Any]:
+    """Extract one soil or leaf report into engine input (picklable, runs in workers)"""
+    from utils.ocr_utils import extract_data_from_image
+    return analysis_input_from_extraction(extract_data_from_image(path), report_type)
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def process_job(job: BatchJob, options: BatchOptions) -> Dict[str, Any]:
+    """
+    Extract, analyse and render one job; never raises
+
+    Returns:
+        Timing row (see TIMING_FIELDS) plus 'fingerprint' and 'outputs'
+    """
+    row: Dict[str, Any] = {'job_id': job.job_id, 'status': STATUS_FAILED, 'llm_mode': options.llm_mode,
+                           'fingerprint': job.input_fingerprint(options.llm_mode, options.prompt_text),
+                           'outputs': {}}
+    job_dir = os.path.join(options.output_dir, job.job_id)
+    started, cpu_started = time.perf_counter(), time.process_time()
+
+    def _timed(name: str, func: Callable[[], Any]) -> Any:
+        stage_start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            row[f"{name}_s"] = round(time.perf_counter() - stage_start, 3)
+
+    try:
+        from utils.analysis_engine import ANALYSIS_MODE_FULL, ANALYSIS_MODE_QUICK
+        if _worker_engine is None:
+            _init_worker(options.llm_mode, options.fake_latency)
+        os.makedirs(job_dir, exist_ok=True)
+        soil = _timed('extract_soil', lambda: extract_report(job.soil_path, 'soil'))
+        leaf = _timed('extract_leaf', lambda: extract_report(job.leaf_path, 'leaf'))
+        row['soil_samples'] = soil['data']['total_samples']
+        row['leaf_samples'] = leaf['data']['total_samples']
+        if not soil['success'] and not leaf['success']:
+            raise ValueError("No samples could be extracted from either report")
+
+        mode = ANALYSIS_MODE_QUICK if options.llm_mode == LLM_MODE_NONE else ANALYSIS_MODE_FULL
+        analysis = _timed('analyze', lambda: _worker_engine.generate_comprehensive_analysis(
+            soil_data=soil, leaf_data=leaf, land_yield_data=job.land_yield_data,
+            prompt_text=options.prompt_text, analysis_mode=mode))
+        if not isinstance(analysis, dict) or analysis.get('success') is False:
+            raise RuntimeError((analysis or {}).get('error', 'Analysis failed') if isinstance(analysis, dict)
+                               else 'Analysis returned no result')
+
+        analysis_path = os.path.join(job_dir, ANALYSIS_FILE)
+        with open(analysis_path, 'w', encoding='utf-8') as handle:
+            json.dump(analysis, handle, default=_json_default, ensure_ascii=False)
+        row['outputs']['analysis'] = analysis_path
+
+        if options.write_pdf:
+            pdf_bytes = _timed('pdf', lambda: render_pdf(analysis, job))
+            if pdf_bytes:
+                pdf_path = os.path.join(job_dir, REPORT_FILE)
+                with open(pdf_path, 'wb') as handle:
+                    handle.write(pdf_bytes)
+                row['outputs']['pdf'] = pdf_path
+            else:
+                raise RuntimeError("PDF generation returned no data")
+
+        if _all_steps_fell_back(analysis, options.llm_mode):
+            row['status'] = STATUS_DEGRADED
+            row['error'] = "Every analysis step used fallback output (LLM unavailable)"
+        else:
+            row['status'] = STATUS_OK
+    except Exception as e:
+        logger.error(f"Batch job {job.job_id} failed: {str(e)}")
+        row['error'] = str(e)[:500]
+
+    row['total_s'] = round(time.perf_counter() - started, 3)
+    row['cpu_s'] = round(time.process_time() - cpu_started, 3)
+    return row
+
+
+def _all_steps_fell_back(analysis: Dict[str, Any], llm_mode: str) -> bool:
+    if llm_mode == LLM_MODE_NONE:
+        return False
+    steps = analysis.get('step_by_step_analysis') or []
+    fallback_steps = (analysis.get('system_health') or {}).get('fallback_steps_used', 0)
+    return bool(steps) and fallback_steps >= len(steps)
+
+
+def render_pdf(analysis: Dict[str, Any], job: BatchJob) -> Optional[bytes]:
+    """PDF with the same sections as the results page download"""
+    from utils.pdf_utils import PDFReportGenerator
+    metadata = {
+        'title': f"Agricultural Analysis Report - {job.job_id}",
+        'timestamp': analysis.get('analysis_metadata', {}).get('timestamp'),
+        'include_timestamp': True,
+    }
+    options = {
+        'include_economic': False,
+        'include_forecast': False,
+        'include_charts': True,
+        'include_raw_data': True,
+        'include_summary': True,
+        'include_key_findings': True,
+        'include_step_analysis': True,
+        'include_references': False,
+        'include_all_details': True,
+    }
+    return PDFReportGenerator().generate_report(analysis, metadata, options)
+
+
+# ----------------------------------------------------------------------
+# Checkpoints and timings
+# ----------------------------------------------------------------------
+def load_checkpoint(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Latest checkpoint record per job id"""
+    records: Dict[str, Dict[str, Any]] = {}
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A partially written last line from an interrupted run
+                continue
+            records[record.get('job_id')] = record
+    return records
+
+
+def is_complete(job: BatchJob, record: Optional[Dict[str, Any]], llm_mode: str, prompt_text: str = '') -> bool:
+    """Done in an earlier run with the same inputs, and its outputs still exist"""
+    if not record or record.get('status') != STATUS_OK:
+        return False
+    if record.get('fingerprint') != job.input_fingerprint(llm_mode, prompt_text):
+        return False
+    return all(os.path.exists(path) for path in (record.get('outputs') or {}).values())
+
+
+class BatchRecorder:
+    """Appends checkpoint records and timing rows as jobs finish (parent process only)"""
+
+    def __init__(self, output_dir: str):
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.timings_path = os.path.join(output_dir, TIMINGS_FILE)
+
+    def record(self, row: Dict[str, Any]):
+        with open(self.checkpoint_path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(row, default=str) + '\n')
+            handle.flush()
+            os.fsync(handle.fileno())
+        new_file = not os.path.exists(self.timings_path)
+        with open(self.timings_path, 'a', encoding='utf-8', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=TIMING_FIELDS, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            writer.writerow({name: row.get(name, '') for name in TIMING_FIELDS})
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+def run_batch(jobs: Iterable[BatchJob], options: BatchOptions,
+              on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Run jobs across a process pool
+
+    Returns:
+        Summary with counts per status, wall time and the result rows
+    """
+    if options.llm_mode not in LLM_MODES:
+        raise ValueError(f"Unknown LLM mode '{options.llm_mode}' (expected one of {LLM_MODES})")
+    jobs = list(jobs)
+    recorder = BatchRecorder(options.output_dir)
+    checkpoint = load_checkpoint(options.output_dir) if options.resume else {}
+
+    pending, rows = [], []
+    for job in jobs:
+        if options.resume and is_complete(job, checkpoint.get(job.job_id), options.llm_mode, options.prompt_text):
+            rows.append(dict(checkpoint[job.job_id], status=STATUS_SKIPPED))
+        else:
+            pending.append(job)
+    if len(pending) < len(jobs):
+        logger.info(f"Resuming: {len(jobs) - len(pending)} job(s) already complete")
+
+    def _finish(row: Dict[str, Any]):
+        recorder.record(row)
+        rows.append(row)
+        if on_result:
+            on_result(row)
+
+    started = time.perf_counter()
+    if options.workers <= 1:
+        _init_pool_worker(options.llm_mode, options.fake_latency)
+        for job in pending:
+            _finish(process_job(job, options))
+    elif pending:
+        with ProcessPoolExecutor(max_workers=options.workers, initializer=_init_pool_worker,
+                                 initargs=(options.llm_mode, options.fake_latency)) as pool:
+            futures = {pool.submit(process_job, job, options): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    # Worker process died (e.g. out of memory); record and continue
+                    row = {'job_id': job.job_id, 'status': STATUS_FAILED, 'llm_mode': options.llm_mode,
+                           'error': f"Worker failed: {str(e)[:300]}"}
+                _finish(row)
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row.get('status', STATUS_FAILED)] = counts.get(row.get('status', STATUS_FAILED), 0) + 1
+    return {
+        'jobs': len(jobs),
+        'counts': counts,
+        'wall_s': round(time.perf_counter() - started, 3),
+        'rows': rows,
+    }
@@ -0,0 +1,227 @@
+"""
+Configuration Snapshot Cache
+Loads the active analysis prompt, AI configuration, output formatting,
+tagging and advanced settings once and hands out an immutable snapshot.
+Firestore on_snapshot listeners (or, when listeners are unavailable, a short
+refresh interval) mark the snapshot stale so edits made in the admin panel
+are picked up without every analysis and rerun re-reading Firestore.
+"""
+
+import copy
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional
+
+try:
+    from google.cloud.firestore import FieldFilter
+except ImportError:
+    FieldFilter = None
+
+from utils.firebase_config import COLLECTIONS, get_firestore_client
+
+logger = logging.getLogger(__name__)
+
+# Without listeners, re-read configuration at most this often
+POLL_INTERVAL_SECONDS = 30
+
+# Documents under the 'ai_config' collection that make up the snapshot
+AI_CONFIG_COLLECTION = 'ai_config'
+SETTINGS_DOCUMENTS = {
+    'output_formatting': 'output_formatting',
+    'tagging': 'tagging_system',
+    'advanced_settings': 'advanced_settings',
+}
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Deep, mutable copy of a frozen value (dicts and lists again)"""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return copy.deepcopy(value)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of all analysis-related configuration at one point in time"""
+    version: int
+    loaded_at: datetime
+    active_prompt: Optional[MappingProxyType] = None
+    ai_configuration: Optional[MappingProxyType] = None
+    settings: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def get_active_prompt(self) -> Optional[Dict[str, Any]]:
+        """Mutable copy of the active prompt, safe to modify per request"""
+        return thaw(self.active_prompt) if self.active_prompt is not None else None
+
+    def get_ai_configuration(self) -> Optional[Dict[str, Any]]:
+        return thaw(self.ai_configuration) if self.ai_configuration is not None else None
+
+    def get_setting(self, name: str) -> Optional[Dict[str, Any]]:
+        value = self.settings.get(name)
+        return thaw(value) if value is not None else None
+
+
+class ConfigSnapshotStore:
+    """Process-wide holder of the current ConfigSnapshot"""
+
+    def __init__(self, db=None, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self._db = db
+        self.poll_interval = poll_interval
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._version = 0
+        self._stale = True
+        self._loaded_monotonic = 0.0
+        self._lock = threading.Lock()
+        self._watches: List[Any] = []
+        self._listening = False
+        self._listeners_failed = False
+        self.logger = logging.getLogger(f"{__name__}.ConfigSnapshotStore")
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_firestore_client()
+        return self._db
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _load_active_prompt(self, db) -> Optional[Dict[str, Any]]:
+        prompts_ref = db.collection(COLLECTIONS['analysis_prompts'])
+        if FieldFilter is not None:
+            query = prompts_ref.where(filter=FieldFilter('is_active', '==', True))
+        else:
+            query = prompts_ref.where('is_active', '==', True)
+        for doc in query.limit(1).stream():
+            prompt_data = doc.to_dict() or {}
+            prompt_data['id'] = doc.id
+            return prompt_data
+        return None
+
+    def _load_document(self, db, collection: str, document: str) -> Optional[Dict[str, Any]]:
+        snapshot = db.collection(collection).document(document).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def _load(self) -> ConfigSnapshot:
+        db = self.db
+        if not db:
+            self._version += 1
+            return ConfigSnapshot(version=self._version, loaded_at=datetime.now())
+
+        active_prompt = self._load_active_prompt(db)
+        # Read-only: a missing configuration document is not seeded from here
+        ai_configuration = self._load_document(db, COLLECTIONS['ai_configuration'], 'default')
+        settings = {name: self._load_document(db, AI_CONFIG_COLLECTION, document)
+                    for name, document in SETTINGS_DOCUMENTS.items()}
+
+        self._version += 1
+        return ConfigSnapshot(
+            version=self._version,
+            loaded_at=datetime.now(),
+            active_prompt=freeze(active_prompt) if active_prompt is not None else None,
+            ai_configuration=freeze(ai_configuration) if ai_configuration is not None else None,
+            settings=freeze({name: value for name, value in settings.items() if value is not None}),
+        )
+
+    # ------------------------------------------------------------------
+    # Change detection
+    # ------------------------------------------------------------------
+    def _on_change(self, initial: List[bool]):
+        def _callback(docs, changes, read_time):
+            # The first callback of each watch delivers the current state
+            if initial[0]:
+                initial[0] = False
+                return
+            self.invalidate()
+        return _callback
+
+    def _start_listeners(self, db):
+        if self._listening or self._listeners_failed or not db:
+            return
+        try:
+            prompts_ref = db.collection(COLLECTIONS['analysis_prompts'])
+            targets = [
+                prompts_ref.where(filter=FieldFilter('is_active', '==', True)) if FieldFilter is not None
+                else prompts_ref.where('is_active', '==', True),
+                db.collection(COLLECTIONS['ai_configuration']).document('default'),
+            ] + [db.collection(AI_CONFIG_COLLECTION).document(document)
+                 for document in SETTINGS_DOCUMENTS.values()]
+            for target in targets:
+                if not hasattr(target, 'on_snapshot'):
+                    raise AttributeError('on_snapshot not supported')
+                self._watches.append(target.on_snapshot(self._on_change([True])))
+            self._listening = True
+            self.logger.info("Configuration listeners started")
+        except Exception as e:
+            self.logger.warning(f"Configuration listeners unavailable, polling every "
+                                f"{self.poll_interval}s instead: {str(e)}")
+            self.stop()
+            self._listeners_failed = True
+
+    def stop(self):
+        """Unsubscribe all listeners"""
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+        self._watches = []
+        self._listening = False
+
+    def invalidate(self):
+        """Mark the snapshot stale; the next get() reloads it"""
+        self._stale = True
+
+    def _needs_reload(self) -> bool:
+        if self._snapshot is None or self._stale:
+            return True
+        if not self._listening:
+            return time.monotonic() - self._loaded_monotonic >= self.poll_interval
+        return False
+
+    def get(self) -> ConfigSnapshot:
+        """Current snapshot; reloads only when something changed"""
+        if not self._needs_reload():
+            return self._snapshot
+        with self._lock:
+            if self._needs_reload():
+                try:
+                    self._stale = False
+                    self._snapshot = self._load()
+                    self._loaded_monotonic = time.monotonic()
+                    self._start_listeners(self.db)
+                except Exception as e:
+                    self.logger.error(f"Error loading configuration snapshot: {str(e)}")
+                    if self._snapshot is None:
+                        self._version += 1
+                        self._snapshot = ConfigSnapshot(version=self._version, loaded_at=datetime.now())
+                    self._stale = True
+            return self._snapshot
+
+
+config_snapshot_store = ConfigSnapshotStore()
+
+
+def get_config_snapshot() -> ConfigSnapshot:
+    """Current immutable configuration snapshot"""
+    return config_snapshot_store.get()
+
+
+def invalidate_config_snapshot():
+    """Call after writing any configuration so this process sees it immediately"""
+    config_snapshot_store.invalidate()
@@ -0,0 +1,213 @@
+"""
+Economic Scenario Simulation
+Vectorized Monte Carlo engine for the 5-year economic forecast. All
+investment scenarios are evaluated in one NumPy pass over thousands of draws
+of FFB price, yield response, initial cost and maintenance cost, giving
+percentile bands for yearly net profit, ROI, cumulative profit and payback
+period as plain numbers (no "15.0-20.0 t/ha" strings to parse back).
+
+The deterministic low/high projection used by the report tables is computed
+by the same vectorized code (``project_ranges``) so both stay consistent.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+YEARS = 5
+DEFAULT_DRAWS = 5000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# FFB price range, RM per tonne (Malaysian market)
+FFB_PRICE_RANGE = (650.0, 750.0)
+
+# Share of the full yield response reached in each year (low, high)
+YIELD_PROGRESSION = (
+    (0.85, 0.95),
+    (0.95, 1.0),
+    (0.98, 1.0),
+    (0.95, 0.98),
+    (0.92, 0.95),
+)
+
+# Maintenance cost per ha/year after the initial investment, by scenario
+BASE_MAINTENANCE_COST_PER_HA = {'high': 600.0, 'medium': 400.0, 'low': 250.0}
+# Years 2-5 relative to base maintenance (palms need more as they mature)
+MAINTENANCE_MULTIPLIERS = (0.0, 1.0, 1.1, 1.1, 1.05)
+# Spread applied to maintenance cost in the simulation
+MAINTENANCE_VARIATION = (0.9, 1.15)
+
+YEARLY_ROI_CAP = 300.0
+FIVE_YEAR_ROI_CAP = 200.0
+
+
+@dataclass
+class ScenarioInputs:
+    """Ranges for one investment scenario (per hectare)"""
+    level: str
+    yield_increase: Tuple[float, float]   # fractional increase over current yield
+    cost_per_ha: Tuple[float, float]      # initial investment
+    maintenance_per_ha: float = 0.0
+
+    def __post_init__(self):
+        if not self.maintenance_per_ha:
+            self.maintenance_per_ha = BASE_MAINTENANCE_COST_PER_HA.get(self.level, 400.0)
+
+
+@dataclass
+class SimulationSettings:
+    draws: int = DEFAULT_DRAWS
+    ffb_price_range: Tuple[float, float] = FFB_PRICE_RANGE
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES
+    seed: Optional[int] = 42
+    progression: Sequence[Tuple[float, float]] = field(default_factory=lambda: YIELD_PROGRESSION)
+
+
+def _payback_years(cumulative: np.ndarray, net: np.ndarray, initial: np.ndarray) -> np.ndarray:
+    """Fractional year in which cumulative net profit reaches the initial
+    investment (same rule as the report), NaN if not within the horizon"""
+    reached = cumulative >= initial[..., None]
+    any_reached = reached.any(axis=-1)
+    first = np.argmax(reached, axis=-1)
+    net_at = np.take_along_axis(net, first[..., None], axis=-1)[..., 0]
+    cum_at = np.take_along_axis(cumulative, first[..., None], axis=-1)[..., 0]
+    before = cum_at - net_at
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = np.where(net_at > 0, (initial - before) / net_at, 1.0)
+    years = first + np.clip(partial, 0.0, 1.0)
+    return np.where(any_reached, years, np.nan)
+
+
+def project_ranges(current_yield: float, new_yield_low: float, new_yield_high: float,
+                   cost_per_ha_low: float, cost_per_ha_high: float,
+                   ffb_price_low: float, ffb_price_high: float, maintenance_per_ha: float,
+                   roi_investment: Optional[float] = None,
+                   progression: Sequence[Tuple[float, float]] = YIELD_PROGRESSION) -> Dict[str, np.ndarray]:
+    """
+    Deterministic low/high 5-year projection per hectare
+
+    Args:
+        roi_investment: Denominator for yearly ROI; defaults to the mean initial cost per ha
+
+    Returns:
+        Dict of arrays shaped (2, YEARS) (row 0 = low, row 1 = high) for yield,
+        additional_yield, additional_revenue, cost, net_profit, cumulative_profit and roi
+    """
+    prog = np.asarray(progression, dtype=float).T                         # (2, YEARS)
+    base = np.array([new_yield_low - current_yield, new_yield_high - current_yield])[:, None]
+    additional_yield = base * prog
+    price = np.array([ffb_price_low, ffb_price_high])[:, None]
+    additional_revenue = additional_yield * price
+
+    maintenance = maintenance_per_ha * np.asarray(MAINTENANCE_MULTIPLIERS)
+    cost = np.tile(maintenance, (2, 1))
+    cost[:, 0] = [cost_per_ha_low, cost_per_ha_high]
+    cost = np.maximum(cost, 0.0)
+
+    net_profit = additional_revenue - cost
+    initial_avg = roi_investment if roi_investment is not None else (cost_per_ha_low + cost_per_ha_high) / 2
+    roi = np.minimum(net_profit / initial_avg * 100, YEARLY_ROI_CAP) if initial_avg > 0 else np.zeros_like(net_profit)
+    return {
+        'yield': current_yield + additional_yield,
+        'additional_yield': additional_yield,
+        'additional_revenue': additional_revenue,
+        'cost': cost,
+        'net_profit': net_profit,
+        'cumulative_profit': np.cumsum(net_profit, axis=1),
+        'roi': roi,
+    }
+
+
+class EconomicScenarioEngine:
+    """Monte Carlo sensitivity analysis over all investment scenarios at once"""
+
+    def __init__(self, settings: Optional[SimulationSettings] = None):
+        self.settings = settings or SimulationSettings()
+        self.logger = logging.getLogger(f"{__name__}.EconomicScenarioEngine")
+
+    def simulate(self, current_yield: float, scenarios: List[ScenarioInputs]) -> Dict[str, Dict[str, Any]]:
+        """
+        Simulate every scenario in one vectorized pass
+
+        Args:
+            current_yield: Current yield, t/ha
+            scenarios: Per-scenario ranges
+
+        Returns:
+            Dict keyed by scenario level with numeric percentile bands
+        """
+        if not scenarios:
+            return {}
+        s = self.settings
+        rng = np.random.default_rng(s.seed)
+        n_scen, draws = len(scenarios), s.draws
+        shape = (n_scen, draws)
+
+        inc_low = np.array([sc.yield_increase[0] for sc in scenarios])[:, None]
+        inc_high = np.array([sc.yield_increase[1] for sc in scenarios])[:, None]
+        cost_low = np.array([sc.cost_per_ha[0] for sc in scenarios])[:, None]
+        cost_high = np.array([sc.cost_per_ha[1] for sc in scenarios])[:, None]
+        maintenance = np.array([sc.maintenance_per_ha for sc in scenarios])[:, None, None]
+
+        yield_increase = inc_low + (inc_high - inc_low) * rng.random(shape)                 # (S, D)
+        initial_cost = cost_low + (cost_high - cost_low) * rng.random(shape)                # (S, D)
+
+        prog = np.asarray(s.progression, dtype=float)                                       # (Y, 2)
+        progression = prog[:, 0] + (prog[:, 1] - prog[:, 0]) * rng.random(shape + (YEARS,))  # (S, D, Y)
+        price_low, price_high = s.ffb_price_range
+        price = rng.triangular(price_low, (price_low + price_high) / 2, price_high, size=shape + (YEARS,))
+
+        additional_yield = current_yield * yield_increase[..., None] * progression
+        revenue = additional_yield * price
+
+        variation = rng.uniform(*MAINTENANCE_VARIATION, size=shape + (YEARS,))
+        cost = maintenance * np.asarray(MAINTENANCE_MULTIPLIERS) * variation
+        cost[..., 0] = initial_cost
+
+        net = revenue - cost
+        cumulative = np.cumsum(net, axis=-1)
+        roi = np.minimum(net / initial_cost[..., None] * 100, YEARLY_ROI_CAP)
+        roi_5year = np.minimum(cumulative[..., -1] / initial_cost * 100, FIVE_YEAR_ROI_CAP)
+        payback = _payback_years(cumulative, net, initial_cost)
+
+        pct = np.asarray(s.percentiles)
+        net_bands = np.percentile(net, pct, axis=1)              # (P, S, Y)
+        roi_bands = np.percentile(roi, pct, axis=1)
+        cum_bands = np.percentile(cumulative, pct, axis=1)
+        roi5_bands = np.percentile(roi_5year, pct, axis=1)       # (P, S)
+        paid = ~np.isnan(payback)
+        payback_filled = np.where(paid, payback, float(YEARS))
+        payback_bands = np.percentile(payback_filled, pct, axis=1)
+
+        def _bands(values: np.ndarray) -> Dict[str, Any]:
+            return {f'p{p}': (np.round(values[k], 2).tolist() if np.ndim(values[k]) else round(float(values[k]), 2))
+                    for k, p in enumerate(pct)}
+
+        results = {}
+        for i, sc in enumerate(scenarios):
+            results[sc.level] = {
+                'draws': draws,
+                'net_profit_per_ha': _bands(net_bands[:, i]),
+                'roi_percent': _bands(roi_bands[:, i]),
+                'cumulative_profit_per_ha': _bands(cum_bands[:, i]),
+                'roi_5year_percent': _bands(roi5_bands[:, i]),
+                'payback_years': _bands(payback_bands[:, i]),
+                'payback_probability': round(float(paid[i].mean()), 3),
+                'loss_probability': round(float((cumulative[i, :, -1] < 0).mean()), 3),
+                'expected_cumulative_profit_per_ha': round(float(cumulative[i, :, -1].mean()), 2),
+            }
+        return results
+
+
+def simulate_scenarios(current_yield: float, scenarios: List[ScenarioInputs],
+                       settings: Optional[SimulationSettings] = None) -> Dict[str, Dict[str, Any]]:
+    """Convenience wrapper returning percentile bands per scenario level"""
+    try:
+        return EconomicScenarioEngine(settings).simulate(current_yield, scenarios)
+    except Exception as e:
+        logger.error(f"Economic simulation failed: {str(e)}")
+        return {}
@@ -0,0 +1,201 @@
+"""
+Fake Firestore Client
+In-memory stand-in for the subset of ``google.cloud.firestore.Client`` used
+by ``AnalysisDocumentStore`` (collections, documents, subcollections,
+get/set/update/delete, get_all and write batches). Writes are checked the way the
+real backend checks them: only Firestore value types are accepted, map keys
+must be strings and a document may not exceed 1 MiB. Used by benchmarks and
+offline runs to measure serialization without a network round trip.
+
+Usage:
+    from utils.fake_firestore import FakeFirestore
+    store = AnalysisDocumentStore(FakeFirestore(), bucket=None)
+"""
+
+import copy
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAX_DOCUMENT_BYTES = 1024 * 1024
+MAX_BATCH_WRITES = 500
+
+# Firestore charges a fixed overhead per field name/value; this approximates its size rules
+_FIXED_SIZES = {type(None): 1, bool: 1, int: 8, float: 8}
+
+
+class FakeFirestoreError(ValueError):
+    """Write the real backend would reject (InvalidArgument)"""
+
+
+def _value_size(value: Any, path: str) -> int:
+    """Stored size of a value following Firestore's storage size rules; validates types"""
+    for kind, size in _FIXED_SIZES.items():
+        if type(value) is kind:
+            return size
+    if isinstance(value, (datetime, date)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        total = 0
+        for index, item in enumerate(value):
+            if isinstance(item, (list, tuple)):
+                raise FakeFirestoreError(f"Nested arrays are not supported at {path}[{index}]")
+            total += _value_size(item, f"{path}[{index}]")
+        return total
+    if isinstance(value, dict):
+        total = 0
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise FakeFirestoreError(f"Map keys must be strings at {path}: {key!r}")
+            total += len(key.encode('utf-8')) + 1 + _value_size(item, f"{path}.{key}")
+        return total
+    raise FakeFirestoreError(f"Unsupported value type {type(value).__name__} at {path}")
+
+
+class FakeSnapshot:
+    def __init__(self, reference: 'FakeDocumentReference', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, client: 'FakeFirestore', path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    @property
+    def path(self) -> str:
+        return '/'.join(self._path)
+
+    def collection(self, name: str) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._client, self._path + (name,))
+
+    def get(self) -> FakeSnapshot:
+        self._client.stats['round_trips'] += 1
+        return FakeSnapshot(self, self._client._read(self._path))
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._client._write(self._path, data, merge=merge)
+
+    def update(self, data: Dict[str, Any]):
+        if self._client._read(self._path) is None:
+            raise FakeFirestoreError(f"No document to update: {self.path}")
+        self._client._write(self._path, data, merge=True)
+
+    def delete(self):
+        self._client._delete(self._path)
+
+
+class FakeCollectionReference:
+    def __init__(self, client: 'FakeFirestore', path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._client, self._path + (document_id or self._client._new_id(),))
+
+    def stream(self) -> Iterator[FakeSnapshot]:
+        for path, data in self._client._children(self._path):
+            yield FakeSnapshot(FakeDocumentReference(self._client, path), copy.deepcopy(data))
+
+
+class FakeWriteBatch:
+    def __init__(self, client: 'FakeFirestore'):
+        self._client = client
+        self._writes: List[Tuple[str, FakeDocumentReference, Any, bool]] = []
+
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any], merge: bool = False):
+        self._writes.append(('set', reference, data, merge))
+
+    def update(self, reference: FakeDocumentReference, data: Dict[str, Any]):
+        self._writes.append(('update', reference, data, True))
+
+    def delete(self, reference: FakeDocumentReference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise FakeFirestoreError(f"A batch may contain at most {MAX_BATCH_WRITES} writes")
+        for operation, reference, data, merge in self._writes:
+            if operation == 'delete':
+                reference.delete()
+            elif operation == 'update':
+                reference.update(data)
+            else:
+                reference.set(data, merge=merge)
+        self._client.stats['batches'] += 1
+        self._writes = []
+
+
+class FakeFirestore:
+    """In-memory Firestore client; ``stats`` counts writes, reads, round trips and stored bytes"""
+
+    def __init__(self):
+        self._documents: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.stats = {'writes': 0, 'reads': 0, 'round_trips': 0, 'batches': 0, 'bytes_written': 0,
+                      'largest_document_bytes': 0}
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, (name,))
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def get_all(self, references: List[FakeDocumentReference]) -> Iterator[FakeSnapshot]:
+        """Snapshots of several documents in one call (counted as one round trip)"""
+        self.stats['round_trips'] += 1
+        for reference in references:
+            yield FakeSnapshot(reference, self._read(reference._path))
+
+    def _new_id(self) -> str:
+        with self._lock:
+            self._counter += 1
+            return f"doc{self._counter:08d}"
+
+    def _read(self, path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.stats['reads'] += 1
+            return self._documents.get(path)
+
+    def _write(self, path: Tuple[str, ...], data: Dict[str, Any], merge: bool = False):
+        if not isinstance(data, dict):
+            raise FakeFirestoreError(f"Document data must be a map: {'/'.join(path)}")
+        stored = copy.deepcopy(data)
+        with self._lock:
+            if merge and path in self._documents:
+                stored = {**self._documents[path], **stored}
+            # Document size: name of the document path plus its fields, plus 32 bytes overhead
+            size = sum(len(part.encode('utf-8')) + 1 for part in path) + 16 + \
+                _value_size(stored, '/'.join(path)) + 32
+            if size > MAX_DOCUMENT_BYTES:
+                raise FakeFirestoreError(f"Document {'/'.join(path)} is {size} bytes (limit {MAX_DOCUMENT_BYTES})")
+            self._documents[path] = stored
+            self.stats['writes'] += 1
+            self.stats['bytes_written'] += size
+            self.stats['largest_document_bytes'] = max(self.stats['largest_document_bytes'], size)
+
+    def _delete(self, path: Tuple[str, ...]):
+        with self._lock:
+            self._documents.pop(path, None)
+
+    def _children(self, collection_path: Tuple[str, ...]) -> List[Tuple[Tuple[str, ...], Dict[str, Any]]]:
+        depth = len(collection_path) + 1
+        with self._lock:
+            return [(path, data) for path, data in sorted(self._documents.items())
+                    if len(path) == depth and path[:-1] == collection_path]
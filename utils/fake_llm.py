@@ -0,0 +1,150 @@
+"""
+Fake Gemini Backend
+Drop-in stand-in for ``google.generativeai.GenerativeModel`` used to exercise
+the analysis pipeline without network access or API quota: it returns a
+valid step JSON response, reports ``usage_metadata`` token counts, and can
+inject per-model latency (fixed, random or stalls) to test hedging and
+routing behaviour.
+
+Usage:
+    from utils.fake_llm import FakeModelFactory
+    analyzer.use_model_factory(FakeModelFactory(latency={'gemini-2.5-pro': (2.0, 30.0)}, stall_rate=0.1))
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Seconds, or (low, high) for a uniform random delay
+Latency = Union[float, Tuple[float, float]]
+
+FINISH_STOP = 1
+FINISH_MAX_TOKENS = 2
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class _Candidate:
+    def __init__(self, finish_reason: int):
+        self.finish_reason = finish_reason
+
+
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeResponse:
+    """Shape-compatible subset of a google.generativeai response"""
+
+    CHUNK_SIZE = 256
+
+    def __init__(self, text: str, prompt: str, finish_reason: int = FINISH_STOP):
+        self.text = text
+        self.candidates = [_Candidate(finish_reason)]
+        # Roughly 4 characters per token, like the real tokenizer on English text
+        self.usage_metadata = _UsageMetadata(max(1, len(prompt) // 4), max(1, len(text) // 4))
+
+    def __iter__(self):
+        """Chunks as delivered by generate_content(stream=True)"""
+        for start in range(0, len(self.text), self.CHUNK_SIZE):
+            yield _Chunk(self.text[start:start + self.CHUNK_SIZE])
+
+
+def _step_from_prompt(prompt: str) -> Tuple[int, str]:
+    match = re.search(r'Step\s+(\d+)\s*-\s*([^:\n]+)', prompt)
+    if match:
+        return int(match.group(1)), match.group(2).strip()
+    return 0, 'Analysis'
+
+
+def fake_step_payload(step_number: int, step_title: str) -> Dict[str, Any]:
+    """Deterministic, schema-valid step response"""
+    return {
+        'summary': f"Step {step_number} ({step_title}) summary generated by the fake backend.",
+        'detailed_analysis': f"Detailed analysis for {step_title}. Values are placeholders from the fake backend.",
+        'key_findings': [
+            f"Finding {i} for step {step_number}" for i in range(1, 4)
+        ],
+        'tables': [{
+            'title': f"{step_title} Summary Table",
+            'headers': ['Parameter', 'Value', 'Status'],
+            'rows': [['pH', '4.8', 'Low'], ['Exch. K', '0.06', 'Critical']],
+        }],
+        'interpretations': [f"Interpretation for step {step_number}"],
+    }
+
+
+class FakeGenerativeModel:
+    """Replacement for genai.GenerativeModel with injectable latency"""
+
+    def __init__(self, model_name: str, latency: Latency = 0.0, stall_rate: float = 0.0,
+                 stall_seconds: float = 120.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.model_name = model_name
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.calls += 1
+            if self._random.random() < self.stall_rate:
+                return self.stall_seconds
+            if isinstance(self.latency, tuple):
+                return self._random.uniform(*self.latency)
+            return float(self.latency)
+
+    def generate_content(self, prompt: str, generation_config: Any = None, safety_settings: Any = None,
+                         cancel_event: Optional[threading.Event] = None, **kwargs) -> FakeResponse:
+        delay = self._delay()
+        # Sleep in small slices so a losing hedged attempt can stop early
+        deadline = time.perf_counter() + delay
+        while time.perf_counter() < deadline:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RuntimeError(f"{self.model_name} request cancelled")
+            time.sleep(min(0.05, max(0.0, deadline - time.perf_counter())))
+
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+        if fail:
+            raise RuntimeError(f"503 Fake backend error from {self.model_name}")
+
+        if prompt.lstrip().startswith('Write an Executive Summary'):
+            text = "Executive summary generated by the fake backend for benchmarking and testing."
+        else:
+            text = json.dumps(fake_step_payload(*_step_from_prompt(prompt)))
+        return FakeResponse(text, prompt)
+
+
+class FakeModelFactory:
+    """Callable model_factory for PromptAnalyzer: one FakeGenerativeModel per model name"""
+
+    def __init__(self, latency: Optional[Dict[str, Latency]] = None, default_latency: Latency = 0.0,
+                 stall_rate: float = 0.0, stall_seconds: float = 120.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency or {}
+        self.default_latency = default_latency
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.error_rate = error_rate
+        self.seed = seed
+        self.models: Dict[str, FakeGenerativeModel] = {}
+
+    def __call__(self, model_name: str, safety_settings: Any = None) -> FakeGenerativeModel:
+        if model_name not in self.models:
+            self.models[model_name] = FakeGenerativeModel(
+                model_name, self.latency.get(model_name, self.default_latency), self.stall_rate,
+                self.stall_seconds, self.error_rate, self.seed)
+        return self.models[model_name]
@@ -11,9 +11,98 @@ from google.cloud.firestore import FieldFilter
 # Use our configured Firestore client instead of direct import
 import json
 
+from utils.figure_cache import fragment
+from utils.ttl_cache import TTLCache
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Ratings summed into the daily rollups (rollup key -> feedback field)
+RATING_FIELDS = {
+    'overall': 'overall_rating',
+    'accuracy': 'accuracy_rating',
+    'usefulness': 'usefulness_rating',
+    'clarity': 'clarity_rating',
+    'recommendations': 'recommendations_rating',
+    'visualizations': 'visualizations_rating'
+}
+
+# Suggestions kept per daily rollup (analytics only shows the latest 10)
+MAX_SUGGESTIONS_PER_DAY = 10
+
+# Feedback analytics/insights may be this stale; they run at the end of every analysis
+FEEDBACK_ANALYTICS_TTL_SECONDS = 300
+
+_analytics_cache = TTLCache(FEEDBACK_ANALYTICS_TTL_SECONDS)
+
+
+def _empty_rollup(day_key: str) -> Dict[str, Any]:
+    return {
+        'date': day_key,
+        'count': 0,
+        'ratings_sum': {key: 0 for key in RATING_FIELDS},
+        'recommend_count': 0,
+        'categories': {},
+        'suggestions': []
+    }
+
+
+def apply_feedback_to_rollup(rollup: Dict[str, Any], feedback_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold one feedback submission into a daily rollup (pure function, no I/O)"""
+    rollup['count'] = rollup.get('count', 0) + 1
+    ratings_sum = rollup.setdefault('ratings_sum', {})
+    for key, field in RATING_FIELDS.items():
+        ratings_sum[key] = ratings_sum.get(key, 0) + (feedback_doc.get(field, 0) or 0)
+    if feedback_doc.get('would_recommend', False):
+        rollup['recommend_count'] = rollup.get('recommend_count', 0) + 1
+    categories = rollup.setdefault('categories', {})
+    for category in feedback_doc.get('feedback_categories', []) or []:
+        categories[category] = categories.get(category, 0) + 1
+    if feedback_doc.get('improvement_suggestions'):
+        suggestions = rollup.setdefault('suggestions', [])
+        suggestions.append(feedback_doc['improvement_suggestions'])
+        del suggestions[:-MAX_SUGGESTIONS_PER_DAY]
+    rollup['updated_at'] = datetime.now().isoformat()
+    return rollup
+
+
+def summarize_rollups(rollups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine daily rollups into the analytics structure returned by get_feedback_analytics"""
+    total_feedback = sum(r.get('count', 0) for r in rollups)
+    if not total_feedback:
+        return {
+            'total_feedback': 0,
+            'average_ratings': {},
+            'feedback_trends': {},
+            'improvement_areas': [],
+            'recommendation_rate': 0
+        }
+
+    ratings_sum = {key: 0 for key in RATING_FIELDS}
+    recommendation_count = 0
+    feedback_categories = {}
+    improvement_suggestions = []
+    # Newest day first so the latest suggestions are kept
+    for rollup in sorted(rollups, key=lambda r: r.get('date', ''), reverse=True):
+        for key in ratings_sum:
+            ratings_sum[key] += rollup.get('ratings_sum', {}).get(key, 0)
+        recommendation_count += rollup.get('recommend_count', 0)
+        for category, count in rollup.get('categories', {}).items():
+            feedback_categories[category] = feedback_categories.get(category, 0) + count
+        improvement_suggestions.extend(reversed(rollup.get('suggestions', [])))
+
+    average_ratings = {key: round(value / total_feedback, 2) for key, value in ratings_sum.items()}
+
+    return {
+        'total_feedback': total_feedback,
+        'average_ratings': average_ratings,
+        'feedback_trends': feedback_categories,
+        # Lowest rated categories
+        'improvement_areas': sorted(average_ratings.items(), key=lambda x: x[1])[:3],
+        'recommendation_rate': round((recommendation_count / total_feedback) * 100, 2),
+        'improvement_suggestions': improvement_suggestions[:10]  # Top 10 suggestions
+    }
+
 class FeedbackLearningSystem:
     """Handles user feedback collection and learning system improvements"""
     
@@ -64,6 +153,10 @@ class FeedbackLearningSystem:
             feedback_ref = db.collection('user_feedback').document()
             feedback_ref.set(feedback_doc)
             
+            # Keep the daily rollup in step so analytics never rescan raw feedback
+            self._update_rollup(db, feedback_doc)
+            _analytics_cache.clear()
+            
             self.logger.info(f"Feedback saved successfully for analysis {analysis_id}")
             return True
             
@@ -71,100 +164,95 @@ class FeedbackLearningSystem:
             self.logger.error(f"Error saving feedback: {str(e)}")
             return False
     
-    def get_feedback_analytics(self, days_back: int = 30) -> Dict[str, Any]:
+    def _rollup_ref(self, db, day_key: str):
+        from utils.firebase_config import COLLECTIONS
+        return db.collection(COLLECTIONS['feedback_rollups']).document(day_key)
+    
+    def _update_rollup(self, db, feedback_doc: Dict[str, Any]) -> bool:
+        """Add a feedback submission to its day's rollup inside a transaction"""
+        try:
+            from utils.firebase_config import update_document_transactionally
+            day_key = feedback_doc['timestamp'].strftime('%Y-%m-%d')
+            update_document_transactionally(db, self._rollup_ref(db, day_key), lambda: _empty_rollup(day_key),
+                                            lambda rollup: apply_feedback_to_rollup(rollup, feedback_doc))
+            return True
+        except Exception as e:
+            self.logger.error(f"Error updating feedback rollup: {str(e)}")
+            return False
+    
+    def _load_rollups(self, db, days_back: int) -> List[Dict[str, Any]]:
+        """Read one small rollup document per day in a single batched get"""
+        end_date = datetime.now()
+        day_keys = [(end_date - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days_back + 1)]
+        refs = [self._rollup_ref(db, key) for key in day_keys]
+        if hasattr(db, 'get_all'):
+            snapshots = db.get_all(refs)
+        else:
+            snapshots = [ref.get() for ref in refs]
+        return [snapshot.to_dict() for snapshot in snapshots if snapshot.exists]
+    
+    def rebuild_rollups(self, days_back: int = 90) -> int:
         """
-        Get feedback analytics for system improvement
+        Recompute daily rollups from raw feedback (one-off backfill for existing data)
         
         Args:
-            days_back: Number of days to look back for analytics
+            days_back: Number of days of feedback to rebuild
             
         Returns:
-            Dict containing analytics data
+            int: Number of feedback documents folded into the rollups
         """
         try:
             db = self._get_firestore_client()
             if not db:
-                return {}
+                return 0
             
-            # Calculate date range
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
+            start_date = datetime.now() - timedelta(days=days_back)
+            feedback_query = db.collection('user_feedback').where(filter=FieldFilter('timestamp', '>=', start_date))
             
-            # Query feedback data
-            feedback_ref = db.collection('user_feedback')
-            feedback_query = feedback_ref.where(filter=FieldFilter('timestamp', '>=', start_date))
-            feedback_docs = list(feedback_query.stream())
-            
-            if not feedback_docs:
-                return {
-                    'total_feedback': 0,
-                    'average_ratings': {},
-                    'feedback_trends': {},
-                    'improvement_areas': [],
-                    'recommendation_rate': 0
-                }
-            
-            # Process feedback data
-            total_feedback = len(feedback_docs)
-            ratings_sum = {
-                'overall': 0,
-                'accuracy': 0,
-                'usefulness': 0,
-                'clarity': 0,
-                'recommendations': 0,
-                'visualizations': 0
-            }
+            rollups = {}
+            found = 0
+            for doc in feedback_query.stream():
+                data = doc.to_dict() or {}
+                timestamp = data.get('timestamp')
+                if not hasattr(timestamp, 'strftime'):
+                    continue
+                day_key = timestamp.strftime('%Y-%m-%d')
+                apply_feedback_to_rollup(rollups.setdefault(day_key, _empty_rollup(day_key)), data)
+                found += 1
             
-            recommendation_count = 0
-            feedback_categories = {}
-            improvement_suggestions = []
+            for day_key, rollup in rollups.items():
+                self._rollup_ref(db, day_key).set(rollup)
+            _analytics_cache.clear()
             
-            for doc in feedback_docs:
-                data = doc.to_dict()
-                
-                # Sum ratings
-                ratings_sum['overall'] += data.get('overall_rating', 0)
-                ratings_sum['accuracy'] += data.get('accuracy_rating', 0)
-                ratings_sum['usefulness'] += data.get('usefulness_rating', 0)
-                ratings_sum['clarity'] += data.get('clarity_rating', 0)
-                ratings_sum['recommendations'] += data.get('recommendations_rating', 0)
-                ratings_sum['visualizations'] += data.get('visualizations_rating', 0)
-                
-                # Count recommendations
-                if data.get('would_recommend', False):
-                    recommendation_count += 1
-                
-                # Collect feedback categories
-                for category in data.get('feedback_categories', []):
-                    feedback_categories[category] = feedback_categories.get(category, 0) + 1
-                
-                # Collect improvement suggestions
-                if data.get('improvement_suggestions'):
-                    improvement_suggestions.append(data['improvement_suggestions'])
+            self.logger.info(f"Rebuilt {len(rollups)} feedback rollups from {found} feedback documents")
+            return found
             
-            # Calculate averages
-            average_ratings = {
-                key: round(value / total_feedback, 2) if total_feedback > 0 else 0
-                for key, value in ratings_sum.items()
-            }
+        except Exception as e:
+            self.logger.error(f"Error rebuilding feedback rollups: {str(e)}")
+            return 0
+    
+    def get_feedback_analytics(self, days_back: int = 30) -> Dict[str, Any]:
+        """
+        Get feedback analytics for system improvement
+        
+        Reads the per-day rollup documents maintained by collect_feedback and
+        caches the result in-process for FEEDBACK_ANALYTICS_TTL_SECONDS.
+        
+        Args:
+            days_back: Number of days to look back for analytics
             
-            # Calculate recommendation rate
-            recommendation_rate = round((recommendation_count / total_feedback) * 100, 2) if total_feedback > 0 else 0
+        Returns:
+            Dict containing analytics data
+        """
+        try:
+            db = self._get_firestore_client()
+            if not db:
+                return {}
             
-            # Identify improvement areas (lowest rated categories)
-            improvement_areas = sorted(
-                average_ratings.items(),
-                key=lambda x: x[1]
-            )[:3]
+            def _compute():
+                return summarize_rollups(self._load_rollups(db, days_back))
             
-            return {
-                'total_feedback': total_feedback,
-                'average_ratings': average_ratings,
-                'feedback_trends': feedback_categories,
-                'improvement_areas': improvement_areas,
-                'recommendation_rate': recommendation_rate,
-                'improvement_suggestions': improvement_suggestions[:10]  # Top 10 suggestions
-            }
+            return _analytics_cache.get_or_compute(f"analytics:{days_back}", _compute)
             
         except Exception as e:
             self.logger.error(f"Error getting feedback analytics: {str(e)}")
@@ -249,9 +337,11 @@ class FeedbackLearningSystem:
             self.logger.error(f"Error getting Firestore client: {str(e)}")
             return None
 
+@fragment
 def display_feedback_section(analysis_id: str, user_id: str):
     """
-    Display feedback collection section in the UI
+    Display feedback collection section in the UI (as a fragment, so
+    submitting the form does not re-render the page around it)
     
     Args:
         analysis_id: Unique identifier for the analysis
@@ -418,6 +508,10 @@ def display_feedback_analytics():
     
     if analytics.get('total_feedback', 0) == 0:
         st.info("No feedback data available yet.")
+        if st.button("🔄 Rebuild feedback rollups", help="Recompute daily rollups from feedback submitted before rollups existed"):
+            rebuilt = feedback_system.rebuild_rollups(days_back=90)
+            st.success(f"Rebuilt rollups from {rebuilt} feedback submissions")
+            st.rerun()
         return
     
     # Display metrics
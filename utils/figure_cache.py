@@ -0,0 +1,123 @@
+"""
+Figure Cache
+Memoizes Plotly figures built for the results page. Every Streamlit rerun
+(expanding a section, clicking a button) re-executes the page script, and
+rebuilding multi-subplot figures trace by trace dominates that rerun. Figures
+are keyed by a fingerprint of the data they are built from and kept as
+serialized JSON in a bounded LRU shared by all sessions of the process, so a
+rerun only deserializes them. Also provides ``fragment`` so interactive
+widgets can rerun on their own instead of re-rendering the whole page.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from utils.run_context import fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FigureCache:
+    """Bounded LRU of serialized figures (thread-safe)"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"{__name__}.FigureCache")
+
+    def get_or_build(self, name: str, spec: Any, builder: Callable[[], Any]) -> Any:
+        """
+        Return a cached copy of the figure or build and store it
+
+        Args:
+            name: Chart kind (part of the key, e.g. 'heatmap')
+            spec: JSON-like inputs the figure is built from
+            builder: Builds the figure on a miss
+
+        Returns:
+            A fresh figure object (safe for the caller to modify)
+        """
+        key = fingerprint(name, spec)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        if cached is not None:
+            try:
+                import plotly.io as pio
+                return pio.from_json(cached, skip_invalid=True)
+            except Exception as e:
+                self.logger.warning(f"Cached figure '{name}' could not be restored, rebuilding: {str(e)}")
+
+        fig = builder()
+        with self._lock:
+            self._misses += 1
+        try:
+            self._store(key, fig.to_json())
+        except Exception as e:
+            self.logger.warning(f"Figure '{name}' not cached: {str(e)}")
+        return fig
+
+    def _store(self, key: str, text: str):
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = text
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(name: str, spec: Any, builder: Callable[[], Any]) -> Any:
+    """Convenience wrapper around the shared figure cache"""
+    return figure_cache.get_or_build(name, spec, builder)
+
+
+def fragment(func: Callable) -> Callable:
+    """``st.fragment`` when available (Streamlit >= 1.37), otherwise a no-op"""
+    try:
+        import streamlit as st
+        decorator = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    except ImportError:
+        decorator = None
+    if decorator is None:
+        return func
+    return decorator(func)
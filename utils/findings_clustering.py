@@ -0,0 +1,227 @@
+"""
+Findings Clustering Utility
+Consolidates similar key findings by fingerprinting each finding once and
+bucketing candidates through an inverted concept index, instead of comparing
+every finding against every other finding.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Vocabulary used for concept fingerprints (kept in sync with the legacy
+# _extract_key_concepts helpers in modules/results.py and utils/pdf_utils.py)
+NUTRIENT_CONCEPTS = [
+    'nitrogen', 'phosphorus', 'potassium', 'calcium', 'magnesium', 'sulfur',
+    'copper', 'zinc', 'manganese', 'iron', 'boron', 'molybdenum'
+]
+PARAMETER_CONCEPTS = [
+    'ph', 'cec', 'organic matter', 'base saturation', 'yield', 'deficiency',
+    'excess', 'optimum', 'critical', 'mg/kg', '%', 'meq'
+]
+CONDITION_CONCEPTS = [
+    'acidic', 'alkaline', 'deficient', 'sufficient', 'excessive', 'low', 'high',
+    'moderate', 'severe', 'mild'
+]
+
+# Issue categories used to decide whether two findings describe the same problem
+ISSUE_PATTERNS = {
+    'potassium_deficiency': ['potassium', 'k deficiency', 'k level', 'k average', 'k critical'],
+    'soil_acidity': ['ph', 'acidic', 'acidity', 'soil ph', 'ph level'],
+    'phosphorus_deficiency': ['phosphorus', 'p deficiency', 'available p', 'p level'],
+    'nutrient_deficiency': ['deficiency', 'deficient', 'nutrient', 'nutrients'],
+    'cec_issue': ['cec', 'cation exchange', 'nutrient retention', 'nutrient holding'],
+    'organic_matter': ['organic matter', 'organic carbon', 'carbon'],
+    'micronutrient': ['copper', 'zinc', 'manganese', 'iron', 'boron', 'micronutrient'],
+    'yield_impact': ['yield', 'productivity', 'tonnes', 'production'],
+    'economic_impact': ['roi', 'investment', 'cost', 'profit', 'revenue', 'economic']
+}
+
+_NUMBER_PATTERN = re.compile(r'\d+\.?\d*')
+_CONCEPT_VOCABULARY = NUTRIENT_CONCEPTS + PARAMETER_CONCEPTS + CONDITION_CONCEPTS
+
+# Key under which consolidated findings are cached on an analysis dict (never persisted)
+KEY_FINDINGS_CACHE_KEY = '_key_findings_cache'
+
+
+@dataclass(frozen=True)
+class FindingFingerprint:
+    """Concepts and issue categories extracted once per finding"""
+    concepts: FrozenSet[str]
+    issues: FrozenSet[str]
+
+
+def extract_concepts(text: str) -> FrozenSet[str]:
+    """Extract agricultural concepts and significant numbers from normalized text"""
+    found = {concept for concept in _CONCEPT_VOCABULARY if concept in text}
+    for num in _NUMBER_PATTERN.findall(text):
+        if float(num) > 0:
+            found.add(num)
+    return frozenset(found)
+
+
+def extract_issue_categories(text: str) -> FrozenSet[str]:
+    """Return the issue categories mentioned in a finding"""
+    text_lower = text.lower()
+    return frozenset(
+        issue for issue, keywords in ISSUE_PATTERNS.items()
+        if any(keyword in text_lower for keyword in keywords)
+    )
+
+
+def fingerprint_finding(text: str) -> FindingFingerprint:
+    """Build the fingerprint used for bucketing and similarity checks"""
+    normalized = ' '.join(text.lower().split())
+    return FindingFingerprint(
+        concepts=extract_concepts(normalized),
+        issues=extract_issue_categories(text)
+    )
+
+
+class FindingsClusterer:
+    """Merges similar findings using an inverted concept index.
+
+    Each incoming finding is fingerprinted once. Candidate clusters are the
+    ones sharing at least one concept with it (found through the index), and
+    the overlap counts gathered while walking the index give the similarity
+    directly, so no per-pair regex or set work is repeated. Cost is bounded by
+    the sizes of the concept buckets rather than the square of the finding count.
+    """
+
+    def __init__(self, merge_fn: Callable[[str, str], str]):
+        self.merge_fn = merge_fn
+        self.logger = logging.getLogger(f"{__name__}.FindingsClusterer")
+
+    def cluster(self, findings_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Deduplicate finding dicts ({'finding', 'source'}) preserving first-seen order"""
+        clusters: List[Dict[str, Any]] = []
+        cluster_concepts: List[FrozenSet[str]] = []
+        cluster_issues: List[FrozenSet[str]] = []
+        concept_index: Dict[str, List[int]] = {}
+
+        for finding_data in findings_list:
+            finding = finding_data['finding']
+            fingerprint = fingerprint_finding(finding)
+            concepts = fingerprint.concepts
+
+            # Count shared concepts per candidate cluster through the index
+            overlaps: Dict[int, int] = {}
+            for concept in concepts:
+                for cluster_id in concept_index.get(concept, ()):
+                    overlaps[cluster_id] = overlaps.get(cluster_id, 0) + 1
+
+            target = self._select_cluster(concepts, fingerprint.issues, overlaps,
+                                          cluster_concepts, cluster_issues)
+
+            if target is None:
+                cluster_id = len(clusters)
+                clusters.append(dict(finding_data))
+                cluster_concepts.append(concepts)
+                cluster_issues.append(fingerprint.issues)
+                for concept in concepts:
+                    concept_index.setdefault(concept, []).append(cluster_id)
+            else:
+                merged = self.merge_fn(clusters[target]['finding'], finding)
+                clusters[target]['finding'] = merged
+                cluster_issues[target] = extract_issue_categories(merged)
+
+        return clusters
+
+    def _select_cluster(self, concepts: FrozenSet[str], issues: FrozenSet[str],
+                        overlaps: Dict[int, int], cluster_concepts: List[FrozenSet[str]],
+                        cluster_issues: List[FrozenSet[str]]) -> Optional[int]:
+        """Pick the earliest cluster that satisfies the similarity thresholds"""
+        for cluster_id in sorted(overlaps):
+            overlap = overlaps[cluster_id]
+            seen = cluster_concepts[cluster_id]
+            union = len(concepts) + len(seen) - overlap
+            similarity = overlap / union if union else 0
+            word_similarity = overlap / max(len(concepts), len(seen))
+
+            if similarity > 0.5 or word_similarity > 0.6:
+                return cluster_id
+            if similarity > 0.3 and word_similarity > 0.4 and issues & cluster_issues[cluster_id]:
+                return cluster_id
+        return None
+
+
+def deduplicate_by_word_overlap(findings_list: List[str], normalize_fn: Callable[[str], str],
+                                threshold: float = 0.8, min_length: int = 10) -> List[str]:
+    """Drop findings whose word sets overlap an earlier finding above ``threshold``.
+
+    Uses an inverted word index so each finding is only compared with earlier
+    findings that share at least one word.
+    """
+    kept_words: List[FrozenSet[str]] = []
+    word_index: Dict[str, List[int]] = {}
+    unique_findings = []
+
+    for finding in findings_list:
+        normalized = normalize_fn(finding)
+        words = frozenset(normalized.split())
+
+        overlaps: Dict[int, int] = {}
+        for word in words:
+            for kept_id in word_index.get(word, ()):
+                overlaps[kept_id] = overlaps.get(kept_id, 0) + 1
+
+        is_duplicate = False
+        for kept_id, overlap in overlaps.items():
+            union = len(words) + len(kept_words[kept_id]) - overlap
+            if union and overlap / union > threshold:
+                is_duplicate = True
+                break
+
+        if not is_duplicate and len(normalized) > min_length:
+            kept_id = len(kept_words)
+            kept_words.append(words)
+            for word in words:
+                word_index.setdefault(word, []).append(kept_id)
+            unique_findings.append(finding)
+
+    return unique_findings
+
+
+def findings_cache_key(analysis_results: Dict[str, Any], version: Any = None) -> str:
+    """Cheap identity of an analysis run plus the renderer version (no hashing of the content)
+
+    Content only changes through a new analysis run, which gets its own
+    timestamp; code that edits steps in place drops the cache instead.
+    """
+    metadata = analysis_results.get('analysis_metadata') or {}
+    run = analysis_results.get('id') or (metadata.get('timestamp') if isinstance(metadata, dict) else None)
+    return f"{run}:{version}"
+
+
+def get_cached_key_findings(analysis_results: Dict[str, Any], namespace: str,
+                            builder: Callable[[], List[Dict[str, Any]]], version: Any = None) -> List[Dict[str, Any]]:
+    """Return consolidated findings cached on the analysis, rebuilding for a new run or version.
+
+    Args:
+        analysis_results: Analysis dict the cache entry is stored on
+        namespace: Separates variants (e.g. results page vs PDF)
+        builder: Callable producing the findings when the cache is stale
+        version: Render payload version the findings are built for
+
+    Returns:
+        List of consolidated finding dicts
+    """
+    if not isinstance(analysis_results, dict):
+        return builder()
+
+    cache = analysis_results.get(KEY_FINDINGS_CACHE_KEY)
+    if not isinstance(cache, dict):
+        cache = {}
+
+    key = findings_cache_key(analysis_results, version)
+    entry = cache.get(namespace)
+    if isinstance(entry, dict) and entry.get('key') == key:
+        return [dict(item) for item in entry.get('findings', [])]
+
+    findings = builder()
+    cache[namespace] = {'key': key, 'findings': [dict(item) for item in findings]}
+    analysis_results[KEY_FINDINGS_CACHE_KEY] = cache
+    return findings
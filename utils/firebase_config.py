@@ -1,13 +1,13 @@
 import os
 import json
 import streamlit as st
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
 # Optional Firebase Admin imports
 try:
     import firebase_admin
     from firebase_admin import credentials, firestore, auth, storage
-    from google.cloud.firestore import FieldFilter
+    from google.cloud.firestore import FieldFilter, transactional
     FIREBASE_AVAILABLE = True
 except ImportError as e:
     firebase_admin = None
@@ -16,6 +16,7 @@ except ImportError as e:
     auth = None
     storage = None
     FieldFilter = None
+    transactional = None
     FIREBASE_AVAILABLE = False
     print(f"Warning: Firebase Admin SDK not available: {e}")
 
@@ -234,6 +235,30 @@ def get_auth_client():
         st.error(f"Failed to get Auth client: {str(e)}")
         return None
 
+def update_document_transactionally(db, doc_ref, create: Callable[[], Dict[str, Any]],
+                                   apply: Callable[[Dict[str, Any]], Any]):
+    """Read-modify-write a document inside a Firestore transaction
+    
+    Args:
+        db: Firestore client (clients without transactions get a plain read and write)
+        doc_ref: Document to update
+        create: Returns the initial document when it does not exist yet
+        apply: Updates the document dict in place
+    """
+    def _update(transaction=None):
+        snapshot = doc_ref.get(transaction=transaction) if transaction else doc_ref.get()
+        data = snapshot.to_dict() if snapshot.exists else create()
+        apply(data)
+        if transaction:
+            transaction.set(doc_ref, data)
+        else:
+            doc_ref.set(data)
+    
+    if transactional is not None and hasattr(db, 'transaction'):
+        transactional(_update)(db.transaction())
+    else:
+        _update()
+
 # Collection names
 COLLECTIONS = {
     'users': 'users',
@@ -248,7 +273,12 @@ COLLECTIONS = {
     'reference_materials': 'reference_materials',
     'output_formats': 'output_formats',
     'tagging_config': 'tagging_config',
-    'prompt_templates': 'prompt_templates'
+    'prompt_templates': 'prompt_templates',
+    'user_stats': 'user_stats',
+    'system_stats': 'system_stats',
+    'feedback_rollups': 'feedback_rollups',
+    'llm_usage': 'llm_usage',
+    'llm_usage_daily': 'llm_usage_daily'
 }
 
 # Default MPOB standards - Accurate values for Malaysian Oil Palm cultivation (matching actual data format)
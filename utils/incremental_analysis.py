@@ -0,0 +1,163 @@
+"""
+Incremental Re-analysis
+Dependency tracking for re-running an analysis after a user corrects sample
+values. Each stage reuses what the previous result already holds when its
+inputs are unchanged:
+
+- Parameter statistics: a parameter's statistics are reused when its column
+  (sample ids and standardized values) is identical to the previous run
+- Standards comparison: only changed parameters are compared again; issues
+  for the other parameters are carried over
+- LLM steps: each step's inputs (step definition, analysis mode, model route
+  and only the data and earlier-step summaries that step reads) are hashed
+  and stored in analysis_metadata.step_input_hashes. A step is reused when
+  its hash matches; a re-run upstream step changes the hash of the steps
+  that read it, while the others stay reusable.
+
+Stored results have been flattened for Firestore (lists turned into item_N
+maps, dicts inside lists JSON-encoded); restore_flattened undoes that for the
+sections that are compared or reused.
+"""
+
+import copy
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STEP_INPUT_HASHES_KEY = 'step_input_hashes'
+
+_ITEM_KEY = re.compile(r'^item_(\d+)$')
+
+
+def restore_flattened(value: Any) -> Any:
+    """Undo the item_N / JSON-string flattening applied to stored analysis results"""
+    if isinstance(value, dict):
+        if value and all(isinstance(key, str) and _ITEM_KEY.match(key) for key in value):
+            ordered = sorted(value.items(), key=lambda item: int(_ITEM_KEY.match(item[0]).group(1)))
+            return [restore_flattened(_decode_item(item)) for _, item in ordered]
+        return {key: restore_flattened(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [restore_flattened(item) for item in value]
+    return value
+
+
+def _decode_item(item: Any) -> Any:
+    if isinstance(item, str) and item[:1] in ('{', '['):
+        try:
+            return json.loads(item)
+        except ValueError:
+            return item
+    return item
+
+
+def without_bookkeeping(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Data without underscore keys such as the timestamped _integrity_check added by preprocessing"""
+    return {key: value for key, value in (data or {}).items() if not str(key).startswith('_')}
+
+
+def _column(samples: Iterable[Dict[str, Any]], param: str) -> List[tuple]:
+    return [(sample.get('sample_no'), sample.get('lab_no'), sample.get(param))
+            for sample in samples if isinstance(sample, dict)]
+
+
+def reusable_parameter_statistics(previous_params: Optional[Dict[str, Any]],
+                                  all_samples_data: List[Dict[str, Any]],
+                                  parameter_names: Iterable[str], total_samples: int) -> Dict[str, Dict[str, Any]]:
+    """Previous statistics of the parameters whose standardized column is unchanged"""
+    if not previous_params:
+        return {}
+    previous_samples = previous_params.get('all_samples') or []
+    previous_stats = previous_params.get('parameter_statistics') or {}
+    # missing_count depends on the sample count, so a changed sample set recomputes everything
+    if previous_params.get('total_samples') != total_samples or len(previous_samples) != len(all_samples_data):
+        return {}
+    reusable = {}
+    for param in parameter_names:
+        if param in previous_stats and _column(previous_samples, param) == _column(all_samples_data, param):
+            reusable[param] = previous_stats[param]
+    return reusable
+
+
+def changed_parameters(previous_params: Optional[Dict[str, Any]], params: Optional[Dict[str, Any]]) -> List[str]:
+    """Parameters whose statistics differ between two extractions (added and removed ones included)"""
+    previous_stats = (previous_params or {}).get('parameter_statistics') or {}
+    stats = (params or {}).get('parameter_statistics') or {}
+    ordered = list(stats) + [param for param in previous_stats if param not in stats]
+    return [param for param in ordered if previous_stats.get(param) != stats.get(param)]
+
+
+def merge_parameter_issues(previous_issues: List[Dict[str, Any]], new_issues: List[Dict[str, Any]],
+                           changed: Iterable[str], parameter_order: Iterable[str]) -> List[Dict[str, Any]]:
+    """Previous issues of unchanged parameters plus freshly compared ones, in parameter order"""
+    changed = set(changed)
+    kept = [issue for issue in previous_issues or []
+            if isinstance(issue, dict) and issue.get('parameter') not in changed]
+    position = {param: index for index, param in enumerate(parameter_order)}
+    merged = kept + list(new_issues or [])
+    # Issue lists are built by iterating parameter_statistics, so keep that order
+    return sorted(merged, key=lambda issue: position.get(issue.get('parameter'), len(position)))
+
+
+class ReanalysisContext:
+    """Previous analysis plus counters of what an incremental run reused or recomputed"""
+
+    def __init__(self, previous_analysis: Dict[str, Any]):
+        self.previous = previous_analysis or {}
+        metadata = self.previous.get('analysis_metadata', {}) or {}
+        self.previous_mode = metadata.get('analysis_mode')
+        self.step_hashes: Dict[str, str] = dict(metadata.get(STEP_INPUT_HASHES_KEY) or {})
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        for step_result in self.previous.get('step_by_step_analysis') or []:
+            if isinstance(step_result, dict) and step_result.get('step_number') is not None:
+                self.steps[str(step_result['step_number'])] = step_result
+        self.changed: Dict[str, List[str]] = {'soil': [], 'leaf': []}
+        self.reused_steps: List[Any] = []
+        self.recomputed_steps: List[Any] = []
+        self.reused_artifacts: List[str] = []
+        self.logger = logging.getLogger(f"{__name__}.ReanalysisContext")
+
+    def previous_section(self, *path: str, default: Any = None) -> Any:
+        node: Any = self.previous
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return default
+            node = node[key]
+        return restore_flattened(node)
+
+    def previous_parameters(self, data_type: str) -> Optional[Dict[str, Any]]:
+        return self.previous_section('raw_data', f'{data_type}_parameters')
+
+    def record_changes(self, data_type: str, params: Dict[str, Any]) -> List[str]:
+        self.changed[data_type] = changed_parameters(self.previous_parameters(data_type), params)
+        return self.changed[data_type]
+
+    def reuse_artifact(self, name: str, unchanged: bool, *path: str) -> Optional[Any]:
+        """Previous value at path when the artifact's inputs are unchanged, otherwise None"""
+        if not unchanged:
+            return None
+        value = self.previous_section(*path)
+        if value is None:
+            return None
+        self.reused_artifacts.append(name)
+        return value
+
+    def reuse_step(self, step_number: Any, input_hash: str) -> Optional[Dict[str, Any]]:
+        """Previous result of an LLM step whose input hash is unchanged"""
+        key = str(step_number)
+        previous = self.steps.get(key)
+        if previous is None or previous.get('fallback_mode') or self.step_hashes.get(key) != input_hash:
+            self.recomputed_steps.append(step_number)
+            return None
+        self.reused_steps.append(step_number)
+        return copy.deepcopy(previous)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'changed_parameters': {data_type: list(params) for data_type, params in self.changed.items()},
+            'reused_steps': list(self.reused_steps),
+            'recomputed_steps': list(self.recomputed_steps),
+            'reused_artifacts': list(self.reused_artifacts),
+        }
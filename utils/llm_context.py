@@ -0,0 +1,243 @@
+"""
+Bounded LLM Data Context
+Builds the soil/leaf data sections of step prompts within a token budget.
+Every parameter always gets full statistics (mean, spread, quantiles and
+outlier samples); individual sample rows are included verbatim only while
+they fit, otherwise a representative subset is chosen (outliers, the most
+typical sample and an even spread across the rest). Prompt size therefore
+stays roughly flat whether a file has 10 or 1,000 samples.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the individual-sample rows of each dataset (soil, leaf)
+DEFAULT_SAMPLE_TOKEN_BUDGET = 3000
+# Outlier sample ids listed per parameter
+MAX_OUTLIERS_PER_PARAMETER = 5
+# Tukey fence multiplier for outlier detection
+IQR_FENCE = 1.5
+# Average characters per token for Gemini on mixed English/numeric text
+CHARS_PER_TOKEN = 4
+
+SAMPLE_ID_FIELDS = ('sample_no', 'lab_no')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (no API round trip)"""
+    return int(math.ceil(len(text or '') / CHARS_PER_TOKEN))
+
+
+def _numeric(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) and not math.isnan(value):
+        return float(value)
+    return None
+
+
+def _quantile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated quantile of pre-sorted values"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * q
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _sample_label(sample: Dict[str, Any]) -> str:
+    return str(sample.get('sample_no', sample.get('lab_no', 'N/A')))
+
+
+def describe_parameter(values: List[Tuple[str, float]]) -> Dict[str, Any]:
+    """
+    Statistics for one parameter
+
+    Args:
+        values: (sample label, value) pairs
+
+    Returns:
+        Dict with count, mean, std_dev, min, q1, median, q3, max and outliers
+    """
+    numbers = sorted(value for _, value in values)
+    count = len(numbers)
+    mean = sum(numbers) / count
+    std_dev = math.sqrt(sum((x - mean) ** 2 for x in numbers) / (count - 1)) if count > 1 else 0.0
+    q1, median, q3 = (_quantile(numbers, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - IQR_FENCE * iqr, q3 + IQR_FENCE * iqr
+    outliers = sorted(
+        ((label, value) for label, value in values if iqr > 0 and (value < low_fence or value > high_fence)),
+        key=lambda item: abs(item[1] - median), reverse=True)
+    return {
+        'count': count,
+        'mean': mean,
+        'std_dev': std_dev,
+        'min': numbers[0],
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'max': numbers[-1],
+        'outliers': outliers,
+    }
+
+
+class LLMContextBuilder:
+    """Formats a dataset (parameter statistics + samples) for a step prompt"""
+
+    def __init__(self, sample_token_budget: int = DEFAULT_SAMPLE_TOKEN_BUDGET):
+        self.sample_token_budget = sample_token_budget
+        self.logger = logging.getLogger(f"{__name__}.LLMContextBuilder")
+
+    @classmethod
+    def from_configuration(cls) -> 'LLMContextBuilder':
+        """Builder using advanced_settings.llm_context_sample_tokens when set"""
+        budget = DEFAULT_SAMPLE_TOKEN_BUDGET
+        try:
+            from utils.config_snapshot import get_config_snapshot
+            advanced = get_config_snapshot().get_setting('advanced_settings') or {}
+            budget = int(advanced.get('llm_context_sample_tokens') or budget)
+        except Exception as e:
+            logger.warning(f"LLM context configuration unavailable, using defaults: {str(e)}")
+        return cls(sample_token_budget=budget)
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+    def parameter_statistics(self, samples: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Per-parameter statistics computed from the sample rows"""
+        columns: Dict[str, List[Tuple[str, float]]] = {}
+        for sample in samples:
+            label = _sample_label(sample)
+            for param, value in sample.items():
+                if param in SAMPLE_ID_FIELDS:
+                    continue
+                number = _numeric(value)
+                if number is not None:
+                    columns.setdefault(param, []).append((label, number))
+        return {param: describe_parameter(values) for param, values in columns.items()}
+
+    def format_statistics(self, stats: Dict[str, Dict[str, Any]], heading: str) -> List[str]:
+        lines = [heading]
+        for param, s in stats.items():
+            lines.append(
+                f"- {param}: n={s['count']}, mean={s['mean']:.3f}, sd={s['std_dev']:.3f}, "
+                f"min={s['min']:.3f}, q1={s['q1']:.3f}, median={s['median']:.3f}, "
+                f"q3={s['q3']:.3f}, max={s['max']:.3f}")
+            if s['outliers']:
+                shown = ', '.join(f"{label}={value:g}" for label, value in s['outliers'][:MAX_OUTLIERS_PER_PARAMETER])
+                more = len(s['outliers']) - MAX_OUTLIERS_PER_PARAMETER
+                lines.append(f"  Outliers: {shown}{f' (+{more} more)' if more > 0 else ''}")
+        lines.append("")
+        return lines
+
+    # ------------------------------------------------------------------
+    # Samples
+    # ------------------------------------------------------------------
+    @staticmethod
+    def format_sample(sample: Dict[str, Any]) -> str:
+        values = ', '.join(f"{param}: {value}" for param, value in sample.items()
+                           if param not in SAMPLE_ID_FIELDS and value is not None)
+        return f"Sample {sample.get('sample_no', 'N/A')} (Lab: {sample.get('lab_no', 'N/A')}): {values}"
+
+    def select_representative(self, samples: List[Dict[str, Any]], stats: Dict[str, Dict[str, Any]],
+                              limit: int) -> List[int]:
+        """Indices of up to ``limit`` samples: outliers first, then the most
+        typical sample, then an even spread by distance from the median"""
+        if limit >= len(samples):
+            return list(range(len(samples)))
+
+        def _distance(sample: Dict[str, Any]) -> float:
+            total = 0.0
+            for param, s in stats.items():
+                number = _numeric(sample.get(param))
+                if number is not None:
+                    total += abs(number - s['median']) / (s['std_dev'] or 1.0)
+            return total
+
+        chosen: List[int] = []
+        index_by_label: Dict[str, int] = {}
+        for index, sample in enumerate(samples):
+            index_by_label.setdefault(_sample_label(sample), index)
+
+        # Outliers, most extreme first, round-robin across parameters
+        outlier_lists = [s['outliers'] for s in stats.values() if s['outliers']]
+        for rank in range(MAX_OUTLIERS_PER_PARAMETER):
+            for outliers in outlier_lists:
+                if rank < len(outliers) and len(chosen) < max(1, limit // 2):
+                    index = index_by_label.get(outliers[rank][0])
+                    if index is not None and index not in chosen:
+                        chosen.append(index)
+
+        ranked = sorted(range(len(samples)), key=lambda i: _distance(samples[i]))
+        remaining = [i for i in ranked if i not in chosen]
+        slots = limit - len(chosen)
+        if slots > 0 and remaining:
+            step = len(remaining) / slots
+            chosen.extend(remaining[int(k * step)] for k in range(slots))
+        return sorted(set(chosen))[:limit]
+
+    def format_samples(self, samples: List[Dict[str, Any]], stats: Dict[str, Dict[str, Any]],
+                       heading: str) -> Tuple[List[str], int]:
+        """Sample rows within the budget; returns (lines, samples included)"""
+        rows = [self.format_sample(sample) for sample in samples]
+        budget_chars = self.sample_token_budget * CHARS_PER_TOKEN
+        if sum(len(row) + 1 for row in rows) <= budget_chars:
+            return [f"{heading}:"] + rows + [""], len(rows)
+
+        average_row = max(1, sum(len(row) + 1 for row in rows) // len(rows))
+        limit = max(1, budget_chars // average_row)
+        selected = self.select_representative(samples, stats, limit)
+        lines = [f"{heading} ({len(selected)} representative of {len(samples)} samples; "
+                 f"statistics above cover all samples):"]
+        lines.extend(rows[index] for index in selected)
+        lines.append("")
+        return lines, len(selected)
+
+    # ------------------------------------------------------------------
+    # Dataset context
+    # ------------------------------------------------------------------
+    def build(self, params: Dict[str, Any], label: str, preamble: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Context section for one dataset
+
+        Args:
+            params: Extracted soil/leaf params ('all_samples', 'parameter_statistics', ...)
+            label: 'SOIL' or 'LEAF'
+            preamble: Lines placed before the statistics
+
+        Returns:
+            Dict with text, estimated_tokens, samples_total and samples_included
+        """
+        samples = [s for s in (params.get('all_samples') or []) if isinstance(s, dict)]
+        lines = list(preamble or [])
+        stats = self.parameter_statistics(samples)
+        if not stats:
+            # No sample rows: fall back to the precomputed summary statistics
+            stats = {
+                param: {
+                    'count': s.get('count', 0), 'mean': s.get('average', 0.0), 'std_dev': s.get('std_dev', 0.0),
+                    'min': s.get('min', 0.0), 'q1': s.get('min', 0.0), 'median': s.get('average', 0.0),
+                    'q3': s.get('max', 0.0), 'max': s.get('max', 0.0), 'outliers': [],
+                }
+                for param, s in (params.get('parameter_statistics') or {}).items()
+                if isinstance(s, dict) and 'average' in s
+            }
+        lines.extend(self.format_statistics(stats, f"{label} PARAMETER STATISTICS (All Samples):"))
+
+        included = 0
+        if samples:
+            sample_lines, included = self.format_samples(samples, stats, f"INDIVIDUAL {label} SAMPLE DATA")
+            lines.extend(sample_lines)
+
+        text = "\n".join(lines)
+        return {
+            'text': text,
+            'estimated_tokens': estimate_tokens(text),
+            'samples_total': len(samples),
+            'samples_included': included,
+        }
@@ -0,0 +1,231 @@
+"""
+Hedged LLM Requests
+Tail-latency mitigation for step generation: the primary request runs in a
+worker thread, and if it hasn't returned a valid response by a percentile of
+recently observed latencies, a hedged request is issued (to a fallback model
+or the same model). The first valid response wins; the other attempt is
+cancelled (or, if already running, its result is discarded) and hedging
+outcomes are counted for monitoring.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from utils.tracing import bind_context
+
+logger = logging.getLogger(__name__)
+
+# Hedge after this percentile of observed latency...
+DEFAULT_HEDGE_PERCENTILE = 0.95
+# ...but never sooner than this (avoids doubling traffic on fast calls)
+MIN_HEDGE_DELAY_SECONDS = 15.0
+# Delay used until enough latencies have been observed
+DEFAULT_HEDGE_DELAY_SECONDS = 60.0
+MIN_SAMPLES_FOR_PERCENTILE = 5
+LATENCY_WINDOW = 200
+# Worker threads per caller: an attempt, its hedge and one losing attempt that
+# cannot be interrupted and is still finishing
+DEFAULT_MAX_IN_FLIGHT = 3
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per key (e.g. model tier)"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES_FOR_PERCENTILE:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p * (len(samples) - 1)))))
+        return samples[index]
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+
+class HedgeMetrics:
+    """Counters describing how often hedging was needed and who won"""
+
+    FIELDS = ('calls', 'hedges_issued', 'primary_wins', 'hedge_wins', 'cancelled', 'failures')
+
+    def __init__(self):
+        self._counts = {name: 0 for name in self.FIELDS}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        hedged = counts['hedges_issued']
+        counts['hedge_rate'] = round(hedged / counts['calls'], 3) if counts['calls'] else 0.0
+        counts['hedge_win_rate'] = round(counts['hedge_wins'] / hedged, 3) if hedged else 0.0
+        return counts
+
+
+class HedgedCallError(Exception):
+    """Raised when every attempt failed or returned an invalid response"""
+
+    def __init__(self, errors: List[BaseException]):
+        self.errors = errors
+        super().__init__('; '.join(str(e) for e in errors) or 'All hedged attempts failed')
+
+
+class HedgedCaller:
+    """Runs a primary attempt and, after a latency-percentile delay, a hedged one.
+
+    Attempts are callables taking a ``threading.Event`` that is set when the
+    attempt has lost and should stop; clients that cannot be interrupted
+    (e.g. an in-flight HTTP call) simply finish and have their result dropped.
+    Each caller has its own small thread pool, so one session's attempts never
+    queue behind another's; share a tracker to pool latency observations. The
+    pool is created on first use and released by ``close`` (the next call
+    creates a new one).
+    """
+
+    def __init__(self, tracker: Optional[LatencyTracker] = None, metrics: Optional[HedgeMetrics] = None,
+                 percentile: float = DEFAULT_HEDGE_PERCENTILE, min_delay: float = MIN_HEDGE_DELAY_SECONDS,
+                 default_delay: float = DEFAULT_HEDGE_DELAY_SECONDS, max_workers: int = DEFAULT_MAX_IN_FLIGHT):
+        self.tracker = tracker or LatencyTracker()
+        self.metrics = metrics or HedgeMetrics()
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.logger = logging.getLogger(f"{__name__}.HedgedCaller")
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='llm-hedge')
+            return self._executor
+
+    def close(self):
+        """Release the worker threads; losing attempts still running finish and exit"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def hedge_delay(self, key: str) -> float:
+        observed = self.tracker.percentile(key, self.percentile)
+        if observed is None:
+            return self.default_delay
+        return max(self.min_delay, observed)
+
+    def call(self, key: str, primary: Callable[[threading.Event], Any],
+             hedge: Optional[Callable[[threading.Event], Any]] = None,
+             validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the first valid result of primary/hedge
+
+        Args:
+            key: Latency bucket (e.g. tier name) used for the percentile delay
+            primary: First attempt
+            hedge: Attempt issued after the hedge delay, or immediately if the primary fails
+            validate: Returns True for usable results; invalid results count as failures
+
+        Returns:
+            The winning attempt's result
+        """
+        validate = validate or (lambda result: result is not None)
+        self.metrics.incr('calls')
+        started = time.perf_counter()
+
+        cancel_events = {'primary': threading.Event(), 'hedge': threading.Event()}
+        executor = self._pool()
+        pending: Dict[Future, str] = {executor.submit(bind_context(primary), cancel_events['primary']): 'primary'}
+        submitted = {'primary': started}
+        errors: List[BaseException] = []
+        hedge_issued = False
+        deadline = started + self.hedge_delay(key)
+
+        def _issue_hedge():
+            nonlocal hedge_issued
+            hedge_issued = True
+            self.metrics.incr('hedges_issued')
+            self.logger.info(f"Issuing hedged request for {key} after {time.perf_counter() - started:.1f}s")
+            submitted['hedge'] = time.perf_counter()
+            pending[executor.submit(bind_context(hedge), cancel_events['hedge'])] = 'hedge'
+
+        while pending:
+            timeout = None
+            if hedge is not None and not hedge_issued:
+                timeout = max(0.0, deadline - time.perf_counter())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                _issue_hedge()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if not validate(result):
+                    errors.append(ValueError(f"{name} attempt returned an invalid response"))
+                    continue
+
+                # Winner: stop the other attempt
+                for other_future, other_name in pending.items():
+                    cancel_events[other_name].set()
+                    other_future.cancel()
+                    self.metrics.incr('cancelled')
+                self.metrics.incr('hedge_wins' if name == 'hedge' else 'primary_wins')
+                self.tracker.observe(key, time.perf_counter() - submitted[name])
+                return result
+
+            # Primary failed before the hedge delay: use the hedge as an immediate fallback
+            if not pending and hedge is not None and not hedge_issued:
+                _issue_hedge()
+
+        self.metrics.incr('failures')
+        raise HedgedCallError(errors)
+
+
+# Shared by all analyses in this process so the latency percentiles are meaningful
+latency_tracker = LatencyTracker()
+
+
+def load_hedging_settings() -> Dict[str, Any]:
+    """Hedging options from the advanced settings ('hedging' map), with defaults"""
+    settings = {
+        'enabled': True,
+        'percentile': DEFAULT_HEDGE_PERCENTILE,
+        'min_delay_seconds': MIN_HEDGE_DELAY_SECONDS,
+    }
+    try:
+        from utils.config_snapshot import get_config_snapshot
+        advanced = get_config_snapshot().get_setting('advanced_settings') or {}
+        settings.update({k: v for k, v in (advanced.get('hedging') or {}).items() if k in settings})
+    except Exception as e:
+        logger.warning(f"Hedging configuration unavailable, using defaults: {str(e)}")
+    return settings
+
+
+def create_hedged_caller(settings: Optional[Dict[str, Any]] = None) -> HedgedCaller:
+    """Caller for one analyzer: its own worker threads and metrics, process-wide latencies"""
+    settings = settings or load_hedging_settings()
+    return HedgedCaller(tracker=latency_tracker, percentile=float(settings['percentile']),
+                        min_delay=float(settings['min_delay_seconds']))
@@ -0,0 +1,352 @@
+"""
+Structured LLM Output
+Declares the analysis step response contract as a JSON schema (passed to
+Gemini as ``response_schema`` with ``response_mime_type='application/json'``)
+and parses step output with an incremental JSON parser that validates the
+structure as chunks stream in, instead of regex-based repair of free-form
+text. Parse outcomes are counted so retry and fallback rates can be
+monitored.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+JSON_MIME_TYPE = 'application/json'
+
+# Parse outcomes
+PARSE_STRICT = 'strict'
+PARSE_EXTRACTED = 'extracted'
+PARSE_REPAIRED = 'repaired'
+PARSE_FAILED = 'failed'
+
+
+# ----------------------------------------------------------------------
+# Step response schema (Gemini OpenAPI subset)
+# ----------------------------------------------------------------------
+def _string() -> Dict[str, Any]:
+    return {'type': 'STRING'}
+
+
+def _number() -> Dict[str, Any]:
+    return {'type': 'NUMBER'}
+
+
+def _array(items: Dict[str, Any]) -> Dict[str, Any]:
+    return {'type': 'ARRAY', 'items': items}
+
+
+def _object(properties: Dict[str, Any], required: Optional[List[str]] = None) -> Dict[str, Any]:
+    schema = {'type': 'OBJECT', 'properties': properties}
+    if required:
+        schema['required'] = list(required)
+    return schema
+
+
+def _strings(*names: str) -> Dict[str, Any]:
+    return _object({name: _string() for name in names})
+
+
+_YEARS = ('year_1', 'year_2', 'year_3', 'year_4', 'year_5')
+
+TABLE_SCHEMA = _object({
+    'title': _string(),
+    'headers': _array(_string()),
+    'rows': _array(_array(_string())),
+}, required=['title', 'headers', 'rows'])
+
+VISUALIZATION_SCHEMA = _object({
+    'type': _string(),
+    'title': _string(),
+    'data': _object({
+        'categories': _array(_string()),
+        'values': _array(_number()),
+        'series': _array(_object({'name': _string(), 'data': _array(_number())})),
+    }),
+})
+
+RECOMMENDATION_SCHEMA = _strings('action', 'timeline', 'cost_estimate', 'expected_impact',
+                                 'success_indicators', 'data_format_notes')
+
+YIELD_FORECAST_SCHEMA = _object({
+    'baseline_yield': _number(),
+    'high_investment': _strings(*_YEARS),
+    'medium_investment': _strings(*_YEARS),
+    'low_investment': _strings(*_YEARS),
+})
+
+# Fields requested from every step by the step prompt
+BASE_STEP_PROPERTIES = {
+    'summary': _string(),
+    'detailed_analysis': _string(),
+    'key_findings': _array(_string()),
+    'formatted_analysis': _string(),
+    'specific_recommendations': _array(RECOMMENDATION_SCHEMA),
+    'tables': _array(TABLE_SCHEMA),
+    'interpretations': _array(_string()),
+    'visualizations': _array(VISUALIZATION_SCHEMA),
+    'yield_forecast': YIELD_FORECAST_SCHEMA,
+    'statistical_analysis': _strings('summary', 'mean', 'range', 'standard_deviation', 'variance'),
+    'format_analysis': _object({
+        'detected_formats': _array(_string()),
+        'format_comparison': _strings('sp_lab_advantages', 'farm_format_advantages', 'recommended_combination'),
+        'quality_assessment': _strings('sp_lab_quality_score', 'farm_quality_score', 'integration_quality'),
+        'format_specific_insights': _strings('sp_lab_insights', 'farm_insights', 'cross_format_benefits'),
+    }),
+    'data_format_recommendations': _object({
+        'optimal_testing_strategy': _string(),
+        'cost_optimization': _string(),
+        'quality_improvements': _strings('sp_lab', 'farm'),
+        'integration_benefits': _string(),
+    }),
+}
+
+# Extra fields read from specific steps by _parse_llm_response
+STEP_SPECIFIC_PROPERTIES = {
+    1: {
+        'nutrient_comparisons': _array(_strings('parameter', 'source', 'current', 'optimal', 'gap', 'status')),
+    },
+    2: {
+        'identified_issues': _array(_strings('parameter', 'issue_type', 'issue_description', 'severity',
+                                             'current_value', 'optimal_range', 'cause', 'impact')),
+    },
+    3: {
+        'solution_options': _array(_strings('parameter', 'issue_description', 'investment_level', 'product',
+                                            'rate', 'timing', 'cost', 'expected_impact')),
+    },
+    4: {
+        'regenerative_practices': _array(_strings('practice', 'mechanism', 'benefits', 'implementation')),
+    },
+    6: {
+        'assumptions': _array(_string()),
+    },
+}
+
+REQUIRED_STEP_FIELDS = ['summary', 'detailed_analysis', 'key_findings']
+
+
+def step_response_schema(step_number: Any) -> Dict[str, Any]:
+    """Response schema for one analysis step"""
+    try:
+        specific = STEP_SPECIFIC_PROPERTIES.get(int(step_number), {})
+    except (TypeError, ValueError):
+        specific = {}
+    return _object(dict(BASE_STEP_PROPERTIES, **specific), required=REQUIRED_STEP_FIELDS)
+
+
+def is_schema_unsupported_error(error: Exception) -> bool:
+    """Model or SDK rejected structured output options (older models/SDK versions)"""
+    text = str(error).lower()
+    return any(marker in text for marker in ('response_schema', 'response_mime_type', 'mime type', 'json mode'))
+
+
+# ----------------------------------------------------------------------
+# Incremental parser
+# ----------------------------------------------------------------------
+class JSONStreamError(ValueError):
+    """Streamed output can no longer become valid JSON"""
+
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class IncrementalJSONParser:
+    """Tracks JSON structure chunk by chunk.
+
+    ``feed`` raises JSONStreamError as soon as brackets are mismatched, so a
+    broken stream can be abandoned early. Leading text (e.g. a ```json fence)
+    before the first bracket and anything after the top-level value is
+    ignored. ``close`` turns truncated output into the longest valid prefix
+    by cutting back to the last complete member and closing open containers.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._length = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # (offset, open containers) after each complete member
+        self._safe_point: Optional[Tuple[int, Tuple[str, ...]]] = None
+
+    @property
+    def started(self) -> bool:
+        return self._start is not None
+
+    @property
+    def start(self) -> Optional[int]:
+        """Offset of the first bracket in the fed text"""
+        return self._start
+
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+
+    @property
+    def depth(self) -> int:
+        return len(self._stack)
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        offset = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        if self.complete:
+            return
+
+        for index, char in enumerate(chunk):
+            position = offset + index
+            if self._start is None:
+                if char in _CLOSERS:
+                    self._start = position
+                    self._stack.append(char)
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+            elif char in '}]':
+                if not self._stack or _CLOSERS[self._stack[-1]] != char:
+                    raise JSONStreamError(f"Unexpected '{char}' at offset {position}")
+                self._stack.pop()
+                if not self._stack:
+                    self._end = position + 1
+                    return
+                self._safe_point = (position + 1, tuple(self._stack))
+            elif char == ',':
+                self._safe_point = (position, tuple(self._stack))
+
+    def text(self) -> str:
+        """Buffered text from the first bracket (to the end of the value if complete)"""
+        if self._start is None:
+            return ''
+        return ''.join(self._chunks)[self._start:self._end]
+
+    def result(self) -> Any:
+        """Parsed value of a complete document"""
+        if not self.complete:
+            raise JSONStreamError('JSON document is incomplete')
+        return json.loads(self.text(), strict=False)
+
+    def close(self) -> Any:
+        """Parsed value, repairing a truncated document if necessary"""
+        if self.complete:
+            return self.result()
+        if self._start is None:
+            raise JSONStreamError('No JSON document found')
+
+        text = self.text()
+        candidates = []
+        if not self._in_string:
+            candidates.append(text + _closing(self._stack))
+        else:
+            candidates.append(text + '"' + _closing(self._stack))
+        if self._safe_point is not None:
+            cut, stack = self._safe_point
+            candidates.append(text[:cut - self._start] + _closing(stack))
+        for candidate in candidates:
+            try:
+                return json.loads(candidate, strict=False)
+            except ValueError:
+                continue
+        raise JSONStreamError('Truncated JSON document could not be closed')
+
+
+def _closing(stack) -> str:
+    return ''.join(_CLOSERS[char] for char in reversed(stack))
+
+
+def parse_json_text(text: str) -> Tuple[Any, str]:
+    """
+    Parse an LLM response body
+
+    Returns:
+        (value, outcome) where outcome is PARSE_STRICT for a clean document,
+        PARSE_EXTRACTED when surrounding text had to be skipped,
+        PARSE_REPAIRED for a closed truncated document, or (None, PARSE_FAILED)
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None, PARSE_FAILED
+    try:
+        return json.loads(text, strict=False), PARSE_STRICT
+    except ValueError:
+        pass
+
+    # A bracketed preamble ("Here is the analysis [Step 1]: {...}") is not the
+    # document, so on failure retry from the next opening bracket
+    offset = 0
+    while True:
+        parser = IncrementalJSONParser()
+        try:
+            parser.feed(text[offset:])
+            if parser.complete:
+                return parser.result(), PARSE_EXTRACTED
+            return parser.close(), PARSE_REPAIRED
+        except ValueError:
+            if not parser.started:
+                return None, PARSE_FAILED
+            offset += parser.start + 1
+
+
+class ParsedResponse:
+    """Model response plus the JSON value parsed while it streamed"""
+
+    def __init__(self, response: Any, parsed: Any):
+        self._response = response
+        self.parsed = parsed
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+
+# ----------------------------------------------------------------------
+# Metrics
+# ----------------------------------------------------------------------
+class JSONParseMetrics:
+    """Per-run counters of structured-output use and parse outcomes"""
+
+    FIELDS = ('schema_requests', 'schema_unsupported', 'streamed', 'stream_aborts',
+              PARSE_STRICT, PARSE_EXTRACTED, PARSE_REPAIRED, PARSE_FAILED)
+
+    def __init__(self):
+        self._counts = {name: 0 for name in self.FIELDS}
+        self._parse_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def record_parse(self, outcome: str, started: float):
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            self._parse_seconds += time.perf_counter() - started
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            parse_seconds = self._parse_seconds
+        parses = sum(counts[name] for name in (PARSE_STRICT, PARSE_EXTRACTED, PARSE_REPAIRED, PARSE_FAILED))
+        counts['parse_failures'] = counts[PARSE_FAILED]
+        counts['parse_failure_rate'] = round(counts[PARSE_FAILED] / parses, 3) if parses else 0.0
+        counts['parse_time_ms'] = round(parse_seconds * 1000, 2)
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts = {name: 0 for name in self.FIELDS}
+            self._parse_seconds = 0.0
@@ -0,0 +1,220 @@
+"""
+Per-Step Model Routing
+Chooses a Gemini model and output token budget for each analysis step from
+a tiered model pool, and records per-step latency and token usage. Light
+steps (data echo, economics, summaries) run on a fast model while heavy
+diagnostic steps keep the large one.
+
+Routing can be overridden per deployment:
+- Active prompt document: ``step_routing`` maps step numbers to
+  ``{'tier': 'fast' | 'balanced' | 'quality', 'max_output_tokens': int}``
+- Advanced settings document: ``model_pool`` maps tiers to ordered model lists
+"""
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Latency/quality tiers
+TIER_FAST = 'fast'
+TIER_BALANCED = 'balanced'
+TIER_QUALITY = 'quality'
+TIERS = (TIER_FAST, TIER_BALANCED, TIER_QUALITY)
+
+# Ordered preference per tier; later entries are fallbacks for older SDKs/regions
+DEFAULT_MODEL_POOL = {
+    TIER_FAST: ['gemini-2.5-flash-lite', 'gemini-2.5-flash', 'gemini-1.5-flash'],
+    TIER_BALANCED: ['gemini-2.5-flash', 'gemini-1.5-flash', 'gemini-2.5-pro'],
+    TIER_QUALITY: ['gemini-2.5-pro', 'gemini-1.5-pro-002', 'gemini-1.5-pro-latest', 'gemini-1.5-pro'],
+}
+
+# Gemini 2.5 output token ceiling
+MAX_OUTPUT_TOKENS = 65536
+
+DEFAULT_TIER_BUDGETS = {
+    TIER_FAST: 8192,
+    TIER_BALANCED: 16384,
+    TIER_QUALITY: 32768,
+}
+
+# Step number -> tier. Steps 1 and 5 have their tables, charts and forecast
+# rebuilt deterministically, so the LLM only writes narrative for them.
+DEFAULT_STEP_ROUTES = {
+    1: {'tier': TIER_BALANCED},
+    2: {'tier': TIER_QUALITY},
+    3: {'tier': TIER_QUALITY},
+    4: {'tier': TIER_BALANCED},
+    5: {'tier': TIER_FAST},
+    6: {'tier': TIER_BALANCED},
+}
+
+# Non-step tasks routed through the same pool
+TASK_ROUTES = {
+    'executive_summary': {'tier': TIER_FAST, 'max_output_tokens': 2048},
+}
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Model choice for one LLM call"""
+    tier: str
+    models: tuple
+    max_output_tokens: int
+    temperature: float = 0.0
+
+    @property
+    def model(self) -> str:
+        return self.models[0]
+
+    def escalated(self) -> 'ModelRoute':
+        """Same models with the full output budget (used after a MAX_TOKENS finish)"""
+        return ModelRoute(self.tier, self.models, MAX_OUTPUT_TOKENS, self.temperature)
+
+
+@dataclass
+class StepUsage:
+    """Latency and token usage of one routed LLM call"""
+    step_number: Any
+    tier: str
+    model: str
+    max_output_tokens: int
+    latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    attempts: int = 0
+    finish_reason: Optional[str] = None
+    success: bool = False
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def usage_from_response(response: Any) -> Dict[str, int]:
+    """Token counts from a google.generativeai response (``usage_metadata``)"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return {'prompt_tokens': 0, 'output_tokens': 0, 'total_tokens': 0}
+    prompt_tokens = int(getattr(usage, 'prompt_token_count', 0) or 0)
+    output_tokens = int(getattr(usage, 'candidates_token_count', 0) or 0)
+    total_tokens = int(getattr(usage, 'total_token_count', 0) or 0) or prompt_tokens + output_tokens
+    return {'prompt_tokens': prompt_tokens, 'output_tokens': output_tokens, 'total_tokens': total_tokens}
+
+
+def is_model_unavailable_error(error: Exception) -> bool:
+    """Errors that mean 'try the next model in the tier' rather than 'retry'"""
+    text = str(error).lower()
+    return any(marker in text for marker in ('404', 'not found', 'notfound', 'is not supported', 'unsupported model'))
+
+
+class ModelRouter:
+    """Resolves step/task routes from defaults plus admin overrides"""
+
+    def __init__(self, model_pool: Optional[Dict[str, List[str]]] = None,
+                 step_routes: Optional[Dict[Any, Dict[str, Any]]] = None,
+                 tier_budgets: Optional[Dict[str, int]] = None,
+                 default_tier: str = TIER_QUALITY, temperature: float = 0.0):
+        self.model_pool = {tier: list(models) for tier, models in DEFAULT_MODEL_POOL.items()}
+        for tier, models in (model_pool or {}).items():
+            if tier in TIERS and models:
+                self.model_pool[tier] = [str(m) for m in models]
+        self.tier_budgets = dict(DEFAULT_TIER_BUDGETS, **(tier_budgets or {}))
+        self.step_routes = {int(k): dict(v) for k, v in DEFAULT_STEP_ROUTES.items()}
+        for key, route in (step_routes or {}).items():
+            try:
+                self.step_routes[int(key)] = dict(self.step_routes.get(int(key), {}), **dict(route))
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring invalid step route for step {key!r}")
+        self.default_tier = default_tier if default_tier in TIERS else TIER_QUALITY
+        self.temperature = temperature
+        self.logger = logging.getLogger(f"{__name__}.ModelRouter")
+
+    @classmethod
+    def from_configuration(cls) -> 'ModelRouter':
+        """Build a router from the active prompt's step_routing and the advanced settings"""
+        step_routes, model_pool, tier_budgets = {}, {}, {}
+        try:
+            from utils.config_snapshot import get_config_snapshot
+            snapshot = get_config_snapshot()
+            prompt = snapshot.get_active_prompt() or {}
+            advanced = snapshot.get_setting('advanced_settings') or {}
+            step_routes = prompt.get('step_routing') or {}
+            model_pool = advanced.get('model_pool') or {}
+            tier_budgets = advanced.get('tier_output_tokens') or {}
+        except Exception as e:
+            logger.warning(f"Model routing configuration unavailable, using defaults: {str(e)}")
+        return cls(model_pool=model_pool, step_routes=step_routes, tier_budgets=tier_budgets)
+
+    def _build_route(self, spec: Dict[str, Any]) -> ModelRoute:
+        tier = spec.get('tier', self.default_tier)
+        if tier not in TIERS:
+            tier = self.default_tier
+        models = tuple(spec.get('models') or self.model_pool.get(tier) or self.model_pool[TIER_QUALITY])
+        budget = int(spec.get('max_output_tokens') or self.tier_budgets.get(tier, MAX_OUTPUT_TOKENS))
+        return ModelRoute(tier, models, max(256, min(budget, MAX_OUTPUT_TOKENS)),
+                          float(spec.get('temperature', self.temperature)))
+
+    def route_step(self, step: Dict[str, Any]) -> ModelRoute:
+        """Route for an analysis step; a step dict may also carry its own tier/max_output_tokens"""
+        spec = dict(self.step_routes.get(step.get('number'), {}))
+        for key in ('tier', 'max_output_tokens', 'models'):
+            if step.get(key):
+                spec[key] = step[key]
+        return self._build_route(spec)
+
+    def route_task(self, task: str) -> ModelRoute:
+        return self._build_route(TASK_ROUTES.get(task, {}))
+
+
+class UsageRecorder:
+    """Thread-safe collector of StepUsage records for one analysis run"""
+
+    def __init__(self):
+        self._records: List[StepUsage] = []
+        self._lock = threading.Lock()
+
+    def start(self, step_number: Any, route: ModelRoute) -> StepUsage:
+        return StepUsage(step_number=step_number, tier=route.tier, model=route.model,
+                         max_output_tokens=route.max_output_tokens)
+
+    def finish(self, usage: StepUsage, started: float, response: Any = None,
+               error: Optional[Exception] = None) -> StepUsage:
+        usage.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        if response is not None:
+            for key, value in usage_from_response(response).items():
+                setattr(usage, key, value)
+        usage.success = error is None
+        usage.error = str(error)[:200] if error else None
+        with self._lock:
+            self._records.append(usage)
+        return usage
+
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record.to_dict() for record in self._records]
+
+    def summary(self) -> Dict[str, Any]:
+        records = self.records()
+        by_model: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            entry = by_model.setdefault(record['model'], {'calls': 0, 'latency_ms': 0.0, 'total_tokens': 0})
+            entry['calls'] += 1
+            entry['latency_ms'] += record['latency_ms']
+            entry['total_tokens'] += record['total_tokens']
+        return {
+            'calls': len(records),
+            'total_latency_ms': round(sum(r['latency_ms'] for r in records), 1),
+            'prompt_tokens': sum(r['prompt_tokens'] for r in records),
+            'output_tokens': sum(r['output_tokens'] for r in records),
+            'total_tokens': sum(r['total_tokens'] for r in records),
+            'by_model': by_model,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._records = []
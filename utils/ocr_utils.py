@@ -53,6 +53,37 @@ except ImportError:
     logger.error("Excel processing libraries not available: No module named 'xlrd'")
     logger.error("Install required libraries: pip install openpyxl xlrd pandas")
 
+from utils.parameter_standardizer import resolve_parameter_name
+from utils.tracing import STAGE_OCR, traced
+
+# Table header parameter keys, by canonical parameter name
+SOIL_HEADER_KEYS = {
+    'pH': 'ph',
+    'N (%)': 'nitrogen',
+    'Org. C (%)': 'organic_carbon',
+    'Total P (mg/kg)': 'total_p',
+    'Avail P (mg/kg)': 'available_p',
+    'Exch. K (meq/100 g)': 'exchangeable_k',
+    'Exch. Ca (meq/100 g)': 'exchangeable_ca',
+    'Exch. Mg (meq/100 g)': 'exchangeable_mg',
+    'CEC (meq/100 g)': 'cec',
+}
+LEAF_HEADER_KEYS = {
+    'N (%)': 'n_percent',
+    'P (%)': 'p_percent',
+    'K (%)': 'k_percent',
+    'Mg (%)': 'mg_percent',
+    'Ca (%)': 'ca_percent',
+    'B (mg/kg)': 'b_mgkg',
+    'Cu (mg/kg)': 'cu_mgkg',
+    'Zn (mg/kg)': 'zn_mgkg',
+}
+LEAF_EXTRA_HEADERS = {
+    'sample_id': ['sample id', 'sample no', 'sample_id', 'lab no', 'lab no.', 'sample', 'id', 'farm', 'plot'],
+    'fe_mgkg': ['fe (mg/kg)', 'fe mg/kg', 'iron'],
+    'mn_mgkg': ['mn (mg/kg)', 'mn mg/kg', 'manganese'],
+}
+
 class DocumentAIProcessor:
     """Google Document AI processor for OCR extraction"""
     
@@ -180,6 +211,7 @@ class DocumentAIProcessor:
             logger.error(f"Failed to initialize Document AI client: {e}")
             self.client = None
     
+    @traced(STAGE_OCR, 'ocr.document_ai')
     def process_document(self, file_path: str) -> Optional[Dict]:
         """Process document with Google Document AI"""
         if not self.client or not self.processor_id or not self.project_id:
@@ -850,38 +882,12 @@ class DocumentAIProcessor:
         try:
             samples = []
             
-            # Map common soil parameters (more specific patterns first to avoid false matches)
-            soil_param_mapping = {
-                'sample id': ['sample id', 'sample no', 'sample_id', 'id', 'sample', 'lab no', 'lab_no', 'lab number', 'farm', 'plot'],
-                'lab_no': ['lab no', 'lab_no', 'lab no.', 'lab number'],
-                'ph': ['ph', 'pH', 'ph value', 'soil ph', 'ph level'],
-                'cec': ['cec (meq%)', 'cec', 'c.e.c', 'c.e.c (meq%)', 'cec meq%', 'c.e.c meq%', 'cation exchange capacity', 'cec meq/100g'],
-                # Put nitrogen BEFORE organic_carbon to avoid false matches
-                'nitrogen': ['n (%)', 'nitrogen', 'n%', 'n', 'nitrogen (%)', 'n content (%)', 'total n', 'total nitrogen'],
-                'organic_carbon': ['org.c (%)', 'organic carbon', 'org c', 'org. c', 'org c (%)', 'organic c', 'org. carbon (%)', 'organic matter', 'o.m (%)', 'o.m'],
-                'exchangeable_k': ['exch. k (meq%)', 'exch k', 'exchangeable k', 'k (meq%)', 'exch. k', 'k meq', 'potassium (meq%)', 'k meq%', 'exch k meq%'],
-                'exchangeable_ca': ['exch. ca (meq%)', 'exch ca', 'exchangeable ca', 'ca (meq%)', 'exch. ca', 'ca meq', 'calcium (meq%)', 'ca meq%', 'exch ca meq%'],
-                'exchangeable_mg': ['exch. mg (meq%)', 'exch mg', 'exchangeable mg', 'mg (meq%)', 'exch. mg', 'mg meq', 'magnesium (meq%)', 'mg meq%', 'exch mg meq%'],
-                'total_p': ['total p (mg/kg)', 'total p', 'total phosphorus', 'phosphorus total (mg/kg)', 'p total (mg/kg)', 'p total', 'phosphorus total'],
-                'available_p': ['avail p (mg/kg)', 'available p', 'avail p', 'available phosphorus', 'p available (mg/kg)', 'avail. p (mg/kg)', 'p avail', 'phosphorus available']
-            }
-            
-            # Create header mapping with flexible matching
+            # Map headers to parameter keys (resolver handles naming variations)
             header_map = {}
             for i, header in enumerate(headers):
-                header_lower = header.lower().strip()
-
-                for param, variations in soil_param_mapping.items():
-                    # More flexible matching: check if any variation is contained in the header
-                    # or if the header is contained in any variation
-                    for var in variations:
-                        var_lower = var.lower()
-                        if var_lower in header_lower or header_lower in var_lower:
-                            header_map[i] = param
-                            break
-
-                    if i in header_map:
-                        break
+                param = SOIL_HEADER_KEYS.get(resolve_parameter_name(header, 'soil'))
+                if param:
+                    header_map[i] = param
             
             # Process each row as a sample
             for row in rows:
@@ -981,29 +987,16 @@ class DocumentAIProcessor:
         try:
             samples = []
             
-            # Map leaf parameters with more variations
-            leaf_param_mapping = {
-                'sample_id': ['sample id', 'sample no', 'sample_id', 'lab no', 'lab no.', 'sample', 'id', 'farm', 'plot'],
-                'n_percent': ['n (%)', 'n%', 'nitrogen %', 'nitrogen', 'n content (%)', 'total n (%)'],
-                'p_percent': ['p (%)', 'p%', 'phosphorus %', 'phosphorus', 'p content (%)', 'total p (%)'],
-                'k_percent': ['k (%)', 'k%', 'potassium %', 'potassium', 'k content (%)', 'total k (%)'],
-                'mg_percent': ['mg (%)', 'mg%', 'magnesium %', 'magnesium', 'mg content (%)', 'total mg (%)'],
-                'ca_percent': ['ca (%)', 'ca%', 'calcium %', 'calcium', 'ca content (%)', 'total ca (%)'],
-                'b_mgkg': ['b (mg/kg)', 'b mg/kg', 'boron', 'b mg/kg dry matter', 'boron (mg/kg)'],
-                'cu_mgkg': ['cu (mg/kg)', 'cu mg/kg', 'copper', 'cu mg/kg dry matter', 'copper (mg/kg)'],
-                'zn_mgkg': ['zn (mg/kg)', 'zn mg/kg', 'zinc', 'zn mg/kg dry matter', 'zinc (mg/kg)'],
-                'fe_mgkg': ['fe (mg/kg)', 'fe mg/kg', 'iron', 'fe mg/kg dry matter', 'iron (mg/kg)'],
-                'mn_mgkg': ['mn (mg/kg)', 'mn mg/kg', 'manganese', 'mn mg/kg dry matter', 'manganese (mg/kg)']
-            }
-            
-            # Create header mapping
+            # Create header mapping; Fe/Mn and identifiers are not standard parameters
             header_map = {}
             for i, header in enumerate(headers):
-                header_lower = header.lower().strip()
-                for param, variations in leaf_param_mapping.items():
-                    if any(var in header_lower for var in variations):
-                        header_map[i] = param
-                        break
+                param = LEAF_HEADER_KEYS.get(resolve_parameter_name(header, 'leaf'))
+                if not param:
+                    header_lower = header.lower().strip()
+                    param = next((key for key, variations in LEAF_EXTRA_HEADERS.items()
+                                  if any(var in header_lower for var in variations)), None)
+                if param:
+                    header_map[i] = param
             
             # Process each row as a sample
             for row in rows:
@@ -1122,6 +1115,7 @@ class TesseractProcessor:
         except Exception:
             pass
     
+    @traced(STAGE_OCR, 'ocr.tesseract')
     def process_document(self, file_path: str) -> Optional[Dict]:
         """Process document with Tesseract OCR"""
         if not self.available:
@@ -1507,6 +1501,11 @@ def _process_excel_file(excel_path: str) -> Optional[Dict]:
         return None
 
 
+def _extract_table_data_from_csv(headers: List[str], rows: List[List[str]]) -> Optional[Dict]:
+    """Extract structured data from a CSV table (same layout rules as Excel)"""
+    return _extract_table_data_from_excel(headers, rows)
+
+
 def _extract_table_data_from_excel(headers: List[str], rows: List[List[str]]) -> Optional[Dict]:
     """Extract structured data from Excel table"""
     try:
@@ -1553,6 +1552,8 @@ def _extract_table_data_from_excel(headers: List[str], rows: List[List[str]]) ->
         return None
 
 
+@traced(STAGE_OCR, 'ocr.extract', attributes=lambda image_path: {
+    'file_type': os.path.splitext(str(image_path))[1].lower().lstrip('.')})
 def extract_data_from_image(image_path: str) -> Dict[str, Any]:
     """
     Main function to extract data from images using Google Document AI with Tesseract fallback
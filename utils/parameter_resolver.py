@@ -0,0 +1,167 @@
+"""
+Parameter Name Resolver
+Compiles the parameter variation table once into an exact-match index and an
+Aho-Corasick automaton, so a raw column/header name is resolved to its
+canonical parameter in a single pass over the name instead of a scan over
+every variation. Results are memoized per (name, context); the context
+('soil', 'leaf' or None) disambiguates names shared by both report types,
+e.g. a bare 'K' header is exchangeable K on a soil report and K (%) on a
+leaf report.
+"""
+
+import logging
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Variations shorter than this only match exactly (avoids 'n' matching 'sample_no')
+MIN_SUBSTRING_LENGTH = 3
+RESOLVE_CACHE_SIZE = 4096
+
+SOIL_CONTEXT = 'soil'
+LEAF_CONTEXT = 'leaf'
+
+SOIL_PARAMETERS = (
+    'pH', 'N (%)', 'Org. C (%)', 'Total P (mg/kg)', 'Avail P (mg/kg)',
+    'Exch. K (meq/100 g)', 'Exch. Ca (meq/100 g)', 'Exch. Mg (meq/100 g)', 'CEC (meq/100 g)',
+)
+LEAF_PARAMETERS = (
+    'N (%)', 'P (%)', 'K (%)', 'Mg (%)', 'Ca (%)', 'B (mg/kg)', 'Cu (mg/kg)', 'Zn (mg/kg)',
+)
+CONTEXT_PARAMETERS = {SOIL_CONTEXT: frozenset(SOIL_PARAMETERS), LEAF_CONTEXT: frozenset(LEAF_PARAMETERS)}
+
+# Bare element symbols that mean something else on a soil report
+CONTEXT_ALIASES = {
+    SOIL_CONTEXT: {
+        'p': 'Avail P (mg/kg)',
+        'k': 'Exch. K (meq/100 g)',
+        'ca': 'Exch. Ca (meq/100 g)',
+        'mg': 'Exch. Mg (meq/100 g)',
+    },
+    LEAF_CONTEXT: {},
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase with collapsed whitespace (the form variations are indexed in)"""
+    return _WHITESPACE.sub(' ', str(name).strip().lower())
+
+
+class _AhoCorasick:
+    """Multi-pattern substring matcher over lowercase variations"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        # Trie as parallel lists: goto transitions, failure links, outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for text, pattern_id in patterns:
+            node = 0
+            for char in text:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            self._out[node].append(pattern_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[int]:
+        """Ids of every pattern occurring in text"""
+        found: List[int] = []
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            found.extend(self._out[node])
+        return found
+
+
+class ParameterResolver:
+    """Resolves raw parameter names to canonical names using a compiled variation table"""
+
+    def __init__(self, variations: Dict[str, List[str]], cache_size: int = RESOLVE_CACHE_SIZE):
+        self.logger = logging.getLogger(f"{__name__}.ParameterResolver")
+        self._exact: Dict[str, str] = {}
+        # (normalized variation, canonical) in table order; index = pattern id
+        self._patterns: List[Tuple[str, str]] = []
+        for standard, names in variations.items():
+            self._exact.setdefault(normalize_name(standard), standard)
+            for variation in names:
+                normalized = normalize_name(variation)
+                if normalized not in self._exact:
+                    self._exact[normalized] = standard
+                if len(normalized) >= MIN_SUBSTRING_LENGTH:
+                    self._patterns.append((normalized, standard))
+        self._automaton = _AhoCorasick((text, index) for index, (text, _) in enumerate(self._patterns))
+        # Short names are also matched inside longer variations ('cation' -> CEC);
+        # one joined haystack keeps that a single C-level search
+        self._haystack = '\n'.join(text for text, _ in self._patterns)
+        self._haystack_owner = []
+        for index, (text, _) in enumerate(self._patterns):
+            self._haystack_owner.extend([index] * (len(text) + 1))
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _best(self, pattern_ids: Iterable[int], context: Optional[str]) -> Optional[str]:
+        """Prefer parameters valid in the context, then the longest variation, then table order"""
+        allowed = CONTEXT_PARAMETERS.get(context)
+        best_key, best = None, None
+        for pattern_id in pattern_ids:
+            text, standard = self._patterns[pattern_id]
+            key = (0 if allowed is None or standard in allowed else 1, -len(text), pattern_id)
+            if best_key is None or key < best_key:
+                best_key, best = key, standard
+        return best
+
+    def _contained_in_variation(self, name: str) -> List[int]:
+        owners = []
+        start = self._haystack.find(name)
+        while start != -1:
+            owners.append(self._haystack_owner[start])
+            start = self._haystack.find(name, start + 1)
+        return owners
+
+    def _resolve(self, name: str, context: Optional[str] = None) -> Optional[str]:
+        if not name:
+            return None
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+
+        alias = CONTEXT_ALIASES.get(context, {}).get(normalized)
+        if alias:
+            return alias
+        if normalized in self._exact:
+            return self._exact[normalized]
+
+        matched = self._best(self._automaton.find(normalized), context)
+        if matched:
+            return matched
+        if len(normalized) >= MIN_SUBSTRING_LENGTH and '\n' not in normalized:
+            return self._best(self._contained_in_variation(normalized), context)
+        return None
+
+    def cache_info(self):
+        return self.resolve.cache_info()
+
+    def clear_cache(self):
+        self.resolve.cache_clear()
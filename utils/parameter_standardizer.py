@@ -4,9 +4,10 @@ Handles consistent naming and mapping of soil and leaf analysis parameters
 across all modules in the AGS-AI system.
 """
 
-import re
 from typing import Dict, List, Any, Optional
 
+from utils.parameter_resolver import ParameterResolver
+
 class ParameterStandardizer:
     """Centralized parameter standardization for soil and leaf analysis data"""
     
@@ -38,26 +39,29 @@ class ParameterStandardizer:
         # Comprehensive mapping of all possible parameter name variations
         self.PARAMETER_VARIATIONS = {
             # pH variations
-            'pH': ['ph', 'pH', 'PH', 'p.h.', 'acidity', 'alkalinity'],
+            'pH': ['ph', 'pH', 'PH', 'p.h.', 'acidity', 'alkalinity', 'p_h', 'soil ph', 'soil_ph',
+                   'ph value', 'ph level'],
             
             # Nitrogen variations
             'N (%)': [
                 'nitrogen', 'n', 'n%', 'n (%)', 'n_%', 'nitrogen%', 'nitrogen (%)', 
                 'nitrogen_%', 'total n', 'total nitrogen', 'total n (%)', 'total nitrogen (%)',
-                'Nitrogen (%)', 'Total Nitrogen (%)'
+                'Nitrogen (%)', 'Total Nitrogen (%)', 'total_n', 'nitrogen %', 'n content (%)'
             ],
             
             # Organic Carbon variations
             'Org. C (%)': [
                 'organic carbon', 'organic_carbon', 'carbon', 'c', 'c%', 'c (%)', 
                 'c_%', 'organic_carbon_%', 'org. c (%)', 'org c (%)', 'org.c (%)',
-                'Organic Carbon (%)', 'Org. C (%)'
+                'Organic Carbon (%)', 'Org. C (%)', 'org c', 'org. c', 'org_c', 'organic c',
+                'org. carbon (%)', 'oc', 'oc_%', 'organic matter', 'om', 'o.m', 'o.m (%)'
             ],
             
             # Total Phosphorus variations
             'Total P (mg/kg)': [
                 'total phosphorus', 'total p', 'total_p', 'total phosphorus mg/kg', 
-                'total_p_mg_kg', 'total p (mg/kg)', 'total_p_(mg/kg)'
+                'total_p_mg_kg', 'total p (mg/kg)', 'total_p_(mg/kg)', 'p total', 'p_total',
+                'p total (mg/kg)', 'phosphorus total', 'phosphorus_total', 'phosphorus total (mg/kg)'
             ],
             
             # Available Phosphorus variations
@@ -65,7 +69,9 @@ class ParameterStandardizer:
                 'available phosphorus', 'available p', 'available_p', 'avail p', 
                 'avail_p', 'available phosphorus mg/kg', 'available_p_mg_kg',
                 'avail p (mg/kg)', 'avail_p_(mg/kg)', 'available p (mg/kg)',
-                'Available P (mg/kg)', 'Available Phosphorus (mg/kg)'
+                'Available P (mg/kg)', 'Available Phosphorus (mg/kg)', 'avail. p (mg/kg)',
+                'p avail', 'p available', 'p_available', 'p available (mg/kg)',
+                'phosphorus available', 'extractable_p'
             ],
             
             # Exchangeable Potassium variations
@@ -75,7 +81,8 @@ class ParameterStandardizer:
                 'exch. k (meq%)', 'exch k (meq%)', 'exch. k meq%', 'exch k meq%',
                 'exch k (cmol/kg)', 'exch. k (cmol/kg)', 'exch k cmol/kg', 'exch. k cmol/kg',
                 'k meq/100 g', 'k_meq/100 g', 'exchangeable_k_meq/100 g',
-                'exch. k (meq/100 g)', 'exch k (meq/100 g)', 'exch. k meq/100 g', 'exch k meq/100 g'
+                'exch. k (meq/100 g)', 'exch k (meq/100 g)', 'exch. k meq/100 g', 'exch k meq/100 g',
+                'exch. k', 'k meq', 'k (meq%)', 'potassium (meq%)'
             ],
 
             # Exchangeable Calcium variations
@@ -85,7 +92,8 @@ class ParameterStandardizer:
                 'exch. ca (meq%)', 'exch ca (meq%)', 'exch. ca meq%', 'exch ca meq%',
                 'exch ca (cmol/kg)', 'exch. ca (cmol/kg)', 'exch ca cmol/kg', 'exch. ca cmol/kg',
                 'ca meq/100 g', 'ca_meq/100 g', 'exchangeable_ca_meq/100 g',
-                'exch. ca (meq/100 g)', 'exch ca (meq/100 g)', 'exch. ca meq/100 g', 'exch ca meq/100 g'
+                'exch. ca (meq/100 g)', 'exch ca (meq/100 g)', 'exch. ca meq/100 g', 'exch ca meq/100 g',
+                'exch. ca', 'ca meq', 'ca (meq%)', 'calcium (meq%)'
             ],
 
             # Exchangeable Magnesium variations
@@ -95,7 +103,8 @@ class ParameterStandardizer:
                 'exch. mg (meq%)', 'exch mg (meq%)', 'exch. mg meq%', 'exch mg meq%',
                 'exch mg (cmol/kg)', 'exch. mg (cmol/kg)', 'exch mg cmol/kg', 'exch. mg cmol/kg',
                 'mg meq/100 g', 'mg_meq/100 g', 'exchangeable_mg_meq/100 g',
-                'exch. mg (meq/100 g)', 'exch mg (meq/100 g)', 'exch. mg meq/100 g', 'exch mg meq/100 g'
+                'exch. mg (meq/100 g)', 'exch mg (meq/100 g)', 'exch. mg meq/100 g', 'exch mg meq/100 g',
+                'exch. mg', 'mg meq', 'mg (meq%)', 'magnesium (meq%)'
             ],
 
             # CEC variations
@@ -104,28 +113,28 @@ class ParameterStandardizer:
                 'cec (meq%)', 'c.e.c (meq%)', 'c.e.c meq%', 'cec (cmol/kg)', 'cec cmol/kg',
                 'C.E.C (meq%)', 'CEC (meq%)', 'cec meq/100 g', 'cec_meq/100 g',
                 'cec (meq/100 g)', 'c.e.c (meq/100 g)', 'c.e.c meq/100 g',
-                'C.E.C (meq/100 g)', 'CEC (meq/100 g)'
+                'C.E.C (meq/100 g)', 'CEC (meq/100 g)', 'cation_exchange_capacity', 'cec meq/100g'
             ],
             
             # Leaf parameter variations
             'P (%)': [
                 'phosphorus', 'p', 'p%', 'p (%)', 'p_%', 'phosphorus%', 'phosphorus (%)',
-                'leaf phosphorus', 'leaf p', 'leaf_p'
+                'leaf phosphorus', 'leaf p', 'leaf_p', 'phosphorus %', 'p content (%)', 'total p (%)'
             ],
             
             'K (%)': [
                 'potassium', 'k', 'k%', 'k (%)', 'k_%', 'potassium%', 'potassium (%)',
-                'leaf potassium', 'leaf k', 'leaf_k'
+                'leaf potassium', 'leaf k', 'leaf_k', 'potassium %', 'k content (%)', 'total k (%)'
             ],
             
             'Mg (%)': [
                 'magnesium', 'mg', 'mg%', 'mg (%)', 'mg_%', 'magnesium%', 'magnesium (%)',
-                'leaf magnesium', 'leaf mg', 'leaf_mg'
+                'leaf magnesium', 'leaf mg', 'leaf_mg', 'magnesium %', 'mg content (%)', 'total mg (%)'
             ],
             
             'Ca (%)': [
                 'calcium', 'ca', 'ca%', 'ca (%)', 'ca_%', 'calcium%', 'calcium (%)',
-                'leaf calcium', 'leaf ca', 'leaf_ca'
+                'leaf calcium', 'leaf ca', 'leaf_ca', 'calcium %', 'ca content (%)', 'total ca (%)'
             ],
             
             'B (mg/kg)': [
@@ -149,43 +158,32 @@ class ParameterStandardizer:
         for standard, variations in self.PARAMETER_VARIATIONS.items():
             for variation in variations:
                 self.variation_to_standard[variation.lower()] = standard
+
+        # Compiled matcher shared by every extraction path
+        self.resolver = ParameterResolver(self.PARAMETER_VARIATIONS)
     
-    def standardize_parameter_name(self, param_name: str) -> Optional[str]:
+    def standardize_parameter_name(self, param_name: str, context: Optional[str] = None) -> Optional[str]:
         """
         Convert any parameter name variation to the standard format
         
         Args:
             param_name: The parameter name to standardize
+            context: 'soil' or 'leaf' to disambiguate shared names (e.g. 'K')
             
         Returns:
             Standard parameter name or None if not found
         """
-        if not param_name:
+        if not param_name or not isinstance(param_name, str):
             return None
-            
-        # Clean the parameter name
-        clean_name = param_name.strip().lower()
-        clean_name = re.sub(r'\s+', ' ', clean_name)  # Normalize whitespace
-        
-        # Direct lookup
-        if clean_name in self.variation_to_standard:
-            return self.variation_to_standard[clean_name]
-        
-        # Fuzzy matching for partial matches (more precise)
-        for variation, standard in self.variation_to_standard.items():
-            # Only match if the variation is a significant part of the clean_name
-            # Avoid matching single characters or very short variations
-            if len(variation) >= 3 and (variation in clean_name or clean_name in variation):
-                return standard
-        
-        return None
+        return self.resolver.resolve(param_name, context)
     
-    def standardize_data_dict(self, data_dict: Dict[str, Any]) -> Dict[str, Any]:
+    def standardize_data_dict(self, data_dict: Dict[str, Any], context: Optional[str] = None) -> Dict[str, Any]:
         """
         Standardize all parameter names in a data dictionary
         
         Args:
             data_dict: Dictionary with potentially non-standard parameter names
+            context: 'soil' or 'leaf' when the report type is known
             
         Returns:
             Dictionary with standardized parameter names
@@ -193,7 +191,7 @@ class ParameterStandardizer:
         standardized = {}
         
         for key, value in data_dict.items():
-            standard_key = self.standardize_parameter_name(key)
+            standard_key = self.standardize_parameter_name(key, context)
             if standard_key:
                 standardized[standard_key] = value
             else:
@@ -202,17 +200,18 @@ class ParameterStandardizer:
         
         return standardized
     
-    def standardize_samples_list(self, samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def standardize_samples_list(self, samples: List[Dict[str, Any]], context: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Standardize parameter names in a list of sample dictionaries
         
         Args:
             samples: List of sample dictionaries
+            context: 'soil' or 'leaf' when the report type is known
             
         Returns:
             List of samples with standardized parameter names
         """
-        return [self.standardize_data_dict(sample) for sample in samples]
+        return [self.standardize_data_dict(sample, context) for sample in samples]
     
     def get_display_name_mapping(self, param_type: str = 'soil') -> Dict[str, str]:
         """
@@ -314,4 +313,9 @@ class ParameterStandardizer:
         }
 
 # Global instance for easy import
-parameter_standardizer = ParameterStandardizer()
\ No newline at end of file
+parameter_standardizer = ParameterStandardizer()
+
+
+def resolve_parameter_name(param_name: str, context: Optional[str] = None) -> Optional[str]:
+    """Canonical parameter name for a raw column/header name (memoized)"""
+    return parameter_standardizer.standardize_parameter_name(param_name, context)
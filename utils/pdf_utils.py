@@ -15,6 +15,10 @@ from reportlab.platypus import (
     PageBreak, Image, HRFlowable
 )
 
+from utils.findings_clustering import (
+    FindingsClusterer, extract_concepts, extract_issue_categories, get_cached_key_findings)
+from utils.tracing import STAGE_PDF, span, traced
+
 matplotlib.use('Agg')  # Use non-interactive backend
 
 try:
@@ -216,6 +220,7 @@ class PDFReportGenerator:
         
         return styles
     
+    @traced(STAGE_PDF, 'pdf.report')
     def generate_report(self, analysis_data: Dict[str, Any], metadata: Dict[str, Any], 
                        options: Dict[str, Any]) -> bytes:
         """Generate complete PDF report with comprehensive analysis support"""
@@ -376,7 +381,8 @@ class PDFReportGenerator:
             canvas.restoreState()
 
         try:
-            doc.build(story, onFirstPage=_draw_page_frame, onLaterPages=_draw_page_frame)
+            with span('pdf.build', STAGE_PDF, flowables=len(story)):
+                doc.build(story, onFirstPage=_draw_page_frame, onLaterPages=_draw_page_frame)
 
             pdf_bytes = buffer.getvalue()
             buffer.close()
@@ -393,6 +399,7 @@ class PDFReportGenerator:
             buffer.close()
             raise
     
+    @traced(STAGE_PDF, 'pdf.title_page')
     def _create_title_page(self, metadata: Dict[str, Any]) -> List:
         """Create title page"""
         story = []
@@ -551,6 +558,7 @@ class PDFReportGenerator:
         
         return story
     
+    @traced(STAGE_PDF, 'pdf.executive_summary')
     def _create_enhanced_executive_summary(self, analysis_data: Dict[str, Any]) -> List:
         """Create executive summary - COPY EXACTLY FROM RESULTS PAGE"""
         story = []
@@ -2829,82 +2837,11 @@ class PDFReportGenerator:
 
     def _is_same_issue_pdf(self, finding1, finding2):
         """Check if two findings are about the same agricultural issue (PDF version)"""
-        # Define issue patterns
-        issue_patterns = {
-            'potassium_deficiency': ['potassium', 'k deficiency', 'k level', 'k average', 'k critical'],
-            'soil_acidity': ['ph', 'acidic', 'acidity', 'soil ph', 'ph level'],
-            'phosphorus_deficiency': ['phosphorus', 'p deficiency', 'available p', 'p level'],
-            'nutrient_deficiency': ['deficiency', 'deficient', 'nutrient', 'nutrients'],
-            'cec_issue': ['cec', 'cation exchange', 'nutrient retention', 'nutrient holding'],
-            'organic_matter': ['organic matter', 'organic carbon', 'carbon'],
-            'micronutrient': ['copper', 'zinc', 'manganese', 'iron', 'boron', 'micronutrient'],
-            'yield_impact': ['yield', 'productivity', 'tonnes', 'production'],
-            'economic_impact': ['roi', 'investment', 'cost', 'profit', 'revenue', 'economic']
-        }
-        
-        finding1_lower = finding1.lower()
-        finding2_lower = finding2.lower()
-        
-        # Check if both findings mention the same issue category
-        for issue, keywords in issue_patterns.items():
-            finding1_has_issue = any(keyword in finding1_lower for keyword in keywords)
-            finding2_has_issue = any(keyword in finding2_lower for keyword in keywords)
-            
-            if finding1_has_issue and finding2_has_issue:
-                # Additional check for specific values or percentages
-                if issue in ['potassium_deficiency', 'soil_acidity', 'phosphorus_deficiency']:
-                    # Extract numbers from both findings
-                    import re
-                    nums1 = re.findall(r'\d+\.?\d*', finding1)
-                    nums2 = re.findall(r'\d+\.?\d*', finding2)
-                    
-                    # If they have similar numbers, they're likely the same issue
-                    if nums1 and nums2:
-                        for num1 in nums1:
-                            for num2 in nums2:
-                                if abs(float(num1) - float(num2)) < 0.1:  # Very close values
-                                    return True
-                
-                return True
-        
-        return False
+        return bool(extract_issue_categories(finding1) & extract_issue_categories(finding2))
 
     def _extract_key_concepts_pdf(self, text):
         """Extract key concepts from text for better deduplication (PDF version)"""
-        import re
-        
-        # Define key agricultural concepts and nutrients
-        nutrients = ['nitrogen', 'phosphorus', 'potassium', 'calcium', 'magnesium', 'sulfur', 'copper', 'zinc', 'manganese', 'iron', 'boron', 'molybdenum']
-        parameters = ['ph', 'cec', 'organic matter', 'base saturation', 'yield', 'deficiency', 'excess', 'optimum', 'critical', 'mg/kg', '%', 'meq']
-        conditions = ['acidic', 'alkaline', 'deficient', 'sufficient', 'excessive', 'low', 'high', 'moderate', 'severe', 'mild']
-        
-        # Extract numbers and percentages
-        numbers = re.findall(r'\d+\.?\d*', text)
-        
-        # Extract nutrient names and parameters
-        found_concepts = set()
-        
-        # Check for nutrients
-        for nutrient in nutrients:
-            if nutrient in text:
-                found_concepts.add(nutrient)
-        
-        # Check for parameters
-        for param in parameters:
-            if param in text:
-                found_concepts.add(param)
-        
-        # Check for conditions
-        for condition in conditions:
-            if condition in text:
-                found_concepts.add(condition)
-        
-        # Add significant numbers (values that matter for agricultural analysis)
-        for num in numbers:
-            if float(num) > 0:  # Only add positive numbers
-                found_concepts.add(num)
-        
-        return found_concepts
+        return set(extract_concepts(text))
     
     def _merge_similar_findings(self, finding1: str, finding2: str) -> str:
         """Merge two similar findings into one comprehensive finding"""
@@ -3209,7 +3146,11 @@ class PDFReportGenerator:
         step_results = analysis_results.get('step_by_step_analysis', [])
         
         # Generate intelligent key findings with proper deduplication
-        all_key_findings = self._generate_intelligent_key_findings_pdf_OLD(analysis_results, step_results)
+        from modules.results import RENDER_PAYLOAD_VERSION
+        all_key_findings = get_cached_key_findings(
+            analysis_results, 'pdf',
+            lambda: self._generate_intelligent_key_findings_pdf_OLD(analysis_results, step_results),
+            version=RENDER_PAYLOAD_VERSION)
         
         if all_key_findings:
             # Display key findings - exact same format as results page
@@ -3325,46 +3266,8 @@ class PDFReportGenerator:
                 # First group findings by parameter and merge within each group
                 parameter_merged_findings = self._group_and_merge_findings_by_parameter_pdf(step_findings)
                 
-                # Then apply additional deduplication for any remaining similar findings
-                unique_findings = []
-                seen_concepts = []
-                
-                for finding_data in parameter_merged_findings:
-                    finding = finding_data['finding']
-                    normalized = ' '.join(finding.lower().split())
-                    key_concepts = self._extract_key_concepts_pdf(normalized)
-                    
-                    is_duplicate = False
-                    for i, seen_concept_set in enumerate(seen_concepts):
-                        concept_overlap = len(key_concepts.intersection(seen_concept_set))
-                        total_concepts = len(key_concepts.union(seen_concept_set))
-                        
-                        if total_concepts > 0:
-                            similarity = concept_overlap / total_concepts
-                            word_similarity = len(key_concepts.intersection(seen_concept_set)) / max(len(key_concepts), len(seen_concept_set)) if len(key_concepts) > 0 and len(seen_concept_set) > 0 else 0
-                            
-                            # More aggressive deduplication - consolidate similar issues
-                            if similarity > 0.5 or word_similarity > 0.6:
-                                # Merge findings for the same issue
-                                existing_finding = unique_findings[i]['finding']
-                                merged_finding = self._merge_similar_findings(existing_finding, finding)
-                                unique_findings[i]['finding'] = merged_finding
-                                is_duplicate = True
-                                break
-                            
-                            # Check for same issue with stricter criteria
-                            if similarity > 0.3 and word_similarity > 0.4:
-                                if self._is_same_issue_pdf(finding, unique_findings[i]['finding']):
-                                    # Merge findings for the same issue
-                                    existing_finding = unique_findings[i]['finding']
-                                    merged_finding = self._merge_similar_findings(existing_finding, finding)
-                                    unique_findings[i]['finding'] = merged_finding
-                                    is_duplicate = True
-                                    break
-                    
-                    if not is_duplicate:
-                        unique_findings.append(finding_data)
-                        seen_concepts.append(key_concepts)
+                # Then merge remaining similar findings through the concept index
+                unique_findings = FindingsClusterer(self._merge_similar_findings).cluster(parameter_merged_findings)
                 
                 # Combine step findings with existing findings
                 all_key_findings.extend(unique_findings)
@@ -3649,6 +3552,7 @@ class PDFReportGenerator:
         
         return findings
     
+    @traced(STAGE_PDF, 'pdf.step_by_step')
     def _create_comprehensive_step_by_step_analysis(self, analysis_data: Dict[str, Any]) -> List:
         """Create comprehensive step-by-step analysis section with visualizations"""
         story = []
@@ -6707,6 +6611,7 @@ class PDFReportGenerator:
         
         return story
     
+    @traced(STAGE_PDF, 'pdf.economic_forecast')
     def _create_enhanced_economic_forecast_table(self, analysis_data: Dict[str, Any]) -> List:
         """Create enhanced economic forecast table - REMOVED for step-by-step analysis as requested"""
         story = []
@@ -7088,6 +6993,7 @@ class PDFReportGenerator:
         story.append(Spacer(1, 20))
         return story
     
+    @traced(STAGE_PDF, 'pdf.conclusion')
     def _create_enhanced_conclusion(self, analysis_data: Dict[str, Any]) -> List:
         """Create enhanced detailed conclusion section"""
         story = []
@@ -7160,6 +7066,7 @@ class PDFReportGenerator:
         
         return story
     
+    @traced(STAGE_PDF, 'pdf.results_header')
     def _create_results_header_section(self, analysis_data: Dict[str, Any], metadata: Dict[str, Any]) -> List:
         """Create results header section with metadata matching the results page"""
         story = []
@@ -7288,6 +7195,7 @@ class PDFReportGenerator:
         story.append(Spacer(1, 20))
         return story
     
+    @traced(STAGE_PDF, 'pdf.references')
     def _create_references_section(self, analysis_data: Dict[str, Any]) -> List:
         """Create references section for step-by-step analysis"""
         story = []
@@ -7610,6 +7518,7 @@ class PDFReportGenerator:
         return []
 
 
+    @traced(STAGE_PDF, 'pdf.visualizations')
     def _create_comprehensive_visualizations_section(self, analysis_data: Dict[str, Any]) -> List:
         """Create comprehensive visualizations section with all charts and graphs"""
         story = []
@@ -9471,6 +9380,7 @@ class PDFReportGenerator:
         """Create data quality summary PDF table - disabled"""
         return []
 
+    @traced(STAGE_PDF, 'pdf.data_tables')
     def _create_top_level_data_tables(self, analysis_data: Dict[str, Any]) -> List:
         """Copy Results page 'Data Tables' behavior: render analysis_data['tables'] if present."""
         story = []
@@ -7,6 +7,8 @@ import logging
 from typing import List, Dict, Any
 from datetime import datetime
 
+from utils.tracing import STAGE_REFERENCE_SEARCH, traced
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,6 +44,7 @@ class ReferenceSearchEngine:
         else:
             logger.warning("Firestore not available - database search disabled")
     
+    @traced(STAGE_REFERENCE_SEARCH, 'reference_search.database')
     def search_database_references(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search for references in Firestore reference_documents collection with enhanced PDF support"""
         if not self.firestore_client:
@@ -176,6 +179,7 @@ class ReferenceSearchEngine:
         
         return min(score, 1.0)  # Cap at 1.0
     
+    @traced(STAGE_REFERENCE_SEARCH, 'reference_search.all')
     def search_all_references(self, query: str, db_limit: int = 8) -> Dict[str, Any]:
         """Search database for references"""
         logger.info(f"Searching database references for query: {query}")
@@ -0,0 +1,89 @@
+"""
+Analysis Run Context
+Per-run memo of derived artifacts (standards comparisons, issues,
+recommendations, economic forecast, ...). Each artifact is keyed by a
+fingerprint of its inputs, so every consumer within one analysis run shares
+a single computed result instead of rebuilding it. Hit/miss counts and
+compute time are reported in the run's analysis_metadata.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Artifact names shared by the analysis engine and its helpers
+ARTIFACT_CROSS_VALIDATION = 'cross_validation'
+ARTIFACT_SOIL_ISSUES = 'soil_issues'
+ARTIFACT_LEAF_ISSUES = 'leaf_issues'
+ARTIFACT_RECOMMENDATIONS = 'recommendations'
+ARTIFACT_ECONOMIC_FORECAST = 'economic_forecast'
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable digest of JSON-like inputs (dict order does not matter)"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class RunContext:
+    """Memoizes derived artifacts for one analysis run (thread-safe)"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._values: Dict[Tuple[str, str], Any] = {}
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._compute_seconds: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(f"{__name__}.RunContext")
+
+    def get_or_compute(self, name: str, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return the memoized artifact or compute and store it
+
+        Args:
+            name: Artifact name (e.g. ARTIFACT_ECONOMIC_FORECAST)
+            key: Fingerprint of the artifact's inputs (see fingerprint())
+            compute: Builds the artifact on a miss
+
+        Returns:
+            The shared artifact; callers must not mutate it unless every
+            consumer should see the change
+        """
+        with self._lock:
+            if (name, key) in self._values:
+                self._hits[name] = self._hits.get(name, 0) + 1
+                return self._values[(name, key)]
+            started = time.perf_counter()
+            value = compute()
+            self._compute_seconds[name] = self._compute_seconds.get(name, 0.0) + time.perf_counter() - started
+            self._misses[name] = self._misses.get(name, 0) + 1
+            self._values[(name, key)] = value
+            return value
+
+    def peek(self, name: str, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._values.get((name, key))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            names = sorted(set(self._hits) | set(self._misses))
+            return {
+                'run_id': self.run_id,
+                'hits': sum(self._hits.values()),
+                'misses': sum(self._misses.values()),
+                'artifacts': {
+                    name: {
+                        'hits': self._hits.get(name, 0),
+                        'misses': self._misses.get(name, 0),
+                        'compute_ms': round(self._compute_seconds.get(name, 0.0) * 1000, 2),
+                    }
+                    for name in names
+                },
+            }
@@ -0,0 +1,254 @@
+"""
+Session Result Store
+Bounded replacement for the plain dict previously kept in
+``st.session_state.stored_analysis_results``. Only the most recently used
+analysis results stay in memory; older ones are pickled, zlib-compressed
+and spilled to a per-session directory keyed by result ID, and are reloaded
+lazily when accessed again. Spilled results beyond a second cap are
+dropped (they remain available from Firestore). A process-wide gauge
+reports resident and spilled bytes across all sessions so instances can
+be sized.
+"""
+
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_STATE_KEY = 'stored_analysis_results'
+DEFAULT_MAX_IN_MEMORY = 2
+DEFAULT_MAX_SPILLED = 20
+COMPRESSION_LEVEL = 6
+SPILL_ROOT = os.path.join(tempfile.gettempdir(), 'ags_ai_session_results')
+
+_stores: 'weakref.WeakSet[SessionResultStore]' = weakref.WeakSet()
+_stores_lock = threading.Lock()
+
+
+class _ByteCounter:
+    """File-like sink that only counts what is written to it"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate resident size of a result tree (its pickled size, streamed without building the payload)"""
+    counter = _ByteCounter()
+    try:
+        pickle.Pickler(counter, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    except Exception:
+        return 0
+    return counter.size
+
+
+class SessionResultStore:
+    """LRU of analysis results with compressed on-disk spill (dict-like, thread-safe)"""
+
+    def __init__(self, max_in_memory: int = DEFAULT_MAX_IN_MEMORY, max_spilled: int = DEFAULT_MAX_SPILLED,
+                 spill_dir: Optional[str] = None):
+        self.max_in_memory = max(1, max_in_memory)
+        self.max_spilled = max(0, max_spilled)
+        self.spill_dir = spill_dir or os.path.join(SPILL_ROOT, uuid.uuid4().hex)
+        self._memory: 'OrderedDict[str, Any]' = OrderedDict()
+        # Pickled size per in-memory result; None until the gauge first needs it
+        self._memory_bytes: Dict[str, Optional[int]] = {}
+        self._spilled: 'OrderedDict[str, int]' = OrderedDict()   # result_id -> compressed bytes
+        self._order: List[str] = []                               # insertion order, oldest first
+        self._reloads = 0
+        self._spills = 0
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(f"{__name__}.SessionResultStore")
+        # Spill files go away with the session
+        weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        with _stores_lock:
+            _stores.add(self)
+
+    @classmethod
+    def from_configuration(cls) -> 'SessionResultStore':
+        """Store sized from advanced_settings (session_results_in_memory / session_results_max_spilled)"""
+        max_in_memory, max_spilled = DEFAULT_MAX_IN_MEMORY, DEFAULT_MAX_SPILLED
+        try:
+            from utils.config_snapshot import get_config_snapshot
+            advanced = get_config_snapshot().get_setting('advanced_settings') or {}
+            max_in_memory = int(advanced.get('session_results_in_memory') or max_in_memory)
+            max_spilled = int(advanced.get('session_results_max_spilled') or max_spilled)
+        except Exception as e:
+            logger.warning(f"Session store configuration unavailable, using defaults: {str(e)}")
+        return cls(max_in_memory=max_in_memory, max_spilled=max_spilled)
+
+    # ------------------------------------------------------------------
+    # Dict interface
+    # ------------------------------------------------------------------
+    def __setitem__(self, result_id: str, value: Any):
+        with self._lock:
+            self._drop(result_id)
+            self._memory[result_id] = value
+            self._memory_bytes[result_id] = None
+            self._order.append(result_id)
+            self._enforce_limits()
+
+    def __getitem__(self, result_id: str) -> Any:
+        with self._lock:
+            if result_id in self._memory:
+                self._memory.move_to_end(result_id)
+                return self._memory[result_id]
+            if result_id not in self._spilled:
+                raise KeyError(result_id)
+            value = self._reload(result_id)
+            self._memory[result_id] = value
+            self._enforce_limits()
+            return value
+
+    def __delitem__(self, result_id: str):
+        with self._lock:
+            if result_id not in self:
+                raise KeyError(result_id)
+            self._drop(result_id)
+
+    def __contains__(self, result_id: object) -> bool:
+        with self._lock:
+            return result_id in self._memory or result_id in self._spilled
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._order)
+
+    def get(self, result_id: str, default: Any = None) -> Any:
+        try:
+            return self[result_id]
+        except KeyError:
+            return default
+        except Exception as e:
+            self.logger.error(f"Error loading stored result {result_id}: {str(e)}")
+            return default
+
+    def latest_id(self) -> Optional[str]:
+        """ID of the most recently stored result"""
+        with self._lock:
+            return self._order[-1] if self._order else None
+
+    def latest(self, default: Any = None) -> Any:
+        result_id = self.latest_id()
+        return self.get(result_id, default) if result_id else default
+
+    def clear(self):
+        with self._lock:
+            for result_id in list(self._order):
+                self._drop(result_id)
+
+    # ------------------------------------------------------------------
+    # Spill
+    # ------------------------------------------------------------------
+    def _path(self, result_id: str) -> str:
+        safe = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in str(result_id))
+        return os.path.join(self.spill_dir, f"{safe}.pkl.z")
+
+    def _spill(self, result_id: str, value: Any):
+        """Write a result to disk (rewritten each time, so in-place edits survive)"""
+        try:
+            payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL)
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._path(result_id), 'wb') as handle:
+                handle.write(payload)
+            self._spilled[result_id] = len(payload)
+            self._spills += 1
+        except Exception as e:
+            self.logger.error(f"Could not spill result {result_id}, dropping it from the session: {str(e)}")
+            self._order = [rid for rid in self._order if rid != result_id]
+
+    def _reload(self, result_id: str) -> Any:
+        with open(self._path(result_id), 'rb') as handle:
+            pickled = zlib.decompress(handle.read())
+        value = pickle.loads(pickled)
+        self._remove_file(result_id)
+        self._memory_bytes[result_id] = len(pickled)
+        self._reloads += 1
+        return value
+
+    def _remove_file(self, result_id: str):
+        self._spilled.pop(result_id, None)
+        try:
+            os.remove(self._path(result_id))
+        except OSError:
+            pass
+
+    def _drop(self, result_id: str):
+        self._memory.pop(result_id, None)
+        self._memory_bytes.pop(result_id, None)
+        if result_id in self._spilled:
+            self._remove_file(result_id)
+        self._order = [rid for rid in self._order if rid != result_id]
+
+    def _enforce_limits(self):
+        while len(self._memory) > self.max_in_memory:
+            result_id, value = self._memory.popitem(last=False)
+            self._memory_bytes.pop(result_id, None)
+            self._spill(result_id, value)
+        while len(self._spilled) > self.max_spilled:
+            result_id = next(iter(self._spilled))
+            self._remove_file(result_id)
+            self._order = [rid for rid in self._order if rid != result_id]
+            self.logger.info(f"Dropped spilled result {result_id} (over {self.max_spilled} per session)")
+
+    # ------------------------------------------------------------------
+    # Gauge
+    # ------------------------------------------------------------------
+    def memory_usage(self) -> Dict[str, Any]:
+        with self._lock:
+            for result_id, size in self._memory_bytes.items():
+                if size is None:
+                    self._memory_bytes[result_id] = _estimate_size(self._memory[result_id])
+            return {
+                'in_memory': len(self._memory),
+                'in_memory_bytes': sum(self._memory_bytes.values()),
+                'spilled': len(self._spilled),
+                'spilled_bytes': sum(self._spilled.values()),
+                'spills': self._spills,
+                'reloads': self._reloads,
+            }
+
+
+def get_session_result_store(session_state: Any, key: str = SESSION_STATE_KEY) -> SessionResultStore:
+    """The session's result store, created (or upgraded from a plain dict) on first use"""
+    store = session_state.get(key) if hasattr(session_state, 'get') else None
+    if isinstance(store, SessionResultStore):
+        return store
+    new_store = SessionResultStore.from_configuration()
+    if isinstance(store, dict):
+        for result_id, value in store.items():
+            new_store[result_id] = value
+    session_state[key] = new_store
+    return new_store
+
+
+def get_memory_usage() -> Dict[str, Any]:
+    """Process-wide totals across all live session stores"""
+    with _stores_lock:
+        stores = list(_stores)
+    totals = {'sessions': len(stores), 'in_memory': 0, 'in_memory_bytes': 0,
+              'spilled': 0, 'spilled_bytes': 0, 'spills': 0, 'reloads': 0}
+    for store in stores:
+        for name, value in store.memory_usage().items():
+            totals[name] += value
+    return totals
@@ -0,0 +1,329 @@
+"""
+Tracing
+Lightweight spans for timing the analysis pipeline by stage (OCR,
+preprocessing, standards comparison, LLM steps, reference search, Firestore,
+PDF sections). The current span is held in a context variable, so nested
+spans find their parent automatically; ``bind_context`` carries it into
+worker threads. A span opened with no parent starts a trace; when it ends,
+the trace (root plus every finished child) is kept in an in-memory ring
+buffer and passed to any configured sinks, e.g. a JSON-lines file set with
+AGS_AI_TRACE_FILE. Finished spans are also kept in a second ring buffer
+that backs the per-stage p50/p95 table in the admin panel.
+
+Token counts set on LLM call spans (prompt_tokens, output_tokens) are added
+to the enclosing spans when the call span ends, so a step span and the
+analysis root report the tokens used below them.
+
+Set AGS_AI_TRACING=0 to disable span recording.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGE_ANALYSIS = 'analysis'
+STAGE_OCR = 'ocr'
+STAGE_PREPROCESSING = 'preprocessing'
+STAGE_STANDARDS = 'standards'
+STAGE_LLM = 'llm'
+STAGE_REFERENCE_SEARCH = 'reference_search'
+STAGE_FIRESTORE = 'firestore'
+STAGE_PDF = 'pdf'
+
+DEFAULT_MAX_SPANS = 5000
+DEFAULT_MAX_TRACES = 200
+DEFAULT_FILE_MAX_BYTES = 50 * 1024 * 1024
+
+# Numeric attributes summed into the parent span when a span ends
+ROLLUP_ATTRIBUTES = ('prompt_tokens', 'output_tokens', 'total_tokens')
+
+_current_span: 'contextvars.ContextVar[Optional[Span]]' = contextvars.ContextVar('ags_ai_span', default=None)
+
+
+class Span:
+    """One timed operation; use via ``tracer.span()`` or ``@traced``"""
+
+    __slots__ = ('name', 'stage', 'trace_id', 'span_id', 'parent', 'start_time', 'duration_s', 'thread',
+                 'attributes', 'status', 'error', '_started')
+
+    def __init__(self, name: str, stage: Optional[str], parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name = name
+        self.stage = stage or (parent.stage if parent else None) or name.split('.', 1)[0]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.start_time = time.time()
+        self.duration_s: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.attributes = dict(attributes)
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'stage': self.stage,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'start_time': self.start_time,
+            'duration_s': self.duration_s,
+            'thread': self.thread,
+            'attributes': self.attributes,
+            'status': self.status,
+            'error': self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled; accepts and drops attributes"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class JsonlTraceSink:
+    """Appends one JSON line per finished trace; rotates to <path>.1 past max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_FILE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: Dict[str, Any]):
+        line = json.dumps(trace, default=str) + '\n'
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(line)
+
+
+class Tracer:
+    """Span factory with ring buffers of recent spans and traces (thread-safe)"""
+
+    def __init__(self, max_spans: int = DEFAULT_MAX_SPANS, max_traces: int = DEFAULT_MAX_TRACES,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=max_traces)
+        # trace_id -> finished child spans, for traces whose root is still open
+        self._open: Dict[str, List[Dict[str, Any]]] = {}
+        self._sinks: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"{__name__}.Tracer")
+
+    @classmethod
+    def from_environment(cls) -> 'Tracer':
+        tracer = cls(enabled=os.environ.get('AGS_AI_TRACING', '1').strip().lower() not in ('0', 'false', 'no'))
+        path = os.environ.get('AGS_AI_TRACE_FILE')
+        if path:
+            tracer.add_sink(JsonlTraceSink(path))
+        return tracer
+
+    def add_sink(self, sink: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._sinks.append(sink)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    @contextmanager
+    def span(self, name: str, stage: Optional[str] = None, **attributes: Any) -> Iterator[Any]:
+        """Time the enclosed block as a child of the current span (or as a new trace)"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        parent = _current_span.get()
+        span = Span(name, stage, parent, attributes)
+        if parent is None:
+            with self._lock:
+                self._open[span.trace_id] = []
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = 'error'
+            span.error = f"{type(e).__name__}: {str(e)[:200]}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration_s = round(time.perf_counter() - span._started, 6)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        record = span.to_dict()
+        with self._lock:
+            if span.parent is not None:
+                for key in ROLLUP_ATTRIBUTES:
+                    value = span.attributes.get(key)
+                    if isinstance(value, (int, float)):
+                        span.parent.attributes[key] = span.parent.attributes.get(key, 0) + value
+            self._spans.append(record)
+            if span.parent is not None:
+                # Children that end after their root (e.g. a cancelled hedge) are not attached
+                children = self._open.get(span.trace_id)
+                if children is not None:
+                    children.append(record)
+                return
+            children = self._open.pop(span.trace_id, [])
+            trace = self._trace_summary(record, children)
+            self._traces.append(trace)
+            sinks = list(self._sinks)
+        for sink in sinks:
+            try:
+                sink(trace)
+            except Exception as e:
+                self.logger.warning(f"Trace sink failed: {str(e)}")
+
+    @staticmethod
+    def _trace_summary(root: Dict[str, Any], children: List[Dict[str, Any]]) -> Dict[str, Any]:
+        stages_by_id = {record['span_id']: record['stage'] for record in [root] + children}
+        stage_totals: Dict[str, float] = {}
+        for child in children:
+            # Only top-most spans of each stage, so nested spans of one stage are not double counted
+            if stages_by_id.get(child['parent_id']) != child['stage']:
+                stage_totals[child['stage']] = stage_totals.get(child['stage'], 0.0) + (child['duration_s'] or 0.0)
+        return {
+            'trace_id': root['trace_id'],
+            'name': root['name'],
+            'stage': root['stage'],
+            'start_time': root['start_time'],
+            'duration_s': root['duration_s'],
+            'status': root['status'],
+            'error': root['error'],
+            'attributes': root['attributes'],
+            'stage_totals': {stage: round(total, 6) for stage, total in stage_totals.items()},
+            'spans': [root] + children,
+        }
+
+    def traced(self, stage: Optional[str] = None, name: Optional[str] = None,
+               attributes: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable:
+        """
+        Decorator recording each call as a span
+
+        Args:
+            stage: Stage the span is reported under
+            name: Span name (default: the function's qualified name)
+            attributes: Called with the function's arguments; returns span attributes
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                extra = {}
+                if attributes is not None and self.enabled:
+                    try:
+                        extra = attributes(*args, **kwargs) or {}
+                    except Exception:
+                        extra = {}
+                with self.span(span_name, stage, **extra):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def stage_stats(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Count, p50, p95, max and errors per (stage, span name) over the span buffer"""
+        with self._lock:
+            spans = list(self._spans)
+        grouped: Dict[tuple, List[Dict[str, Any]]] = {}
+        for record in spans:
+            if since is None or record['start_time'] >= since:
+                grouped.setdefault((record['stage'], record['name']), []).append(record)
+        rows = []
+        for (stage, name), records in sorted(grouped.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            durations = sorted(record['duration_s'] or 0.0 for record in records)
+            rows.append({
+                'stage': stage,
+                'name': name,
+                'count': len(records),
+                'p50_s': round(_percentile(durations, 0.50), 4),
+                'p95_s': round(_percentile(durations, 0.95), 4),
+                'max_s': round(durations[-1], 4),
+                'errors': sum(1 for record in records if record['status'] == 'error'),
+            })
+        return rows
+
+    def recent_traces(self, limit: int = 50, stage: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent finished traces, newest first (optionally only those rooted in a stage)"""
+        with self._lock:
+            traces = list(self._traces)
+        traces = [trace for trace in reversed(traces) if stage is None or trace['stage'] == stage]
+        return traces[:limit]
+
+    def slowest_traces(self, limit: int = 10, stage: Optional[str] = STAGE_ANALYSIS) -> List[Dict[str, Any]]:
+        traces = self.recent_traces(limit=self._traces.maxlen, stage=stage)
+        return sorted(traces, key=lambda trace: trace['duration_s'] or 0.0, reverse=True)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._traces.clear()
+
+
+tracer = Tracer.from_environment()
+
+
+def span(name: str, stage: Optional[str] = None, **attributes: Any):
+    """Convenience wrapper around the shared tracer"""
+    return tracer.span(name, stage, **attributes)
+
+
+def traced(stage: Optional[str] = None, name: Optional[str] = None,
+           attributes: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable:
+    """Convenience wrapper around the shared tracer"""
+    return tracer.traced(stage, name, attributes)
+
+
+def current_span() -> Any:
+    """The innermost open span in this context (a no-op span when there is none)"""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def bind_context(func: Callable) -> Callable:
+    """Run func in a copy of the caller's context, so spans opened in another thread nest under the caller's"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
@@ -95,6 +95,11 @@ TRANSLATIONS = {
         'upload_yield_unit': 'Yield Unit',
         'upload_palm_density': 'Palm Density (per hectare)',
         'upload_start_analysis': 'Start Comprehensive Analysis',
+        'upload_analysis_mode': 'Analysis Mode',
+        'upload_analysis_mode_help': 'Full uses AI for every step. Fast computes data, issue and economic steps instantly and uses AI only for the written guidance. Quick report makes no AI calls.',
+        'upload_mode_full': 'Full (AI)',
+        'upload_mode_fast': 'Fast',
+        'upload_mode_quick': 'Quick report',
         'upload_requirements': 'Requirements for Analysis:',
         'upload_need_soil': 'Upload a soil analysis report',
         'upload_need_leaf': 'Upload a leaf analysis report',
@@ -259,6 +264,11 @@ TRANSLATIONS = {
         'upload_yield_unit': 'Unit Hasil',
         'upload_palm_density': 'Ketumpatan Kelapa Sawit (per hektar)',
         'upload_start_analysis': 'Mula Analisis Komprehensif',
+        'upload_analysis_mode': 'Mod Analisis',
+        'upload_analysis_mode_help': 'Penuh menggunakan AI untuk setiap langkah. Pantas mengira langkah data, isu dan ekonomi serta-merta dan menggunakan AI hanya untuk panduan bertulis. Laporan ringkas tidak menggunakan AI.',
+        'upload_mode_full': 'Penuh (AI)',
+        'upload_mode_fast': 'Pantas',
+        'upload_mode_quick': 'Laporan ringkas',
         'upload_requirements': 'Keperluan untuk Analisis:',
         'upload_need_soil': 'Muat naik laporan analisis tanah',
         'upload_need_leaf': 'Muat naik laporan analisis daun',
@@ -0,0 +1,185 @@
+"""
+In-Process TTL Cache
+Small thread-safe time-based cache shared by services whose results may be
+slightly stale (admin metrics, feedback insights) so repeated Streamlit
+reruns and analyses don't repeat the same Firestore reads.
+
+``NamespacedCache`` adds per-scope keys (a user, an analysis) on top, so
+one user's refresh drops only that user's entries instead of every cached
+value on the server, with hit/miss/eviction counters per namespace.
+"""
+
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe mapping of key -> value that expires entries after ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                return entry[1]
+        value = compute()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        self.invalidate()
+
+
+class NamespacedCache:
+    """TTL cache partitioned into namespaces, keyed by (scope, key) within each"""
+
+    def __init__(self):
+        # namespace -> OrderedDict[(scope, key)] = (stored_at, value), oldest first
+        self._entries: Dict[str, 'OrderedDict[Tuple[Hashable, Hashable], Tuple[float, Any]]'] = {}
+        self._settings: Dict[str, Tuple[float, Optional[int]]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, namespace: str, ttl_seconds: float, max_entries: Optional[int] = None):
+        """Declare a namespace (re-registering updates its ttl and size cap)"""
+        with self._lock:
+            self._settings[namespace] = (ttl_seconds, max_entries)
+            self._entries.setdefault(namespace, OrderedDict())
+            self._counters.setdefault(namespace, {'hits': 0, 'misses': 0, 'evictions': 0})
+
+    def get_or_compute(self, namespace: str, scope: Hashable, compute: Callable[[], Any],
+                       key: Hashable = None) -> Any:
+        """
+        Cached value for (scope, key) in a namespace, computing it on a miss
+
+        Every caller gets its own deep copy, so one session mutating what it
+        was handed (e.g. attaching render caches) never leaks into another
+        session or back into the cache.
+        """
+        if namespace not in self._settings:
+            raise KeyError(f"Cache namespace '{namespace}' is not registered")
+        entry_key = (scope, key)
+        now = time.monotonic()
+        with self._lock:
+            ttl_seconds, _ = self._settings[namespace]
+            entries = self._entries[namespace]
+            counters = self._counters[namespace]
+            entry = entries.get(entry_key)
+            if entry is not None and now - entry[0] < ttl_seconds:
+                counters['hits'] += 1
+                cached = entry[1]
+            else:
+                if entry is not None:
+                    del entries[entry_key]
+                    counters['evictions'] += 1
+                counters['misses'] += 1
+                cached = _MISSING
+        if cached is not _MISSING:
+            return copy.deepcopy(cached)
+
+        value = compute()
+        with self._lock:
+            ttl_seconds, max_entries = self._settings[namespace]
+            entries = self._entries[namespace]
+            counters = self._counters[namespace]
+            entries.pop(entry_key, None)
+            now = time.monotonic()
+            # Entries are in insertion order, so expired ones are at the front
+            while entries and now - next(iter(entries.values()))[0] >= ttl_seconds:
+                entries.popitem(last=False)
+                counters['evictions'] += 1
+            entries[entry_key] = (now, value)
+            while max_entries and len(entries) > max_entries:
+                entries.popitem(last=False)
+                counters['evictions'] += 1
+        return copy.deepcopy(value)
+
+    def invalidate(self, namespace: str, scope: Hashable = None, key: Hashable = None) -> int:
+        """
+        Drop entries of a namespace: all of them, one scope's, or one (scope, key)
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            entries = self._entries.get(namespace)
+            if not entries:
+                return 0
+            if scope is None:
+                doomed = list(entries)
+            elif key is None:
+                doomed = [entry_key for entry_key in entries if entry_key[0] == scope]
+            else:
+                doomed = [(scope, key)] if (scope, key) in entries else []
+            for entry_key in doomed:
+                del entries[entry_key]
+            self._counters[namespace]['evictions'] += len(doomed)
+            return len(doomed)
+
+    def invalidate_scope(self, scope: Hashable) -> int:
+        """Drop one scope's entries (e.g. a user's) from every namespace; a None scope drops nothing"""
+        if scope is None:
+            return 0
+        with self._lock:
+            namespaces = list(self._entries)
+        return sum(self.invalidate(namespace, scope) for namespace in namespaces)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for namespace, counters in self._counters.items():
+                lookups = counters['hits'] + counters['misses']
+                result[namespace] = dict(
+                    counters,
+                    entries=len(self._entries.get(namespace, {})),
+                    hit_rate=round(counters['hits'] / lookups, 3) if lookups else 0.0,
+                )
+            return result
+
+
+app_cache = NamespacedCache()
+
+
+def scoped_cache(namespace: str, ttl_seconds: float, max_entries: Optional[int] = None,
+                 cache: Optional[NamespacedCache] = None):
+    """
+    Decorator caching ``func(scope, *args, **kwargs)`` in a namespace
+
+    The first positional argument is the scope (usually the user key); the
+    remaining arguments form the key. The wrapper gains ``invalidate(scope=None)``.
+    """
+    store = cache or app_cache
+    store.register(namespace, ttl_seconds, max_entries)
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(scope, *args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items()))) if (args or kwargs) else None
+            return store.get_or_compute(namespace, scope, lambda: func(scope, *args, **kwargs), key=key)
+
+        wrapper.invalidate = lambda scope=None: store.invalidate(namespace, scope)
+        wrapper.namespace = namespace
+        return wrapper
+
+    return decorator
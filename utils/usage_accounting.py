@@ -0,0 +1,477 @@
+"""
+LLM Usage Accounting
+Prices the per-call token counts recorded by ``UsageRecorder`` and rolls
+them up per step, per analysis and per user. Every finished analysis is
+added to an in-process ledger (recent analyses and per-model totals for the
+admin panel), to the owner's usage document in Firestore (lifetime totals
+plus monthly buckets, updated in a transaction) and to a small per-day
+document with system-wide totals. Optional monthly token/cost budgets per
+subscription plan, with per-user overrides, are checked before an analysis
+that would call the LLM starts.
+
+Prices and budgets can be overridden in the advanced settings document:
+- ``model_pricing`` maps a model to
+  ``{'input_per_million': USD, 'output_per_million': USD}``
+- ``llm_budgets`` is ``{'plans': {plan: limits}, 'users': {user_key: limits}}``
+  where limits are ``{'monthly_tokens': int, 'monthly_cost_usd': float}``;
+  a missing or zero limit means unlimited
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+try:
+    from google.cloud.firestore import Increment, Query
+except ImportError:
+    Increment = None
+    Query = None
+
+from utils.firebase_config import COLLECTIONS, get_firestore_client, update_document_transactionally
+
+logger = logging.getLogger(__name__)
+
+USAGE_SCHEMA_VERSION = 1
+MONTHLY_RETENTION_MONTHS = 24
+LEDGER_MAX_ENTRIES = 500
+
+# USD per million tokens (paid tier, prompts up to 200k tokens)
+DEFAULT_MODEL_PRICING = {
+    'gemini-2.5-pro': {'input_per_million': 1.25, 'output_per_million': 10.00},
+    'gemini-2.5-flash': {'input_per_million': 0.30, 'output_per_million': 2.50},
+    'gemini-2.5-flash-lite': {'input_per_million': 0.10, 'output_per_million': 0.40},
+    'gemini-2.0-flash': {'input_per_million': 0.10, 'output_per_million': 0.40},
+    'gemini-1.5-pro': {'input_per_million': 1.25, 'output_per_million': 5.00},
+    'gemini-1.5-flash': {'input_per_million': 0.075, 'output_per_million': 0.30},
+}
+# Unknown models are priced like the quality tier so costs are never understated
+FALLBACK_PRICING_MODEL = 'gemini-2.5-pro'
+
+COUNTER_KEYS = ('analyses', 'calls', 'failed_calls', 'prompt_tokens', 'output_tokens', 'total_tokens', 'cost_usd')
+
+
+def _month_key(when: datetime) -> str:
+    return when.strftime('%Y-%m')
+
+
+def _day_key(when: datetime) -> str:
+    return when.strftime('%Y-%m-%d')
+
+
+def _empty_counters() -> Dict[str, Any]:
+    return {key: 0.0 if key == 'cost_usd' else 0 for key in COUNTER_KEYS}
+
+
+def _add_counters(target: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    for key in COUNTER_KEYS:
+        target[key] = target.get(key, 0) + source.get(key, 0)
+    target['cost_usd'] = round(target.get('cost_usd', 0.0), 6)
+    return target
+
+
+# ----------------------------------------------------------------------
+# Pricing and per-analysis rollups
+# ----------------------------------------------------------------------
+class UsagePricing:
+    """Token prices per model; model names are matched exactly, then by prefix"""
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self.prices = {model: dict(price) for model, price in DEFAULT_MODEL_PRICING.items()}
+        for model, price in (prices or {}).items():
+            if isinstance(price, dict):
+                self.prices[str(model)] = dict(self.prices.get(str(model), {}), **price)
+        self._unknown_logged = set()
+        self.logger = logging.getLogger(f"{__name__}.UsagePricing")
+
+    @classmethod
+    def from_configuration(cls) -> 'UsagePricing':
+        prices = {}
+        try:
+            from utils.config_snapshot import get_config_snapshot
+            advanced = get_config_snapshot().get_setting('advanced_settings') or {}
+            prices = advanced.get('model_pricing') or {}
+        except Exception as e:
+            logger.warning(f"Model pricing configuration unavailable, using defaults: {str(e)}")
+        return cls(prices)
+
+    def price_for(self, model: str) -> Dict[str, float]:
+        name = str(model or '').replace('models/', '')
+        if name in self.prices:
+            return self.prices[name]
+        # Versioned names (gemini-1.5-pro-002, -latest) use the longest matching base model
+        matches = [known for known in self.prices if name.startswith(known)]
+        if matches:
+            return self.prices[max(matches, key=len)]
+        if name not in self._unknown_logged:
+            self._unknown_logged.add(name)
+            self.logger.warning(f"No price for model '{name}', using {FALLBACK_PRICING_MODEL} prices")
+        return self.prices[FALLBACK_PRICING_MODEL]
+
+    def cost(self, model: str, prompt_tokens: int, output_tokens: int, total_tokens: int = 0) -> float:
+        """USD cost of one call; thinking tokens are billed as output, so use total - prompt when larger"""
+        price = self.price_for(model)
+        billed_output = max(int(output_tokens or 0), int(total_tokens or 0) - int(prompt_tokens or 0))
+        return (int(prompt_tokens or 0) * float(price.get('input_per_million', 0.0)) +
+                billed_output * float(price.get('output_per_million', 0.0))) / 1_000_000
+
+
+def summarize_calls(calls: Iterable[Dict[str, Any]], pricing: Optional[UsagePricing] = None) -> Dict[str, Any]:
+    """Priced totals for a list of StepUsage records, broken down by step and by model"""
+    pricing = pricing or UsagePricing()
+    totals = _empty_counters()
+    by_step: Dict[str, Dict[str, Any]] = {}
+    by_model: Dict[str, Dict[str, Any]] = {}
+    latency_ms = 0.0
+    for call in calls or []:
+        prompt_tokens = int(call.get('prompt_tokens') or 0)
+        output_tokens = int(call.get('output_tokens') or 0)
+        total_tokens = int(call.get('total_tokens') or 0) or prompt_tokens + output_tokens
+        contribution = {
+            'calls': 1,
+            'failed_calls': 0 if call.get('success', True) else 1,
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': total_tokens,
+            'cost_usd': pricing.cost(call.get('model'), prompt_tokens, output_tokens, total_tokens),
+        }
+        latency_ms += float(call.get('latency_ms') or 0.0)
+        _add_counters(totals, contribution)
+        # Firestore map keys must be strings
+        _add_counters(by_step.setdefault(str(call.get('step_number')), _empty_counters()), contribution)
+        _add_counters(by_model.setdefault(str(call.get('model') or 'unknown'), _empty_counters()), contribution)
+    for bucket in [totals] + list(by_step.values()) + list(by_model.values()):
+        bucket.pop('analyses', None)
+    totals['latency_ms'] = round(latency_ms, 1)
+    totals['by_step'] = by_step
+    totals['by_model'] = by_model
+    return totals
+
+
+def analysis_usage(analysis_results: Dict[str, Any], pricing: Optional[UsagePricing] = None) -> Dict[str, Any]:
+    """Priced usage of one analysis from its analysis_metadata.model_usage.calls"""
+    metadata = (analysis_results or {}).get('analysis_metadata', {}) or {}
+    model_usage = metadata.get('model_usage', {}) or {}
+    usage = summarize_calls(model_usage.get('calls') or [], pricing)
+    usage['analysis_mode'] = metadata.get('analysis_mode')
+    return usage
+
+
+# ----------------------------------------------------------------------
+# Budgets
+# ----------------------------------------------------------------------
+@dataclass
+class BudgetStatus:
+    """Outcome of a budget check for the current month"""
+    allowed: bool
+    plan: str
+    month: str
+    used_tokens: int = 0
+    used_cost_usd: float = 0.0
+    token_limit: Optional[int] = None
+    cost_limit_usd: Optional[float] = None
+    message: str = ''
+
+    @property
+    def limited(self) -> bool:
+        return self.token_limit is not None or self.cost_limit_usd is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _limits(spec: Any) -> Dict[str, Any]:
+    spec = spec if isinstance(spec, dict) else {}
+    tokens = int(spec.get('monthly_tokens') or 0)
+    cost = float(spec.get('monthly_cost_usd') or 0.0)
+    return {'monthly_tokens': tokens or None, 'monthly_cost_usd': cost or None}
+
+
+def load_budgets() -> Dict[str, Any]:
+    try:
+        from utils.config_snapshot import get_config_snapshot
+        advanced = get_config_snapshot().get_setting('advanced_settings') or {}
+        return advanced.get('llm_budgets') or {}
+    except Exception as e:
+        logger.warning(f"LLM budget configuration unavailable, budgets disabled: {str(e)}")
+        return {}
+
+
+def evaluate_budget(usage_doc: Optional[Dict[str, Any]], plan: str, budgets: Dict[str, Any],
+                    user_key: Optional[str] = None, now: Optional[datetime] = None) -> BudgetStatus:
+    """Compare a user's usage this month with their plan (or per-user) limits (pure function)"""
+    month = _month_key(now or datetime.now())
+    plan = plan or 'none'
+    user_limits = (budgets.get('users') or {}).get(user_key) if user_key else None
+    limits = _limits(user_limits if user_limits is not None else (budgets.get('plans') or {}).get(plan))
+    used = ((usage_doc or {}).get('monthly') or {}).get(month) or {}
+    status = BudgetStatus(
+        allowed=True, plan=plan, month=month,
+        used_tokens=int(used.get('total_tokens', 0) or 0),
+        used_cost_usd=round(float(used.get('cost_usd', 0.0) or 0.0), 4),
+        token_limit=limits['monthly_tokens'], cost_limit_usd=limits['monthly_cost_usd'],
+    )
+    if status.token_limit is not None and status.used_tokens >= status.token_limit:
+        status.allowed = False
+        status.message = (f"Monthly AI token budget reached for the '{plan}' plan "
+                          f"({status.used_tokens:,} of {status.token_limit:,} tokens)")
+    elif status.cost_limit_usd is not None and status.used_cost_usd >= status.cost_limit_usd:
+        status.allowed = False
+        status.message = (f"Monthly AI budget reached for the '{plan}' plan "
+                          f"(${status.used_cost_usd:,.2f} of ${status.cost_limit_usd:,.2f})")
+    return status
+
+
+# ----------------------------------------------------------------------
+# In-process ledger
+# ----------------------------------------------------------------------
+class UsageLedger:
+    """Thread-safe record of recent analyses' usage and per-model totals since process start"""
+
+    def __init__(self, max_entries: int = LEDGER_MAX_ENTRIES):
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._totals = _empty_counters()
+        self._by_model: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_key: Optional[str], plan: Optional[str], usage: Dict[str, Any],
+               when: Optional[datetime] = None):
+        entry = {
+            'recorded_at': (when or datetime.now()).isoformat(),
+            'user_key': user_key or 'anonymous',
+            'plan': plan,
+            'analysis_mode': usage.get('analysis_mode'),
+            'by_step': usage.get('by_step', {}),
+            **{key: usage.get(key, 0) for key in COUNTER_KEYS if key != 'analyses'},
+        }
+        with self._lock:
+            self._entries.append(entry)
+            _add_counters(self._totals, dict(usage, analyses=1))
+            for model, counters in (usage.get('by_model') or {}).items():
+                _add_counters(self._by_model.setdefault(model, _empty_counters()), counters)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._entries))[:limit]
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._totals, by_model={model: dict(c) for model, c in self._by_model.items()})
+
+    def by_user(self) -> List[Dict[str, Any]]:
+        """Per-user totals over the ledger window, most expensive first"""
+        users: Dict[str, Dict[str, Any]] = {}
+        for entry in self.recent(limit=self._entries.maxlen):
+            bucket = users.setdefault(entry['user_key'], dict(_empty_counters(), user_key=entry['user_key'],
+                                                             plan=entry.get('plan')))
+            _add_counters(bucket, dict(entry, analyses=1))
+        return sorted(users.values(), key=lambda bucket: bucket['cost_usd'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._totals = _empty_counters()
+            self._by_model = {}
+
+
+usage_ledger = UsageLedger()
+
+
+# ----------------------------------------------------------------------
+# Firestore rollups
+# ----------------------------------------------------------------------
+def _empty_usage_doc(user_key: str) -> Dict[str, Any]:
+    return {
+        'user_key': user_key,
+        'schema_version': USAGE_SCHEMA_VERSION,
+        'totals': _empty_counters(),
+        'monthly': {},
+        'by_model': {},
+        'month': None,
+        'month_total_tokens': 0,
+        'month_cost_usd': 0.0,
+        'last_analysis': None,
+    }
+
+
+def apply_usage(doc: Dict[str, Any], usage: Dict[str, Any], plan: Optional[str], when: datetime) -> Dict[str, Any]:
+    """Fold one analysis' usage into a user usage document (pure function, no I/O)"""
+    contribution = dict(usage, analyses=1)
+    _add_counters(doc.setdefault('totals', _empty_counters()), contribution)
+    month_key = _month_key(when)
+    month = _add_counters(doc.setdefault('monthly', {}).setdefault(month_key, _empty_counters()), contribution)
+    for model, counters in (usage.get('by_model') or {}).items():
+        _add_counters(doc.setdefault('by_model', {}).setdefault(model, _empty_counters()), counters)
+
+    for key in sorted(doc['monthly'])[:-MONTHLY_RETENTION_MONTHS]:
+        del doc['monthly'][key]
+
+    # Top-level copies of the current month so admins can order users by spend
+    if doc.get('month') is None or month_key >= doc['month']:
+        doc['month'] = month_key
+        doc['month_total_tokens'] = month['total_tokens']
+        doc['month_cost_usd'] = month['cost_usd']
+    if plan:
+        doc['plan'] = plan
+    doc['last_analysis'] = {
+        'at': when.isoformat(),
+        'analysis_mode': usage.get('analysis_mode'),
+        'total_tokens': usage.get('total_tokens', 0),
+        'cost_usd': round(usage.get('cost_usd', 0.0), 6),
+        'by_step': usage.get('by_step', {}),
+    }
+    doc['updated_at'] = datetime.now().isoformat()
+    return doc
+
+
+class UsageAccountant:
+    """Records analysis usage and checks budgets against the per-user usage documents"""
+
+    def __init__(self, db=None, pricing: Optional[UsagePricing] = None, ledger: Optional[UsageLedger] = None):
+        self.db = db or get_firestore_client()
+        self.pricing = pricing or UsagePricing.from_configuration()
+        self.ledger = ledger or usage_ledger
+        self.logger = logging.getLogger(f"{__name__}.UsageAccountant")
+
+    def _doc_ref(self, user_key: str):
+        return self.db.collection(COLLECTIONS['llm_usage']).document(user_key)
+
+    def _daily_ref(self, day_key: str):
+        return self.db.collection(COLLECTIONS['llm_usage_daily']).document(day_key)
+
+    def record_analysis(self, user_key: Optional[str], analysis_results: Dict[str, Any],
+                        plan: Optional[str] = None, when: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Price an analysis' LLM calls and add them to the ledger and Firestore rollups
+
+        Args:
+            user_key: user_id (or email for legacy users); None for anonymous runs
+            analysis_results: Results returned by generate_comprehensive_analysis
+            plan: The user's subscription plan
+            when: When the analysis finished, defaults to now
+
+        Returns:
+            dict: The priced usage of the analysis (totals, by_step, by_model)
+        """
+        when = when or datetime.now()
+        usage = analysis_usage(analysis_results, self.pricing)
+        self.ledger.record(user_key, plan, usage, when)
+        if self.db and usage['calls']:
+            if user_key:
+                self._record_user(user_key, usage, plan, when)
+            self._record_daily(usage, when)
+        return usage
+
+    def _record_user(self, user_key: str, usage: Dict[str, Any], plan: Optional[str], when: datetime) -> bool:
+        try:
+            update_document_transactionally(self.db, self._doc_ref(user_key), lambda: _empty_usage_doc(user_key),
+                                            lambda doc: apply_usage(doc, usage, plan, when))
+            return True
+        except Exception as e:
+            self.logger.error(f"Error updating LLM usage for {user_key}: {str(e)}")
+            return False
+
+    def _record_daily(self, usage: Dict[str, Any], when: datetime) -> bool:
+        try:
+            day_key = _day_key(when)
+            counters = {key: usage.get(key, 0) for key in COUNTER_KEYS if key != 'analyses'}
+            counters['analyses'] = 1
+            update: Dict[str, Any] = {'date': day_key, 'updated_at': datetime.now().isoformat()}
+            if Increment is not None:
+                update.update({key: Increment(value) for key, value in counters.items()})
+                update['models'] = {model: {'total_tokens': Increment(c['total_tokens']),
+                                            'cost_usd': Increment(c['cost_usd'])}
+                                    for model, c in (usage.get('by_model') or {}).items()}
+            else:
+                snapshot = self._daily_ref(day_key).get()
+                current = snapshot.to_dict() if snapshot.exists else {}
+                update.update({key: current.get(key, 0) + value for key, value in counters.items()})
+                models = dict(current.get('models', {}))
+                for model, c in (usage.get('by_model') or {}).items():
+                    entry = dict(models.get(model, {}))
+                    entry['total_tokens'] = entry.get('total_tokens', 0) + c['total_tokens']
+                    entry['cost_usd'] = entry.get('cost_usd', 0.0) + c['cost_usd']
+                    models[model] = entry
+                update['models'] = models
+            self._daily_ref(day_key).set(update, merge=True)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error recording daily LLM usage: {str(e)}")
+            return False
+
+    def get_user_usage(self, user_key: str) -> Optional[Dict[str, Any]]:
+        if not self.db or not user_key:
+            return None
+        try:
+            snapshot = self._doc_ref(user_key).get()
+            return snapshot.to_dict() if snapshot.exists else None
+        except Exception as e:
+            self.logger.error(f"Error reading LLM usage for {user_key}: {str(e)}")
+            return None
+
+    def check_budget(self, user_key: Optional[str], plan: Optional[str],
+                     budgets: Optional[Dict[str, Any]] = None, now: Optional[datetime] = None) -> BudgetStatus:
+        """Whether the user may start another LLM analysis this month; fails open if usage is unreadable"""
+        budgets = load_budgets() if budgets is None else budgets
+        status = evaluate_budget(None, plan, budgets, user_key, now)
+        if not status.limited or not user_key:
+            return status
+        return evaluate_budget(self.get_user_usage(user_key), plan, budgets, user_key, now)
+
+    def top_users(self, limit: int = 20, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Users with the highest LLM spend this month"""
+        if not self.db:
+            return []
+        month = _month_key(now or datetime.now())
+        try:
+            query = self.db.collection(COLLECTIONS['llm_usage'])
+            if Query is not None and hasattr(query, 'order_by'):
+                query = query.order_by('month_cost_usd', direction=Query.DESCENDING).limit(limit * 2)
+            rows = []
+            for doc in query.stream():
+                data = doc.to_dict() or {}
+                current = (data.get('monthly') or {}).get(month)
+                if current:
+                    rows.append(dict(current, user_key=data.get('user_key', doc.id), plan=data.get('plan')))
+            return sorted(rows, key=lambda row: row.get('cost_usd', 0.0), reverse=True)[:limit]
+        except Exception as e:
+            self.logger.error(f"Error loading top LLM users: {str(e)}")
+            return []
+
+    def daily_usage(self, days: int = 30, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """System-wide daily usage, oldest first"""
+        now = now or datetime.now()
+        keys = [_day_key(now - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+        empty = {key: 0.0 if key == 'cost_usd' else 0 for key in COUNTER_KEYS}
+        if not self.db:
+            return [dict(empty, date=key) for key in keys]
+        try:
+            refs = [self._daily_ref(key) for key in keys]
+            snapshots = {}
+            if hasattr(self.db, 'get_all'):
+                for snapshot in self.db.get_all(refs):
+                    if snapshot.exists:
+                        snapshots[snapshot.id] = snapshot.to_dict() or {}
+            else:
+                for key, ref in zip(keys, refs):
+                    snapshot = ref.get()
+                    if snapshot.exists:
+                        snapshots[key] = snapshot.to_dict() or {}
+            return [dict(empty, **{k: snapshots.get(key, {}).get(k, 0) for k in COUNTER_KEYS}, date=key)
+                    for key in keys]
+        except Exception as e:
+            self.logger.error(f"Error loading daily LLM usage: {str(e)}")
+            return [dict(empty, date=key) for key in keys]
+
+
+def record_analysis_usage(user_key: Optional[str], analysis_results: Dict[str, Any],
+                          plan: Optional[str] = None, db=None) -> Dict[str, Any]:
+    """Convenience wrapper used when an analysis finishes"""
+    return UsageAccountant(db).record_analysis(user_key, analysis_results, plan)
+
+
+def check_usage_budget(user_key: Optional[str], plan: Optional[str], db=None) -> BudgetStatus:
+    """Convenience wrapper used before an analysis starts"""
+    return UsageAccountant(db).check_budget(user_key, plan)
@@ -0,0 +1,363 @@
+"""
+Materialized Per-User Analysis Statistics
+Keeps one compact statistics document per user that is updated in a
+Firestore transaction whenever an analysis is stored, so the dashboard reads
+a single small document instead of scanning the user's analysis history.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from google.cloud.firestore import FieldFilter
+except ImportError:
+    FieldFilter = None
+
+from utils.analysis_storage import AnalysisDocumentStore, analysis_report_types, is_chunked_document
+from utils.firebase_config import COLLECTIONS, get_firestore_client, update_document_transactionally
+
+logger = logging.getLogger(__name__)
+
+STATS_SCHEMA_VERSION = 1
+
+# Daily counts are only needed for "this week" activity and month-over-month trends
+DAILY_RETENTION_DAYS = 70
+# Monthly buckets power the 12-month trends chart
+MONTHLY_RETENTION_MONTHS = 24
+
+SEVERITY_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+EFFECTIVENESS_LEVELS = ['High', 'Medium', 'Low']
+
+
+def _naive(value: Any) -> Optional[datetime]:
+    """Normalize stored timestamps (datetime or ISO string) to naive datetimes"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None) if value.tzinfo is not None else value
+    return None
+
+
+def analysis_contribution(analysis_results: Dict[str, Any], status: str = 'completed',
+                          report_types: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Counts a single analysis adds to its owner's statistics
+
+    report_types overrides the types derived from raw_data (for stored
+    documents whose raw_data is kept outside the summary document).
+    """
+    analysis_results = analysis_results or {}
+    metadata = analysis_results.get('analysis_metadata', {}) or {}
+    issues = (analysis_results.get('issues_analysis', {}) or {}).get('all_issues', []) or []
+    recommendations = analysis_results.get('recommendations', []) or []
+    if report_types is None:
+        report_types = analysis_report_types(analysis_results)
+
+    has_soil = 'soil' in report_types
+    has_leaf = 'leaf' in report_types
+
+    severity_counts = {level: 0 for level in SEVERITY_LEVELS}
+    critical_issues = 0
+    for issue in issues if isinstance(issues, list) else []:
+        if not isinstance(issue, dict):
+            continue
+        severity = str(issue.get('severity') or issue.get('priority') or 'Medium').title()
+        severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        if issue.get('critical') or severity in ('High', 'Critical'):
+            critical_issues += 1
+
+    effectiveness_counts = {level: 0 for level in EFFECTIVENESS_LEVELS}
+    for rec in recommendations if isinstance(recommendations, list) else []:
+        if isinstance(rec, dict):
+            effectiveness = str(rec.get('effectiveness') or 'Medium').title()
+            effectiveness_counts[effectiveness] = effectiveness_counts.get(effectiveness, 0) + 1
+
+    return {
+        'analyses': 1,
+        'completed': 1 if status == 'completed' else 0,
+        'soil': 1 if has_soil else 0,
+        'leaf': 1 if has_leaf else 0,
+        'issues': len(issues) if isinstance(issues, list) else 0,
+        'critical_issues': critical_issues,
+        'recommendations': len(recommendations) if isinstance(recommendations, list) else 0,
+        'processing_time_seconds': float(metadata.get('processing_time_seconds', 0) or 0),
+        'issue_severity': severity_counts,
+        'recommendation_effectiveness': effectiveness_counts,
+    }
+
+
+def contribution_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Change in an analysis's contribution when it is re-saved (counts of analyses stay put)"""
+    delta = {key: current.get(key, 0) - previous.get(key, 0) for key in current
+             if key not in ('issue_severity', 'recommendation_effectiveness')}
+    delta['analyses'] = 0
+    for field in ('issue_severity', 'recommendation_effectiveness'):
+        levels = set(previous.get(field, {})) | set(current.get(field, {}))
+        delta[field] = {level: current.get(field, {}).get(level, 0) - previous.get(field, {}).get(level, 0)
+                        for level in levels}
+    return delta
+
+
+def _empty_stats(user_key: str) -> Dict[str, Any]:
+    return {
+        'user_key': user_key,
+        'schema_version': STATS_SCHEMA_VERSION,
+        'totals': {
+            'analyses': 0, 'completed': 0, 'soil': 0, 'leaf': 0, 'issues': 0,
+            'critical_issues': 0, 'recommendations': 0, 'processing_time_seconds': 0.0,
+        },
+        'issue_severity': {level: 0 for level in SEVERITY_LEVELS},
+        'recommendation_effectiveness': {level: 0 for level in EFFECTIVENESS_LEVELS},
+        'monthly': {},
+        'daily': {},
+        'last_analysis_at': None,
+    }
+
+
+def apply_contribution(stats: Dict[str, Any], contribution: Dict[str, Any], created_at: datetime) -> Dict[str, Any]:
+    """Fold one analysis into a statistics document (pure function, no I/O)"""
+    totals = stats.setdefault('totals', {})
+    for key in ('analyses', 'completed', 'soil', 'leaf', 'issues', 'critical_issues',
+                'recommendations', 'processing_time_seconds'):
+        totals[key] = totals.get(key, 0) + contribution.get(key, 0)
+
+    for field in ('issue_severity', 'recommendation_effectiveness'):
+        levels = stats.setdefault(field, {})
+        for level, count in contribution.get(field, {}).items():
+            levels[level] = levels.get(level, 0) + count
+
+    month_key = created_at.strftime('%Y-%m')
+    month = stats.setdefault('monthly', {}).setdefault(
+        month_key, {'analyses': 0, 'soil': 0, 'leaf': 0, 'issues': 0, 'recommendations': 0})
+    for key in month:
+        month[key] += contribution.get(key, 0)
+
+    day_key = created_at.strftime('%Y-%m-%d')
+    daily = stats.setdefault('daily', {})
+    day = daily.setdefault(day_key, {'analyses': 0, 'soil': 0, 'leaf': 0})
+    for key in day:
+        day[key] += contribution.get(key, 0)
+
+    # Prune old buckets so the document stays small
+    cutoff_day = (created_at - timedelta(days=DAILY_RETENTION_DAYS)).strftime('%Y-%m-%d')
+    for key in [k for k in daily if k < cutoff_day]:
+        del daily[key]
+    months = sorted(stats['monthly'])
+    for key in months[:-MONTHLY_RETENTION_MONTHS]:
+        del stats['monthly'][key]
+
+    last = _naive(stats.get('last_analysis_at'))
+    if last is None or created_at > last:
+        stats['last_analysis_at'] = created_at.isoformat()
+    stats['updated_at'] = datetime.now().isoformat()
+    return stats
+
+
+class UserStatsAggregator:
+    """Maintains and reads the per-user statistics documents"""
+
+    def __init__(self, db=None):
+        self.db = db or get_firestore_client()
+        self.logger = logging.getLogger(f"{__name__}.UserStatsAggregator")
+
+    def _doc_ref(self, user_key: str):
+        return self.db.collection(COLLECTIONS['user_stats']).document(user_key)
+
+    def _fold(self, user_key: str, contribution: Dict[str, Any], created_at: datetime,
+              result_id: Optional[str] = None, existing_contribution: Optional[Dict[str, Any]] = None):
+        """
+        Apply an analysis to the statistics document in one transaction
+
+        A missing document is backfilled from the user's stored analyses (other
+        than result_id) inside the same transaction and then gets the full
+        contribution; an existing one gets existing_contribution (default: the
+        same). Concurrent first writers conflict on the document and retry, so
+        only one backfill is kept.
+        """
+        backfilled = {}
+
+        def _create():
+            backfilled['stats'] = self._backfill(user_key, exclude_result_id=result_id)
+            return backfilled['stats']
+
+        def _apply(stats):
+            if stats is backfilled.get('stats') or existing_contribution is None:
+                apply_contribution(stats, contribution, created_at)
+            else:
+                apply_contribution(stats, existing_contribution, created_at)
+
+        update_document_transactionally(self.db, self._doc_ref(user_key), _create, _apply)
+
+    def record_analysis(self, user_key: str, analysis_results: Dict[str, Any],
+                        created_at: Optional[datetime] = None,
+                        result_id: Optional[str] = None) -> bool:
+        """
+        Add a newly stored analysis to its owner's statistics
+
+        Args:
+            user_key: user_id (or email for legacy users) the analysis belongs to
+            analysis_results: The stored analysis results tree
+            created_at: When the analysis was created
+            result_id: Document ID of the stored analysis (left out of a backfill)
+
+        Returns:
+            bool: True if the statistics document was updated
+        """
+        if not self.db or not user_key:
+            return False
+        try:
+            created_at = _naive(created_at) or datetime.now()
+            self._fold(user_key, analysis_contribution(analysis_results), created_at, result_id)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error updating user statistics for {user_key}: {str(e)}")
+            return False
+
+    def replace_analysis(self, user_key: str, previous_results: Dict[str, Any], analysis_results: Dict[str, Any],
+                         created_at: Optional[datetime] = None, result_id: Optional[str] = None) -> bool:
+        """
+        Swap an overwritten analysis's counts (issues, recommendations, ...) for its new ones
+
+        Used when a stored analysis is re-saved in place (e.g. re-analysis after
+        sample corrections); the number of analyses is left unchanged.
+
+        Returns:
+            bool: True if the statistics document was updated
+        """
+        if not self.db or not user_key:
+            return False
+        try:
+            created_at = _naive(created_at) or datetime.now()
+            contribution = analysis_contribution(analysis_results)
+            delta = contribution_delta(analysis_contribution(previous_results), contribution)
+            self._fold(user_key, contribution, created_at, result_id, existing_contribution=delta)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error adjusting user statistics for {user_key}: {str(e)}")
+            return False
+
+    def get_stats(self, user_key: str, rebuild_if_missing: bool = True) -> Optional[Dict[str, Any]]:
+        """Read a user's statistics document, backfilling it once for existing users"""
+        if not self.db or not user_key:
+            return None
+        try:
+            snapshot = self._doc_ref(user_key).get()
+            if snapshot.exists:
+                return snapshot.to_dict()
+            if not rebuild_if_missing:
+                return None
+            # Written even for users without analyses, so the backfill query runs only once
+            stored = {}
+            update_document_transactionally(self.db, self._doc_ref(user_key),
+                                            lambda: self._backfill(user_key),
+                                            lambda stats: stored.update(stats=stats))
+            return stored.get('stats')
+        except Exception as e:
+            self.logger.error(f"Error reading user statistics for {user_key}: {str(e)}")
+            return None
+
+    def rebuild(self, user_key: str) -> Optional[Dict[str, Any]]:
+        """Recompute a user's statistics from their stored analyses and overwrite the document"""
+        try:
+            stats = self._backfill(user_key)
+            self._doc_ref(user_key).set(stats)
+            return stats
+        except Exception as e:
+            self.logger.error(f"Error rebuilding user statistics for {user_key}: {str(e)}")
+            return None
+
+    def _backfill(self, user_key: str, exclude_result_id: Optional[str] = None) -> Dict[str, Any]:
+        """Statistics computed from the user's stored analyses (no write)"""
+        store = AnalysisDocumentStore(self.db, COLLECTIONS['analysis_results'])
+        query = self.db.collection(COLLECTIONS['analysis_results'])
+        if FieldFilter is not None:
+            query = query.where(filter=FieldFilter('user_id', '==', user_key))
+        else:
+            query = query.where('user_id', '==', user_key)
+
+        stats = _empty_stats(user_key)
+        found = 0
+        for doc in query.stream():
+            if exclude_result_id and doc.id == exclude_result_id:
+                continue
+            data = doc.to_dict() or {}
+            created_at = _naive(data.get('created_at')) or datetime.now()
+            analysis_results = data.get('analysis_results', {}) or {}
+            summary = data.get('summary')
+            report_types = summary.get('report_types') if isinstance(summary, dict) else None
+            if report_types is None and is_chunked_document(data) and 'raw_data' not in analysis_results:
+                # Older chunked documents keep raw_data in a section part only
+                analysis_results = dict(analysis_results, raw_data=store.load_section(doc.id, 'raw_data') or {})
+            contribution = analysis_contribution(analysis_results, data.get('status', 'completed'),
+                                                 report_types)
+            if isinstance(summary, dict):
+                # Chunked documents keep issue/recommendation counts in the summary
+                contribution['issues'] = summary.get('total_issues', contribution['issues'])
+                contribution['critical_issues'] = summary.get('critical_issues', contribution['critical_issues'])
+                contribution['recommendations'] = summary.get('total_recommendations', contribution['recommendations'])
+            apply_contribution(stats, contribution, created_at)
+            found += 1
+
+        self.logger.info(f"Backfilled statistics for {user_key} from {found} analyses")
+        return stats
+
+
+def summarize_stats(stats: Optional[Dict[str, Any]], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Derive the dashboard metrics from a statistics document"""
+    stats = stats or _empty_stats('')
+    now = now or datetime.now()
+    totals = stats.get('totals', {})
+    daily = stats.get('daily', {})
+
+    def _window(start_days: int, end_days: int, key: str) -> int:
+        start = (now - timedelta(days=start_days)).strftime('%Y-%m-%d')
+        end = (now - timedelta(days=end_days)).strftime('%Y-%m-%d')
+        return sum(day.get(key, 0) for day_key, day in daily.items() if start < day_key <= end)
+
+    soil_this_month, soil_last_month = _window(30, 0, 'soil'), _window(60, 30, 'soil')
+    leaf_this_month, leaf_last_month = _window(30, 0, 'leaf'), _window(60, 30, 'leaf')
+    total = totals.get('analyses', 0)
+
+    return {
+        'total_analyses': total,
+        'completed_analyses': totals.get('completed', 0),
+        'soil_analyses': totals.get('soil', 0),
+        'leaf_analyses': totals.get('leaf', 0),
+        'total_issues': totals.get('issues', 0),
+        'critical_issues': totals.get('critical_issues', 0),
+        'total_recommendations': totals.get('recommendations', 0),
+        'recent_activity': _window(7, 0, 'analyses'),
+        'soil_trend': ((soil_this_month - soil_last_month) / soil_last_month) * 100 if soil_last_month else 0,
+        'leaf_trend': ((leaf_this_month - leaf_last_month) / leaf_last_month) * 100 if leaf_last_month else 0,
+        'issues_trend': 0,
+        'recommendations_trend': 0,
+        'avg_issues_per_analysis': totals.get('issues', 0) / max(total, 1),
+        'avg_recommendations_per_analysis': totals.get('recommendations', 0) / max(total, 1),
+        'avg_processing_time': totals.get('processing_time_seconds', 0) / max(total, 1),
+        'issue_severity': dict(stats.get('issue_severity', {})),
+        'recommendation_effectiveness': dict(stats.get('recommendation_effectiveness', {})),
+    }
+
+
+def monthly_trends(stats: Optional[Dict[str, Any]], months: int = 12) -> List[Dict[str, Any]]:
+    """Monthly buckets for the trends chart, oldest first"""
+    monthly = (stats or {}).get('monthly', {})
+    return [dict(monthly[key], month=key) for key in sorted(monthly)[-months:]]
+
+
+def record_analysis_for_user(user_key: str, analysis_results: Dict[str, Any],
+                             created_at: Optional[datetime] = None,
+                             result_id: Optional[str] = None, db=None) -> bool:
+    """Convenience wrapper used when an analysis is stored"""
+    return UserStatsAggregator(db).record_analysis(user_key, analysis_results, created_at, result_id)
+
+
+def replace_analysis_for_user(user_key: str, previous_results: Dict[str, Any], analysis_results: Dict[str, Any],
+                              created_at: Optional[datetime] = None, result_id: Optional[str] = None,
+                              db=None) -> bool:
+    """Convenience wrapper used when a stored analysis is overwritten"""
+    return UserStatsAggregator(db).replace_analysis(user_key, previous_results, analysis_results,
+                                                    created_at, result_id)